@@ -0,0 +1,213 @@
+"""alcance.py
+
+Este módulo limita las consultas de la API a la empresa del usuario, para
+que ninguna empresa vea ni modifique los registros de otra.
+
+    - `obtener_empresa_id` resuelve la empresa del usuario a partir de su
+      perfil (`request.user.perfilusuario`) una sola vez por petición. El
+      resultado se guarda además en la caché (`ALCANCE_EMPRESA_TIMEOUT`
+      segundos) para no consultar el perfil en cada petición; se invalida al
+      guardar o eliminar el perfil (ver `usuarios/signals.py`).
+    - `AlcanceEmpresaMixin` filtra el queryset de cada vista por la empresa
+      del usuario con la ruta `campo_empresa` y rechaza las escrituras que
+      dejarían el registro fuera de su empresa.
+    - Las tablas que más crecen (bitácora de kilometraje, órdenes de trabajo
+      y órdenes de movimiento) tienen su propia columna `empresa`, copiada del
+      vehículo al guardar (`EmpresaDerivadaMixin`) e indexada junto con la
+      fecha, para filtrarlas por empresa sin joins.
+
+Los usuarios del personal (`is_staff`) no están limitados a una empresa; los
+usuarios sin perfil no ven ningún registro.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.request import Request
+
+# Valor guardado en la caché para los usuarios sin perfil (los ids empiezan en 1):
+SIN_EMPRESA = 0
+
+def clave_empresa(usuario_id: int) -> str:
+    """Devuelve la clave de la caché con la empresa de un usuario."""
+    return f'alcance:empresa:{usuario_id}'
+
+def empresa_del_usuario(usuario) -> Optional[int]:
+    """Devuelve el id de la empresa del perfil de un usuario.
+
+    Returns:
+        int: El id de la empresa, o None si el usuario no está autenticado
+        o no tiene perfil.
+    """
+    if usuario is None or not usuario.is_authenticated:
+        return None
+    clave = clave_empresa(usuario.pk)
+    empresa_id = cache.get(clave)
+    if empresa_id is None:
+        perfil = getattr(usuario, 'perfilusuario', None)
+        empresa_id = perfil.empresa_id if perfil is not None else SIN_EMPRESA
+        cache.set(clave, empresa_id, getattr(settings, 'ALCANCE_EMPRESA_TIMEOUT', 300))
+    return empresa_id or None
+
+def olvidar_empresa(usuario_id: int) -> None:
+    """Elimina de la caché la empresa de un usuario."""
+    cache.delete(clave_empresa(usuario_id))
+
+def conectar_perfiles(modelos: Iterable[Model]) -> None:
+    """Conecta la eliminación de la empresa guardada en la caché al guardar
+    o eliminar el perfil de un usuario.
+
+    Args:
+        modelos (Iterable[Model]): Modelos de perfil (con el campo `user`).
+    """
+
+    def receptor(sender, instance, **kwargs):
+        olvidar_empresa(instance.user_id)
+
+    for modelo in modelos:
+        uid = f'alcance:{modelo._meta.label}'
+        post_save.connect(receptor, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_save')
+        post_delete.connect(receptor, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_delete')
+
+def es_global(request: Request) -> bool:
+    """Indica si el usuario de la petición puede ver todas las empresas."""
+    return bool(getattr(request.user, 'is_staff', False))
+
+def obtener_empresa_id(request: Request) -> Optional[int]:
+    """Devuelve el id de la empresa del usuario de la petición.
+
+    Se resuelve una sola vez por petición; las siguientes llamadas
+    devuelven el valor guardado en la petición.
+    """
+    http = getattr(request, '_request', request)
+    if not hasattr(http, 'empresa_alcance'):
+        http.empresa_alcance = empresa_del_usuario(request.user)
+    return http.empresa_alcance
+
+def fijar_empresa(request: Request, empresa_id: Optional[int]) -> None:
+    """Guarda en la petición la empresa del usuario ya conocida (p. ej. por
+    la autenticación, ver `autenticacion.py`)."""
+    getattr(request, '_request', request).empresa_alcance = empresa_id
+
+def ambito(request: Request) -> str:
+    """Identifica el conjunto de registros visible para el usuario
+    (para las claves de la caché de respuestas)."""
+    return 'global' if es_global(request) else f'e{obtener_empresa_id(request)}'
+
+def filtrar_por_empresa(request: Request, queryset: QuerySet, campo_empresa: str) -> QuerySet:
+    """Filtra un queryset por la empresa del usuario de la petición.
+
+    Args:
+        request (Request): La petición HTTP.
+        queryset (QuerySet): Las filas a filtrar.
+        campo_empresa (str): Ruta desde el modelo hasta la empresa.
+    """
+    if es_global(request):
+        return queryset
+    empresa_id = obtener_empresa_id(request)
+    if empresa_id is None:
+        return queryset.none()
+    return queryset.filter(**{campo_empresa: empresa_id})
+
+class AlcanceEmpresaMixin:
+    """
+    Mixin para vistas que limita su queryset a la empresa del usuario.
+
+    Atributos:
+        - campo_empresa: Ruta desde el modelo de la vista hasta la empresa
+          (p. ej. `'empresa'` o `'vehiculo__empresa'`).
+    """
+    campo_empresa = 'empresa'
+
+    def get_queryset(self):
+        return self.limitar_a_empresa(super().get_queryset())
+
+    def limitar_a_empresa(self, queryset: QuerySet, campo_empresa: Optional[str] = None) -> QuerySet:
+        """Filtra un queryset por la empresa del usuario de la petición.
+
+        Args:
+            queryset (QuerySet): Las filas a filtrar.
+            campo_empresa (str): Ruta hasta la empresa (`campo_empresa` por defecto).
+        """
+        return filtrar_por_empresa(self.request, queryset, campo_empresa or self.campo_empresa)
+
+    def verificar_empresa(self, empresa_id) -> None:
+        """Rechaza las consultas sobre una empresa distinta a la del usuario."""
+        if not es_global(self.request) and empresa_id != obtener_empresa_id(self.request):
+            raise PermissionDenied(_("No tiene acceso a los registros de esta empresa."))
+
+    def verificar_alcance(self, instancia: Model) -> None:
+        """Rechaza un registro guardado fuera de la empresa del usuario."""
+        if es_global(self.request):
+            return
+        visibles = self.limitar_a_empresa(type(instancia)._default_manager.filter(pk=instancia.pk))
+        if not visibles.exists():
+            raise PermissionDenied(_("No tiene acceso a los registros de esta empresa."))
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            self.verificar_alcance(serializer.instance)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+            self.verificar_alcance(serializer.instance)
+
+class EmpresaDerivadaMixin:
+    """
+    Mixin para modelos con una columna `empresa` copiada de una relación:
+    la actualiza al guardar.
+
+    Atributos:
+        - relacion_empresa: Relación de la que se copia la empresa.
+    """
+    relacion_empresa = 'vehiculo'
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.relacion_empresa in update_fields:
+            self.empresa_id = getattr(self, self.relacion_empresa).empresa_id
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'empresa'}
+        super().save(*args, **kwargs)
+
+def conectar_propagacion(modelo: Model, ruta: str, origen: Model) -> None:
+    """Mantiene la columna `empresa` de un modelo al cambiar la empresa de
+    los registros de los que se copió, e invalida las respuestas en caché
+    de los grupos del modelo (ver `cache.py`).
+
+    Args:
+        modelo (Model): Modelo con la columna `empresa` desnormalizada.
+        ruta (str): Ruta desde `modelo` hasta `origen` (p. ej. `'vehiculo'`).
+        origen (Model): Modelo con la empresa original (p. ej. `Vehiculo`),
+            incluidos sus modelos hijos.
+    """
+
+    def al_guardar(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+        # La señal se emite con la clase concreta como remitente: se conecta
+        # sin remitente para atender también a los modelos hijos del origen
+        # (p. ej. `Representante`, que hereda de `PerfilUsuario`).
+        if not issubclass(sender, origen):
+            return
+        if raw or created or (update_fields is not None and 'empresa' not in update_fields):
+            return
+        actualizados = modelo._default_manager.filter(**{ruta: instance}).exclude(
+            empresa_id=instance.empresa_id
+        ).update(empresa_id=instance.empresa_id)
+        if actualizados:
+            # `update` no emite señales, así que los grupos del modelo se
+            # invalidan aquí (importación diferida: cache.py importa este módulo).
+            from .cache import invalidar_modelo
+            invalidar_modelo(modelo)
+
+    post_save.connect(
+        al_guardar, weak=False, dispatch_uid=f'alcance:{modelo._meta.label}:{ruta}'
+    )
@@ -0,0 +1,231 @@
+"""almacenamiento.py
+
+Este módulo define los backends de almacenamiento de las fotografías,
+con una caché de las URLs de los archivos.
+
+Generar una URL firmada de Google Cloud Storage es una operación
+criptográfica; sin caché, un listado de cientos de filas con fotografías
+firma una URL por cada imagen de cada fila en cada petición. Con
+`URLCacheadaMixin`:
+    - Cada URL firmada se guarda en la caché hasta `margen_urls()` segundos
+      antes de su expiración, por lo que se firma una vez por archivo y
+      periodo, no una vez por petición. El margen cubre el tiempo que la URL
+      puede pasar en una respuesta cacheada (`CACHE_RESPUESTAS_TIMEOUT`) más
+      el que necesita el cliente para usarla (`MEDIA_URL_MARGEN`), de modo
+      que ninguna respuesta entrega una URL ya expirada.
+    - `urls(nombres)` resuelve un conjunto de archivos con una sola lectura
+      (`get_many`) y una sola escritura (`set_many`) de la caché.
+      `ListaConURLs` la utiliza para resolver de una vez las URLs de todas
+      las filas de un listado, que luego se leen de la variable de contexto
+      `URLS_PRECARGADAS` sin volver a consultar la caché.
+    - Los archivos direccionados por contenido (cuyo nombre incluye el hash
+      de su contenido, como las miniaturas) nunca cambian: se suben con
+      `Cache-Control: immutable` y se sirven desde `MEDIA_CDN_URL` sin firma,
+      o con una firma de `MEDIA_URL_EXPIRACION_INMUTABLE` segundos si no hay CDN.
+
+`AlmacenamientoGCS` es el backend de producción y `AlmacenamientoLocal`
+su equivalente en el sistema de archivos (desarrollo y pruebas), que firma
+las URLs con HMAC para comportarse igual que las URLs firmadas de GCS; la
+vista `servir_media` sirve sus archivos y rechaza las URLs con una firma
+inválida o expirada.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+import hashlib
+import re
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import FileField
+from django.db.models.manager import BaseManager
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import serializers
+from storages.backends.gcloud import GoogleCloudStorage
+
+from .cache import obtener_cache
+
+# Nombres direccionados por contenido: `<nombre>.<hash de 12 caracteres>.<extensión>`
+NOMBRE_INMUTABLE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+CACHE_CONTROL_INMUTABLE = 'public, max-age=31536000, immutable'
+
+URLS_PRECARGADAS: ContextVar[Optional[Dict[str, str]]] = ContextVar(
+    'urls_precargadas', default=None
+)
+
+def es_inmutable(nombre: str) -> bool:
+    """Indica si el nombre de un archivo incluye el hash de su contenido."""
+    return bool(NOMBRE_INMUTABLE.search(nombre))
+
+def nombre_inmutable(nombre: str, contenido: bytes) -> str:
+    """Agrega el hash del contenido al nombre de un archivo (antes de la extensión)."""
+    base, punto, extension = nombre.rpartition('.')
+    huella = hashlib.sha256(contenido).hexdigest()[:12]
+    return f'{base}.{huella}.{extension}' if punto else f'{nombre}.{huella}'
+
+def margen_urls() -> int:
+    """Devuelve los segundos antes de su expiración en los que una URL firmada
+    deja de entregarse: la vigencia de las respuestas cacheadas más el tiempo
+    que el cliente necesita para usar la URL."""
+    return (
+        getattr(settings, 'CACHE_RESPUESTAS_TIMEOUT', 300)
+        + getattr(settings, 'MEDIA_URL_MARGEN', 300)
+    )
+
+class URLCacheadaMixin:
+    """
+    Mixin para backends de almacenamiento que guarda en caché sus URLs.
+
+    El backend debe aceptar `parameters={'expiration': timedelta}` en `url`.
+    """
+
+    def url(self, name, parameters=None):
+        if parameters is not None:
+            return super().url(name, parameters)
+        precargadas = URLS_PRECARGADAS.get()
+        if precargadas is not None and name in precargadas:
+            return precargadas[name]
+        return self.urls([name])[name]
+
+    def clave_url(self, nombre: str) -> str:
+        huella = hashlib.md5(nombre.encode()).hexdigest()
+        return f'media:url:{type(self).__name__}:{huella}'
+
+    def urls(self, nombres: Iterable[str]) -> Dict[str, str]:
+        """Devuelve las URLs de un conjunto de archivos.
+
+        Las URLs guardadas en la caché se leen con una sola consulta;
+        las demás se generan y se guardan con una sola escritura por
+        tiempo de vigencia.
+
+        Returns:
+            dict: La URL de cada archivo indexada por su nombre.
+        """
+        claves = {self.clave_url(nombre): nombre for nombre in set(nombres) if nombre}
+        cache = obtener_cache()
+        resultado = {
+            claves[clave]: url for clave, url in cache.get_many(list(claves)).items()
+        }
+        nuevas: Dict[Optional[int], Dict[str, str]] = {}
+        for clave, nombre in claves.items():
+            if nombre in resultado:
+                continue
+            url, vigencia = self.generar_url(nombre)
+            resultado[nombre] = url
+            nuevas.setdefault(vigencia, {})[clave] = url
+        for vigencia, urls in nuevas.items():
+            cache.set_many(urls, vigencia)
+        return resultado
+
+    def generar_url(self, nombre: str) -> Tuple[str, Optional[int]]:
+        """Genera la URL de un archivo.
+
+        Returns:
+            tuple: La URL y los segundos que puede guardarse en la caché
+            (None si no expira).
+        """
+        margen = margen_urls()
+        if es_inmutable(nombre):
+            cdn = getattr(settings, 'MEDIA_CDN_URL', '')
+            if cdn:
+                return f"{cdn.rstrip('/')}/{quote(nombre)}", None
+            expiracion = timedelta(
+                seconds=getattr(settings, 'MEDIA_URL_EXPIRACION_INMUTABLE', 7 * 24 * 3600)
+            )
+        elif not self.firma_urls():
+            return super().url(nombre), None
+        else:
+            expiracion = self.expiration
+        url = self.url(nombre, {'expiration': expiracion})
+        return url, max(int(expiracion.total_seconds()) - margen, 1)
+
+    def firma_urls(self) -> bool:
+        """Indica si el backend firma sus URLs."""
+        return True
+
+class AlmacenamientoGCS(URLCacheadaMixin, GoogleCloudStorage):
+    """
+    Google Cloud Storage con caché de URLs firmadas.
+    """
+
+    def firma_urls(self) -> bool:
+        return self.querystring_auth and self.default_acl != 'publicRead'
+
+    def get_object_parameters(self, name):
+        parametros = super().get_object_parameters(name)
+        if es_inmutable(name):
+            parametros.setdefault('cache_control', CACHE_CONTROL_INMUTABLE)
+        return parametros
+
+class AlmacenamientoLocal(URLCacheadaMixin, FileSystemStorage):
+    """
+    Almacenamiento en el sistema de archivos (`MEDIA_ROOT`) con URLs firmadas
+    con HMAC, equivalente a `AlmacenamientoGCS` para desarrollo y pruebas.
+    """
+
+    @property
+    def expiration(self) -> timedelta:
+        return timedelta(seconds=getattr(settings, 'MEDIA_URL_EXPIRACION', 24 * 3600))
+
+    def url(self, name, parameters=None):
+        if parameters is None:
+            return super().url(name)
+        expira = int(time.time() + parameters['expiration'].total_seconds())
+        consulta = urlencode({'expira': expira, 'firma': self.firmar(name, expira)})
+        return f'{FileSystemStorage.url(self, name)}?{consulta}'
+
+    def firmar(self, nombre: str, expira: int) -> str:
+        return salted_hmac('media', f'{nombre}:{expira}').hexdigest()
+
+    def verificar(self, nombre: str, expira: int, firma: str) -> bool:
+        """Comprueba la firma y la vigencia de una URL generada por `url`."""
+        return expira >= time.time() and constant_time_compare(firma, self.firmar(nombre, expira))
+
+def nombres_de_archivos(instancias: Iterable) -> set:
+    """Devuelve los nombres de los archivos (y miniaturas) de un conjunto de instancias."""
+    nombres = set()
+    for instancia in instancias:
+        for campo in instancia._meta.concrete_fields:
+            if isinstance(campo, FileField):
+                archivo = getattr(instancia, campo.attname)
+                if archivo:
+                    nombres.add(archivo.name)
+        for variantes in (getattr(instancia, 'miniaturas', None) or {}).values():
+            nombres.update(
+                ruta for nombre, ruta in variantes.items() if nombre != 'original'
+            )
+    return nombres
+
+@contextmanager
+def urls_precargadas(instancias: Iterable):
+    """Resuelve de una vez las URLs de los archivos de las instancias.
+
+    Dentro del bloque, `URLCacheadaMixin.url` lee las URLs resueltas
+    sin consultar la caché.
+    """
+    storage = default_storage
+    if not hasattr(storage, 'urls'):
+        yield
+        return
+    token = URLS_PRECARGADAS.set(storage.urls(nombres_de_archivos(instancias)))
+    try:
+        yield
+    finally:
+        URLS_PRECARGADAS.reset(token)
+
+class ListaConURLs(serializers.ListSerializer):
+    """
+    ListSerializer que resuelve las URLs de los archivos de todas las filas
+    antes de serializarlas.
+    """
+
+    def to_representation(self, data):
+        instancias = list(data.all() if isinstance(data, BaseManager) else data)
+        with urls_precargadas(instancias):
+            return super().to_representation(instancias)
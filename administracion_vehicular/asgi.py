@@ -3,6 +3,11 @@ ASGI config for administracion_vehicular project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Sirve las vistas asíncronas (ver `asincrono.py`) sin ocupar un trabajador
+por petición, p. ej. con uvicorn:
+
+    gunicorn -k uvicorn.workers.UvicornWorker administracion_vehicular.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'administracion_vehicular.settings')
+os.environ.setdefault('SERVIDOR_ASGI', 'true')
 
 application = get_asgi_application()
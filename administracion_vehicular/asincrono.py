@@ -0,0 +1,72 @@
+"""asincrono.py
+
+Este módulo define las vistas asíncronas de las consultas más frecuentes de
+la API (la orden de movimiento abierta de un conductor, el estado actual de
+un vehículo y la vigencia de una licencia), que las aplicaciones móviles de
+los conductores consultan periódicamente.
+
+Con el servidor WSGI (trabajadores síncronos de gunicorn) cada petición
+ocupa un trabajador completo mientras espera la base de datos. Servidas con
+ASGI (`asgi.py`), estas vistas esperan la base de datos y la caché con las
+interfaces asíncronas de Django, y un solo trabajador atiende muchas
+conexiones a la vez. Cada una tiene una versión síncrona en la vista de DRF
+correspondiente, con la misma respuesta (ver `benchmarks/carga.py`).
+
+`vista_asincrona` convierte una corrutina que devuelve un diccionario en una
+vista de Django:
+    - Solo acepta peticiones GET.
+    - Autentica la petición por su token (`autenticacion.autenticar_asincrono`)
+      y resuelve la empresa del usuario para `alcance.filtrar_por_empresa`.
+    - Devuelve los errores con el mismo formato que DRF (`{"detail": ...}`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from functools import wraps
+from typing import Awaitable, Callable
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpRequest, JsonResponse
+from rest_framework import exceptions
+
+from .alcance import fijar_empresa
+from .autenticacion import autenticar_asincrono, empresa_del_token
+
+def respuesta_de_error(error: exceptions.APIException) -> JsonResponse:
+    """Devuelve la respuesta JSON de una excepción de DRF."""
+    if isinstance(error.detail, (dict, list)):
+        datos = error.detail
+    else:
+        datos = {'detail': str(error.detail)}
+    response = JsonResponse(datos, status=error.status_code, safe=False)
+    if isinstance(error, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)):
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+def vista_asincrona(vista: Callable[..., Awaitable[dict]]):
+    """Decorador para las vistas asíncronas de solo lectura.
+
+    Args:
+        vista: Corrutina que recibe la petición (con `request.user`) y los
+            argumentos de la URL y devuelve los datos de la respuesta.
+    """
+
+    @wraps(vista)
+    async def envoltura(request: HttpRequest, *args, **kwargs):
+        if request.method != 'GET':
+            return respuesta_de_error(exceptions.MethodNotAllowed(request.method))
+        try:
+            token = await autenticar_asincrono(request)
+            if token is None:
+                raise exceptions.NotAuthenticated()
+            request.user = token.user
+            fijar_empresa(request, empresa_del_token(token))
+            datos = await vista(request, *args, **kwargs)
+        except exceptions.APIException as error:
+            return respuesta_de_error(error)
+        except Http404 as error:
+            return respuesta_de_error(exceptions.NotFound(str(error) or None))
+        except ObjectDoesNotExist:
+            return respuesta_de_error(exceptions.NotFound())
+        return JsonResponse(datos)
+
+    return envoltura
@@ -0,0 +1,256 @@
+"""autenticacion.py
+
+Este módulo define la autenticación por token de la API con una caché de
+los tokens.
+
+`TokenAuthentication` consulta en cada petición el token junto con su usuario
+y, después, las vistas consultan el perfil del usuario para conocer su
+empresa (ver `alcance.py`). `TokenCacheAuthentication` carga el token, el
+usuario y su perfil en una sola consulta y, con `AUTENTICACION_CACHE`
+activado, guarda en la caché durante `AUTENTICACION_CACHE_TIMEOUT` segundos
+los datos que necesita la autenticación (`datos_del_token`: id, nombre y
+permisos del usuario, id del perfil y de la empresa), por lo que las
+peticiones siguientes con el mismo token no consultan la base de datos.
+No se guarda el usuario completo, que incluye el hash de su contraseña; el
+usuario y el perfil se reconstruyen con esos campos y los demás se cargan
+de la base de datos solo si se usan (como los campos diferidos de `only`).
+
+Las entradas se eliminan de la caché:
+    - Al eliminar o reemplazar el token (cierre de sesión y rotación del
+      token, ver `views.py`).
+    - Al guardar el usuario (p. ej. al desactivarlo o cambiar su contraseña)
+      o al guardar o eliminar su perfil.
+
+`autenticar_asincrono` autentica de la misma forma las peticiones de las
+vistas asíncronas (ver `asincrono.py`), con las interfaces asíncronas del ORM
+y de la caché.
+
+Las claves de la caché contienen el hash SHA-256 del token y no el token.
+Los aciertos y fallos se publican junto con los de la caché de respuestas
+(grupo `autenticacion`, ver `cache.obtener_estadisticas`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import hashlib
+from typing import Iterable, NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+from rest_framework.authtoken.models import Token
+
+from .alcance import fijar_empresa
+from .cache import GRUPOS, acontar, contar, obtener_cache
+
+GRUPO = 'autenticacion'
+GRUPOS.add(GRUPO)
+
+def clave_token(key: str) -> str:
+    """Devuelve la clave de la caché de un token."""
+    return f'{GRUPO}:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+def clave_usuario(usuario_id: int) -> str:
+    """Devuelve la clave de la caché con el token guardado de un usuario."""
+    return f'{GRUPO}:usuario:{usuario_id}'
+
+def olvidar_token(key: str) -> None:
+    """Elimina un token de la caché."""
+    obtener_cache().delete(clave_token(key))
+
+def olvidar_usuario(usuario_id: int) -> None:
+    """Elimina de la caché el token de un usuario, si está guardado."""
+    cache = obtener_cache()
+    clave = cache.get(clave_usuario(usuario_id))
+    if clave is not None:
+        cache.delete_many([clave, clave_usuario(usuario_id)])
+
+class DatosToken(NamedTuple):
+    """Datos de un token guardados en la caché."""
+    usuario_id: int
+    username: str
+    is_active: bool
+    is_staff: bool
+    is_superuser: bool
+    perfil_id: Optional[int]
+    empresa_id: Optional[int]
+
+def instancia_parcial(modelo, **valores) -> Model:
+    """Crea una instancia guardada de un modelo con solo algunos campos
+    cargados; los demás se consultan si se usan."""
+    campos = [
+        campo.attname for campo in modelo._meta.concrete_fields if campo.attname in valores
+    ]
+    return modelo.from_db('default', campos, [valores[campo] for campo in campos])
+
+def datos_del_token(token: Token) -> DatosToken:
+    """Devuelve los datos de un token (con su usuario y perfil) que se guardan en la caché."""
+    usuario = token.user
+    perfil = getattr(usuario, 'perfilusuario', None)
+    return DatosToken(
+        usuario.pk, usuario.get_username(), usuario.is_active, usuario.is_staff,
+        usuario.is_superuser,
+        perfil.pk if perfil is not None else None,
+        perfil.empresa_id if perfil is not None else None,
+    )
+
+def token_de_los_datos(key: str, datos: DatosToken) -> Token:
+    """Reconstruye un token, su usuario y su perfil con los datos de la caché."""
+    usuario = instancia_parcial(
+        User, id=datos.usuario_id, username=datos.username, is_active=datos.is_active,
+        is_staff=datos.is_staff, is_superuser=datos.is_superuser,
+    )
+    relacion = User._meta.get_field('perfilusuario')
+    perfil = None
+    if datos.perfil_id is not None:
+        perfil = instancia_parcial(
+            relacion.related_model,
+            id=datos.perfil_id, user_id=datos.usuario_id, empresa_id=datos.empresa_id
+        )
+        relacion.remote_field.set_cached_value(perfil, usuario)
+    relacion.set_cached_value(usuario, perfil)
+    token = instancia_parcial(Token, key=key, user_id=datos.usuario_id)
+    Token._meta.get_field('user').set_cached_value(token, usuario)
+    return token
+
+def leer_datos(datos) -> Optional[DatosToken]:
+    """Devuelve los datos leídos de la caché, o None si no hay datos o tienen
+    otro formato (p. ej. entradas de una versión anterior)."""
+    if isinstance(datos, tuple) and len(datos) == len(DatosToken._fields):
+        return DatosToken(*datos)
+    return None
+
+def empresa_del_token(token: Token):
+    """Devuelve el id de la empresa del perfil del usuario de un token."""
+    perfil = getattr(token.user, 'perfilusuario', None)
+    return perfil.empresa_id if perfil is not None else None
+
+class TokenCacheAuthentication(authentication.TokenAuthentication):
+    """
+    Autenticación por token que carga el usuario y su perfil en una sola
+    consulta y, con `AUTENTICACION_CACHE` activado, los guarda en la caché.
+    """
+
+    def authenticate(self, request):
+        resultado = super().authenticate(request)
+        if resultado is not None:
+            fijar_empresa(request, empresa_del_token(resultado[1]))
+        return resultado
+
+    def authenticate_credentials(self, key):
+        if not getattr(settings, 'AUTENTICACION_CACHE', False):
+            token = self.obtener_token(key)
+        else:
+            cache = obtener_cache()
+            clave = clave_token(key)
+            datos = leer_datos(cache.get(clave))
+            if datos is not None:
+                contar(GRUPO, 'aciertos')
+                token = token_de_los_datos(key, datos)
+            else:
+                contar(GRUPO, 'fallos')
+                token = self.obtener_token(key)
+                timeout = getattr(settings, 'AUTENTICACION_CACHE_TIMEOUT', 300)
+                cache.set_many(
+                    {clave: tuple(datos_del_token(token)), clave_usuario(token.user_id): clave}, timeout
+                )
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
+
+    def obtener_token(self, key: str) -> Token:
+        """Consulta el token con su usuario y el perfil del usuario."""
+        model = self.get_model()
+        try:
+            return model.objects.select_related('user__perfilusuario').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+def clave_de_la_peticion(request) -> Optional[str]:
+    """Devuelve el token de la cabecera `Authorization: Token <token>`, o None
+    si la petición no usa autenticación por token."""
+    partes = authentication.get_authorization_header(request).split()
+    if not partes or partes[0].lower() != TokenCacheAuthentication.keyword.lower().encode():
+        return None
+    if len(partes) != 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+    try:
+        return partes[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. Token string should not contain invalid characters.')
+        )
+
+async def autenticar_asincrono(request) -> Optional[Token]:
+    """Autentica una petición de una vista asíncrona por su token.
+
+    Returns:
+        Token: El token con su usuario y el perfil del usuario, o None si la
+        petición no usa autenticación por token.
+
+    Raises:
+        AuthenticationFailed: Si el token no existe o su usuario está inactivo.
+    """
+    key = clave_de_la_peticion(request)
+    if key is None:
+        return None
+    usar_cache = getattr(settings, 'AUTENTICACION_CACHE', False)
+    token = None
+    if usar_cache:
+        cache = obtener_cache()
+        clave = clave_token(key)
+        datos = leer_datos(await cache.aget(clave))
+        await acontar(GRUPO, 'aciertos' if datos is not None else 'fallos')
+        if datos is not None:
+            token = token_de_los_datos(key, datos)
+    if token is None:
+        try:
+            token = await Token.objects.select_related('user__perfilusuario').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if usar_cache:
+            timeout = getattr(settings, 'AUTENTICACION_CACHE_TIMEOUT', 300)
+            await cache.aset_many(
+                {clave: tuple(datos_del_token(token)), clave_usuario(token.user_id): clave}, timeout
+            )
+
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return token
+
+def conectar_tokens(modelos: Iterable[Model]) -> None:
+    """Conecta la eliminación de los tokens guardados en la caché al cambiar
+    los tokens, los usuarios o sus perfiles.
+
+    Args:
+        modelos (Iterable[Model]): Modelos de perfil (con el campo `user`).
+    """
+
+    def al_cambiar_token(sender, instance, **kwargs):
+        olvidar_token(instance.key)
+        olvidar_usuario(instance.user_id)
+
+    def al_guardar_usuario(sender, instance, raw=False, **kwargs):
+        if not raw:
+            olvidar_usuario(instance.pk)
+
+    def al_cambiar_perfil(sender, instance, **kwargs):
+        olvidar_usuario(instance.user_id)
+
+    uid = f'{GRUPO}:{Token._meta.label}'
+    post_save.connect(al_cambiar_token, sender=Token, weak=False, dispatch_uid=f'{uid}:post_save')
+    post_delete.connect(al_cambiar_token, sender=Token, weak=False, dispatch_uid=f'{uid}:post_delete')
+    post_save.connect(
+        al_guardar_usuario, sender=User, weak=False, dispatch_uid=f'{GRUPO}:{User._meta.label}'
+    )
+    for modelo in modelos:
+        uid = f'{GRUPO}:{modelo._meta.label}'
+        post_save.connect(
+            al_cambiar_perfil, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_save'
+        )
+        post_delete.connect(
+            al_cambiar_perfil, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_delete'
+        )
@@ -0,0 +1,187 @@
+"""busqueda.py
+
+Este módulo define el mixin de búsqueda compartido por las acciones
+`search_by` de las vistas.
+
+Cada vista declara sus parámetros de búsqueda con `Parametro`; el mixin
+los valida y convierte a su tipo, construye los filtros y evalúa la
+consulta una sola vez:
+    - `buscar` devuelve una página con los resultados (vacía si no hay
+      coincidencias), con la misma paginación de las rutas de listado.
+    - `buscar_uno` devuelve el primer resultado o 404 si no hay ninguno.
+
+Si falta un parámetro obligatorio, un parámetro no se puede convertir a
+su tipo o no se envía ningún parámetro, se responde con 400 Bad Request.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import re
+from datetime import date
+from typing import Any, Iterable, Optional, Sequence
+
+from django.utils.translation import gettext as _
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .exceptions import ParametroBusquedaInvalido
+from .pagination import PaginacionBusquedaMixin
+
+# Mayor id que admite un BigAutoField:
+ID_MAXIMO = 2 ** 63 - 1
+
+class Parametro:
+    """
+    Parámetro de búsqueda recibido en la query string.
+
+    Atributos:
+        - nombre: Nombre del parámetro en la query string.
+        - tipo: `int` (ids), `str` o `date` (formato ISO 8601).
+        - campo: Campo por el que se filtra, por defecto el nombre del parámetro.
+        - requerido: Si el parámetro es obligatorio.
+        - opciones: Valores admitidos (opcional).
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        tipo: type = int,
+        campo: Optional[str] = None,
+        requerido: bool = False,
+        opciones: Optional[Iterable[Any]] = None
+    ):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.campo = campo or nombre
+        self.requerido = requerido
+        self.opciones = list(opciones) if opciones is not None else None
+
+    def convertir(self, valor: str) -> Any:
+        """Convierte el valor recibido al tipo del parámetro.
+
+        Raises:
+            ParametroBusquedaInvalido: Si el valor no es válido.
+        """
+        if self.tipo is int:
+            if not re.fullmatch(r'[0-9]+', valor) or int(valor) > ID_MAXIMO:
+                raise ParametroBusquedaInvalido(
+                    _("%(nombre)s debe ser un número entero positivo.") % {'nombre': self.nombre}
+                )
+            valor = int(valor)
+        elif self.tipo is date:
+            try:
+                valor = date.fromisoformat(valor)
+            except ValueError as error:
+                raise ParametroBusquedaInvalido(
+                    _("%(nombre)s debe ser una fecha AAAA-MM-DD.") % {'nombre': self.nombre}
+                ) from error
+        if self.opciones is not None and valor not in self.opciones:
+            raise ParametroBusquedaInvalido(
+                _("%(nombre)s debe ser uno de: %(opciones)s.") % {
+                    'nombre': self.nombre,
+                    'opciones': ', '.join(str(opcion) for opcion in self.opciones),
+                }
+            )
+        return valor
+
+class BusquedaMixin(PaginacionBusquedaMixin):
+    """
+    Mixin para implementar las acciones de búsqueda con parámetros tipados.
+
+    Atributos:
+        - parametros_busqueda: Parámetros de la acción `search_by`.
+    """
+    parametros_busqueda: Sequence[Parametro] = ()
+
+    def obtener_filtros(
+        self,
+        request: Request,
+        parametros: Optional[Sequence[Parametro]] = None,
+        solo_el_primero: bool = False
+    ) -> dict:
+        """Valida los parámetros de búsqueda y construye los filtros.
+
+        Args:
+            request (Request): La petición HTTP con los parámetros de búsqueda.
+            parametros (Sequence[Parametro]): Parámetros admitidos, por defecto
+                `parametros_busqueda`.
+            solo_el_primero (bool): Si es True, solo se usa el primero de los
+                parámetros recibidos.
+
+        Returns:
+            dict: Los filtros para `QuerySet.filter`.
+
+        Raises:
+            ParametroBusquedaInvalido: Si los parámetros no son válidos.
+        """
+        parametros = self.parametros_busqueda if parametros is None else parametros
+        filtros = {}
+        for parametro in parametros:
+            valor = request.query_params.get(parametro.nombre, '').strip()
+            if not valor:
+                if parametro.requerido:
+                    raise ParametroBusquedaInvalido(
+                        _("Parámetro de búsqueda incorrecto: %(nombre)s es obligatorio.")
+                        % {'nombre': parametro.nombre}
+                    )
+                continue
+            filtros[parametro.campo] = parametro.convertir(valor)
+            if solo_el_primero:
+                break
+        if not filtros:
+            raise ParametroBusquedaInvalido(
+                _("Parámetros de búsqueda incorrectos: se requiere alguno de %(nombres)s.")
+                % {'nombres': ', '.join(parametro.nombre for parametro in parametros)}
+            )
+        return filtros
+
+    def buscar(self, request: Request, parametros: Optional[Sequence[Parametro]] = None) -> Response:
+        """Devuelve una página con los registros que coinciden con la búsqueda.
+
+        Returns:
+            Response: La página solicitada, vacía si no hay coincidencias.
+        """
+        filtros = self.obtener_filtros(request, parametros)
+        return self.respuesta_paginada(self.get_queryset().filter(**filtros))
+
+    def buscar_uno(
+        self,
+        request: Request,
+        parametros: Optional[Sequence[Parametro]] = None,
+        solo_el_primero: bool = False
+    ) -> Response:
+        """Devuelve el primer registro que coincide con la búsqueda.
+
+        Returns:
+            Response: El registro serializado, o 404 si no hay coincidencias.
+        """
+        filtros = self.obtener_filtros(request, parametros, solo_el_primero)
+        instancia = self.get_queryset().filter(**filtros).first()
+        if instancia is None:
+            return Response(
+                {"error": _("No se encontraron registros para los criterios especificados.")},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(self.get_serializer(instancia).data)
+
+def obtener_perfil_id(request, nombre: str = 'conductor_id') -> int:
+    """Devuelve el id del perfil de la query string (`nombre`) o, si no se
+    envía, el del perfil del usuario de la petición.
+
+    Sirve también para las vistas asíncronas (`asincrono.py`): lee
+    `request.GET` si la petición no es de DRF.
+
+    Raises:
+        ParametroBusquedaInvalido: Si el valor no es válido, o si no se
+        envía y el usuario no tiene perfil.
+    """
+    parametros = getattr(request, 'query_params', request.GET)
+    valor = parametros.get(nombre, '').strip()
+    if valor:
+        return Parametro(nombre).convertir(valor)
+    perfil = getattr(request.user, 'perfilusuario', None)
+    if perfil is None:
+        raise ParametroBusquedaInvalido(
+            _("Parámetro de búsqueda incorrecto: %(nombre)s es obligatorio.") % {'nombre': nombre}
+        )
+    return perfil.id
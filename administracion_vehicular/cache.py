@@ -0,0 +1,288 @@
+"""cache.py
+
+Este módulo define la caché de respuestas de las vistas de catálogos
+que cambian con poca frecuencia (funcionalidades, suscripciones, empresas
+y manuales de mantenimiento).
+
+Cada vista declara los grupos de modelos de los que dependen sus respuestas.
+Cada grupo tiene un número de generación guardado en la caché que forma parte
+de la clave de cada respuesta; al guardar, eliminar o modificar las relaciones
+muchos a muchos de un modelo del grupo, las señales `post_save`, `post_delete`
+y `m2m_changed` incrementan la generación y las respuestas anteriores dejan
+de utilizarse (y caducan por sí solas).
+
+Las claves también incluyen la empresa del usuario (ver `alcance.py`), el
+serializer de la vista y su versión (`version_cache`), y la ruta completa
+de la petición.
+
+El backend se configura en `CACHES` (memoria local, archivos o Redis).
+
+Los aciertos y fallos de cada grupo se acumulan en el proceso y se suman a
+los contadores compartidos de la caché cada `CACHE_ESTADISTICAS_LOTE` eventos
+o `CACHE_ESTADISTICAS_INTERVALO` segundos, con un `incr` por contador, en
+lugar de dos operaciones de la caché en cada petición.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import ManyToManyField, Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .alcance import ambito
+
+ESPACIO = 'respuestas'
+
+# Grupos registrados con `conectar_invalidacion`, para las estadísticas:
+GRUPOS = set()
+# Grupos de los que forma parte cada modelo (por su etiqueta `app.Modelo`):
+GRUPOS_POR_MODELO: Dict[str, Set[str]] = defaultdict(set)
+
+class Contadores:
+    """
+    Aciertos y fallos acumulados en el proceso que aún no se han sumado a los
+    contadores de la caché.
+    """
+
+    def __init__(self):
+        self.pendientes = Counter()
+        self.total = 0
+        self.ultimo_envio = time.monotonic()
+        self.creados = set()
+        self.candado = threading.Lock()
+
+    def acumular(self, clave: str) -> Optional[Dict[str, int]]:
+        """Acumula un evento.
+
+        Returns:
+            dict: Los contadores a enviar si se completó el lote o el
+            intervalo, o None.
+        """
+        with self.candado:
+            self.pendientes[clave] += 1
+            self.total += 1
+            if self.total < getattr(settings, 'CACHE_ESTADISTICAS_LOTE', 100) \
+                    and time.monotonic() - self.ultimo_envio \
+                    < getattr(settings, 'CACHE_ESTADISTICAS_INTERVALO', 10):
+                return None
+            return self.extraer()
+
+    def extraer(self) -> Dict[str, int]:
+        """Devuelve y descarta los contadores pendientes (con el candado tomado)."""
+        pendientes = dict(self.pendientes)
+        self.pendientes.clear()
+        self.total = 0
+        self.ultimo_envio = time.monotonic()
+        return pendientes
+
+    def vaciar(self) -> Dict[str, int]:
+        """Devuelve y descarta todos los contadores pendientes."""
+        with self.candado:
+            return self.extraer()
+
+CONTADORES = Contadores()
+
+def obtener_cache():
+    """Devuelve el backend de caché configurado para las respuestas."""
+    return caches[getattr(settings, 'CACHE_RESPUESTAS_ALIAS', 'default')]
+
+def obtener_generacion(grupo: str) -> int:
+    """Devuelve la generación actual de un grupo de modelos."""
+    clave = f'{ESPACIO}:generacion:{grupo}'
+    cache = obtener_cache()
+    generacion = cache.get(clave)
+    if generacion is None:
+        # Se parte de un valor que no se haya usado antes, por si la
+        # generación anterior fue desalojada de la caché.
+        cache.add(clave, time.time_ns(), None)
+        generacion = cache.get(clave)
+    return generacion
+
+def invalidar(grupo: str) -> None:
+    """Invalida todas las respuestas que dependen de un grupo de modelos."""
+    clave = f'{ESPACIO}:generacion:{grupo}'
+    cache = obtener_cache()
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, time.time_ns(), None)
+
+def contar(grupo: str, evento: str) -> None:
+    """Incrementa el contador de aciertos o fallos de un grupo."""
+    pendientes = CONTADORES.acumular(f'{ESPACIO}:{evento}:{grupo}')
+    if pendientes:
+        enviar_contadores(pendientes)
+
+async def acontar(grupo: str, evento: str) -> None:
+    """Versión asíncrona de `contar`, para las vistas asíncronas."""
+    pendientes = CONTADORES.acumular(f'{ESPACIO}:{evento}:{grupo}')
+    if not pendientes:
+        return
+    cache = obtener_cache()
+    for clave, cantidad in pendientes.items():
+        if clave not in CONTADORES.creados:
+            await cache.aadd(clave, 0, None)
+            CONTADORES.creados.add(clave)
+        try:
+            await cache.aincr(clave, cantidad)
+        except ValueError:
+            await cache.aset(clave, cantidad, None)
+
+def enviar_contadores(pendientes: Dict[str, int]) -> None:
+    """Suma los contadores acumulados en el proceso a los de la caché."""
+    cache = obtener_cache()
+    for clave, cantidad in pendientes.items():
+        if clave not in CONTADORES.creados:
+            cache.add(clave, 0, None)
+            CONTADORES.creados.add(clave)
+        try:
+            cache.incr(clave, cantidad)
+        except ValueError:
+            # La caché desalojó el contador.
+            cache.set(clave, cantidad, None)
+
+def obtener_estadisticas() -> Dict[str, Dict[str, int]]:
+    """Devuelve los aciertos y fallos de la caché de cada grupo (incluidos los
+    acumulados en este proceso)."""
+    enviar_contadores(CONTADORES.vaciar())
+    cache = obtener_cache()
+    estadisticas = {}
+    for grupo in sorted(GRUPOS):
+        aciertos = cache.get(f'{ESPACIO}:aciertos:{grupo}', 0)
+        fallos = cache.get(f'{ESPACIO}:fallos:{grupo}', 0)
+        total = aciertos + fallos
+        estadisticas[grupo] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / total, 4) if total else None,
+        }
+    return estadisticas
+
+def invalidar_en_transaccion(grupo: str) -> None:
+    """Invalida un grupo en este momento y nuevamente al confirmarse la transacción."""
+    invalidar(grupo)
+    transaction.on_commit(lambda: invalidar(grupo))
+
+def invalidar_modelo(modelo: Model) -> None:
+    """Invalida los grupos de un modelo modificado sin emitir señales
+    (p. ej. con `QuerySet.update`, ver `alcance.conectar_propagacion`)."""
+    for grupo in GRUPOS_POR_MODELO.get(modelo._meta.label, ()):
+        invalidar_en_transaccion(grupo)
+
+def conectar_invalidacion(grupo: str, modelos: Iterable[Model]) -> None:
+    """Conecta las señales que invalidan un grupo cuando cambian sus modelos.
+
+    La invalidación se realiza en el momento del cambio y nuevamente al
+    confirmarse la transacción, para que una respuesta generada con los datos
+    anteriores mientras la transacción estaba abierta no quede en la caché.
+
+    Args:
+        grupo (str): Nombre del grupo de modelos.
+        modelos (Iterable[Model]): Modelos cuyas modificaciones invalidan el grupo.
+    """
+    GRUPOS.add(grupo)
+
+    def receptor(sender, **kwargs):
+        invalidar_en_transaccion(grupo)
+
+    for modelo in modelos:
+        GRUPOS_POR_MODELO[modelo._meta.label].add(grupo)
+        uid = f'{ESPACIO}:{grupo}:{modelo._meta.label}'
+        post_save.connect(
+            receptor, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_save'
+        )
+        post_delete.connect(
+            receptor, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_delete'
+        )
+        for campo in modelo._meta.get_fields():
+            if isinstance(campo, ManyToManyField):
+                m2m_changed.connect(
+                    receptor,
+                    sender=campo.remote_field.through,
+                    weak=False,
+                    dispatch_uid=f'{uid}:{campo.name}:m2m_changed'
+                )
+
+class RespuestaCacheMixin:
+    """
+    Mixin para guardar en caché las respuestas de `list` y `retrieve`.
+
+    Atributos:
+        - grupos_cache: Grupos de modelos de los que dependen las respuestas.
+        - grupos_cache_acciones: Grupos de las acciones que dependen de otros
+          modelos, por ejemplo `{'costos': ('ordenes_trabajo', 'kilometrajes')}`;
+          así los cambios de esos modelos no invalidan el resto de respuestas.
+        - version_cache: Versión del serializer; se incrementa al cambiar
+          el formato de las respuestas.
+    """
+    grupos_cache = ()
+    grupos_cache_acciones = {}
+    version_cache = 1
+
+    def list(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(request, lambda: super(RespuestaCacheMixin, self).list(
+            request, *args, **kwargs
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(request, lambda: super(RespuestaCacheMixin, self).retrieve(
+            request, *args, **kwargs
+        ))
+
+    def obtener_grupos_cache(self) -> Sequence[str]:
+        """Devuelve los grupos de los que depende la respuesta de la acción actual."""
+        return self.grupos_cache_acciones.get(getattr(self, 'action', None), self.grupos_cache)
+
+    def clave_cache(self, request: Request) -> str:
+        """Construye la clave de la respuesta a una petición."""
+        generaciones = '.'.join(
+            str(obtener_generacion(grupo)) for grupo in self.obtener_grupos_cache()
+        )
+        ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        formato = request.accepted_renderer.format if request.accepted_renderer else ''
+        return ':'.join([
+            ESPACIO,
+            self.get_serializer_class().__name__,
+            f'v{self.version_cache}',
+            ambito(request),
+            f'g{generaciones}',
+            formato,
+            ruta,
+        ])
+
+    def respuesta_cacheada(self, request: Request, generar: Callable[[], Response]) -> Response:
+        """Devuelve la respuesta guardada en caché o la genera y la guarda.
+
+        Args:
+            request (Request): La petición HTTP.
+            generar (Callable): Función que genera la respuesta.
+
+        Returns:
+            Response: La respuesta con la cabecera `X-Cache` (HIT o MISS).
+        """
+        grupo = self.obtener_grupos_cache()[0]
+        cache = obtener_cache()
+        clave = self.clave_cache(request)
+        guardada = cache.get(clave)
+        if guardada is not None:
+            contar(grupo, 'aciertos')
+            return Response(guardada, headers={'X-Cache': 'HIT'})
+
+        contar(grupo, 'fallos')
+        response = generar()
+        if response.status_code == 200:
+            cache.set(
+                clave, response.data,
+                getattr(settings, 'CACHE_RESPUESTAS_TIMEOUT', 300)
+            )
+        response['X-Cache'] = 'MISS'
+        return response
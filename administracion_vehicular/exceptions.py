@@ -0,0 +1,25 @@
+"""exceptions.py
+
+Excepciones comunes a las vistas de la API.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+class ParametroBusquedaInvalido(APIException):
+    """Se lanza cuando falta o es inválido un parámetro de búsqueda.
+
+    Responde con 400 Bad Request y el mismo formato `{"error": "..."}`
+    de las demás respuestas de error de las búsquedas.
+
+    Args:
+        detail (str): Mensaje de error personalizado (opcional).
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _("Parámetros de búsqueda incorrectos.")
+    default_code = 'parametro_busqueda_invalido'
+
+    def __init__(self, detail=None):
+        super().__init__({'error': detail or self.default_detail})
@@ -0,0 +1,286 @@
+"""exportacion.py
+
+Este módulo define la exportación completa de tablas en CSV o NDJSON.
+
+A diferencia de las rutas de listado, la exportación no carga la tabla en
+memoria ni utiliza los serializers de DRF: las filas se leen con
+`values_list` y `QuerySet.iterator` en bloques de `EXPORTACION_CHUNK_SIZE`
+filas, se codifican una a una y se envían con `StreamingHttpResponse` en
+trozos de `EXPORTACION_TAMANIO_TROZO` bytes, por lo que la memoria usada
+no depende del número de filas.
+
+La acción `exportar` recibe:
+    - `formato`: `csv` (por defecto) o `ndjson`.
+    - Los filtros declarados por la vista en `parametros_exportacion`
+      (empresa, vehículo, rango de fechas).
+
+Si el cliente acepta `gzip` (cabecera `Accept-Encoding`), la respuesta se
+comprime a medida que se genera.
+
+Con `?asincrono=true` la exportación se encola como tarea en segundo plano
+(`exportar_a_archivo`, ver `tareas.py`): el archivo se escribe comprimido
+con gzip en el almacenamiento (`exportaciones/`) y se descarga con la acción
+`descargar` de la tarea, sin ocupar un trabajador de gunicorn mientras se
+genera.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import csv
+import io
+import re
+import tempfile
+import uuid
+import zlib
+from datetime import date
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import coreapi
+import coreschema
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import gettext as _
+from rest_framework.decorators import action
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.request import Request
+from rest_framework.schemas import AutoSchema
+
+from .alcance import es_global, obtener_empresa_id
+from .busqueda import Parametro
+from .exceptions import ParametroBusquedaInvalido
+
+ACEPTA_GZIP = re.compile(r'\bgzip\b')
+
+def codificar_csv(campos: Sequence[str], filas: Iterable[tuple]) -> Iterator[str]:
+    """Codifica las filas en CSV, precedidas por la fila de encabezados."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(campos)
+    yield buffer.getvalue()
+    for fila in filas:
+        buffer.seek(0)
+        buffer.truncate(0)
+        escritor.writerow(fila)
+        yield buffer.getvalue()
+
+def codificar_ndjson(campos: Sequence[str], filas: Iterable[tuple]) -> Iterator[str]:
+    """Codifica cada fila como un objeto JSON por línea."""
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield codificador.encode(dict(zip(campos, fila))) + '\n'
+
+FORMATOS: Dict[str, tuple] = {
+    'csv': ('text/csv', codificar_csv),
+    'ndjson': ('application/x-ndjson', codificar_ndjson),
+}
+
+def agrupar(lineas: Iterable[str], tamanio: int) -> Iterator[bytes]:
+    """Agrupa las líneas codificadas en trozos de al menos `tamanio` bytes."""
+    trozo = []
+    acumulado = 0
+    for linea in lineas:
+        datos = linea.encode('utf-8')
+        trozo.append(datos)
+        acumulado += len(datos)
+        if acumulado >= tamanio:
+            yield b''.join(trozo)
+            trozo = []
+            acumulado = 0
+    if trozo:
+        yield b''.join(trozo)
+
+def comprimir(trozos: Iterable[bytes]) -> Iterator[bytes]:
+    """Comprime los trozos en formato gzip a medida que se generan."""
+    compresor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+def exportar_a_archivo(
+    modelo: str,
+    campos: Sequence[str],
+    filtros: dict,
+    formato: str,
+    nombre: str,
+    alcance: Optional[dict] = None
+) -> dict:
+    """Escribe la exportación de una tabla en un archivo gzip del almacenamiento.
+
+    Args:
+        modelo (str): Etiqueta del modelo (`app.Modelo`).
+        campos (Sequence[str]): Campos exportados.
+        filtros (dict): Filtros de la exportación.
+        formato (str): `csv` o `ndjson`.
+        nombre (str): Nombre del archivo, sin extensión.
+        alcance (dict): Filtro por la empresa del usuario que la solicitó
+            (vacío para los usuarios del personal).
+
+    Returns:
+        dict: La ruta del archivo en el almacenamiento y el número de filas.
+    """
+    filas = apps.get_model(modelo).objects.filter(**(alcance or {}), **filtros).order_by(
+        'id'
+    ).values_list(*campos).iterator(chunk_size=getattr(settings, 'EXPORTACION_CHUNK_SIZE', 2000))
+    total = 0
+
+    def contar(filas):
+        nonlocal total
+        for fila in filas:
+            total += 1
+            yield fila
+
+    contenido = comprimir(agrupar(
+        FORMATOS[formato][1](campos, contar(filas)),
+        getattr(settings, 'EXPORTACION_TAMANIO_TROZO', 64 * 1024)
+    ))
+    with tempfile.TemporaryFile() as temporal:
+        for trozo in contenido:
+            temporal.write(trozo)
+        temporal.seek(0)
+        ruta = default_storage.save(
+            f'exportaciones/{uuid.uuid4().hex}/{nombre}.{formato}.gz', File(temporal)
+        )
+    return {'archivo': ruta, 'filas': total, 'formato': formato}
+
+class SinNegociacion(BaseContentNegotiation):
+    """
+    Negociación de contenido que no rechaza la cabecera `Accept` del cliente;
+    el formato de la exportación se elige con el parámetro `formato`.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+class ExportacionSchema(AutoSchema):
+    """Documenta los parámetros de la acción `exportar` de la vista."""
+
+    def get_description(self, path: str, method):
+        if path.endswith('/exportar/'):
+            return 'Exporta todos los registros filtrados en formato CSV o NDJSON.'
+        return super().get_description(path, method)
+
+    def get_manual_fields(self, path: str, method):
+        extra_fields = []
+        if path.endswith('/exportar/'):
+            extra_fields = [
+                coreapi.Field(
+                    name='formato',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Enum(list(FORMATOS), title='Formato'),
+                    description='Formato de la exportación (csv o ndjson).'
+                ),
+                coreapi.Field(
+                    name='asincrono',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(title='Asíncrono'),
+                    description='Genera el archivo en una tarea en segundo plano.'
+                ),
+            ] + [
+                coreapi.Field(
+                    name=parametro.nombre,
+                    required=parametro.requerido,
+                    location='query',
+                    schema=(
+                        coreschema.Integer(title=parametro.nombre)
+                        if parametro.tipo is int
+                        else coreschema.String(title=parametro.nombre)
+                    ),
+                    description=(
+                        _('Fecha AAAA-MM-DD.') if parametro.tipo is date else ''
+                    )
+                )
+                for parametro in getattr(self.view, 'parametros_exportacion', ())
+            ]
+        return super().get_manual_fields(path, method) + extra_fields
+
+class ExportacionMixin:
+    """
+    Mixin que agrega la acción `exportar` a una vista con `BusquedaMixin`.
+
+    Atributos:
+        - campos_exportacion: Campos (o rutas `relacion__campo`) exportados.
+        - parametros_exportacion: Filtros admitidos por la exportación.
+        - nombre_exportacion: Nombre del archivo descargado, sin extensión.
+    """
+    campos_exportacion: Sequence[str] = ()
+    parametros_exportacion: Sequence[Parametro] = ()
+    nombre_exportacion = 'exportacion'
+
+    @action(
+        detail=False,
+        methods=['get'],
+        content_negotiation_class=SinNegociacion,
+        schema=ExportacionSchema()
+    )
+    def exportar(self, request: Request):
+        """Exporta los registros filtrados en CSV o NDJSON.
+
+        Args:
+            request (Request): La petición HTTP con el formato y los filtros.
+
+        Returns:
+            StreamingHttpResponse: El archivo generado a medida que se envía,
+            comprimido con gzip si el cliente lo acepta, o la tarea encolada
+            (202) con `?asincrono=true`.
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            raise ParametroBusquedaInvalido(
+                _("formato debe ser uno de: %(opciones)s.") % {'opciones': ', '.join(FORMATOS)}
+            )
+        filtros = self.obtener_filtros(request, self.parametros_exportacion)
+        if request.query_params.get('asincrono', '').lower() in ('1', 'true'):
+            return self.encolar_exportacion(request, filtros, formato)
+        tipo_contenido, codificar = FORMATOS[formato]
+        filas = self.get_queryset().filter(**filtros).order_by('id').values_list(
+            *self.campos_exportacion
+        ).iterator(chunk_size=getattr(settings, 'EXPORTACION_CHUNK_SIZE', 2000))
+        contenido = agrupar(
+            codificar(self.campos_exportacion, filas),
+            getattr(settings, 'EXPORTACION_TAMANIO_TROZO', 64 * 1024)
+        )
+
+        comprimida = bool(ACEPTA_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if comprimida:
+            contenido = comprimir(contenido)
+        response = StreamingHttpResponse(
+            contenido, content_type=f'{tipo_contenido}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.nombre_exportacion}.{formato}"'
+        )
+        if comprimida:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def encolar_exportacion(self, request: Request, filtros: dict, formato: str):
+        """Encola la exportación como tarea en segundo plano."""
+        # Importación diferida: las tareas se registran al iniciar la aplicación `tareas`.
+        from tareas.registro import encolar
+        from tareas.views import respuesta_tarea
+
+        empresa_id = obtener_empresa_id(request)
+        tarea = encolar(
+            'administracion_vehicular.exportar',
+            empresa_id=empresa_id,
+            usuario=request.user,
+            modelo=self.get_queryset().model._meta.label,
+            campos=list(self.campos_exportacion),
+            filtros=filtros,
+            formato=formato,
+            nombre=self.nombre_exportacion,
+            alcance={} if es_global(request) else {self.campo_empresa: empresa_id},
+        )
+        return respuesta_tarea(request, tarea)
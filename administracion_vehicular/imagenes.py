@@ -0,0 +1,188 @@
+"""imagenes.py
+
+Este módulo genera las miniaturas de las fotografías subidas a la API
+(vehículos, matrículas, perfiles de usuario y logos de empresas).
+
+La fotografía original se guarda durante la petición como hasta ahora;
+se encola como tarea en segundo plano (ver `tareas/registro.py`) la generación
+de sus miniaturas, para que la petición no espere el procesamiento de la imagen:
+    - Se aplica la orientación indicada en los metadatos EXIF y se descartan
+      los metadatos (ubicación GPS, modelo del teléfono, etc.).
+    - Se reduce la imagen a cada uno de los tamaños de `MINIATURAS_TAMANIOS`
+      (lado mayor en píxeles), conservando la proporción, y se codifica
+      en WebP con calidad `MINIATURAS_CALIDAD`.
+    - Las variantes se guardan con el almacenamiento del campo (Google Cloud
+      Storage en producción) y sus rutas en el campo `miniaturas` del modelo,
+      con la forma `{campo: {'original': ruta, tamaño: ruta, ...}}`. El nombre
+      de cada variante incluye el hash de su contenido, por lo que sus URLs
+      pueden guardarse en caché por largo tiempo (ver `almacenamiento.py`).
+
+Las miniaturas anteriores se eliminan al reemplazar o eliminar la fotografía.
+Los serializers exponen las URLs de las miniaturas con `MiniaturasField`.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import io
+import logging
+import os
+from typing import Dict, Iterable
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from tareas.registro import encolar
+
+from .almacenamiento import nombre_inmutable
+
+logger = logging.getLogger('administracion_vehicular.imagenes')
+
+ORIGINAL = 'original'
+
+def obtener_tamanios() -> Dict[str, int]:
+    """Devuelve los tamaños de las miniaturas: nombre -> lado mayor en píxeles."""
+    return getattr(settings, 'MINIATURAS_TAMANIOS', {'pequena': 160, 'mediana': 640})
+
+def generar_miniaturas(archivo) -> Dict[str, bytes]:
+    """Genera las miniaturas WebP, sin metadatos EXIF, de una imagen.
+
+    Args:
+        archivo: Archivo abierto con la imagen original.
+
+    Returns:
+        dict: El contenido de cada miniatura indexado por el nombre del tamaño.
+    """
+    calidad = getattr(settings, 'MINIATURAS_CALIDAD', 80)
+    with Image.open(archivo) as original:
+        imagen = ImageOps.exif_transpose(original)
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+        miniaturas = {}
+        for nombre, lado in obtener_tamanios().items():
+            miniatura = imagen.copy()
+            miniatura.thumbnail((lado, lado), Image.LANCZOS)
+            buffer = io.BytesIO()
+            miniatura.save(buffer, 'WEBP', quality=calidad)
+            miniaturas[nombre] = buffer.getvalue()
+    return miniaturas
+
+def ruta_miniatura(original: str, nombre: str, contenido: bytes) -> str:
+    """Devuelve la ruta, direccionada por contenido, de la miniatura `nombre`
+    de una fotografía (ver `almacenamiento.nombre_inmutable`)."""
+    base = os.path.splitext(original)[0]
+    return nombre_inmutable(f'miniaturas/{base}_{nombre}.webp', contenido)
+
+def eliminar_variantes(variantes: dict, storage=None) -> None:
+    """Elimina del almacenamiento los archivos de las miniaturas."""
+    storage = storage or default_storage
+    for nombre, ruta in variantes.items():
+        if nombre != ORIGINAL and ruta:
+            storage.delete(ruta)
+
+def procesar_miniaturas(modelo: str, pk, campo: str) -> None:
+    """Genera y registra las miniaturas de la fotografía de una instancia.
+
+    Args:
+        modelo (str): Etiqueta del modelo (`app.Modelo`).
+        pk: Clave primaria de la instancia.
+        campo (str): Nombre del campo de la fotografía.
+    """
+    clase = apps.get_model(modelo)
+    instancia = clase.objects.filter(pk=pk).first()
+    if instancia is None:
+        return
+    archivo = getattr(instancia, campo)
+    anteriores = (instancia.miniaturas or {}).get(campo, {})
+    if anteriores.get(ORIGINAL) == (archivo.name or None):
+        return
+
+    nuevas = {}
+    if archivo:
+        nuevas[ORIGINAL] = archivo.name
+        try:
+            with archivo.open('rb'):
+                contenido = generar_miniaturas(archivo)
+        except (UnidentifiedImageError, OSError):
+            logger.warning("No se pudo procesar la imagen %s de %s %s", archivo.name, modelo, pk)
+            contenido = {}
+        for nombre, datos in contenido.items():
+            ruta = ruta_miniatura(archivo.name, nombre, datos)
+            if not archivo.storage.exists(ruta):
+                ruta = archivo.storage.save(ruta, ContentFile(datos))
+            nuevas[nombre] = ruta
+
+    with transaction.atomic():
+        instancia = clase.objects.select_for_update().filter(pk=pk).first()
+        if instancia is None or (getattr(instancia, campo).name or None) != nuevas.get(ORIGINAL):
+            # La fotografía cambió mientras se procesaba; la tarea encolada
+            # por el último cambio generará sus miniaturas.
+            eliminar_variantes(nuevas, archivo.storage)
+            return
+        miniaturas = dict(instancia.miniaturas or {})
+        anteriores = miniaturas.pop(campo, {})
+        if nuevas:
+            miniaturas[campo] = nuevas
+        instancia.miniaturas = miniaturas
+        instancia.save(update_fields=['miniaturas'])
+    eliminar_variantes(
+        {nombre: ruta for nombre, ruta in anteriores.items() if ruta not in nuevas.values()},
+        archivo.storage
+    )
+
+def conectar_miniaturas(modelos: Iterable[Model], campos: Iterable[str]) -> None:
+    """Conecta la generación de miniaturas de los campos de imagen de los modelos.
+
+    Args:
+        modelos (Iterable[Model]): Modelos con el campo `miniaturas`.
+        campos (Iterable[str]): Campos de imagen de los modelos.
+    """
+    campos = tuple(campos)
+
+    def al_guardar(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        registradas = instance.miniaturas or {}
+        for campo in campos:
+            nombre = getattr(instance, campo).name or None
+            if registradas.get(campo, {}).get(ORIGINAL) != nombre:
+                encolar(
+                    'administracion_vehicular.procesar_miniaturas',
+                    modelo=sender._meta.label, pk=instance.pk, campo=campo
+                )
+
+    def al_eliminar(sender, instance, **kwargs):
+        for variantes in (instance.miniaturas or {}).values():
+            encolar('administracion_vehicular.eliminar_miniaturas', variantes=variantes)
+
+    for modelo in modelos:
+        uid = f'miniaturas:{modelo._meta.label}'
+        post_save.connect(al_guardar, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_save')
+        post_delete.connect(
+            al_eliminar, sender=modelo, weak=False, dispatch_uid=f'{uid}:post_delete'
+        )
+
+class MiniaturasField(serializers.Field):
+    """
+    Campo de solo lectura con las URLs de las miniaturas de cada fotografía:
+    `{campo: {tamaño: url}}`. Las fotografías cuyas miniaturas aún no se han
+    generado no aparecen.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('help_text', 'URLs de las miniaturas de las fotografías.')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            campo: {
+                nombre: default_storage.url(ruta)
+                for nombre, ruta in variantes.items() if nombre != ORIGINAL
+            }
+            for campo, variantes in (value or {}).items()
+        }
@@ -0,0 +1,189 @@
+"""middleware.py
+
+Este módulo define el perfilador de consultas SQL por petición.
+
+Cuando `PERFILADOR_CONSULTAS` es True, `PerfiladorConsultasMiddleware` registra
+las consultas ejecutadas durante cada petición y reporta:
+    - El número de consultas y el tiempo total en la base de datos, en la
+      cabecera `Server-Timing` (visible en las herramientas del navegador).
+    - Una línea de log estructurada (JSON) en el logger
+      `administracion_vehicular.consultas`, con las consultas repetidas
+      agrupadas por su huella (el SQL sin parámetros), que delatan los
+      patrones N+1.
+
+Las vistas pueden declarar un presupuesto de consultas con el atributo
+`presupuesto_consultas`, un entero o un diccionario por acción, por ejemplo
+`{'list': 4, 'search_by': 3}`. El presupuesto cuenta todas las consultas de
+la petición, incluidas las de la autenticación y, en las respuestas en flujo
+(exportaciones), las que se ejecutan mientras se envía el contenido. Al
+superarlo se registra una advertencia o, si `PERFILADOR_CONSULTAS_ESTRICTO`
+es True (en las pruebas), se lanza `PresupuestoConsultasExcedido`.
+
+El middleware admite peticiones síncronas y asíncronas (ASGI), por lo que no
+obliga a ejecutar las vistas asíncronas en un hilo. En las respuestas en
+flujo, las consultas se registran hasta que termina el contenido; el reporte
+se emite al final y no incluye la cabecera `Server-Timing`, que ya se envió.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from collections import Counter
+from contextlib import ExitStack
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('administracion_vehicular.consultas')
+
+class PresupuestoConsultasExcedido(Exception):
+    """Se lanza cuando una vista ejecuta más consultas que su presupuesto."""
+
+def huella(sql: str) -> str:
+    """Devuelve la huella de una consulta: un hash corto de su SQL sin parámetros."""
+    return hashlib.md5(sql.encode()).hexdigest()[:12]
+
+class RegistroConsultas:
+    """
+    Envoltorio de ejecución (`connection.execute_wrapper`) que registra
+    el SQL y la duración de cada consulta.
+    """
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, time.perf_counter() - inicio))
+
+    @property
+    def tiempo(self) -> float:
+        """Tiempo total en la base de datos, en segundos."""
+        return sum(duracion for _sql, duracion in self.consultas)
+
+    def duplicadas(self) -> dict:
+        """Devuelve las huellas que se ejecutaron más de una vez y sus repeticiones."""
+        conteo = Counter(sql for sql, _duracion in self.consultas)
+        return {huella(sql): veces for sql, veces in conteo.most_common() if veces > 1}
+
+def registrar(registro: RegistroConsultas) -> ExitStack:
+    """Instala el registro de consultas en todas las conexiones."""
+    pila = ExitStack()
+    for conexion in connections.all():
+        pila.enter_context(conexion.execute_wrapper(registro))
+    return pila
+
+class PerfiladorConsultasMiddleware:
+    """
+    Middleware que perfila las consultas SQL de cada petición.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADOR_CONSULTAS', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registro = RegistroConsultas()
+        request.presupuesto_consultas = None
+        inicio = time.perf_counter()
+        with registrar(registro):
+            response = self.get_response(request)
+        return self.terminar(request, response, registro, inicio)
+
+    async def __acall__(self, request):
+        registro = RegistroConsultas()
+        request.presupuesto_consultas = None
+        inicio = time.perf_counter()
+        with registrar(registro):
+            response = await self.get_response(request)
+        return self.terminar(request, response, registro, inicio)
+
+    def terminar(self, request, response, registro: RegistroConsultas, inicio: float):
+        """Reporta las consultas de la petición o, si la respuesta es un flujo,
+        las sigue registrando hasta que termine el contenido."""
+        if response.streaming:
+            response.streaming_content = self.perfilar_flujo(
+                request, response, registro, inicio
+            )
+            return response
+        duplicadas = self.reportar(request, response, registro, inicio)
+        response['Server-Timing'] = ', '.join([
+            f'db;desc="{len(registro.consultas)} consultas";dur={registro.tiempo * 1000:.2f}',
+            f'dup;desc="{sum(duplicadas.values())} repetidas"',
+            f'total;dur={(time.perf_counter() - inicio) * 1000:.2f}',
+        ])
+        return response
+
+    def perfilar_flujo(self, request, response, registro: RegistroConsultas, inicio: float):
+        """Envuelve el contenido de una respuesta en flujo para registrar sus consultas."""
+        contenido = response.streaming_content
+
+        if response.is_async:
+            async def flujo_asincrono():
+                with registrar(registro):
+                    async for trozo in contenido:
+                        yield trozo
+                self.reportar(request, response, registro, inicio)
+            return flujo_asincrono()
+
+        def flujo():
+            with registrar(registro):
+                yield from contenido
+            self.reportar(request, response, registro, inicio)
+        return flujo()
+
+    def reportar(self, request, response, registro: RegistroConsultas, inicio: float) -> dict:
+        """Registra el log de la petición y verifica su presupuesto.
+
+        Returns:
+            dict: Las huellas de las consultas repetidas.
+        """
+        duplicadas = registro.duplicadas()
+        logger.info(json.dumps({
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': len(registro.consultas),
+            'tiempo_db_ms': round(registro.tiempo * 1000, 2),
+            'tiempo_total_ms': round((time.perf_counter() - inicio) * 1000, 2),
+            'duplicadas': duplicadas,
+        }))
+        self.verificar_presupuesto(request, len(registro.consultas))
+        return duplicadas
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Obtiene el presupuesto de consultas declarado en la vista."""
+        vista = getattr(view_func, 'cls', None)
+        presupuesto = getattr(vista, 'presupuesto_consultas', None)
+        if isinstance(presupuesto, dict):
+            acciones = getattr(view_func, 'actions', None) or {}
+            presupuesto = presupuesto.get(acciones.get(request.method.lower()))
+        request.presupuesto_consultas = presupuesto
+        request.vista_perfilada = vista.__name__ if vista else None
+
+    def verificar_presupuesto(self, request, consultas: int) -> None:
+        presupuesto: Optional[int] = request.presupuesto_consultas
+        if presupuesto is None or consultas <= presupuesto:
+            return
+        mensaje = (
+            f"{request.vista_perfilada} ejecutó {consultas} consultas en "
+            f"{request.method} {request.path}; su presupuesto es {presupuesto}."
+        )
+        if getattr(settings, 'PERFILADOR_CONSULTAS_ESTRICTO', False):
+            raise PresupuestoConsultasExcedido(mensaje)
+        logger.warning(mensaje)
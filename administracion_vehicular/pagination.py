@@ -0,0 +1,55 @@
+"""pagination.py
+
+Este módulo define la paginación por cursor usada por todas las vistas
+de la API, tanto en las rutas de listado como en las acciones `search_by`.
+
+La paginación por cursor (keyset) ordena por una columna indexada y única,
+por lo que cada página se obtiene con un `WHERE id < cursor LIMIT n`
+sin importar cuántas filas tenga la tabla, y las páginas no se desplazan
+cuando se insertan nuevos registros mientras el cliente recorre la lista.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor ordenada por la clave primaria.
+
+    Atributos:
+        - ordering: Columna indexada y única usada como cursor.
+        - page_size_query_param: Parámetro para pedir otro tamaño de página.
+        - max_page_size: Tamaño máximo de página permitido (`API_MAX_PAGE_SIZE`).
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+class PaginacionBusquedaMixin:
+    """
+    Mixin para paginar los resultados de las acciones personalizadas
+    (por ejemplo `search_by`) con la misma paginación de las rutas de listado.
+    """
+
+    def respuesta_paginada(self, queryset, serializer_class=None) -> Response:
+        """Pagina y serializa un queryset.
+
+        Args:
+            queryset (QuerySet): Los registros a devolver.
+            serializer_class (Serializer): Serializer a usar, por defecto
+                el de la vista.
+
+        Returns:
+            Response: La página solicitada con los enlaces `next` y `previous`,
+            o todos los registros si la vista no tiene paginación.
+        """
+        serializer_class = serializer_class or self.get_serializer_class()
+        context = self.get_serializer_context()
+        pagina = self.paginate_queryset(queryset)
+        if pagina is not None:
+            serializer = serializer_class(pagina, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        serializer = serializer_class(queryset, many=True, context=context)
+        return Response(serializer.data)
@@ -0,0 +1,69 @@
+"""parsers.py
+
+Este módulo define los parsers adicionales de la API.
+
+`NDJSONParser` interpreta cuerpos en formato NDJSON (un objeto JSON por línea),
+el formato en el que los equipos de telemetría envían sus lecturas.
+Las líneas vacías se ignoran.
+
+`CSVParser` interpreta cuerpos CSV con una fila de encabezados (p. ej. las
+hojas de cálculo de trabajadores de la incorporación en bloque); devuelve
+un objeto por fila, sin las celdas vacías.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+class NDJSONParser(BaseParser):
+    """
+    Parser para cuerpos NDJSON; devuelve la lista de objetos del cuerpo.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        objetos = []
+        lector = codecs.getreader(encoding)(stream)
+        for numero, linea in enumerate(lector, start=1):
+            if not linea.strip():
+                continue
+            try:
+                objetos.append(json.loads(linea))
+            except ValueError as exc:
+                raise ParseError(
+                    _("NDJSON inválido en la línea %(linea)s: %(error)s")
+                    % {'linea': numero, 'error': exc}
+                ) from exc
+        return objetos
+
+class CSVParser(BaseParser):
+    """
+    Parser para cuerpos CSV; devuelve la lista de filas como diccionarios.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name == 'utf-8':
+            # Las hojas de cálculo exportadas suelen empezar con un BOM.
+            encoding = 'utf-8-sig'
+        lector = csv.DictReader(codecs.getreader(encoding)(stream))
+        try:
+            return [
+                {campo: valor for campo, valor in fila.items() if campo and valor not in (None, '')}
+                for fila in lector
+            ]
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError(
+                _("CSV inválido en la línea %(linea)s: %(error)s")
+                % {'linea': lector.line_num, 'error': exc}
+            ) from exc
@@ -58,11 +58,13 @@ INSTALLED_APPS = [
     'ordenes_de_mantenimiento',
     'ordenes_de_trabajo',
     'representantes',
+    'tareas',
     'usuarios',
     'vehiculos'
 ]
 
 MIDDLEWARE = [
+    "administracion_vehicular.middleware.PerfiladorConsultasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -74,6 +76,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Con el servidor ASGI (ver asgi.py) los archivos estáticos los sirve el
+# proceso WSGI: WhiteNoise es solo síncrono y obligaría a adaptar cada
+# petición asíncrona a un hilo.
+SERVIDOR_ASGI = os.environ.get('SERVIDOR_ASGI', 'false').lower() == 'true'
+if SERVIDOR_ASGI:
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
 ROOT_URLCONF = 'administracion_vehicular.urls'
 
 TEMPLATES = [
@@ -102,6 +111,47 @@ DATABASES = {
     )
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Redis si se define REDIS_URL, archivos si se define CACHE_DIR
+# y, en otro caso, memoria local del proceso.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Segundos que se conservan las respuestas de los catálogos en caché:
+CACHE_RESPUESTAS_TIMEOUT = int(os.environ.get('CACHE_RESPUESTAS_TIMEOUT', 300))
+
+# Aciertos y fallos de la caché acumulados en cada proceso antes de sumarlos a
+# los contadores compartidos, y segundos máximos entre dos envíos:
+CACHE_ESTADISTICAS_LOTE = int(os.environ.get('CACHE_ESTADISTICAS_LOTE', 100))
+CACHE_ESTADISTICAS_INTERVALO = int(os.environ.get('CACHE_ESTADISTICAS_INTERVALO', 10))
+
+# Caché de los tokens de autenticación (usuario, perfil y empresa) y segundos
+# que se conserva cada token (ver autenticacion.py):
+AUTENTICACION_CACHE = os.environ.get('AUTENTICACION_CACHE', 'false').lower() == 'true'
+AUTENTICACION_CACHE_TIMEOUT = int(os.environ.get('AUTENTICACION_CACHE_TIMEOUT', 300))
+
+# Segundos que se conserva en caché la empresa de cada usuario (ver alcance.py):
+ALCANCE_EMPRESA_TIMEOUT = int(os.environ.get('ALCANCE_EMPRESA_TIMEOUT', 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -159,9 +209,94 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'administracion_vehicular.autenticacion.TokenCacheAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'administracion_vehicular.pagination.PaginacionCursor',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+}
+
+# Tamaño máximo de página que un cliente puede pedir con `?page_size=`
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Ingesta en bloque de lecturas de odómetro (`/api/v1/kilometrajes/bulk/`):
+INGESTA_KILOMETRAJE_MAX_FILAS = int(os.environ.get('INGESTA_KILOMETRAJE_MAX_FILAS', 10000))
+INGESTA_KILOMETRAJE_BATCH_SIZE = int(os.environ.get('INGESTA_KILOMETRAJE_BATCH_SIZE', 1000))
+
+# Exportaciones en CSV/NDJSON (acción `exportar`): filas leídas por consulta
+# y tamaño mínimo en bytes de cada trozo enviado al cliente.
+EXPORTACION_CHUNK_SIZE = int(os.environ.get('EXPORTACION_CHUNK_SIZE', 2000))
+EXPORTACION_TAMANIO_TROZO = int(os.environ.get('EXPORTACION_TAMANIO_TROZO', 64 * 1024))
+
+# Miniaturas WebP de las fotografías (ver imagenes.py): lado mayor en píxeles
+# de cada tamaño y calidad de la codificación.
+MINIATURAS_TAMANIOS = {'pequena': 160, 'mediana': 640}
+MINIATURAS_CALIDAD = int(os.environ.get('MINIATURAS_CALIDAD', 80))
+
+# Tareas en segundo plano persistidas (ver tareas/backends.py): backend de la
+# cola, procesos de cada trabajador (0 = uno por CPU), segundos entre consultas
+# a la cola vacía, segundos que un trabajador reserva una tarea y espera base y
+# máxima (segundos) entre los reintentos de una tarea fallida.
+TAREAS_BACKEND = os.environ.get('TAREAS_BACKEND', 'tareas.backends.BackendBaseDeDatos')
+TAREAS_PROCESOS = int(os.environ.get('TAREAS_PROCESOS', 0))
+TAREAS_INTERVALO = float(os.environ.get('TAREAS_INTERVALO', 2))
+TAREAS_RESERVA = int(os.environ.get('TAREAS_RESERVA', 600))
+TAREAS_ESPERA_BASE = int(os.environ.get('TAREAS_ESPERA_BASE', 30))
+TAREAS_ESPERA_MAXIMA = int(os.environ.get('TAREAS_ESPERA_MAXIMA', 3600))
+
+# Incorporación en bloque de trabajadores (`/api/v1/perfiles/bulk/`): filas por
+# petición, filas insertadas por consulta y procesos que calculan los hash de
+# las contraseñas (0 = uno por CPU).
+INCORPORACION_MAX_FILAS = int(os.environ.get('INCORPORACION_MAX_FILAS', 5000))
+INCORPORACION_BATCH_SIZE = int(os.environ.get('INCORPORACION_BATCH_SIZE', 500))
+INCORPORACION_PROCESOS = int(os.environ.get('INCORPORACION_PROCESOS', 0))
+
+# Números de teléfono normalizados (E.164) guardados en la caché LRU del proceso
+# (ver usuarios/telefonos.py).
+TELEFONOS_CACHE_TAMANIO = int(os.environ.get('TELEFONOS_CACHE_TAMANIO', 8192))
+
+# Mayor distancia (km) que se considera verosímil entre dos lecturas de odómetro
+# por cada día transcurrido; los saltos mayores se rechazan o, si
+# KILOMETRAJE_RECHAZAR_ANOMALIAS es False, se aceptan con una advertencia.
+KILOMETRAJE_DELTA_MAXIMO_DIARIO = int(os.environ.get('KILOMETRAJE_DELTA_MAXIMO_DIARIO', 2000))
+KILOMETRAJE_RECHAZAR_ANOMALIAS = os.environ.get('KILOMETRAJE_RECHAZAR_ANOMALIAS', 'true').lower() == 'true'
+
+# Antigüedad (años desde la fecha de fabricación del código DOT) a partir de
+# la cual una llanta aparece en el reporte de antigüedad (ver vehiculos/llantas.py).
+LLANTAS_ANTIGUEDAD_MAXIMA = int(os.environ.get('LLANTAS_ANTIGUEDAD_MAXIMA', 6))
+
+# Perfilador de consultas SQL por petición (cabecera Server-Timing y log);
+# en modo estricto, superar el presupuesto de consultas de una vista es un error.
+PERFILADOR_CONSULTAS = os.environ.get('PERFILADOR_CONSULTAS', 'false').lower() == 'true'
+PERFILADOR_CONSULTAS_ESTRICTO = os.environ.get(
+    'PERFILADOR_CONSULTAS_ESTRICTO', 'false'
+).lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'administracion_vehicular.consultas': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'tareas': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'vehiculos.licencias': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
 
 # Google credentials for saving images of users:
@@ -179,6 +314,22 @@ else:
     )
 
 # Configura el backend de almacenamiento de Google Cloud Storage
-DEFAULT_FILE_STORAGE = 'storages.backends.gcloud.GoogleCloudStorage'
+# (con MEDIA_ALMACENAMIENTO=local se usa el sistema de archivos, ver almacenamiento.py)
+if os.environ.get('MEDIA_ALMACENAMIENTO') == 'local':
+    DEFAULT_FILE_STORAGE = 'administracion_vehicular.almacenamiento.AlmacenamientoLocal'
+else:
+    DEFAULT_FILE_STORAGE = 'administracion_vehicular.almacenamiento.AlmacenamientoGCS'
 GS_BUCKET_NAME = 'acv-img-storage.appspot.com'
 GS_CREDENTIALS = my_credentials # Credenciales de cuenta de servicio
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+MEDIA_URL = '/media/'
+
+# Caché de las URLs de los archivos: segundos que el cliente necesita para usar
+# una URL firmada (se dejan de entregar CACHE_RESPUESTAS_TIMEOUT + MEDIA_URL_MARGEN
+# segundos antes de su expiración), vigencia de las URLs de los archivos
+# direccionados por contenido (miniaturas) y CDN desde la que se sirven.
+MEDIA_URL_MARGEN = int(os.environ.get('MEDIA_URL_MARGEN', 300))
+MEDIA_URL_EXPIRACION_INMUTABLE = int(
+    os.environ.get('MEDIA_URL_EXPIRACION_INMUTABLE', 7 * 24 * 3600)
+)
+MEDIA_CDN_URL = os.environ.get('MEDIA_CDN_URL', '')
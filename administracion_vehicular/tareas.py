@@ -0,0 +1,36 @@
+"""tareas.py
+
+Este módulo registra como tareas en segundo plano (ver `tareas/registro.py`)
+las operaciones compartidas por las aplicaciones: las miniaturas de las
+fotografías (ver `imagenes.py`) y las exportaciones de tablas a un archivo
+(ver `exportacion.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from typing import List, Optional
+
+from tareas.registro import tarea
+
+from . import exportacion, imagenes
+
+@tarea('administracion_vehicular.procesar_miniaturas')
+def procesar_miniaturas(modelo: str, pk: int, campo: str) -> None:
+    """Genera las miniaturas de la fotografía de una instancia."""
+    imagenes.procesar_miniaturas(modelo, pk, campo)
+
+@tarea('administracion_vehicular.eliminar_miniaturas')
+def eliminar_miniaturas(variantes: dict) -> None:
+    """Elimina del almacenamiento las miniaturas de una fotografía."""
+    imagenes.eliminar_variantes(variantes)
+
+@tarea('administracion_vehicular.exportar')
+def exportar(
+    modelo: str,
+    campos: List[str],
+    filtros: dict,
+    formato: str,
+    nombre: str,
+    alcance: Optional[dict] = None
+) -> dict:
+    """Exporta una tabla a un archivo gzip del almacenamiento."""
+    return exportacion.exportar_a_archivo(modelo, campos, filtros, formato, nombre, alcance)
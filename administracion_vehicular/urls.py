@@ -14,19 +14,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.authtoken import views
 from rest_framework.documentation import include_docs_urls
 
+from .views import CerrarSesionView, EstadisticasCacheView, RotarTokenView, servir_media
+
 urlpatterns = [
     path('api_generate_token/', views.obtain_auth_token),
     path('dashboard/', admin.site.urls),
     path('docs/', include_docs_urls(title='Developer API documentation')),
+    path('api/v1/cache/estadisticas/', EstadisticasCacheView.as_view()),
+    path('api/v1/sesion/cerrar/', CerrarSesionView.as_view()),
+    path('api/v1/sesion/rotar_token/', RotarTokenView.as_view()),
     path('', include('empresas.urls')),
     path('', include('manual_de_mantenimiento.urls')),
     path('', include('ordenes_de_mantenimiento.urls')),
     path('', include('ordenes_de_trabajo.urls')),
     path('', include('representantes.urls')),
+    path('', include('tareas.urls')),
     path('', include('usuarios.urls')),
     path('', include('vehiculos.urls')),
+    # Archivos de AlmacenamientoLocal (desarrollo), con URLs firmadas:
+    re_path(r'^media/(?P<ruta>.+)$', servir_media),
 ]
@@ -0,0 +1,135 @@
+"""validacion.py
+
+Este módulo valida en lote los valores de las cargas masivas (importaciones
+de vehículos, llantas o baterías, listas de perfiles).
+
+`validar_varios` verifica una secuencia de valores con una función booleana
+(cuyos patrones están compilados al importar su módulo) y devuelve una
+máscara con el resultado de cada uno y los mensajes de error de los
+inválidos, indexados por su posición. Los mensajes se obtienen del validador
+del campo solo para los valores inválidos, ya que lanzar y capturar una
+excepción por valor cuesta más que la propia verificación.
+
+`ValidacionEnLoteMixin` lo utiliza en los ListSerializer: antes de validar
+cada fila con el serializer hijo, valida en lote los campos declarados en
+`campos_validados_en_lote`; el serializer hijo no vuelve a llamar al
+validador de esos campos con los valores ya revisados. Los errores del lote
+se combinan con los de cada fila, por lo que una carga rechazada informa
+todos sus errores en una sola respuesta. A cambio, las filas se deserializan
+aunque el lote tenga errores: rechazar una carga cuesta lo mismo que
+validarla (incluidas las consultas de los validadores de unicidad), y no
+solo la verificación en lote.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+class ResultadoValidacion(NamedTuple):
+    """Resultado de `validar_varios`."""
+    # Indica, para cada valor, si es válido:
+    mascara: List[bool]
+    # Mensajes de error de los valores inválidos indexados por su posición:
+    errores: Dict[int, List[str]]
+
+def mensajes_de_error(validador: Callable, valor) -> List[str]:
+    """Devuelve los mensajes de error de un valor (vacío si es válido)."""
+    try:
+        validador(valor)
+    except DjangoValidationError as error:
+        return error.messages
+    except ValidationError as error:
+        detalle = error.detail
+        return [str(mensaje) for mensaje in (detalle if isinstance(detalle, list) else [detalle])]
+    return []
+
+def validar_varios(
+    valores: Iterable, verificar: Callable[..., bool], validador: Callable
+) -> ResultadoValidacion:
+    """Valida una secuencia de valores.
+
+    Args:
+        valores (Iterable): Los valores a validar.
+        verificar (Callable): Función que indica si un valor es válido
+            (p. ej. `es_una_placa_de_vehiculo_valida`).
+        validador (Callable): Validador que lanza `ValidationError` (de Django
+            o de DRF) con el mensaje de error; solo se llama con los valores
+            inválidos (p. ej. `validar_placa_vehicular`).
+
+    Returns:
+        ResultadoValidacion: La máscara de valores válidos y los errores
+        de los inválidos.
+    """
+    valores = list(valores)
+    mascara = list(map(verificar, valores))
+    errores = {
+        posicion: mensajes_de_error(validador, valores[posicion])
+        for posicion, valido in enumerate(mascara) if not valido
+    }
+    return ResultadoValidacion(mascara, errores)
+
+class ValidadorOmitido:
+    """
+    Validador de un campo que omite los valores ya revisados en lote y
+    valida los demás con el validador original.
+    """
+
+    def __init__(self, validador: Callable, revisados: set):
+        self.validador = validador
+        self.revisados = revisados
+
+    def __call__(self, valor):
+        if valor not in self.revisados:
+            self.validador(valor)
+
+class ValidacionEnLoteMixin:
+    """
+    Mixin para ListSerializer que valida en lote algunos campos de todas
+    las filas antes de deserializarlas una por una.
+
+    Atributos:
+        - campos_validados_en_lote: Función de verificación y validador
+          de cada campo (ver `validar_varios`).
+    """
+    campos_validados_en_lote: Mapping[str, Tuple[Callable, Callable]] = {}
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not self.campos_validados_en_lote:
+            return super().to_internal_value(data)
+        errores = [{} for _ in data]
+        campos = self.child.fields
+        originales = {}
+        for campo, (verificar, validador) in self.campos_validados_en_lote.items():
+            posiciones = [
+                posicion for posicion, fila in enumerate(data)
+                if isinstance(fila, Mapping) and isinstance(fila.get(campo), str)
+            ]
+            valores = [data[i][campo] for i in posiciones]
+            resultado = validar_varios(valores, verificar, validador)
+            for indice, mensajes in resultado.errores.items():
+                errores[posiciones[indice]][campo] = mensajes
+            if campo in campos:
+                originales[campo] = campos[campo].validators
+                omitido = ValidadorOmitido(validador, set(valores))
+                campos[campo].validators = [
+                    omitido if original is validador else original
+                    for original in originales[campo]
+                ]
+        try:
+            validados = super().to_internal_value(data)
+        except ValidationError as error:
+            if not isinstance(error.detail, list) or not any(errores):
+                raise
+            raise serializers.ValidationError([
+                {**de_la_fila, **del_lote}
+                for de_la_fila, del_lote in zip(error.detail, errores)
+            ]) from error
+        finally:
+            for campo, validadores in originales.items():
+                campos[campo].validators = validadores
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return validados
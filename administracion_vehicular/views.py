@@ -0,0 +1,62 @@
+"""views.py
+
+Vistas generales del proyecto que no pertenecen a ninguna aplicación.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpRequest, HttpResponseForbidden
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import obtener_estadisticas
+
+class EstadisticasCacheView(APIView):
+    """Devuelve los aciertos y fallos de la caché de respuestas por grupo
+    (y de la caché de autenticación)."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request):
+        return Response(obtener_estadisticas())
+
+class CerrarSesionView(APIView):
+    """Cierra la sesión: elimina el token de la petición (y su entrada en la
+    caché de autenticación, ver `autenticacion.py`)."""
+    presupuesto_consultas = 2
+
+    def post(self, request: Request):
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class RotarTokenView(APIView):
+    """Reemplaza el token del usuario por uno nuevo; el token anterior deja de
+    ser válido inmediatamente."""
+    presupuesto_consultas = 6
+
+    def post(self, request: Request):
+        with transaction.atomic():
+            Token.objects.filter(user=request.user).delete()
+            token = Token.objects.create(user=request.user)
+        return Response({'token': token.key}, status=status.HTTP_201_CREATED)
+
+def servir_media(request: HttpRequest, ruta: str):
+    """Sirve los archivos de `AlmacenamientoLocal` (desarrollo) si la URL tiene
+    una firma válida y no ha expirado (ver `almacenamiento.py`)."""
+    if not hasattr(default_storage, 'verificar'):
+        raise Http404
+    expira = request.GET.get('expira', '')
+    if not expira.isascii() or not expira.isdigit() or not default_storage.verificar(
+        ruta, int(expira), request.GET.get('firma', '')
+    ):
+        return HttpResponseForbidden()
+    try:
+        return FileResponse(default_storage.open(ruta, 'rb'))
+    except (FileNotFoundError, SuspiciousFileOperation) as error:
+        raise Http404 from error
@@ -0,0 +1,476 @@
+"""api.py
+
+Benchmark de la API con mezclas de peticiones sobre datos de flota
+realistas: mide el rendimiento, la latencia p50, p95 y p99 y las consultas
+SQL de cada endpoint y guarda los resultados en un archivo JSON para
+compararlos entre versiones.
+
+El benchmark crea una base de datos de pruebas, la llena con `datos.sembrar`
+y autentica con un token a un trabajador de cada empresa, por lo que cada
+petición atraviesa toda la pila de la API (autenticación, alcance por
+empresa, router, vista, serializer y paginación). Cada mezcla elige en cada
+petición una empresa al azar y un endpoint según su peso, con ids de
+registros de esa empresa:
+    - `conductor`: las consultas periódicas de la aplicación de los
+      conductores (orden de movimiento abierta, vigencia de la licencia,
+      estado y kilometraje del vehículo).
+    - `administracion`: el panel de la empresa (listados, búsquedas y
+      reportes de costos, vencimientos, licencias y llantas).
+    - `completa`: el listado, el detalle y `search_by` de cada viewset, con
+      el mismo peso.
+
+Las peticiones se envían en serie con el cliente de pruebas de Django, sin
+red: el rendimiento medido es el costo de procesar cada petición en un solo
+proceso. Para medir la concurrencia con un servidor en ejecución se usa
+`carga.py`.
+
+Uso:
+    python benchmarks/api.py [--empresas N] [--trabajadores N] [--vehiculos N]
+        [--lecturas N] [--ordenes N] ... [--peticiones N]
+        [--mezclas conductor,administracion,completa] [--semilla N]
+        [--salida ARCHIVO] [--comparar ARCHIVO]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import argparse
+from dataclasses import asdict, fields
+from datetime import date, datetime, timezone
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'administracion_vehicular.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks.datos import Volumenes, sembrar  # noqa: E402
+from manual_de_mantenimiento.models import (  # noqa: E402
+    ManualMantenimiento,
+    OperacionMantenimiento,
+    Sistema,
+    Subsistema,
+)
+from ordenes_de_mantenimiento.models import (  # noqa: E402
+    AperturaOrdenMovimiento,
+    CierreOrdenMovimiento,
+)
+from ordenes_de_trabajo.models import OrdenTrabajo  # noqa: E402
+from usuarios.models import PerfilUsuario  # noqa: E402
+from vehiculos.models import Bateria, Kilometraje, Licencia, Llanta, Vehiculo  # noqa: E402
+
+# Ids de cada tabla que se cargan por empresa para construir las URLs:
+MUESTRA = 500
+
+# Ruta desde cada modelo hasta su empresa:
+TABLAS = {
+    'perfiles': (PerfilUsuario, 'empresa_id'),
+    'vehiculos': (Vehiculo, 'empresa_id'),
+    'kilometrajes': (Kilometraje, 'empresa_id'),
+    'llantas': (Llanta, 'vehiculo__empresa_id'),
+    'baterias': (Bateria, 'vehiculo__empresa_id'),
+    'licencias': (Licencia, 'empresa_id'),
+    'manuales': (ManualMantenimiento, 'vehiculo__empresa_id'),
+    'sistemas': (Sistema, 'manual_mantenimiento__vehiculo__empresa_id'),
+    'subsistemas': (Subsistema, 'sistema__manual_mantenimiento__vehiculo__empresa_id'),
+    'operaciones': (
+        OperacionMantenimiento, 'subsistema__sistema__manual_mantenimiento__vehiculo__empresa_id'
+    ),
+    'ordenes_trabajo': (OrdenTrabajo, 'empresa_id'),
+    'aperturas': (AperturaOrdenMovimiento, 'empresa_id'),
+    'cierres': (CierreOrdenMovimiento, 'empresa_id'),
+}
+
+def cargar_ids(empresa_id: int) -> dict:
+    """Carga una muestra de los ids de cada tabla de una empresa."""
+    ids = {'empresa': empresa_id}
+    for nombre, (modelo, campo) in TABLAS.items():
+        ids[nombre] = list(
+            modelo.objects.filter(**{campo: empresa_id})
+            .order_by('?').values_list('id', flat=True)[:MUESTRA]
+        )
+    ids['conductores'] = list(
+        Licencia.objects.filter(empresa_id=empresa_id)
+        .order_by('?').values_list('conductor_id', flat=True)[:MUESTRA]
+    )
+    ids['vehiculos_con_manual'] = list(
+        ManualMantenimiento.objects.filter(vehiculo__empresa_id=empresa_id)
+        .order_by('?').values_list('vehiculo_id', flat=True)[:MUESTRA]
+    )
+    ids['perfiles_datos'] = list(
+        PerfilUsuario.objects.filter(empresa_id=empresa_id)
+        .order_by('?').values('id', 'email', 'cedula', 'role')[:MUESTRA]
+    )
+    return ids
+
+# Cada endpoint recibe los ids de la empresa y el generador aleatorio y
+# devuelve la URL de la petición.
+Generador = Callable[[dict, random.Random], str]
+
+def listado(ruta: str) -> Generador:
+    return lambda ids, aleatorio: f'/api/v1/{ruta}/'
+
+def detalle(ruta: str, tabla: str) -> Generador:
+    return lambda ids, aleatorio: f'/api/v1/{ruta}/{aleatorio.choice(ids[tabla])}/'
+
+def busqueda(ruta: str, parametro: str, tabla: str) -> Generador:
+    return lambda ids, aleatorio: (
+        f'/api/v1/{ruta}/search_by/?{parametro}={aleatorio.choice(ids[tabla])}'
+    )
+
+def perfil_aleatorio(ids: dict, aleatorio: random.Random) -> dict:
+    return aleatorio.choice(ids['perfiles_datos'])
+
+ENDPOINTS: Dict[str, Generador] = {
+    # Empresas
+    'empresas.list': listado('empresas'),
+    'empresas.retrieve': lambda ids, aleatorio: f"/api/v1/empresas/{ids['empresa']}/",
+    'funcionalidades.list': listado('funcionalidades'),
+    'suscripciones.list': listado('suscripciones'),
+    # Usuarios
+    'perfiles.list': listado('perfiles'),
+    'perfiles.retrieve': detalle('perfiles', 'perfiles'),
+    'perfiles.search_by': lambda ids, aleatorio: (
+        f"/api/v1/perfiles/search_by/?empresa_id={ids['empresa']}"
+        f"&role={perfil_aleatorio(ids, aleatorio)['role']}"
+    ),
+    'perfiles.search.email': lambda ids, aleatorio: (
+        f"/api/v1/perfiles/search/?email={perfil_aleatorio(ids, aleatorio)['email']}"
+    ),
+    'perfiles.search.cedula': lambda ids, aleatorio: (
+        f"/api/v1/perfiles/search/?cedula={perfil_aleatorio(ids, aleatorio)['cedula']}"
+    ),
+    'representantes.list': listado('representantes'),
+    # Vehículos
+    'vehiculos.list': listado('vehiculos'),
+    'vehiculos.retrieve': detalle('vehiculos', 'vehiculos'),
+    'vehiculos.search_by': busqueda('vehiculos', 'propietario_id', 'perfiles'),
+    'vehiculos.estado': lambda ids, aleatorio: (
+        f"/api/v1/vehiculos/{aleatorio.choice(ids['vehiculos'])}/estado/"
+    ),
+    'kilometrajes.list': listado('kilometrajes'),
+    'kilometrajes.retrieve': detalle('kilometrajes', 'kilometrajes'),
+    'kilometrajes.search_by': busqueda('kilometrajes', 'vehiculo_id', 'vehiculos'),
+    'llantas.list': listado('llantas'),
+    'llantas.retrieve': detalle('llantas', 'llantas'),
+    'llantas.search_by': busqueda('llantas', 'vehiculo_id', 'vehiculos'),
+    'llantas.antiguedad': lambda ids, aleatorio: (
+        f"/api/v1/llantas/antiguedad/?empresa_id={ids['empresa']}"
+    ),
+    'baterias.list': listado('baterias'),
+    'baterias.retrieve': detalle('baterias', 'baterias'),
+    'baterias.search_by': busqueda('baterias', 'vehiculo_id', 'vehiculos'),
+    'licencias.list': listado('licencias'),
+    'licencias.retrieve': detalle('licencias', 'licencias'),
+    'licencias.search_by': busqueda('licencias', 'conductor_id', 'conductores'),
+    'licencias.vigencia': lambda ids, aleatorio: (
+        f"/api/v1/licencias/vigencia/?conductor_id={aleatorio.choice(ids['conductores'])}"
+    ),
+    'licencias.caducidad': lambda ids, aleatorio: (
+        f"/api/v1/licencias/caducidad/?empresa_id={ids['empresa']}"
+    ),
+    # Manuales de mantenimiento
+    'manuales_mantenimiento.list': listado('manuales_mantenimiento'),
+    'manuales_mantenimiento.retrieve': detalle('manuales_mantenimiento', 'manuales'),
+    'manuales_mantenimiento.search_by': busqueda(
+        'manuales_mantenimiento', 'vehiculo_id', 'vehiculos_con_manual'
+    ),
+    'manuales_mantenimiento.vencimientos': lambda ids, aleatorio: (
+        f"/api/v1/manuales_mantenimiento/vencimientos/?empresa_id={ids['empresa']}"
+    ),
+    'sistemas.list': listado('sistemas'),
+    'sistemas.retrieve': detalle('sistemas', 'sistemas'),
+    'sistemas.search_by': busqueda('sistemas', 'manual_mantenimiento_id', 'manuales'),
+    'subsistemas.list': listado('subsistemas'),
+    'subsistemas.retrieve': detalle('subsistemas', 'subsistemas'),
+    'subsistemas.search_by': busqueda('subsistemas', 'sistema_id', 'sistemas'),
+    'operaciones_mantenimiento.list': listado('operaciones_mantenimiento'),
+    'operaciones_mantenimiento.retrieve': detalle('operaciones_mantenimiento', 'operaciones'),
+    'operaciones_mantenimiento.search_by': busqueda(
+        'operaciones_mantenimiento', 'subsistema_id', 'subsistemas'
+    ),
+    # Órdenes de trabajo
+    'ordenes_trabajo.list': listado('ordenes_trabajo'),
+    'ordenes_trabajo.retrieve': detalle('ordenes_trabajo', 'ordenes_trabajo'),
+    'ordenes_trabajo.search_by': busqueda('ordenes_trabajo', 'vehiculo_id', 'vehiculos'),
+    'ordenes_trabajo.costos': lambda ids, aleatorio: (
+        f"/api/v1/ordenes_trabajo/costos/?empresa_id={ids['empresa']}"
+    ),
+    # Órdenes de movimiento
+    'apertura_ordenes_movimiento.list': listado('apertura_ordenes_movimiento'),
+    'apertura_ordenes_movimiento.retrieve': detalle('apertura_ordenes_movimiento', 'aperturas'),
+    'apertura_ordenes_movimiento.search_by': busqueda(
+        'apertura_ordenes_movimiento', 'vehiculo_id', 'vehiculos'
+    ),
+    'apertura_ordenes_movimiento.abierta': lambda ids, aleatorio: (
+        "/api/v1/apertura_ordenes_movimiento/abierta/"
+        f"?conductor_id={aleatorio.choice(ids['perfiles'])}"
+    ),
+    'cierre_ordenes_movimiento.list': listado('cierre_ordenes_movimiento'),
+    'cierre_ordenes_movimiento.retrieve': detalle('cierre_ordenes_movimiento', 'cierres'),
+    # Tareas en segundo plano
+    'tareas.list': listado('tareas'),
+}
+
+# Peso de cada endpoint en cada mezcla:
+MEZCLAS: Dict[str, Dict[str, int]] = {
+    'conductor': {
+        'apertura_ordenes_movimiento.abierta': 30,
+        'licencias.vigencia': 20,
+        'vehiculos.estado': 20,
+        'kilometrajes.search_by': 15,
+        'vehiculos.retrieve': 10,
+        'manuales_mantenimiento.search_by': 5,
+    },
+    'administracion': {
+        'vehiculos.list': 15,
+        'perfiles.search_by': 10,
+        'perfiles.search.cedula': 5,
+        'ordenes_trabajo.search_by': 10,
+        'apertura_ordenes_movimiento.search_by': 10,
+        'kilometrajes.list': 10,
+        'llantas.search_by': 5,
+        'baterias.search_by': 5,
+        'ordenes_trabajo.costos': 8,
+        'manuales_mantenimiento.vencimientos': 8,
+        'licencias.caducidad': 7,
+        'llantas.antiguedad': 7,
+    },
+    'completa': {nombre: 1 for nombre in ENDPOINTS},
+}
+
+def percentiles(tiempos: List[float]) -> dict:
+    """Devuelve la latencia p50, p95 y p99 (en ms) de una lista de tiempos."""
+    if len(tiempos) < 2:
+        cortes = (tiempos or [0.0]) * 99
+    else:
+        cortes = statistics.quantiles(tiempos, n=100, method='inclusive')
+    return {'p50': cortes[49], 'p95': cortes[94], 'p99': cortes[98]}
+
+def resumir(tiempos: List[float], consultas: List[int], codigos: Dict[str, int]) -> dict:
+    """Resume las medidas de un conjunto de peticiones."""
+    return {
+        'peticiones': len(tiempos),
+        **percentiles(tiempos),
+        'consultas_promedio': statistics.fmean(consultas) if consultas else 0.0,
+        'consultas_maximo': max(consultas, default=0),
+        'codigos': dict(sorted(codigos.items())),
+    }
+
+def crear_clientes(empresas: List[int]) -> List[tuple]:
+    """Autentica con un token a un trabajador de cada empresa.
+
+    Returns:
+        list: Pares (cliente, ids de la empresa).
+    """
+    clientes = []
+    for empresa_id in empresas:
+        perfil = PerfilUsuario.objects.filter(empresa_id=empresa_id).order_by('id').first()
+        token, _creado = Token.objects.get_or_create(user_id=perfil.user_id)
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        clientes.append((cliente, cargar_ids(empresa_id)))
+    return clientes
+
+def medir_mezcla(clientes: List[tuple], pesos: Dict[str, int], peticiones: int, semilla: int) -> dict:
+    """Ejecuta una mezcla de peticiones y mide cada endpoint.
+
+    Antes de medir, envía una petición a cada endpoint de la mezcla con cada
+    cliente (calentamiento).
+
+    Returns:
+        dict: Rendimiento, latencias y consultas de la mezcla y de cada endpoint.
+    """
+    aleatorio = random.Random(semilla)
+    nombres, valores = list(pesos), list(pesos.values())
+    for cliente, ids in clientes:
+        for nombre in nombres:
+            cliente.get(ENDPOINTS[nombre](ids, aleatorio))
+
+    medidas = {nombre: ([], [], {}) for nombre in nombres}
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        cliente, ids = aleatorio.choice(clientes)
+        nombre = aleatorio.choices(nombres, weights=valores)[0]
+        url = ENDPOINTS[nombre](ids, aleatorio)
+        with CaptureQueriesContext(connection) as capturadas:
+            comienzo = time.perf_counter()
+            response = cliente.get(url)
+            transcurrido = (time.perf_counter() - comienzo) * 1000
+        if response.status_code >= 500:
+            raise RuntimeError(f"{url}: {response.status_code}")
+        tiempos, consultas, codigos = medidas[nombre]
+        tiempos.append(transcurrido)
+        consultas.append(len(capturadas))
+        codigo = str(response.status_code)
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+    duracion = time.perf_counter() - inicio
+
+    todos_tiempos, todas_consultas, todos_codigos = [], [], {}
+    for tiempos, consultas, codigos in medidas.values():
+        todos_tiempos.extend(tiempos)
+        todas_consultas.extend(consultas)
+        for codigo, cantidad in codigos.items():
+            todos_codigos[codigo] = todos_codigos.get(codigo, 0) + cantidad
+    return {
+        'duracion_s': duracion,
+        'peticiones_por_segundo': peticiones / duracion,
+        **resumir(todos_tiempos, todas_consultas, todos_codigos),
+        'endpoints': {
+            nombre: resumir(*medidas[nombre]) for nombre in nombres if medidas[nombre][0]
+        },
+    }
+
+def commit_actual() -> Optional[str]:
+    """Devuelve el commit del repositorio, o None si no se puede obtener."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def entorno() -> dict:
+    """Describe el entorno de la medición, para comparar solo reportes equivalentes."""
+    return {
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'base_de_datos': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'autenticacion_cache': getattr(settings, 'AUTENTICACION_CACHE', False),
+        'tamanio_pagina': settings.REST_FRAMEWORK.get('PAGE_SIZE'),
+    }
+
+def imprimir(reporte: dict) -> None:
+    """Imprime el resumen de cada mezcla y de sus endpoints."""
+    for nombre, mezcla in reporte['mezclas'].items():
+        print(
+            f"\n{nombre}: {mezcla['peticiones_por_segundo']:.1f} req/s,"
+            f" p50 {mezcla['p50']:.2f} ms, p95 {mezcla['p95']:.2f} ms,"
+            f" p99 {mezcla['p99']:.2f} ms, {mezcla['consultas_promedio']:.1f} consultas"
+        )
+        print(
+            f"  {'endpoint':45} {'pet.':>6} {'p50':>8} {'p95':>8} {'p99':>8}"
+            f" {'consultas':>10} {'códigos':>10}"
+        )
+        for endpoint, medidas in mezcla['endpoints'].items():
+            codigos = ','.join(f'{codigo}:{cantidad}' for codigo, cantidad in medidas['codigos'].items())
+            print(
+                f"  {endpoint:45} {medidas['peticiones']:6} {medidas['p50']:8.2f}"
+                f" {medidas['p95']:8.2f} {medidas['p99']:8.2f}"
+                f" {medidas['consultas_promedio']:10.1f} {codigos:>10}"
+            )
+    print("(latencias en ms)")
+
+def comparar(anterior: dict, actual: dict) -> None:
+    """Imprime la variación de la latencia p95 y de las consultas por endpoint
+    respecto de un reporte anterior."""
+    print(f"\nComparación con {anterior['entorno'].get('commit')} ({anterior['fecha']}):")
+    if anterior['volumenes'] != actual['volumenes']:
+        print("  Aviso: los volúmenes de datos de los reportes son distintos.")
+    for nombre, mezcla in actual['mezclas'].items():
+        previa = anterior['mezclas'].get(nombre)
+        if previa is None:
+            continue
+        print(
+            f"  {nombre}: {previa['peticiones_por_segundo']:.1f} ->"
+            f" {mezcla['peticiones_por_segundo']:.1f} req/s"
+        )
+        print(f"    {'endpoint':45} {'p95 antes':>10} {'p95 ahora':>10} {'var.':>8} {'consultas':>12}")
+        for endpoint, medidas in mezcla['endpoints'].items():
+            antes = previa['endpoints'].get(endpoint)
+            if antes is None:
+                continue
+            variacion = (medidas['p95'] / antes['p95'] - 1) if antes['p95'] else 0.0
+            consultas = f"{antes['consultas_maximo']} -> {medidas['consultas_maximo']}"
+            print(
+                f"    {endpoint:45} {antes['p95']:10.2f} {medidas['p95']:10.2f}"
+                f" {variacion:+8.1%} {consultas:>12}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    valores = Volumenes()
+    for campo in fields(Volumenes):
+        parser.add_argument(
+            f"--{campo.name.replace('_', '-')}", dest=campo.name, type=int,
+            default=getattr(valores, campo.name)
+        )
+    parser.add_argument('--peticiones', type=int, default=2000, help="Peticiones por mezcla.")
+    parser.add_argument(
+        '--mezclas', default=','.join(MEZCLAS),
+        type=lambda valor: valor.split(','), help="Mezclas a ejecutar, separadas por comas."
+    )
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument(
+        '--salida', default=f"benchmark-api-{date.today():%Y%m%d}.json",
+        help="Archivo JSON con los resultados."
+    )
+    parser.add_argument('--comparar', help="Reporte JSON anterior con el que comparar.")
+    args = parser.parse_args()
+    desconocidas = set(args.mezclas) - set(MEZCLAS)
+    if desconocidas:
+        parser.error(f"Mezclas desconocidas: {', '.join(sorted(desconocidas))}")
+
+    # Las búsquedas sin resultados responden 404; no se registran como avisos.
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    setup_test_environment()
+    bases = setup_databases(verbosity=0, interactive=False)
+    try:
+        volumenes = Volumenes(**{campo.name: getattr(args, campo.name) for campo in fields(Volumenes)})
+        print("Generando datos...", flush=True)
+        datos = sembrar(volumenes, args.semilla)
+        clientes = crear_clientes(datos['empresas'])
+
+        reporte = {
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'entorno': entorno(),
+            'volumenes': asdict(volumenes),
+            'peticiones': args.peticiones,
+            'semilla': args.semilla,
+            'mezclas': {},
+        }
+        for nombre in args.mezclas:
+            print(f"Midiendo la mezcla {nombre}...", flush=True)
+            cache.clear()
+            reporte['mezclas'][nombre] = medir_mezcla(
+                clientes, MEZCLAS[nombre], args.peticiones, args.semilla
+            )
+    finally:
+        teardown_databases(bases, verbosity=0)
+        teardown_test_environment()
+
+    imprimir(reporte)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(json.load(archivo), reporte)
+
+if __name__ == '__main__':
+    main()
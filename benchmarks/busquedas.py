@@ -0,0 +1,188 @@
+"""busquedas.py
+
+Benchmark de las acciones `search_by` (y de la búsqueda de perfiles por email
+y cédula) con y sin los índices de búsqueda.
+
+El benchmark crea una base de datos de pruebas, la llena con `datos.sembrar`,
+elimina los índices de búsqueda (solo esos índices, con el editor de esquema,
+sin revertir migraciones posteriores) y mide la latencia de cada búsqueda;
+después vuelve a crear los índices y repite la medición sobre los mismos
+datos. Las peticiones atraviesan toda la pila de la API (router, vista,
+serializer y paginación) con un usuario autenticado.
+
+Uso:
+    python benchmarks/busquedas.py [--empresas N] [--trabajadores N] [--vehiculos N]
+        [--lecturas N] [--ordenes N] [--repeticiones N]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'administracion_vehicular.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.apps import apps  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks.datos import Volumenes, sembrar  # noqa: E402
+
+# Índices de búsqueda medidos, por modelo:
+INDICES_BUSQUEDA = {
+    'usuarios.PerfilUsuario': ('perfil_empresa_role_idx', 'perfil_email_idx', 'perfil_cedula_idx'),
+    'vehiculos.Kilometraje': ('kilometraje_vehiculo_fecha_idx',),
+    'ordenes_de_trabajo.OrdenTrabajo': ('orden_responsable_vehiculo_idx',),
+}
+
+def indices_busqueda() -> list:
+    """Devuelve los pares (modelo, índice) de `INDICES_BUSQUEDA`."""
+    pares = []
+    for etiqueta, nombres in INDICES_BUSQUEDA.items():
+        modelo = apps.get_model(etiqueta)
+        indices = {indice.name: indice for indice in modelo._meta.indexes}
+        pares.extend((modelo, indices[nombre]) for nombre in nombres)
+    return pares
+
+def eliminar_indices(pares: list) -> None:
+    """Elimina los índices de búsqueda de la base de datos."""
+    with connection.schema_editor() as editor:
+        for modelo, indice in pares:
+            editor.remove_index(modelo, indice)
+
+def crear_indices(pares: list) -> None:
+    """Vuelve a crear los índices de búsqueda."""
+    with connection.schema_editor() as editor:
+        for modelo, indice in pares:
+            editor.add_index(modelo, indice)
+
+def busquedas(datos: dict) -> dict:
+    """Define las búsquedas a medir; cada una genera una URL aleatoria."""
+    perfiles, vehiculos = datos['perfiles'], datos['vehiculos']
+    return {
+        'kilometrajes.vehiculo_id': lambda: (
+            f"/api/v1/kilometrajes/search_by/?vehiculo_id={random.choice(vehiculos)['id']}"
+        ),
+        'vehiculos.propietario_id': lambda: (
+            "/api/v1/vehiculos/search_by/"
+            f"?propietario_id={random.choice(vehiculos)['propietario_id']}"
+        ),
+        'perfiles.empresa_id_role': lambda: (
+            lambda perfil: "/api/v1/perfiles/search_by/"
+            f"?empresa_id={perfil['empresa_id']}&role={perfil['role']}"
+        )(random.choice(perfiles)),
+        'perfiles.email': lambda: (
+            f"/api/v1/perfiles/search/?email={random.choice(perfiles)['email']}"
+        ),
+        'perfiles.cedula': lambda: (
+            f"/api/v1/perfiles/search/?cedula={random.choice(perfiles)['cedula']}"
+        ),
+        'ordenes_trabajo.responsable_id': lambda: (
+            f"/api/v1/ordenes_trabajo/search_by/?responsable_id={random.choice(perfiles)['id']}"
+        ),
+        'ordenes_trabajo.responsable_id_vehiculo_id': lambda: (
+            "/api/v1/ordenes_trabajo/search_by/"
+            f"?responsable_id={random.choice(perfiles)['id']}"
+            f"&vehiculo_id={random.choice(vehiculos)['id']}"
+        ),
+        'aperturas.conductor_id': lambda: (
+            "/api/v1/apertura_ordenes_movimiento/search_by/"
+            f"?conductor_id={random.choice(perfiles)['id']}"
+        ),
+    }
+
+def percentil(tiempos: list, porcentaje: int) -> float:
+    """Devuelve el percentil de una lista de tiempos (en ms)."""
+    if len(tiempos) < 2:
+        return tiempos[0]
+    return statistics.quantiles(tiempos, n=100, method='inclusive')[porcentaje - 1]
+
+def medir(client: APIClient, datos: dict, repeticiones: int) -> dict:
+    """Mide la latencia de cada búsqueda.
+
+    Returns:
+        dict: p50 y p99 (en ms) de cada búsqueda.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    resultados = {}
+    for nombre, generar_url in busquedas(datos).items():
+        random.seed(nombre)
+        client.get(generar_url())  # Calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            url = generar_url()
+            inicio = time.perf_counter()
+            response = client.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{url}: {response.status_code}")
+        resultados[nombre] = {
+            'p50': statistics.median(tiempos),
+            'p99': percentil(tiempos, 99),
+        }
+    return resultados
+
+def imprimir(antes: dict, despues: dict) -> None:
+    """Imprime la tabla comparativa de latencias."""
+    print(f"{'búsqueda':45} {'p50 antes':>10} {'p50 desp.':>10} {'p99 antes':>10} {'p99 desp.':>10}")
+    for nombre in antes:
+        print(
+            f"{nombre:45} {antes[nombre]['p50']:10.2f} {despues[nombre]['p50']:10.2f}"
+            f" {antes[nombre]['p99']:10.2f} {despues[nombre]['p99']:10.2f}"
+        )
+    print("(latencias en ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    valores = Volumenes()
+    for campo in ('empresas', 'trabajadores', 'vehiculos', 'lecturas', 'ordenes'):
+        parser.add_argument(f'--{campo}', type=int, default=getattr(valores, campo))
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    # Las búsquedas sin resultados responden 404; no se registran como avisos.
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    setup_test_environment()
+    bases = setup_databases(verbosity=0, interactive=False)
+    try:
+        volumenes = Volumenes(
+            empresas=args.empresas, trabajadores=args.trabajadores,
+            vehiculos=args.vehiculos, lecturas=args.lecturas, ordenes=args.ordenes
+        )
+        print("Generando datos...", flush=True)
+        datos = sembrar(volumenes)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="benchmark", is_staff=True))
+
+        indices = indices_busqueda()
+        eliminar_indices(indices)
+        print("Midiendo sin índices...", flush=True)
+        antes = medir(client, datos, args.repeticiones)
+
+        crear_indices(indices)
+        print("Midiendo con índices...", flush=True)
+        despues = medir(client, datos, args.repeticiones)
+        imprimir(antes, despues)
+    finally:
+        teardown_databases(bases, verbosity=0)
+        teardown_test_environment()
+
+if __name__ == '__main__':
+    main()
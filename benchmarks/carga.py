@@ -0,0 +1,196 @@
+"""carga.py
+
+Prueba de carga de las consultas más frecuentes (orden de movimiento abierta,
+estado del vehículo y vigencia de la licencia) en sus versiones síncrona
+(vistas de DRF servidas con WSGI) y asíncrona (`asincrono.py`, servidas con
+ASGI).
+
+A diferencia de los demás benchmarks, las peticiones no atraviesan el
+cliente de pruebas de Django sino un servidor en ejecución, porque lo que se
+mide es cuántas conexiones simultáneas atiende cada modelo de servidor. Para
+comparar con los mismos recursos, se levanta un solo trabajador de cada uno
+sobre la misma base de datos:
+
+    gunicorn -w 1 -b 127.0.0.1:8000 administracion_vehicular.wsgi:application
+    gunicorn -w 1 -b 127.0.0.1:8001 -k uvicorn.workers.UvicornWorker \\
+        administracion_vehicular.asgi:application
+
+Cada nivel de concurrencia abre N conexiones persistentes que envían
+peticiones sin pausa durante `--duracion` segundos, y se reportan las
+peticiones por segundo, la latencia p50 y p95 y los errores (respuestas
+distintas de 200 y fallos de conexión).
+
+Uso:
+    python benchmarks/carga.py --token TOKEN --vehiculo ID --conductor ID
+        [--sincrono URL] [--asincrono URL] [--concurrencias 1,10,50,100]
+        [--duracion SEGUNDOS] [--json ARCHIVO]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+def consultas(vehiculo: int, conductor: int) -> Dict[str, tuple]:
+    """Define las rutas síncrona y asíncrona de cada consulta."""
+    return {
+        'orden_abierta': (
+            f'/api/v1/apertura_ordenes_movimiento/abierta/?conductor_id={conductor}',
+            f'/api/v1/async/apertura_ordenes_movimiento/abierta/?conductor_id={conductor}',
+        ),
+        'estado_vehiculo': (
+            f'/api/v1/vehiculos/{vehiculo}/estado/',
+            f'/api/v1/async/vehiculos/{vehiculo}/estado/',
+        ),
+        'vigencia_licencia': (
+            f'/api/v1/licencias/vigencia/?conductor_id={conductor}',
+            f'/api/v1/async/licencias/vigencia/?conductor_id={conductor}',
+        ),
+    }
+
+async def leer_respuesta(lector: asyncio.StreamReader) -> tuple:
+    """Lee una respuesta HTTP/1.1 con `Content-Length`.
+
+    Returns:
+        tuple: El código de estado y si el servidor cierra la conexión.
+    """
+    linea = await lector.readline()
+    if not linea:
+        raise ConnectionError("El servidor cerró la conexión.")
+    codigo = int(linea.split()[1])
+    longitud, cerrar = 0, False
+    while True:
+        linea = await lector.readline()
+        if linea in (b'\r\n', b'\n', b''):
+            break
+        nombre, _sep, valor = linea.decode('latin-1').partition(':')
+        nombre, valor = nombre.strip().lower(), valor.strip().lower()
+        if nombre == 'content-length':
+            longitud = int(valor)
+        elif nombre == 'connection':
+            cerrar = valor == 'close'
+    await lector.readexactly(longitud)
+    return codigo, cerrar
+
+async def conexion(url: str, token: str, fin: float, tiempos: List[float], errores: List[int]):
+    """Envía peticiones por una conexión persistente hasta el instante `fin`."""
+    partes = urlsplit(url)
+    ruta = partes.path + (f'?{partes.query}' if partes.query else '')
+    peticion = (
+        f'GET {ruta} HTTP/1.1\r\n'
+        f'Host: {partes.netloc}\r\n'
+        f'Authorization: Token {token}\r\n'
+        'Accept: application/json\r\n'
+        'Connection: keep-alive\r\n\r\n'
+    ).encode()
+    lector = escritor = None
+    while time.perf_counter() < fin:
+        try:
+            if escritor is None:
+                lector, escritor = await asyncio.open_connection(
+                    partes.hostname, partes.port or 80
+                )
+            inicio = time.perf_counter()
+            escritor.write(peticion)
+            await escritor.drain()
+            codigo, cerrar = await leer_respuesta(lector)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if codigo != 200:
+                errores.append(codigo)
+            if cerrar:
+                escritor.close()
+                escritor = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errores.append(0)
+            if escritor is not None:
+                escritor.close()
+            escritor = None
+    if escritor is not None:
+        escritor.close()
+
+async def medir(url: str, token: str, concurrencia: int, duracion: float) -> dict:
+    """Mide una ruta con `concurrencia` conexiones simultáneas.
+
+    Returns:
+        dict: Peticiones por segundo, p50 y p95 (en ms) y errores.
+    """
+    tiempos: List[float] = []
+    errores: List[int] = []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(
+        conexion(url, token, fin, tiempos, errores) for _indice in range(concurrencia)
+    ))
+    transcurrido = time.perf_counter() - inicio
+    percentiles = (
+        statistics.quantiles(tiempos, n=100, method='inclusive') if len(tiempos) > 1
+        else tiempos * 99 or [0.0] * 99
+    )
+    return {
+        'peticiones_por_segundo': len(tiempos) / transcurrido,
+        'p50': percentiles[49],
+        'p95': percentiles[94],
+        'errores': len(errores),
+    }
+
+def imprimir(resultados: dict) -> None:
+    """Imprime la tabla comparativa por consulta y nivel de concurrencia."""
+    print(
+        f"{'consulta':20} {'conc.':>6} {'req/s sinc.':>12} {'req/s asinc.':>12}"
+        f" {'p50 sinc.':>10} {'p50 asinc.':>10} {'p95 sinc.':>10} {'p95 asinc.':>10}"
+        f" {'errores':>10}"
+    )
+    for nombre, niveles in resultados.items():
+        for concurrencia, medidas in niveles.items():
+            sinc, asinc = medidas['sincrono'], medidas['asincrono']
+            print(
+                f"{nombre:20} {concurrencia:>6} {sinc['peticiones_por_segundo']:12.1f}"
+                f" {asinc['peticiones_por_segundo']:12.1f} {sinc['p50']:10.2f}"
+                f" {asinc['p50']:10.2f} {sinc['p95']:10.2f} {asinc['p95']:10.2f}"
+                f" {sinc['errores']:>4}/{asinc['errores']:<5}"
+            )
+    print("(latencias en ms; errores síncrono/asíncrono)")
+
+async def ejecutar(args) -> dict:
+    resultados = {}
+    for nombre, (sincrona, asincrona) in consultas(args.vehiculo, args.conductor).items():
+        resultados[nombre] = {}
+        for concurrencia in args.concurrencias:
+            print(f"Midiendo {nombre} con {concurrencia} conexiones...", flush=True)
+            resultados[nombre][concurrencia] = {
+                'sincrono': await medir(
+                    args.sincrono.rstrip('/') + sincrona, args.token, concurrencia, args.duracion
+                ),
+                'asincrono': await medir(
+                    args.asincrono.rstrip('/') + asincrona, args.token, concurrencia, args.duracion
+                ),
+            }
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sincrono', default='http://127.0.0.1:8000')
+    parser.add_argument('--asincrono', default='http://127.0.0.1:8001')
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--vehiculo', type=int, required=True)
+    parser.add_argument('--conductor', type=int, required=True)
+    parser.add_argument(
+        '--concurrencias', default='1,10,50,100',
+        type=lambda valor: [int(nivel) for nivel in valor.split(',')]
+    )
+    parser.add_argument('--duracion', type=float, default=10.0)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo.")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(ejecutar(args))
+    imprimir(resultados)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""datos.py
+
+Genera datos de prueba con volúmenes realistas para los benchmarks:
+empresas con sus trabajadores (con cédulas válidas y licencia de conducir),
+vehículos con sus llantas, baterías y manual de mantenimiento, varios años
+de bitácora de kilometraje, órdenes de trabajo y órdenes de movimiento
+(abiertas y cerradas).
+
+Todas las filas se insertan con `bulk_create`, por lo que los campos que los
+modelos calculan en `save()` (empresa desnormalizada, fecha de fabricación
+de las llantas) se asignan aquí.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+import random
+import string
+
+from django.contrib.auth.models import User
+
+from empresas.models import Empresa, Suscripcion
+from manual_de_mantenimiento.enums import Tareas, UnidadOdometro as UnidadManual
+from manual_de_mantenimiento.models import (
+    ManualMantenimiento,
+    OperacionMantenimiento,
+    Sistema,
+    Subsistema,
+)
+from ordenes_de_mantenimiento.enums import EstadoCumplimiento as EstadoMovimiento
+from ordenes_de_mantenimiento.models import AperturaOrdenMovimiento, CierreOrdenMovimiento
+from ordenes_de_trabajo.enums import EstadoCumplimiento, TipoMantenimiento
+from ordenes_de_trabajo.models import OrdenTrabajo
+from usuarios.enums import EstadoCivil, NivelEducacion, Roles
+from usuarios.models import PerfilUsuario
+from usuarios.validators import generar_cedula_ecuatoriana
+from vehiculos.enums import (
+    Combustible,
+    CondicionVehicular,
+    PosicionLlanta,
+    TipoLicencia,
+    UnidadCarburante,
+    UnidadOdometro,
+)
+from vehiculos.models import (
+    Bateria,
+    Kilometraje,
+    KilometrajeActual,
+    Licencia,
+    Llanta,
+    Vehiculo,
+)
+from vehiculos.validators import obtener_fecha_fabricacion
+
+BATCH_SIZE = 1000
+
+@dataclass
+class Volumenes:
+    """Número de filas generadas por cada tabla.
+
+    `trabajadores` y `vehiculos` son por empresa; `lecturas` (una cada
+    `dias_entre_lecturas` días hasta hoy), `ordenes`, `aperturas`,
+    `llantas`, `baterias` y `sistemas` (cada uno con `subsistemas`, y estos
+    con `operaciones`) son por vehículo. Todas las aperturas de un vehículo
+    salvo la última tienen su cierre.
+    """
+    empresas: int = 10
+    trabajadores: int = 200
+    vehiculos: int = 50
+    lecturas: int = 200
+    dias_entre_lecturas: int = 7
+    ordenes: int = 20
+    aperturas: int = 5
+    llantas: int = 4
+    baterias: int = 1
+    sistemas: int = 3
+    subsistemas: int = 2
+    operaciones: int = 3
+
+def generar_codigo_dot(aleatorio: random.Random, hoy: date) -> str:
+    """Genera un código DOT válido de una llanta fabricada hace 1 a 9 años."""
+    planta = ''.join(aleatorio.choices(string.ascii_uppercase + string.digits, k=4))
+    tamanio = ''.join(aleatorio.choices(string.ascii_uppercase + string.digits, k=4))
+    anio = (hoy.year - aleatorio.randint(1, 9)) % 100
+    return f"DOT-{planta}-{tamanio}-{aleatorio.randint(1, 52):02d}{anio:02d}"
+
+def sembrar(volumenes: Volumenes, semilla: int = 0) -> dict:
+    """Genera los datos de prueba.
+
+    Args:
+        volumenes (Volumenes): Número de filas por empresa y por vehículo.
+        semilla (int): Semilla de los valores aleatorios.
+
+    Returns:
+        dict: Los ids generados de empresas, perfiles (con su email, cédula
+        y rol) y vehículos, para construir las consultas de los benchmarks.
+    """
+    aleatorio = random.Random(semilla)
+    random.seed(semilla)
+    roles = [rol.value for rol in Roles]
+    hoy = date.today()
+
+    suscripciones = Suscripcion.objects.bulk_create([
+        Suscripcion(
+            tipo="Benchmark", fecha_emision=hoy, fecha_caducidad=hoy + timedelta(days=365),
+            precio=100
+        ) for _ in range(volumenes.empresas)
+    ])
+    empresas = Empresa.objects.bulk_create([
+        Empresa(
+            nombre_comercial=f"Empresa {indice}", suscripcion=suscripcion,
+            ruc="1790012345001", direccion="Quito", correo=f"empresa{indice}@acv.ec",
+            telefono="0987129357"
+        ) for indice, suscripcion in enumerate(suscripciones)
+    ])
+
+    plazas = [
+        (empresa, f"u{empresa.id}-{indice}@acv.ec")
+        for empresa in empresas for indice in range(volumenes.trabajadores)
+    ]
+    usuarios = User.objects.bulk_create([
+        User(username=email, email=email) for _empresa, email in plazas
+    ], batch_size=BATCH_SIZE)
+    perfiles = PerfilUsuario.objects.bulk_create([
+        PerfilUsuario(
+            user=usuario,
+            empresa=empresa,
+            role=aleatorio.choice(roles),
+            cedula=generar_cedula_ecuatoriana(),
+            email=email,
+            telefono="0987129357",
+            fecha_nacimiento=date(1990, 1, 1),
+            nivel_educacion=NivelEducacion.SUPERIOR.value,
+            estado_civil=EstadoCivil.SOLTERO.value
+        ) for (empresa, email), usuario in zip(plazas, usuarios)
+    ], batch_size=BATCH_SIZE)
+    perfiles_por_empresa = {}
+    for perfil in perfiles:
+        perfiles_por_empresa.setdefault(perfil.empresa_id, []).append(perfil)
+
+    vehiculos = Vehiculo.objects.bulk_create([
+        Vehiculo(
+            empresa=empresa,
+            propietario=aleatorio.choice(perfiles_por_empresa[empresa.id]),
+            anio_de_fabricacion=2018, cilindraje=1.6, color="Blanco", clase="Camioneta",
+            combustible=Combustible.DIESEL.value, condicion=CondicionVehicular.OPERABLE.value,
+            marca="Toyota", modelo="Hilux", numero_de_chasis=f"CH-{empresa.id}-{indice}",
+            placa=f"P{empresa.id:02d}-{indice:04d}", tonelaje=1.5,
+            valor_unidad_carburante=1.75, unidad_carburante=UnidadCarburante.GALONES.value
+        ) for empresa in empresas for indice in range(volumenes.vehiculos)
+    ], batch_size=BATCH_SIZE)
+
+    # Cada conductor tiene una licencia; algunas caducadas o por caducar.
+    tipos_licencia = [tipo.value for tipo in TipoLicencia]
+    Licencia.objects.bulk_create([
+        Licencia(
+            conductor=perfil, empresa_id=perfil.empresa_id, tipo=aleatorio.choice(tipos_licencia),
+            fecha_de_emision=caducidad - timedelta(days=5 * 365),
+            fecha_de_caducidad=caducidad, puntos=aleatorio.randint(1, 30)
+        ) for perfil in perfiles
+        for caducidad in [hoy + timedelta(days=aleatorio.randint(-60, 5 * 365))]
+    ], batch_size=BATCH_SIZE)
+
+    posiciones = [posicion.value for posicion in PosicionLlanta]
+    Llanta.objects.bulk_create([
+        Llanta(
+            vehiculo=vehiculo, codigo_de_fabricacion=codigo,
+            posicion_respecto_al_vehiculo=posiciones[indice % len(posiciones)],
+            fecha_fabricacion=obtener_fecha_fabricacion(codigo, hoy)
+        ) for vehiculo in vehiculos for indice in range(volumenes.llantas)
+        for codigo in [generar_codigo_dot(aleatorio, hoy)]
+    ], batch_size=BATCH_SIZE)
+    Bateria.objects.bulk_create([
+        Bateria(vehiculo=vehiculo, codigo_de_fabricacion=f"BAT{vehiculo.id:06d}{indice}")
+        for vehiculo in vehiculos for indice in range(volumenes.baterias)
+    ], batch_size=BATCH_SIZE)
+
+    manuales = ManualMantenimiento.objects.bulk_create([
+        ManualMantenimiento(
+            vehiculo=vehiculo, anticipo_alertas=500, frecuencia_minima=5000,
+            final_ciclo=100000, unidad=UnidadManual.KILOMETROS.value
+        ) for vehiculo in vehiculos
+    ], batch_size=BATCH_SIZE)
+    sistemas = Sistema.objects.bulk_create([
+        Sistema(manual_mantenimiento=manual, nombre=f"Sistema {indice}")
+        for manual in manuales for indice in range(volumenes.sistemas)
+    ], batch_size=BATCH_SIZE)
+    subsistemas = Subsistema.objects.bulk_create([
+        Subsistema(sistema=sistema, nombre=f"Subsistema {indice}")
+        for sistema in sistemas for indice in range(volumenes.subsistemas)
+    ], batch_size=BATCH_SIZE)
+    tareas = [tarea.value['sigla'] for tarea in Tareas]
+    OperacionMantenimiento.objects.bulk_create([
+        OperacionMantenimiento(
+            subsistema=subsistema, tarea=aleatorio.choice(tareas),
+            frecuencia=5000 * aleatorio.randint(1, 8), unidad=UnidadManual.KILOMETROS.value
+        ) for subsistema in subsistemas for _ in range(volumenes.operaciones)
+    ], batch_size=BATCH_SIZE)
+
+    intervalo = volumenes.dias_entre_lecturas
+    inicio = hoy - timedelta(days=volumenes.lecturas * intervalo)
+    lecturas = Kilometraje.objects.bulk_create([
+        Kilometraje(
+            vehiculo=vehiculo, empresa_id=vehiculo.empresa_id,
+            kilometraje=indice * intervalo * 100, unidad=UnidadOdometro.KILOMETROS.value,
+            fecha=inicio + timedelta(days=indice * intervalo)
+        ) for vehiculo in vehiculos for indice in range(volumenes.lecturas)
+    ], batch_size=BATCH_SIZE)
+    KilometrajeActual.objects.reconstruir()
+
+    tipos = [tipo.value for tipo in TipoMantenimiento]
+    estados_trabajo = [estado.value for estado in EstadoCumplimiento]
+    OrdenTrabajo.objects.bulk_create([
+        OrdenTrabajo(
+            responsable=aleatorio.choice(perfiles_por_empresa[vehiculo.empresa_id]),
+            vehiculo=vehiculo, empresa_id=vehiculo.empresa_id,
+            tipo_mantenimiento=aleatorio.choice(tipos),
+            tipo_trabajo="Cambio de aceite", cumplimiento=aleatorio.choice(estados_trabajo),
+            costo_mantenimiento=aleatorio.randint(20, 500)
+        ) for vehiculo in vehiculos for _ in range(volumenes.ordenes)
+    ], batch_size=BATCH_SIZE)
+
+    lecturas_por_vehiculo = {}
+    for lectura in lecturas:
+        lecturas_por_vehiculo.setdefault(lectura.vehiculo_id, []).append(lectura)
+    # Las salidas usan las lecturas pares y los retornos las impares.
+    aperturas = AperturaOrdenMovimiento.objects.bulk_create([
+        AperturaOrdenMovimiento(
+            responsable=aleatorio.choice(perfiles_por_empresa[vehiculo.empresa_id]),
+            conductor=aleatorio.choice(perfiles_por_empresa[vehiculo.empresa_id]),
+            vehiculo=vehiculo, empresa_id=vehiculo.empresa_id,
+            kilometraje_salida=lectura, fecha_salida_vehiculo=lectura.fecha,
+            itinerario="Quito - Guayaquil", detalle_comision="Entrega"
+        ) for vehiculo in vehiculos
+        for lectura in lecturas_por_vehiculo[vehiculo.id][:2 * volumenes.aperturas:2]
+    ], batch_size=BATCH_SIZE)
+    aperturas_por_vehiculo = {}
+    for apertura in aperturas:
+        aperturas_por_vehiculo.setdefault(apertura.vehiculo_id, []).append(apertura)
+    CierreOrdenMovimiento.objects.bulk_create([
+        CierreOrdenMovimiento(
+            apertura=apertura, empresa_id=apertura.empresa_id,
+            fecha_retorno_vehiculo=retorno.fecha, kilometraje_retorno=retorno,
+            cumplimiento=EstadoMovimiento.CUMPLIDO.value
+        ) for vehiculo_id, abiertas in aperturas_por_vehiculo.items()
+        for apertura, retorno in zip(
+            abiertas[:-1], lecturas_por_vehiculo[vehiculo_id][1:2 * volumenes.aperturas:2]
+        )
+    ], batch_size=BATCH_SIZE)
+
+    return {
+        'empresas': [empresa.id for empresa in empresas],
+        'perfiles': [
+            {'id': perfil.id, 'empresa_id': perfil.empresa_id, 'role': perfil.role,
+             'email': perfil.email, 'cedula': perfil.cedula}
+            for perfil in perfiles
+        ],
+        'vehiculos': [
+            {'id': vehiculo.id, 'propietario_id': vehiculo.propietario_id}
+            for vehiculo in vehiculos
+        ],
+    }
@@ -0,0 +1,158 @@
+"""validadores.py
+
+Microbenchmark de los validadores de placas, códigos DOT, códigos de batería
+y cédulas.
+
+Compara la implementación anterior (expresiones regulares interpretadas en
+cada llamada con `re.match`, dos patrones para las placas y el cálculo de la
+cédula con `int` por dígito) con los validadores actuales (patrones
+compilados al importar el módulo) y con la validación en lote de
+`validar_varios` (que además obtiene el mensaje de error de cada entrada
+inválida), sobre entradas sintéticas generadas al estilo de
+`generar_cedula_ecuatoriana`: el 80 % válidas y el 20 % con un carácter
+alterado. Cada implementación se comprueba contra las demás antes de medir.
+
+Uso:
+    python benchmarks/validadores.py [--entradas N] [--semilla N]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'administracion_vehicular.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from administracion_vehicular.validacion import validar_varios  # noqa: E402
+from usuarios.validators import (  # noqa: E402
+    es_una_cedula_valida,
+    generar_cedula_ecuatoriana,
+    validar_cedula,
+)
+from vehiculos.validators import (  # noqa: E402
+    es_un_codigo_bateria_valido,
+    es_un_codigo_dot_valido,
+    es_una_placa_de_vehiculo_valida,
+    validar_codigo_bateria,
+    validar_codigo_dot,
+    validar_placa_vehicular,
+)
+
+# Implementación anterior de los validadores:
+
+def placa_anterior(placa: str) -> bool:
+    patron_vehiculo = r'^[A-Z]{3}\-\d{3,4}$'
+    patron_moto = r'^[A-Z]{2}\-\d{3}[A-Z]?$'
+    return bool(re.match(patron_vehiculo, placa)) or bool(re.match(patron_moto, placa))
+
+def codigo_dot_anterior(codigo: str) -> bool:
+    patron = r'^DOT-[A-Z0-9]{4}-[A-Z0-9]{4}-\d{4}$'
+    return bool(re.match(patron, codigo))
+
+def codigo_bateria_anterior(codigo_bateria: str) -> bool:
+    patron = r'^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]{8,}$'
+    return bool(re.match(patron, codigo_bateria))
+
+def cedula_anterior(cedula: str) -> bool:
+    if not cedula.isdigit() or len(cedula) != 10:
+        return False
+    codigo_provincial = int(cedula[:2])
+    if not (0 <= codigo_provincial <= 24 or codigo_provincial == 30):
+        return False
+    if int(cedula[2]) > 6:
+        return False
+    coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
+    total = sum(map(
+        lambda x: x[0] if x[0] < 10 else x[0] - 9,
+        [(int(cedula[i]) * coeficientes[i],) for i in range(9)]
+    ))
+    return (10 - total % 10) % 10 == int(cedula[9])
+
+# Generadores de entradas sintéticas:
+
+ALFANUMERICOS = string.ascii_uppercase + string.digits
+
+def generar_placa() -> str:
+    if random.random() < 0.8:
+        letras = ''.join(random.choices(string.ascii_uppercase, k=3))
+        return f"{letras}-{random.randint(100, 9999)}"
+    letras = ''.join(random.choices(string.ascii_uppercase, k=2))
+    return f"{letras}-{random.randint(100, 999)}{random.choice(['', 'A', 'B'])}"
+
+def generar_codigo_dot() -> str:
+    planta = ''.join(random.choices(ALFANUMERICOS, k=4))
+    tamanio = ''.join(random.choices(ALFANUMERICOS, k=4))
+    return f"DOT-{planta}-{tamanio}-{random.randint(1, 52):02d}{random.randint(0, 99):02d}"
+
+def generar_codigo_bateria() -> str:
+    letras = ''.join(random.choices(string.ascii_uppercase, k=random.randint(1, 6)))
+    return letras + ''.join(random.choices(string.digits, k=random.randint(2, 6)))
+
+def alterar(valor: str) -> str:
+    """Reemplaza un carácter del valor por uno de otra clase."""
+    posicion = random.randrange(len(valor))
+    reemplazo = random.choice('-x*9Z ' if valor[posicion].isdigit() else '0/#a')
+    return valor[:posicion] + reemplazo + valor[posicion + 1:]
+
+def generar_entradas(generador, cantidad: int) -> list:
+    """Genera las entradas: el 80 % válidas y el 20 % alteradas."""
+    return [
+        generador() if random.random() < 0.8 else alterar(generador())
+        for _ in range(cantidad)
+    ]
+
+CASOS = (
+    ('placa', generar_placa, placa_anterior,
+     es_una_placa_de_vehiculo_valida, validar_placa_vehicular),
+    ('codigo_dot', generar_codigo_dot, codigo_dot_anterior,
+     es_un_codigo_dot_valido, validar_codigo_dot),
+    ('codigo_bateria', generar_codigo_bateria, codigo_bateria_anterior,
+     es_un_codigo_bateria_valido, validar_codigo_bateria),
+    ('cedula', generar_cedula_ecuatoriana, cedula_anterior,
+     es_una_cedula_valida, validar_cedula),
+)
+
+def medir(funcion, entradas: list) -> float:
+    """Devuelve los nanosegundos por entrada de la función."""
+    inicio = time.perf_counter()
+    funcion(entradas)
+    return (time.perf_counter() - inicio) * 1e9 / len(entradas)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--entradas', type=int, default=1_000_000)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'validador':15} {'anterior':>10} {'actual':>10} {'en lote':>10}"
+        f" {'aceleración':>12} {'válidas':>8}"
+    )
+    for nombre, generador, anterior, actual, validador in CASOS:
+        random.seed(args.semilla)
+        entradas = generar_entradas(generador, args.entradas)
+        esperado = list(map(anterior, entradas))
+        if list(map(actual, entradas)) != esperado \
+                or validar_varios(entradas, actual, validador).mascara != esperado:
+            raise AssertionError(f"{nombre}: los resultados no coinciden")
+
+        tiempo_anterior = medir(lambda valores: list(map(anterior, valores)), entradas)
+        tiempo_actual = medir(lambda valores: list(map(actual, valores)), entradas)
+        tiempo_lote = medir(lambda valores: validar_varios(valores, actual, validador), entradas)
+        print(
+            f"{nombre:15} {tiempo_anterior:10.0f} {tiempo_actual:10.0f} {tiempo_lote:10.0f}"
+            f" {tiempo_anterior / tiempo_actual:11.2f}x {sum(esperado) / len(esperado):8.1%}"
+        )
+    print(f"(nanosegundos por entrada, {args.entradas} entradas por validador)")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from usuarios.telefonos import TelefonoNormalizadoMixin
 from usuarios.validators import validar_numero_de_telefono
 
 class Funcionalidad(models.Model):
@@ -84,7 +85,7 @@ class Suscripcion(models.Model):
     def __str__(self) -> str:
         return f"{self.id}:{self.tipo} - (Desde {self.fecha_emision} hasta {self.fecha_caducidad})"
 
-class Empresa(models.Model):
+class Empresa(TelefonoNormalizadoMixin, models.Model):
     """Modelo para almacenar información sobre empresas.
 
     Este modelo define varios campos para almacenar información sobre una empresa,
@@ -130,16 +131,34 @@ class Empresa(models.Model):
         validators=[validar_numero_de_telefono],
         help_text=_("Teléfono de la empresa.")
     )
+    telefono_e164 = models.CharField(
+        _('Teléfono (E.164)'),
+        max_length=16,
+        blank=True,
+        editable=False,
+        help_text=_("Teléfono de la empresa normalizado en formato E.164.")
+    )
     logo_empresa = models.ImageField(
       _('Logo de la empresa'),
       null=True,
       blank=True,
       help_text=_("Logo de la empresa.")
     )
+    miniaturas = models.JSONField(
+        _('Miniaturas'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("Rutas de las miniaturas de las fotografías (ver imagenes.py).")
+    )
 
     class Meta:
         verbose_name = _("Empresa")
         verbose_name_plural = _("Empresas")
+        indexes = [
+            # Búsqueda de empresas por teléfono normalizado:
+            models.Index(fields=['telefono_e164'], name='empresa_telefono_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.nombre_comercial} ({self.ruc})"
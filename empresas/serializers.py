@@ -5,6 +5,9 @@ Autor: Christopher Villamarín (@xeland314)
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from administracion_vehicular.almacenamiento import ListaConURLs
+from administracion_vehicular.imagenes import MiniaturasField
+
 from .models import Empresa, Funcionalidad, Suscripcion
 
 class FuncionalidadSerializer(serializers.ModelSerializer):
@@ -70,11 +73,13 @@ class EmpresaSerializer(serializers.ModelSerializer):
         queryset=Suscripcion.objects.all(),
         write_only=True
     )
+    miniaturas = MiniaturasField()
 
     class Meta:
         model = Empresa
         fields = '__all__'
         read_only_fields = ('id',)
+        list_serializer_class = ListaConURLs
         default_error_messages = {
             'invalid': _('Datos inválidos.'),
             'required': _('Este campo es obligatorio.'),
@@ -0,0 +1,17 @@
+"""signals.py
+
+Conecta la invalidación de las respuestas en caché de las vistas de empresas,
+funcionalidades y suscripciones, y la generación de las miniaturas del logo
+de las empresas.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from administracion_vehicular.cache import conectar_invalidacion
+from administracion_vehicular.imagenes import conectar_miniaturas
+
+from .models import Empresa, Funcionalidad, Suscripcion
+
+conectar_invalidacion('funcionalidades', [Funcionalidad])
+conectar_invalidacion('suscripciones', [Suscripcion])
+conectar_invalidacion('empresas', [Empresa])
+conectar_miniaturas([Empresa], ['logo_empresa'])
@@ -1,3 +1,94 @@
+"""
+tests.py
+
+Este módulo define los tests para empresas.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from administracion_vehicular.cache import CONTADORES
+
+from usuarios.tests import crear_empresa, crear_perfil
+
+from .models import Funcionalidad, Suscripcion
+
+class RespuestaCacheTestCase(TestCase):
+    """Pruebas de la caché de respuestas de los catálogos."""
+
+    def setUp(self):
+        cache.clear()
+        # Descarta los contadores que otras pruebas acumularon en el proceso:
+        CONTADORES.vaciar()
+        self.empresa = crear_empresa()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create(username="admin", is_staff=True)
+        )
+        self.funcionalidad = Funcionalidad.objects.create(
+            nombre="Reportes", descripcion="Reportes de la flota"
+        )
+
+    def test_acierto_despues_del_primer_fallo(self):
+        url = "/api/v1/funcionalidades/"
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['nombre'], "Reportes")
+        # Otra página u otros parámetros tienen su propia entrada:
+        self.assertEqual(self.client.get(f"{url}?page_size=1")['X-Cache'], 'MISS')
+
+        estadisticas = self.client.get("/api/v1/cache/estadisticas/").data
+        self.assertEqual(estadisticas['funcionalidades']['aciertos'], 1)
+        self.assertEqual(estadisticas['funcionalidades']['fallos'], 2)
+
+    def test_invalidacion_al_guardar_y_eliminar(self):
+        url = f"/api/v1/funcionalidades/{self.funcionalidad.id}/"
+        self.client.get(url)
+        self.funcionalidad.nombre = "Alertas"
+        self.funcionalidad.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['nombre'], "Alertas")
+
+        self.client.get("/api/v1/funcionalidades/")
+        Funcionalidad.objects.filter(id=self.funcionalidad.id).get().delete()
+        response = self.client.get("/api/v1/funcionalidades/")
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalidacion_por_relaciones_muchos_a_muchos(self):
+        """Las suscripciones dependen de sus funcionalidades."""
+        suscripcion = Suscripcion.objects.get()
+        url = f"/api/v1/suscripciones/{suscripcion.id}/"
+        self.assertEqual(self.client.get(url).data['funcionalidades'], [])
+        suscripcion.funcionalidades.add(self.funcionalidad)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['funcionalidades']), 1)
+
+        self.client.get(url)
+        Funcionalidad.objects.filter(id=self.funcionalidad.id).update(nombre="x")
+        self.funcionalidad.save()
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_claves_por_empresa(self):
+        """Los usuarios de empresas distintas no comparten respuestas."""
+        url = "/api/v1/empresas/"
+        self.client.get(url)
+        otra = APIClient()
+        otra.force_authenticate(crear_perfil(crear_empresa("Otra"), 1).user)
+        self.assertEqual(otra.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(otra.get(url)['X-Cache'], 'HIT')
 
-# Create your tests here.
+    def test_escrituras_no_se_guardan(self):
+        response = self.client.post("/api/v1/funcionalidades/", {
+            "nombre": "Mapas", "descripcion": "Mapas de rutas"
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('X-Cache', response)
+        response = self.client.get("/api/v1/funcionalidades/")
+        self.assertEqual(len(response.data['results']), 2)
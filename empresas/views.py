@@ -2,31 +2,39 @@
 
 Autor: Christopher Villamarín (@xeland314)
 """
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 
+from administracion_vehicular.alcance import AlcanceEmpresaMixin
+from administracion_vehicular.autenticacion import TokenCacheAuthentication
+from administracion_vehicular.cache import RespuestaCacheMixin
+
 from .models import Empresa, Funcionalidad, Suscripcion
 from .serializers import EmpresaSerializer, FuncionalidadSerializer, SuscripcionSerializer
 
-class FuncionalidadView(ModelViewSet):
+class FuncionalidadView(RespuestaCacheMixin, ModelViewSet):
     """Vista para listar y crear funcionalidades."""
+    grupos_cache = ('funcionalidades',)
     queryset = Funcionalidad.objects.all()
     serializer_class = FuncionalidadSerializer
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenCacheAuthentication,)
 
-class SuscripcionView(ModelViewSet):
+class SuscripcionView(AlcanceEmpresaMixin, RespuestaCacheMixin, ModelViewSet):
     """Vista para listar y crear suscripciones."""
-    queryset = Suscripcion.objects.all()
+    grupos_cache = ('suscripciones', 'funcionalidades')
+    campo_empresa = 'empresa'
+    queryset = Suscripcion.objects.prefetch_related('funcionalidades')
     serializer_class = SuscripcionSerializer
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenCacheAuthentication,)
 
 
-class EmpresaView(ModelViewSet):
+class EmpresaView(AlcanceEmpresaMixin, RespuestaCacheMixin, ModelViewSet):
     """Vista para listar y crear empresas."""
+    grupos_cache = ('empresas',)
+    campo_empresa = 'id'
     queryset = Empresa.objects.all()
     serializer_class = EmpresaSerializer
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenCacheAuthentication,)
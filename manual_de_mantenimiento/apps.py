@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ManualMantenimientoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'manual_de_mantenimiento'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -5,6 +5,45 @@ from rest_framework.schemas import AutoSchema
 class ManualMantenimientoSchema(AutoSchema):
 
     def get_manual_fields(self, path: str, method):
+        if path.endswith('/vencimientos/'):
+            return [
+                coreapi.Field(
+                    name='empresa_id',
+                    required=True,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Empresa ID',
+                        description=(
+                            'ID de la empresa de la cual se desean calcular'
+                            ' los vencimientos de mantenimiento'
+                        )
+                    )
+                ),
+                coreapi.Field(
+                    name='solo_alertas',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Solo alertas',
+                        description=(
+                            'Devuelve solo las operaciones que se encuentran'
+                            ' dentro de la ventana de alerta'
+                        )
+                    )
+                ),
+                coreapi.Field(
+                    name='asincrono',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Asíncrono',
+                        description=(
+                            'Encola la operación como tarea en segundo plano'
+                            ' (respuesta 202 con la URL de la tarea)'
+                        )
+                    )
+                )
+            ]
         if path.endswith('/search_by/'):
             return [
                 coreapi.Field(
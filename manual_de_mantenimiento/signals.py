@@ -0,0 +1,19 @@
+"""signals.py
+
+Conecta la invalidación de las respuestas en caché de los manuales de
+mantenimiento: cualquier cambio en un nivel del árbol invalida el grupo.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from administracion_vehicular.cache import conectar_invalidacion
+
+from .models import (
+    ManualMantenimiento,
+    OperacionMantenimiento,
+    Sistema,
+    Subsistema
+)
+
+conectar_invalidacion('manuales', [
+    ManualMantenimiento, Sistema, Subsistema, OperacionMantenimiento
+])
@@ -0,0 +1,15 @@
+"""tareas.py
+
+Este módulo registra el cálculo de los vencimientos de mantenimiento como
+tarea en segundo plano (ver `tareas/registro.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from tareas.registro import tarea
+
+from .vencimientos import calcular_vencimientos_empresa
+
+@tarea('manual_de_mantenimiento.calcular_vencimientos')
+def calcular_vencimientos(empresa: int, solo_alertas: bool = False) -> list:
+    """Calcula los vencimientos de mantenimiento de los vehículos de una empresa."""
+    return calcular_vencimientos_empresa(empresa, solo_alertas=solo_alertas)
@@ -1,3 +1,227 @@
+"""
+tests.py
+
+Este módulo define los tests para manual_de_mantenimiento.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from usuarios.tests import crear_empresa, crear_perfil
+from vehiculos.enums import UnidadOdometro as UnidadKilometraje
+from vehiculos.models import Kilometraje
+from vehiculos.tests import crear_vehiculo
+
+from .enums import Tareas, UnidadOdometro
+from .models import (
+    ManualMantenimiento,
+    OperacionMantenimiento,
+    Sistema,
+    Subsistema
+)
+from .vencimientos import (
+    calcular_proximo_vencimiento,
+    calcular_vencimientos_empresa
+)
+
+def crear_manual(vehiculo, operaciones: list, **kwargs) -> ManualMantenimiento:
+    """Crea un manual con un sistema, un subsistema y las operaciones indicadas.
+
+    Args:
+        vehiculo (Vehiculo): El vehículo del manual.
+        operaciones (list): Tuplas (frecuencia, unidad) de cada operación.
+    """
+    datos = {
+        'anticipo_alertas': 500,
+        'frecuencia_minima': 0,
+        'final_ciclo': 0,
+        'unidad': UnidadOdometro.KILOMETROS.value,
+    }
+    datos.update(kwargs)
+    manual = ManualMantenimiento.objects.create(vehiculo=vehiculo, **datos)
+    sistema = Sistema.objects.create(manual_mantenimiento=manual, nombre="Motor")
+    subsistema = Subsistema.objects.create(sistema=sistema, nombre="Lubricación")
+    for frecuencia, unidad in operaciones:
+        OperacionMantenimiento.objects.create(
+            subsistema=subsistema,
+            tarea=Tareas.REEMPLAZAR.value['sigla'],
+            frecuencia=frecuencia,
+            unidad=unidad
+        )
+    return manual
+
+class VencimientosTestCase(TestCase):
+    """Pruebas del cálculo de vencimientos de mantenimiento."""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.propietario = crear_perfil(self.empresa, 1)
+
+    def registrar_kilometraje(self, vehiculo, valor, fecha, unidad=UnidadKilometraje.KILOMETROS):
+        Kilometraje.objects.create(
+            vehiculo=vehiculo, kilometraje=valor, unidad=unidad.value, fecha=fecha
+        )
+
+    def test_calcular_proximo_vencimiento(self):
+        """El vencimiento es el siguiente múltiplo de la frecuencia dentro del ciclo."""
+        self.assertEqual(calcular_proximo_vencimiento(12000, 5000), 15000)
+        self.assertEqual(calcular_proximo_vencimiento(15000, 5000), 20000)
+        # Ciclo de 100000 km con operaciones cada 30000 km:
+        self.assertEqual(calcular_proximo_vencimiento(95000, 30000, 100000), 130000)
+        self.assertEqual(calcular_proximo_vencimiento(105000, 30000, 100000), 130000)
+
+    def test_vencimientos_por_kilometraje_y_tiempo(self):
+        """Se calculan vencimientos en distancia y en tiempo, y la ventana de alerta."""
+        vehiculo = crear_vehiculo(self.empresa, self.propietario)
+        crear_manual(vehiculo, [
+            (5000, UnidadOdometro.KILOMETROS.value),
+            (10000, UnidadOdometro.KILOMETROS.value),
+            (6, UnidadOdometro.MESES.value),
+        ])
+        hoy = date(2023, 6, 1)
+        self.registrar_kilometraje(vehiculo, 1000, hoy - timedelta(days=100))
+        self.registrar_kilometraje(vehiculo, 14600, hoy)
+
+        resultado = calcular_vencimientos_empresa(self.empresa.id, hoy=hoy)
+        self.assertEqual(len(resultado), 1)
+        self.assertEqual(resultado[0]['kilometraje_actual'], 14600)
+        cada_5000, cada_10000, cada_6_meses = resultado[0]['operaciones']
+        self.assertEqual(cada_5000['proximo_kilometraje'], 15000)
+        self.assertTrue(cada_5000['en_alerta'])
+        self.assertEqual(cada_10000['proximo_kilometraje'], 20000)
+        self.assertFalse(cada_10000['en_alerta'])
+        self.assertEqual(cada_6_meses['proxima_fecha'], hoy + timedelta(days=80))
+        self.assertEqual(cada_6_meses['restante'], 80)
+
+        solo_alertas = calcular_vencimientos_empresa(self.empresa.id, hoy=hoy, solo_alertas=True)
+        self.assertEqual(len(solo_alertas[0]['operaciones']), 1)
+
+    def test_lecturas_en_millas(self):
+        """Las lecturas en millas se convierten a kilómetros."""
+        vehiculo = crear_vehiculo(self.empresa, self.propietario)
+        crear_manual(vehiculo, [(5000, UnidadOdometro.KILOMETROS.value)])
+        self.registrar_kilometraje(
+            vehiculo, 1000, date(2023, 1, 1), unidad=UnidadKilometraje.MILLAS
+        )
+        resultado = calcular_vencimientos_empresa(self.empresa.id)
+        self.assertAlmostEqual(resultado[0]['kilometraje_actual'], 1609.344)
+        self.assertEqual(resultado[0]['operaciones'][0]['proximo_kilometraje'], 5000)
+
+    def test_consultas_constantes(self):
+        """El cálculo no realiza consultas por cada vehículo."""
+        for indice in range(5):
+            vehiculo = crear_vehiculo(self.empresa, self.propietario, f"ABC-{1000 + indice}")
+            crear_manual(vehiculo, [(5000, UnidadOdometro.KILOMETROS.value)])
+            self.registrar_kilometraje(vehiculo, 100 * indice, date(2023, 1, 1))
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = calcular_vencimientos_empresa(self.empresa.id)
+        self.assertEqual(len(resultado), 5)
+        self.assertEqual(len(consultas), 2)
+
+    def test_endpoint_vencimientos(self):
+        """El endpoint exige el id de la empresa y devuelve los vencimientos."""
+        vehiculo = crear_vehiculo(self.empresa, self.propietario)
+        crear_manual(vehiculo, [(5000, UnidadOdometro.KILOMETROS.value)])
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        url = "/api/v1/manuales_mantenimiento/vencimientos/"
+        self.assertEqual(client.get(url).status_code, 400)
+        self.assertEqual(client.get(f"{url}?empresa_id=%C2%B2").status_code, 400)
+        response = client.get(f"{url}?empresa_id={self.empresa.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['vehiculo_id'], vehiculo.id)
+
+class ManualMantenimientoConsultasTestCase(TestCase):
+    """Pruebas del número de consultas al obtener los manuales de mantenimiento."""
+
+    # Una consulta para los manuales y una por cada nivel del árbol; el usuario
+    # es del personal y no se consulta su perfil (ver `alcance.py`).
+    CONSULTAS_ESPERADAS = 4
+
+    def setUp(self):
+        cache.clear()
+        empresa = crear_empresa()
+        propietario = crear_perfil(empresa, 1)
+        self.manuales = []
+        for indice in range(3):
+            vehiculo = crear_vehiculo(empresa, propietario, f"ABC-{1000 + indice}")
+            manual = crear_manual(vehiculo, [])
+            for nombre in ("Frenos", "Suspensión", "Eléctrico"):
+                sistema = Sistema.objects.create(manual_mantenimiento=manual, nombre=nombre)
+                for subnombre in ("Delantero", "Posterior"):
+                    subsistema = Subsistema.objects.create(sistema=sistema, nombre=subnombre)
+                    for frecuencia in (5000, 10000, 20000):
+                        OperacionMantenimiento.objects.create(
+                            subsistema=subsistema,
+                            tarea=Tareas.INSPECCIONAR.value['sigla'],
+                            frecuencia=frecuencia,
+                            unidad=UnidadOdometro.KILOMETROS.value
+                        )
+            self.manuales.append(manual)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def obtener(self, url: str):
+        with self.assertNumQueries(self.CONSULTAS_ESPERADAS):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_listado(self):
+        data = self.obtener("/api/v1/manuales_mantenimiento/")
+        self.assertEqual(len(data['results']), 3)
+        sistemas = data['results'][0]['sistemas_vehiculos']
+        self.assertEqual(len(sistemas), 4)
+        self.assertEqual(len(sistemas[1]['subsistemas_vehiculos'][0]['operaciones_mantenimiento']), 3)
+
+    def test_detalle(self):
+        manual = self.manuales[0]
+        data = self.obtener(f"/api/v1/manuales_mantenimiento/{manual.id}/")
+        self.assertEqual(data['id'], manual.id)
+
+    def test_search_by(self):
+        manual = self.manuales[1]
+        data = self.obtener(
+            f"/api/v1/manuales_mantenimiento/search_by/?vehiculo_id={manual.vehiculo_id}"
+        )
+        self.assertEqual(data['id'], manual.id)
+
+    def test_search_by_sistemas(self):
+        """Los sistemas se buscan por el id de su manual de mantenimiento."""
+        manual = self.manuales[2]
+        response = self.client.get(
+            f"/api/v1/sistemas/search_by/?manual_mantenimiento_id={manual.id}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_cache_invalidada_al_modificar_el_arbol(self):
+        """La respuesta se sirve desde la caché hasta que cambia una operación."""
+        url = f"/api/v1/manuales_mantenimiento/{self.manuales[0].id}/"
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertLessEqual(len(consultas), 1)
 
-# Create your tests here.
+        operacion = OperacionMantenimiento.objects.filter(
+            subsistema__sistema__manual_mantenimiento=self.manuales[0]
+        ).first()
+        operacion.frecuencia = 7500
+        operacion.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        frecuencias = [
+            float(op['frecuencia'])
+            for sistema in response.data['sistemas_vehiculos']
+            for subsistema in sistema['subsistemas_vehiculos']
+            for op in subsistema['operaciones_mantenimiento']
+        ]
+        self.assertIn(7500, frecuencias)
@@ -0,0 +1,223 @@
+"""vencimientos.py
+
+Este módulo calcula los vencimientos de las operaciones de mantenimiento
+de todos los vehículos de una empresa.
+
+El cálculo se realiza en una sola pasada con dos consultas, sin importar
+el número de vehículos:
+    - Los vehículos de la empresa unidos a su kilometraje actual
+      (`KilometrajeActual`) y anotados con la fecha de su primera lectura
+      (inicio de uso) mediante una subconsulta.
+    - Las operaciones de mantenimiento de todos los manuales de la empresa,
+      junto con los datos de su manual.
+
+Las operaciones medidas en distancia (km, mi) vencen cada `frecuencia`
+kilómetros contados desde el inicio del ciclo de mantenimiento actual;
+las medidas en tiempo (días, semanas, meses) vencen cada `frecuencia`
+días contados desde la primera lectura del odómetro del vehículo.
+El ciclo se reinicia cada `final_ciclo` del manual.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.db.models import OuterRef, Subquery
+
+from vehiculos.models import Kilometraje, Vehiculo
+
+from .enums import UnidadOdometro
+from .models import OperacionMantenimiento
+
+# Factores de conversión a kilómetros:
+FACTORES_DISTANCIA = {
+    UnidadOdometro.KILOMETROS.value: 1.0,
+    UnidadOdometro.MILLAS.value: 1.609344,
+}
+
+# Factores de conversión a días (un mes se considera de 30 días):
+FACTORES_TIEMPO = {
+    UnidadOdometro.DIAS.value: 1.0,
+    UnidadOdometro.SEMANAS.value: 7.0,
+    UnidadOdometro.MESES.value: 30.0,
+}
+
+def convertir(valor, unidad: str, factores: Dict[str, float]) -> Optional[float]:
+    """Convierte un valor a la unidad base de `factores` (km o días).
+
+    Returns:
+        float: El valor convertido, o None si la unidad no pertenece
+        a la misma magnitud que `factores`.
+    """
+    if valor is None or unidad not in factores:
+        return None
+    return float(valor) * factores[unidad]
+
+def calcular_proximo_vencimiento(
+    recorrido: float,
+    frecuencia: float,
+    final_ciclo: Optional[float] = None
+) -> float:
+    """Calcula en qué punto vence la próxima operación.
+
+    Args:
+        recorrido (float): Kilómetros o días recorridos por el vehículo.
+        frecuencia (float): Cada cuántos kilómetros o días se repite la operación.
+        final_ciclo (float): Longitud del ciclo de mantenimiento (opcional).
+
+    Returns:
+        float: El kilometraje o número de días en el que vence la operación.
+    """
+    inicio_ciclo = 0.0
+    if final_ciclo:
+        inicio_ciclo = recorrido - recorrido % final_ciclo
+    posicion = recorrido - inicio_ciclo
+    proximo = (posicion // frecuencia + 1) * frecuencia
+    if final_ciclo and proximo > final_ciclo:
+        # La operación se vuelve a realizar en el ciclo siguiente.
+        proximo = final_ciclo + frecuencia
+    return inicio_ciclo + proximo
+
+def obtener_estado_vehiculos(empresa_id: int) -> Dict[int, dict]:
+    """Obtiene la última lectura del odómetro de cada vehículo de una empresa.
+
+    Returns:
+        dict: Diccionario indexado por el id del vehículo con su placa,
+        su último kilometraje (en km) y la fecha de su primera lectura.
+    """
+    primera_lectura = Kilometraje.objects.filter(
+        vehiculo_id=OuterRef('id')
+    ).order_by('fecha', 'id')
+    vehiculos = Vehiculo.objects.filter(empresa_id=empresa_id).annotate(
+        fecha_inicio=Subquery(primera_lectura.values('fecha')[:1]),
+    ).values(
+        'id', 'placa', 'kilometraje_actual__kilometraje',
+        'kilometraje_actual__unidad', 'fecha_inicio'
+    )
+    return {
+        vehiculo['id']: {
+            'placa': vehiculo['placa'],
+            'kilometraje_actual': convertir(
+                vehiculo['kilometraje_actual__kilometraje'],
+                vehiculo['kilometraje_actual__unidad'],
+                FACTORES_DISTANCIA
+            ),
+            'fecha_inicio': vehiculo['fecha_inicio'],
+        }
+        for vehiculo in vehiculos
+    }
+
+def calcular_vencimiento(operacion: dict, vehiculo: dict, hoy: date) -> dict:
+    """Calcula el vencimiento de una operación de mantenimiento de un vehículo.
+
+    Args:
+        operacion (dict): Operación con los datos de su manual de mantenimiento.
+        vehiculo (dict): Estado del vehículo según `obtener_estado_vehiculos`.
+        hoy (date): Fecha de referencia del cálculo.
+
+    Returns:
+        dict: El próximo vencimiento (kilometraje o fecha), lo que falta
+        para alcanzarlo y si se encuentra dentro de la ventana de alerta.
+    """
+    unidad = operacion['unidad']
+    resultado = {
+        'operacion_id': operacion['id'],
+        'sistema': operacion['subsistema__sistema__nombre'],
+        'subsistema': operacion['subsistema__nombre'],
+        'tarea': operacion['tarea'],
+        'frecuencia': operacion['frecuencia'],
+        'unidad': unidad,
+        'proximo_kilometraje': None,
+        'proxima_fecha': None,
+        'restante': None,
+        'en_alerta': False,
+    }
+    if unidad in FACTORES_DISTANCIA:
+        factores = FACTORES_DISTANCIA
+        recorrido = vehiculo['kilometraje_actual']
+    else:
+        factores = FACTORES_TIEMPO
+        inicio = vehiculo['fecha_inicio']
+        recorrido = (hoy - inicio).days if inicio else None
+    if recorrido is None:
+        return resultado
+
+    manual_unidad = operacion['subsistema__sistema__manual_mantenimiento__unidad']
+    frecuencia = convertir(operacion['frecuencia'], unidad, factores)
+    frecuencia_minima = convertir(
+        operacion['subsistema__sistema__manual_mantenimiento__frecuencia_minima'],
+        manual_unidad, factores
+    )
+    final_ciclo = convertir(
+        operacion['subsistema__sistema__manual_mantenimiento__final_ciclo'],
+        manual_unidad, factores
+    )
+    anticipo = convertir(
+        operacion['subsistema__sistema__manual_mantenimiento__anticipo_alertas'],
+        manual_unidad, factores
+    )
+    if frecuencia_minima:
+        frecuencia = max(frecuencia, frecuencia_minima)
+    if not frecuencia:
+        return resultado
+
+    proximo = calcular_proximo_vencimiento(recorrido, frecuencia, final_ciclo)
+    restante = proximo - recorrido
+    if factores is FACTORES_DISTANCIA:
+        resultado['proximo_kilometraje'] = round(proximo, 2)
+        resultado['restante'] = round(restante, 2)
+    else:
+        resultado['proxima_fecha'] = vehiculo['fecha_inicio'] + timedelta(days=proximo)
+        resultado['restante'] = int(restante)
+    resultado['en_alerta'] = anticipo is not None and restante <= anticipo
+    return resultado
+
+def calcular_vencimientos_empresa(
+    empresa_id: int,
+    hoy: Optional[date] = None,
+    solo_alertas: bool = False
+) -> List[dict]:
+    """Calcula los vencimientos de mantenimiento de todos los vehículos de una empresa.
+
+    Args:
+        empresa_id (int): El id de la empresa.
+        hoy (date): Fecha de referencia del cálculo, por defecto la fecha actual.
+        solo_alertas (bool): Si es True, solo se devuelven las operaciones
+            que se encuentran dentro de la ventana de alerta.
+
+    Returns:
+        list: Un elemento por cada vehículo con manual de mantenimiento,
+        con su kilometraje actual y el vencimiento de cada una de sus operaciones.
+    """
+    hoy = hoy or date.today()
+    vehiculos = obtener_estado_vehiculos(empresa_id)
+    operaciones = OperacionMantenimiento.objects.filter(
+        subsistema__sistema__manual_mantenimiento__vehiculo__empresa_id=empresa_id
+    ).values(
+        'id', 'tarea', 'frecuencia', 'unidad',
+        'subsistema__nombre',
+        'subsistema__sistema__nombre',
+        'subsistema__sistema__manual_mantenimiento__vehiculo_id',
+        'subsistema__sistema__manual_mantenimiento__unidad',
+        'subsistema__sistema__manual_mantenimiento__frecuencia_minima',
+        'subsistema__sistema__manual_mantenimiento__final_ciclo',
+        'subsistema__sistema__manual_mantenimiento__anticipo_alertas',
+    ).order_by('subsistema__sistema__manual_mantenimiento__vehiculo_id', 'id')
+
+    resultados: Dict[int, dict] = {}
+    for operacion in operaciones:
+        vehiculo_id = operacion['subsistema__sistema__manual_mantenimiento__vehiculo_id']
+        vehiculo = vehiculos[vehiculo_id]
+        vencimiento = calcular_vencimiento(operacion, vehiculo, hoy)
+        if solo_alertas and not vencimiento['en_alerta']:
+            continue
+        if vehiculo_id not in resultados:
+            resultados[vehiculo_id] = {
+                'vehiculo_id': vehiculo_id,
+                'placa': vehiculo['placa'],
+                'kilometraje_actual': vehiculo['kilometraje_actual'],
+                'fecha_inicio': vehiculo['fecha_inicio'],
+                'operaciones': [],
+            }
+        resultados[vehiculo_id]['operaciones'].append(vencimiento)
+    return list(resultados.values())
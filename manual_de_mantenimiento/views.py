@@ -1,8 +1,14 @@
+from django.db.models import Prefetch
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import status
+
+from administracion_vehicular.alcance import AlcanceEmpresaMixin
+from administracion_vehicular.cache import RespuestaCacheMixin
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro
+from tareas.registro import encolar
+from tareas.views import respuesta_tarea
 
 from .models import (
     ManualMantenimiento,
@@ -22,104 +28,110 @@ from .serializers import (
     SistemaSerializer,
     SubsistemaSerializer
 )
+from .tareas import calcular_vencimientos
+from .vencimientos import calcular_vencimientos_empresa
+
+# Carga las operaciones de cada subsistema en una sola consulta:
+SUBSISTEMAS_CON_OPERACIONES = Subsistema.objects.prefetch_related(
+    Prefetch(
+        'operaciones_mantenimiento',
+        queryset=OperacionMantenimiento.objects.order_by('id')
+    )
+).order_by('id')
 
-class ManualMantenimientoViewSet(ModelViewSet):
+# Carga los subsistemas (y sus operaciones) de cada sistema con una consulta por nivel:
+SISTEMAS_CON_SUBSISTEMAS = Sistema.objects.prefetch_related(
+    Prefetch('subsistemas_vehiculos', queryset=SUBSISTEMAS_CON_OPERACIONES)
+).order_by('id')
+
+class ManualMantenimientoViewSet(
+    AlcanceEmpresaMixin, RespuestaCacheMixin, BusquedaMixin, ModelViewSet
+):
     """
     ViewSet para el modelo ManualMantenimiento.
+
+    El árbol de sistemas, subsistemas y operaciones de los manuales se carga
+    con una consulta por nivel, sin importar el número de manuales o de
+    elementos de cada nivel. Las respuestas de `list`, `retrieve` y
+    `search_by` se guardan en caché hasta que cambia algún nivel del árbol.
     """
-    queryset = ManualMantenimiento.objects.all()
+    grupos_cache = ('manuales',)
+    presupuesto_consultas = {'list': 6, 'retrieve': 6, 'search_by': 6}
+    queryset = ManualMantenimiento.objects.prefetch_related(
+        Prefetch('sistemas_vehiculos', queryset=SISTEMAS_CON_SUBSISTEMAS)
+    )
     serializer_class = ManualMantenimientoSerializer
+    campo_empresa = 'vehiculo__empresa'
+    parametros_busqueda = (Parametro('vehiculo_id', requerido=True),)
+    parametros_vencimientos = (Parametro('empresa_id', requerido=True),)
 
     @action(detail=False, methods=['get'], schema=ManualMantenimientoSchema())
     def search_by(self, request: Request):
         """Función de búsqueda para los manuales de mantenimiento"""
-        vehiculo_id = request.query_params.get('vehiculo_id')
-        if not vehiculo_id:
-            return Response(
-                {"error": "vehiculo_id is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            manual = self.queryset.get(vehiculo_id=vehiculo_id)
-            serializer = ManualMantenimientoSerializer(manual)
-            return Response(serializer.data)
-        except ManualMantenimiento.DoesNotExist:
-            return Response(
-                {"error": "ManualMantenimiento not found"},
-                status=status.HTTP_404_NOT_FOUND
+        return self.respuesta_cacheada(request, lambda: self.buscar_uno(request))
+
+    @action(detail=False, methods=['get'], schema=ManualMantenimientoSchema())
+    def vencimientos(self, request: Request):
+        """Calcula los vencimientos de mantenimiento de los vehículos de una empresa.
+
+        Para cada vehículo de la empresa con manual de mantenimiento devuelve
+        el próximo kilometraje o fecha en el que vence cada operación
+        y si se encuentra dentro de la ventana de alerta del manual.
+
+        Con `?asincrono=true` el cálculo se encola como tarea en segundo plano
+        (ver `tareas`) y los vencimientos quedan en el resultado de la tarea.
+        """
+        empresa_id = self.obtener_filtros(request, self.parametros_vencimientos)['empresa_id']
+        self.verificar_empresa(empresa_id)
+        solo_alertas = request.query_params.get('solo_alertas', '').lower() in ('1', 'true')
+        if request.query_params.get('asincrono', '').lower() in ('1', 'true'):
+            tarea = encolar(
+                calcular_vencimientos, empresa_id=empresa_id, usuario=request.user,
+                empresa=empresa_id, solo_alertas=solo_alertas
             )
+            return respuesta_tarea(request, tarea)
+        return Response(calcular_vencimientos_empresa(empresa_id, solo_alertas=solo_alertas))
 
-class SistemaViewSet(ModelViewSet):
+class SistemaViewSet(AlcanceEmpresaMixin, BusquedaMixin, ModelViewSet):
     """
     ViewSet para el modelo Sistema.
     """
-    queryset = Sistema.objects.all()
+    queryset = SISTEMAS_CON_SUBSISTEMAS
     serializer_class = SistemaSerializer
+    campo_empresa = 'manual_mantenimiento__vehiculo__empresa'
+    presupuesto_consultas = {'list': 4, 'retrieve': 4, 'search_by': 4}
+    parametros_busqueda = (Parametro('manual_mantenimiento_id', requerido=True),)
 
     @action(detail=False, methods=['get'], schema=SistemaSchema())
     def search_by(self, request: Request):
         """Función de búsqueda para sistemas"""
-        manualmantenimiento_id = request.query_params.get('manual_mantenimiento_id')
-        if not manualmantenimiento_id:
-            return Response(
-                {"error": "manualmantenimiento_id is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        queryset = self.queryset.filter(manualmantenimiento_id=manualmantenimiento_id)
-        if not queryset.exists():
-            return Response(
-                {"error": "Sistemas not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        serializer = SistemaSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.buscar(request)
 
-class SubsistemaViewSet(ModelViewSet):
+class SubsistemaViewSet(AlcanceEmpresaMixin, BusquedaMixin, ModelViewSet):
     """
     ViewSet para el modelo Subsistema.
     """
-    queryset = Subsistema.objects.all()
+    queryset = SUBSISTEMAS_CON_OPERACIONES
     serializer_class = SubsistemaSerializer
+    campo_empresa = 'sistema__manual_mantenimiento__vehiculo__empresa'
+    presupuesto_consultas = {'list': 3, 'retrieve': 3, 'search_by': 3}
+    parametros_busqueda = (Parametro('sistema_id', requerido=True),)
 
     @action(detail=False, methods=['get'], schema=SubsistemaSchema())
     def search_by(self, request: Request):
         """Función de búsqueda para subsistemas"""
-        sistema_id = request.query_params.get('sistema_id')
-        if not sistema_id:
-            return Response(
-                {"error": "sistema_id is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        queryset = self.queryset.filter(sistema_id=sistema_id)
-        if not queryset.exists():
-            return Response(
-                {"error": "Subsistemas not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        serializer = SubsistemaSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.buscar(request)
 
-class OperacionMantenimientoViewSet(ModelViewSet):
+class OperacionMantenimientoViewSet(AlcanceEmpresaMixin, BusquedaMixin, ModelViewSet):
     """
     ViewSet para el modelo OperacionMantenimiento.
     """
     queryset = OperacionMantenimiento.objects.all()
     serializer_class = OperacionMantenimientoSerializer
+    campo_empresa = 'subsistema__sistema__manual_mantenimiento__vehiculo__empresa'
+    parametros_busqueda = (Parametro('subsistema_id', requerido=True),)
 
     @action(detail=False, methods=['get'], schema=OperacionMantenimientoSchema())
     def search_by(self, request: Request):
         """Función de búsqueda para las operaciones de mantenimiento"""
-        subsistema_id = request.query_params.get('subsistema_id')
-        if not subsistema_id:
-            return Response(
-                {"error": "subsistema_id is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        queryset = self.queryset.filter(subsistema_id=subsistema_id)
-        if not queryset.exists():
-            return Response(
-                {"error": "Operaciones not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        serializer = OperacionMantenimientoSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.buscar(request)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OrdenesDeMantenimientoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ordenes_de_mantenimiento'
+
+    def ready(self):
+        from . import signals  # noqa: F401
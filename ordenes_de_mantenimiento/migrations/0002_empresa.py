@@ -0,0 +1,62 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def asignar_empresa_del_vehiculo(apps, schema_editor):
+    """Copia en cada apertura y cierre de orden de movimiento la empresa del vehículo."""
+    AperturaOrdenMovimiento = apps.get_model('ordenes_de_mantenimiento', 'AperturaOrdenMovimiento')
+    CierreOrdenMovimiento = apps.get_model('ordenes_de_mantenimiento', 'CierreOrdenMovimiento')
+    Vehiculo = apps.get_model('vehiculos', 'Vehiculo')
+    AperturaOrdenMovimiento.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            Vehiculo.objects.filter(id=models.OuterRef('vehiculo_id')).values('empresa_id')[:1]
+        )
+    )
+    CierreOrdenMovimiento.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            AperturaOrdenMovimiento.objects.filter(
+                id=models.OuterRef('apertura_id')
+            ).values('empresa_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_telefono_e164'),
+        ('vehiculos', '0005_miniaturas'),
+        ('ordenes_de_mantenimiento', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aperturaordenmovimiento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='aperturas_movimiento', to='empresas.empresa'),
+        ),
+        migrations.AddField(
+            model_name='cierreordenmovimiento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cierres_movimiento', to='empresas.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_del_vehiculo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='aperturaordenmovimiento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', on_delete=django.db.models.deletion.CASCADE, related_name='aperturas_movimiento', to='empresas.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='cierreordenmovimiento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', on_delete=django.db.models.deletion.CASCADE, related_name='cierres_movimiento', to='empresas.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='aperturaordenmovimiento',
+            index=models.Index(fields=['empresa', 'fecha_de_emision_orden'], name='apertura_empresa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cierreordenmovimiento',
+            index=models.Index(fields=['empresa', 'fecha_de_cierre_orden'], name='cierre_empresa_fecha_idx'),
+        ),
+    ]
@@ -8,12 +8,14 @@ Autor: Christopher Villamarín (@xeland314)
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from administracion_vehicular.alcance import EmpresaDerivadaMixin
+from empresas.models import Empresa
 from usuarios.models import PerfilUsuario
 from vehiculos.models import Kilometraje, Vehiculo
 
 from .enums import EstadoCumplimiento
 
-class AperturaOrdenMovimiento(models.Model):
+class AperturaOrdenMovimiento(EmpresaDerivadaMixin, models.Model):
     """
     Representa la apertura de una OrdenMovimiento.
     """
@@ -35,6 +37,13 @@ class AperturaOrdenMovimiento(models.Model):
         related_name="aperturas_vehiculo",
         help_text=_("El vehículo del cual se abre la orden de movimiento.")
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="aperturas_movimiento",
+        editable=False,
+        help_text=_("Empresa del vehículo, para filtrar las órdenes por empresa sin joins")
+    )
     kilometraje_salida = models.OneToOneField(
         Kilometraje,
         on_delete=models.CASCADE,
@@ -53,19 +62,32 @@ class AperturaOrdenMovimiento(models.Model):
     class Meta:
         verbose_name = _("Apertura de orden de movimiento")
         verbose_name_plural = _("Aperturas de órdenes de movimiento")
+        indexes = [
+            # Órdenes de una empresa por rango de fechas (exportación):
+            models.Index(fields=['empresa', 'fecha_de_emision_orden'], name='apertura_empresa_fecha_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.vehiculo} - {self.fecha_de_emision_orden}"
 
-class CierreOrdenMovimiento(models.Model):
+class CierreOrdenMovimiento(EmpresaDerivadaMixin, models.Model):
     """
     Representa el cierre de una OrdenMovimiento.
     """
+    relacion_empresa = 'apertura'
+
     apertura = models.OneToOneField(
         AperturaOrdenMovimiento,
         on_delete=models.PROTECT,
         help_text=_("Apertura de la orden de movimiento a la que se vincula el cierre de la misma")
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="cierres_movimiento",
+        editable=False,
+        help_text=_("Empresa del vehículo, para filtrar las órdenes por empresa sin joins")
+    )
     fecha_de_cierre_orden = models.DateField(
         auto_now=True, blank=False,
         help_text=_("Fecha del cierre de la orden de movimiento")
@@ -87,6 +109,10 @@ class CierreOrdenMovimiento(models.Model):
     class Meta:
         verbose_name = _("Cierre de orden de movimiento")
         verbose_name_plural = _("Cierres de órdenes de movimiento")
+        indexes = [
+            # Órdenes de una empresa por rango de fechas (exportación):
+            models.Index(fields=['empresa', 'fecha_de_cierre_orden'], name='cierre_empresa_fecha_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.apertura} - {self.fecha_retorno_vehiculo}"
@@ -0,0 +1,14 @@
+"""signals.py
+
+Conecta la actualización de la empresa de las aperturas y cierres de órdenes
+de movimiento al cambiar la empresa de su vehículo (ver `alcance.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from administracion_vehicular.alcance import conectar_propagacion
+from vehiculos.models import Vehiculo
+
+from .models import AperturaOrdenMovimiento, CierreOrdenMovimiento
+
+conectar_propagacion(AperturaOrdenMovimiento, 'vehiculo', Vehiculo)
+conectar_propagacion(CierreOrdenMovimiento, 'apertura__vehiculo', Vehiculo)
@@ -10,6 +10,7 @@ from rest_framework import routers
 from .views import (
     AperturaOrdenMovimientoView,
     CierreOrdenMovimientoView,
+    orden_abierta_asincrona,
 )
 
 router = routers.DefaultRouter()
@@ -26,4 +27,10 @@ router.register(
 
 urlpatterns = [
     path('api/v1/', include(router.urls)),
+    # Versión asíncrona de la consulta más frecuente (servida con ASGI):
+    path(
+        'api/v1/async/apertura_ordenes_movimiento/abierta/',
+        orden_abierta_asincrona,
+        name='apertura_ordenes_movimiento-abierta-asincrona'
+    ),
 ]
@@ -1,12 +1,21 @@
+from datetime import date
+
 import coreapi
 import coreschema
-from django.utils.translation import gettext_lazy as _
-from rest_framework import viewsets, status
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest
+from django.utils.translation import gettext as _
+from rest_framework import status, viewsets
 from rest_framework.schemas import AutoSchema
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from administracion_vehicular.alcance import AlcanceEmpresaMixin, filtrar_por_empresa
+from administracion_vehicular.asincrono import vista_asincrona
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro, obtener_perfil_id
+from administracion_vehicular.exportacion import ExportacionMixin
+
 from .serializers import (
     AperturaOrdenMovimientoSerializer,
     CierreOrdenMovimientoSerializer,
@@ -23,11 +32,30 @@ class AperturaOrdenMovimientoSearchSchema(AutoSchema):
                 'Busca aperturas de órdenes de movimiento por'
                 ' responsable, conductor o vehículo.'
             )
+        if path.endswith('abierta/'):
+            return 'Devuelve la orden de movimiento abierta (sin cierre) de un conductor.'
         return super().get_description(path, method)
 
     def get_manual_fields(self, path: str, method):
         extra_fields = []
 
+        if path.endswith('abierta/'):
+            extra_fields = [
+                coreapi.Field(
+                    name='conductor_id',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Conductor ID',
+                        description=(
+                            'El id del conductor. Por defecto, el perfil'
+                            ' del usuario que realiza la petición.'
+                        )
+                    ),
+                    description='El id del conductor a consultar.'
+                )
+            ]
+
         if path.endswith('search_by'):
             extra_fields = [
                 coreapi.Field(
@@ -67,13 +95,43 @@ class AperturaOrdenMovimientoSearchSchema(AutoSchema):
 
         return super().get_manual_fields(path, method) + extra_fields
 
-class AperturaOrdenMovimientoView(viewsets.ModelViewSet):
+def ordenes_abiertas(queryset: QuerySet, conductor_id: int) -> QuerySet:
+    """Filtra las aperturas sin cierre de un conductor, de la más reciente
+    a la más antigua."""
+    return queryset.filter(
+        conductor_id=conductor_id, cierreordenmovimiento__isnull=True
+    ).order_by('-fecha_salida_vehiculo', '-id')
+
+class AperturaOrdenMovimientoView(
+    AlcanceEmpresaMixin, ExportacionMixin, BusquedaMixin, viewsets.ModelViewSet
+):
     """
     Clase que define la vista para listar
     y crear las aperturas de órdenes de movimiento.
     """
     queryset = AperturaOrdenMovimiento.objects.all()
     serializer_class = AperturaOrdenMovimientoSerializer
+    presupuesto_consultas = {
+        'list': 2, 'retrieve': 2, 'search_by': 2, 'exportar': 2, 'abierta': 2,
+    }
+    parametros_busqueda = (
+        Parametro('responsable_id'),
+        Parametro('conductor_id'),
+        Parametro('vehiculo_id'),
+    )
+    nombre_exportacion = 'aperturas_ordenes_movimiento'
+    campos_exportacion = (
+        'id', 'fecha_de_emision_orden', 'fecha_salida_vehiculo',
+        'vehiculo_id', 'vehiculo__placa', 'responsable_id', 'conductor_id',
+        'kilometraje_salida__kilometraje', 'kilometraje_salida__unidad',
+        'itinerario', 'detalle_comision',
+    )
+    parametros_exportacion = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('vehiculo_id'),
+        Parametro('desde', tipo=date, campo='fecha_de_emision_orden__gte'),
+        Parametro('hasta', tipo=date, campo='fecha_de_emision_orden__lte'),
+    )
 
     @action(detail=False, methods=['get'], schema=AperturaOrdenMovimientoSearchSchema())
     def search_by(self, request: Request):
@@ -87,45 +145,66 @@ class AperturaOrdenMovimientoView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con los parámetros de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados
+            Response: Una página con los datos serializados
             de las aperturas de órdenes de movimiento
             que coinciden con los criterios de búsqueda,
             o un mensaje de error si los parámetros son incorrectos.
         """
-        responsable_id = request.query_params.get('responsable_id')
-        conductor_id = request.query_params.get('conductor_id')
-        vehiculo_id = request.query_params.get('vehiculo_id')
+        return self.buscar(request)
 
-        if not any([responsable_id, conductor_id, vehiculo_id]):
-            return Response(
-                {"error": _("Parámetros de búsqueda incorrectos.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    @action(detail=False, methods=['get'], schema=AperturaOrdenMovimientoSearchSchema())
+    def abierta(self, request: Request):
+        """Devuelve la orden de movimiento abierta de un conductor.
+
+        La consultan periódicamente las aplicaciones de los conductores; su
+        versión asíncrona es `orden_abierta_asincrona`.
 
-        queryset = AperturaOrdenMovimiento.objects.all()
-        if responsable_id:
-            queryset = queryset.filter(responsable_id=responsable_id)
-        if conductor_id:
-            queryset = queryset.filter(conductor_id=conductor_id)
-        if vehiculo_id:
-            queryset = queryset.filter(vehiculo_id=vehiculo_id)
+        Args:
+            request (Request): La petición HTTP con el parámetro opcional
+                `conductor_id` (por defecto, el perfil del usuario).
 
-        if not queryset.exists():
+        Returns:
+            Response: La apertura sin cierre más reciente del conductor,
+            o 404 si no tiene ninguna.
+        """
+        conductor_id = obtener_perfil_id(request)
+        apertura = ordenes_abiertas(self.get_queryset(), conductor_id).first()
+        if apertura is None:
             return Response(
-                {"error": _(
-                    "No se encontraron aperturas de órdenes"
-                    " de movimiento para los criterios especificados."
-                )},
+                {"detail": _("El conductor no tiene órdenes de movimiento abiertas.")},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(self.get_serializer(apertura).data)
 
-        serializer = AperturaOrdenMovimientoSerializer(queryset, many=True)
-        return Response(serializer.data)
+@vista_asincrona
+async def orden_abierta_asincrona(request: HttpRequest) -> dict:
+    """Versión asíncrona de `AperturaOrdenMovimientoView.abierta`."""
+    conductor_id = obtener_perfil_id(request)
+    queryset = filtrar_por_empresa(request, AperturaOrdenMovimiento.objects.all(), 'empresa')
+    apertura = await ordenes_abiertas(queryset, conductor_id).afirst()
+    if apertura is None:
+        raise Http404(_("El conductor no tiene órdenes de movimiento abiertas."))
+    return AperturaOrdenMovimientoSerializer(apertura).data
 
-class CierreOrdenMovimientoView(viewsets.ModelViewSet):
+class CierreOrdenMovimientoView(
+    AlcanceEmpresaMixin, ExportacionMixin, BusquedaMixin, viewsets.ModelViewSet
+):
     """
     Clase que define la vista para listar
     y crear los cierres de las órdenes de movimiento.
     """
     queryset = CierreOrdenMovimiento.objects.all()
     serializer_class = CierreOrdenMovimientoSerializer
+    presupuesto_consultas = {'exportar': 2}
+    nombre_exportacion = 'cierres_ordenes_movimiento'
+    campos_exportacion = (
+        'id', 'apertura_id', 'apertura__vehiculo_id', 'apertura__vehiculo__placa',
+        'fecha_de_cierre_orden', 'fecha_retorno_vehiculo',
+        'kilometraje_retorno__kilometraje', 'kilometraje_retorno__unidad', 'cumplimiento',
+    )
+    parametros_exportacion = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('vehiculo_id', campo='apertura__vehiculo_id'),
+        Parametro('desde', tipo=date, campo='fecha_de_cierre_orden__gte'),
+        Parametro('hasta', tipo=date, campo='fecha_de_cierre_orden__lte'),
+    )
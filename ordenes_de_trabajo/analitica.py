@@ -0,0 +1,222 @@
+"""analitica.py
+
+Este módulo calcula los indicadores de costos de mantenimiento de la flota
+de una empresa a partir de las órdenes de trabajo y de la bitácora de
+kilometrajes.
+
+Las sumas, promedios y conteos se calculan en la base de datos con cuatro
+consultas, sin importar el número de órdenes o de lecturas del odómetro:
+    - Las órdenes agrupadas por vehículo y mes (`TruncMonth`).
+    - Las órdenes agrupadas por tipo de mantenimiento.
+    - El kilometraje recorrido por cada vehículo en cada mes, con funciones
+      de ventana sobre la bitácora: de cada mes se toma la primera lectura,
+      la última (`FirstValue`) y la lectura anterior al mes (`Lag`).
+    - La última lectura de cada vehículo anterior al rango de fechas, para
+      el recorrido del primer mes del rango.
+
+Los totales por vehículo, por mes y de la empresa se obtienen sumando las
+filas agrupadas por vehículo y mes, que son pocas (una por vehículo y mes).
+El costo por kilómetro es el costo total dividido para los kilómetros
+recorridos en el mismo periodo; las lecturas en millas se convierten
+a kilómetros.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import FirstValue, Lag, RowNumber, TruncMonth
+
+from vehiculos.models import Kilometraje, Vehiculo
+from vehiculos.odometro import FACTORES_KILOMETROS, kilometros_sql
+
+from .models import OrdenTrabajo
+
+def redondear(valor, decimales: int = 2) -> Optional[float]:
+    """Redondea un valor numérico, conservando None."""
+    return None if valor is None else round(float(valor), decimales)
+
+def costo_por_kilometro(total, kilometros) -> Optional[float]:
+    """Divide el costo para los kilómetros recorridos, si los hay."""
+    return round(float(total) / float(kilometros), 4) if kilometros else None
+
+def obtener_recorridos(
+    empresa_id: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    vehiculo_id: Optional[int] = None
+) -> List[dict]:
+    """Calcula los kilómetros recorridos por cada vehículo en cada mes.
+
+    El recorrido de un mes es la diferencia entre su última lectura y la
+    última lectura del mes anterior (o la primera lectura del mes, si el
+    vehículo no tiene lecturas anteriores).
+
+    Returns:
+        list: Una fila por vehículo y mes con lecturas, con el id y la placa
+        del vehículo, el mes y los kilómetros recorridos.
+    """
+    filtros = {'empresa_id': empresa_id}
+    if vehiculo_id is not None:
+        filtros['vehiculo_id'] = vehiculo_id
+    lecturas = Kilometraje.objects.filter(
+        unidad__in=FACTORES_KILOMETROS.keys(), **filtros
+    )
+    if hasta is not None:
+        lecturas = lecturas.filter(fecha__lte=hasta)
+
+    previos = {}
+    if desde is not None:
+        lecturas = lecturas.filter(fecha__gte=desde)
+        anterior = Kilometraje.objects.filter(
+            vehiculo_id=OuterRef('id'),
+            unidad__in=FACTORES_KILOMETROS.keys(),
+            fecha__lt=desde
+        ).order_by('-fecha', '-id').annotate(km=kilometros_sql())
+        vehiculos = Vehiculo.objects.filter(empresa_id=empresa_id)
+        if vehiculo_id is not None:
+            vehiculos = vehiculos.filter(id=vehiculo_id)
+        previos = dict(vehiculos.annotate(
+            previo=Subquery(anterior.values('km')[:1])
+        ).filter(previo__isnull=False).values_list('id', 'previo'))
+
+    kilometros = kilometros_sql()
+    por_mes = [F('vehiculo_id'), TruncMonth('fecha')]
+    cronologico = [F('fecha').asc(), F('id').asc()]
+    meses = lecturas.annotate(
+        mes=TruncMonth('fecha'),
+        km=kilometros,
+        posicion=Window(RowNumber(), partition_by=por_mes, order_by=cronologico),
+        anterior=Window(Lag(kilometros), partition_by=[F('vehiculo_id')], order_by=cronologico),
+        ultimo=Window(
+            FirstValue(kilometros),
+            partition_by=por_mes,
+            order_by=[F('fecha').desc(), F('id').desc()]
+        ),
+    ).filter(posicion=1).values(
+        'vehiculo_id', 'vehiculo__placa', 'mes', 'km', 'anterior', 'ultimo'
+    )
+
+    recorridos = []
+    for fila in meses:
+        inicio = fila['anterior']
+        if inicio is None:
+            inicio = previos.get(fila['vehiculo_id'], fila['km'])
+        recorridos.append({
+            'vehiculo_id': fila['vehiculo_id'],
+            'placa': fila['vehiculo__placa'],
+            'mes': fila['mes'],
+            'kilometros': max(Decimal(fila['ultimo']) - Decimal(inicio), Decimal(0)),
+        })
+    return recorridos
+
+def totalizar(filas: Iterable[dict]) -> dict:
+    """Suma el costo, las órdenes y los kilómetros de un conjunto de filas."""
+    total = Decimal(0)
+    ordenes = 0
+    kilometros = Decimal(0)
+    for fila in filas:
+        total += fila['total']
+        ordenes += fila['ordenes']
+        kilometros += fila['kilometros']
+    return {
+        'total': redondear(total),
+        'ordenes': ordenes,
+        'promedio': redondear(total / ordenes) if ordenes else None,
+        'kilometros': redondear(kilometros),
+        'costo_km': costo_por_kilometro(total, kilometros),
+    }
+
+def calcular_costos(
+    empresa_id: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    vehiculo_id: Optional[int] = None
+) -> dict:
+    """Calcula los costos de mantenimiento de la flota de una empresa.
+
+    Args:
+        empresa_id (int): El id de la empresa.
+        desde (date): Fecha de emisión mínima de las órdenes (opcional).
+        hasta (date): Fecha de emisión máxima de las órdenes (opcional).
+        vehiculo_id (int): Limita el cálculo a un vehículo (opcional).
+
+    Returns:
+        dict: Los totales de la empresa (`resumen`) y los costos por vehículo,
+        por mes, por vehículo y mes, y por tipo de mantenimiento.
+    """
+    ordenes = OrdenTrabajo.objects.filter(empresa_id=empresa_id)
+    if vehiculo_id is not None:
+        ordenes = ordenes.filter(vehiculo_id=vehiculo_id)
+    if desde is not None:
+        ordenes = ordenes.filter(fecha_emision__gte=desde)
+    if hasta is not None:
+        ordenes = ordenes.filter(fecha_emision__lte=hasta)
+
+    agrupadas = ordenes.annotate(mes=TruncMonth('fecha_emision')).values(
+        'vehiculo_id', 'vehiculo__placa', 'mes'
+    ).annotate(
+        total=Sum('costo_mantenimiento'),
+        ordenes=Count('id'),
+    ).order_by('vehiculo_id', 'mes')
+    por_tipo = ordenes.values('tipo_mantenimiento').annotate(
+        total=Sum('costo_mantenimiento'),
+        promedio=Avg('costo_mantenimiento'),
+        ordenes=Count('id'),
+    ).order_by('tipo_mantenimiento')
+
+    # Una celda por vehículo y mes con órdenes o con kilómetros recorridos:
+    celdas = {}
+
+    def obtener_celda(vehiculo: int, placa: str, mes: date) -> dict:
+        if (vehiculo, mes) not in celdas:
+            celdas[(vehiculo, mes)] = {
+                'vehiculo_id': vehiculo, 'placa': placa, 'mes': mes,
+                'total': Decimal(0), 'ordenes': 0, 'kilometros': Decimal(0),
+            }
+        return celdas[(vehiculo, mes)]
+
+    for fila in agrupadas:
+        celda = obtener_celda(fila['vehiculo_id'], fila['vehiculo__placa'], fila['mes'])
+        celda['total'] = fila['total']
+        celda['ordenes'] = fila['ordenes']
+    for fila in obtener_recorridos(empresa_id, desde, hasta, vehiculo_id):
+        celda = obtener_celda(fila['vehiculo_id'], fila['placa'], fila['mes'])
+        celda['kilometros'] = fila['kilometros']
+
+    filas = [celdas[clave] for clave in sorted(celdas)]
+    vehiculos = defaultdict(list)
+    meses = defaultdict(list)
+    for fila in filas:
+        vehiculos[(fila['vehiculo_id'], fila['placa'])].append(fila)
+        meses[fila['mes']].append(fila)
+
+    return {
+        'empresa_id': empresa_id,
+        'desde': desde,
+        'hasta': hasta,
+        'resumen': totalizar(filas),
+        'por_vehiculo': [
+            {'vehiculo_id': vehiculo, 'placa': placa, **totalizar(grupo)}
+            for (vehiculo, placa), grupo in vehiculos.items()
+        ],
+        'por_mes': [
+            {'mes': mes, **totalizar(meses[mes])} for mes in sorted(meses)
+        ],
+        'por_vehiculo_mes': [
+            {'vehiculo_id': fila['vehiculo_id'], 'mes': fila['mes'], **totalizar([fila])}
+            for fila in filas
+        ],
+        'por_tipo': [
+            {
+                'tipo_mantenimiento': fila['tipo_mantenimiento'],
+                'total': redondear(fila['total']),
+                'promedio': redondear(fila['promedio']),
+                'ordenes': fila['ordenes'],
+            }
+            for fila in por_tipo
+        ],
+    }
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordenes_de_trabajo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['responsable', 'vehiculo'], name='orden_responsable_vehiculo_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordenes_de_trabajo', '0002_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['vehiculo', 'fecha_emision'], name='orden_vehiculo_fecha_idx'),
+        ),
+    ]
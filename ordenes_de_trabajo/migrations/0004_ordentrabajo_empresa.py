@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def asignar_empresa_del_vehiculo(apps, schema_editor):
+    """Copia en cada orden de trabajo la empresa de su vehículo."""
+    OrdenTrabajo = apps.get_model('ordenes_de_trabajo', 'OrdenTrabajo')
+    Vehiculo = apps.get_model('vehiculos', 'Vehiculo')
+    OrdenTrabajo.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            Vehiculo.objects.filter(id=models.OuterRef('vehiculo_id')).values('empresa_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_telefono_e164'),
+        ('vehiculos', '0005_miniaturas'),
+        ('ordenes_de_trabajo', '0003_indice_costos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordentrabajo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ordenes_trabajo', to='empresas.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_del_vehiculo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ordentrabajo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='Empresa del vehículo, para filtrar las órdenes por empresa sin joins', on_delete=django.db.models.deletion.CASCADE, related_name='ordenes_trabajo', to='empresas.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='ordentrabajo',
+            index=models.Index(fields=['empresa', 'fecha_emision'], name='orden_empresa_fecha_idx'),
+        ),
+    ]
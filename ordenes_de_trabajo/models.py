@@ -8,6 +8,8 @@ Autor: Christopher Villamarín (@xeland314)
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from administracion_vehicular.alcance import EmpresaDerivadaMixin
+from empresas.models import Empresa
 from vehiculos.models import Vehiculo
 
 from usuarios.models import PerfilUsuario
@@ -16,7 +18,7 @@ from .enums import (
     EstadoCumplimiento, TipoMantenimiento
 )
 
-class OrdenTrabajo(models.Model):
+class OrdenTrabajo(EmpresaDerivadaMixin, models.Model):
     """
     Representa una orden de trabajo para el mantenimiento de vehículos.
     """
@@ -38,6 +40,13 @@ class OrdenTrabajo(models.Model):
         related_name="orden_trabajo_vehiculos",
         help_text=_("Vehículo asociado con la orden de trabajo")
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="ordenes_trabajo",
+        editable=False,
+        help_text=_("Empresa del vehículo, para filtrar las órdenes por empresa sin joins")
+    )
     tipo_mantenimiento = models.CharField(
         _("Tipo de mantenimiento"),
         max_length=30,
@@ -64,6 +73,14 @@ class OrdenTrabajo(models.Model):
     class Meta:
         verbose_name = _("Orden de trabajo")
         verbose_name_plural = _("Órdenes de trabajo")
+        indexes = [
+            # Búsqueda por responsable y vehículo (`search_by`):
+            models.Index(fields=['responsable', 'vehiculo'], name='orden_responsable_vehiculo_idx'),
+            # Costos por vehículo y rango de fechas (ver `analitica.py`):
+            models.Index(fields=['vehiculo', 'fecha_emision'], name='orden_vehiculo_fecha_idx'),
+            # Órdenes de una empresa por rango de fechas (costos, exportación):
+            models.Index(fields=['empresa', 'fecha_emision'], name='orden_empresa_fecha_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.vehiculo} - {self.fecha_emision}"
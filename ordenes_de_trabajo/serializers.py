@@ -15,7 +15,7 @@ class OrdenTrabajoSerializer(serializers.ModelSerializer):
     """
     Serializer para serializar y deserializar instancias del modelo OrdenTrabajo.
     """
-    secretario = serializers.PrimaryKeyRelatedField(
+    responsable = serializers.PrimaryKeyRelatedField(
         queryset=PerfilUsuario.objects.all(),
         help_text=_("Responsable de emitir la orden de trabajo")
     )
@@ -0,0 +1,16 @@
+"""signals.py
+
+Conecta la invalidación de las respuestas en caché de las vistas de órdenes
+de trabajo y la actualización de la empresa de las órdenes al cambiar la
+empresa de su vehículo (ver `alcance.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from administracion_vehicular.alcance import conectar_propagacion
+from administracion_vehicular.cache import conectar_invalidacion
+from vehiculos.models import Vehiculo
+
+from .models import OrdenTrabajo
+
+conectar_invalidacion('ordenes_trabajo', [OrdenTrabajo])
+conectar_propagacion(OrdenTrabajo, 'vehiculo', Vehiculo)
@@ -0,0 +1,29 @@
+"""tareas.py
+
+Este módulo registra el cálculo de los costos de mantenimiento de la flota
+como tarea en segundo plano (ver `tareas/registro.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date
+from typing import Optional
+
+from tareas.registro import tarea
+
+from .analitica import calcular_costos
+
+@tarea('ordenes_de_trabajo.calcular_costos')
+def calcular_costos_flota(
+    empresa: int,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    vehiculo_id: Optional[int] = None
+) -> dict:
+    """Calcula los costos de mantenimiento de la flota de una empresa
+    (ver `analitica.calcular_costos`)."""
+    return calcular_costos(
+        empresa,
+        desde=date.fromisoformat(desde) if desde else None,
+        hasta=date.fromisoformat(hasta) if hasta else None,
+        vehiculo_id=vehiculo_id,
+    )
@@ -1,3 +1,125 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from usuarios.tests import crear_empresa, crear_perfil
+from vehiculos.enums import UnidadOdometro
+from vehiculos.models import Kilometraje
+from vehiculos.tests import crear_vehiculo
+
+from .analitica import calcular_costos
+from .enums import EstadoCumplimiento, TipoMantenimiento
+from .models import OrdenTrabajo
+
+class CostosTestCase(TestCase):
+    """Pruebas de los indicadores de costos de mantenimiento de la flota."""
+
+    def setUp(self):
+        cache.clear()
+        self.empresa = crear_empresa()
+        self.responsable = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, self.responsable, "ABC-1000")
+        self.otro = crear_vehiculo(self.empresa, self.responsable, "ABC-1001")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def crear_orden(self, vehiculo, costo, fecha, tipo=TipoMantenimiento.CORRECTIVO):
+        orden = OrdenTrabajo.objects.create(
+            responsable=self.responsable,
+            vehiculo=vehiculo,
+            tipo_mantenimiento=tipo.value,
+            tipo_trabajo="Cambio de aceite",
+            cumplimiento=EstadoCumplimiento.CUMPLIDO.value,
+            costo_mantenimiento=Decimal(costo)
+        )
+        # `fecha_emision` se asigna automáticamente al guardar:
+        OrdenTrabajo.objects.filter(id=orden.id).update(fecha_emision=fecha)
+        return orden
+
+    def registrar_kilometraje(self, vehiculo, valor, fecha, unidad=UnidadOdometro.KILOMETROS):
+        Kilometraje.objects.create(
+            vehiculo=vehiculo, kilometraje=valor, unidad=unidad.value, fecha=fecha
+        )
+
+    def test_costos_por_vehiculo_mes_y_tipo(self):
+        """Se agrupan los costos y se calcula el costo por kilómetro recorrido."""
+        self.crear_orden(self.vehiculo, 100, date(2023, 1, 10))
+        self.crear_orden(self.vehiculo, 50, date(2023, 1, 20), TipoMantenimiento.RESTAURATIVO)
+        self.crear_orden(self.vehiculo, 300, date(2023, 2, 5))
+        self.crear_orden(self.otro, 80, date(2023, 2, 15))
+        self.registrar_kilometraje(self.vehiculo, 1000, date(2022, 12, 30))
+        self.registrar_kilometraje(self.vehiculo, 1200, date(2023, 1, 15))
+        self.registrar_kilometraje(self.vehiculo, 1500, date(2023, 1, 31))
+        self.registrar_kilometraje(self.vehiculo, 2500, date(2023, 2, 28))
+        # 500 millas recorridas por el segundo vehículo en febrero:
+        self.registrar_kilometraje(self.otro, 100, date(2023, 2, 1), UnidadOdometro.MILLAS)
+        self.registrar_kilometraje(self.otro, 600, date(2023, 2, 20), UnidadOdometro.MILLAS)
+
+        with self.assertNumQueries(4):
+            costos = calcular_costos(self.empresa.id, desde=date(2023, 1, 1))
+
+        self.assertEqual(costos['resumen']['total'], 530)
+        self.assertEqual(costos['resumen']['ordenes'], 4)
+        enero, febrero = costos['por_mes']
+        self.assertEqual(enero['mes'], date(2023, 1, 1))
+        # Desde la última lectura de diciembre hasta la última de enero:
+        self.assertEqual(enero['kilometros'], 500)
+        self.assertEqual(enero['costo_km'], 0.3)
+        self.assertEqual(febrero['total'], 380)
+        self.assertAlmostEqual(febrero['kilometros'], 1000 + 804.67, places=2)
+
+        vehiculo, otro = costos['por_vehiculo']
+        self.assertEqual((vehiculo['placa'], vehiculo['total']), ("ABC-1000", 450))
+        self.assertEqual(vehiculo['promedio'], 150)
+        self.assertEqual(vehiculo['costo_km'], 0.3)
+        self.assertEqual(otro['ordenes'], 1)
+
+        por_tipo = {fila['tipo_mantenimiento']: fila for fila in costos['por_tipo']}
+        self.assertEqual(por_tipo[TipoMantenimiento.CORRECTIVO.value]['total'], 480)
+        self.assertEqual(por_tipo[TipoMantenimiento.CORRECTIVO.value]['promedio'], 160)
+
+    def test_rango_de_fechas(self):
+        """Las órdenes y lecturas fuera del rango no se consideran."""
+        self.crear_orden(self.vehiculo, 100, date(2022, 12, 10))
+        self.crear_orden(self.vehiculo, 200, date(2023, 3, 10))
+        costos = calcular_costos(self.empresa.id, desde=date(2023, 1, 1), hasta=date(2023, 2, 28))
+        self.assertEqual(costos['resumen']['ordenes'], 0)
+        self.assertEqual(costos['por_vehiculo'], [])
+
+    def test_endpoint_costos(self):
+        """Los costos se guardan en caché hasta que cambia una orden o una lectura."""
+        self.crear_orden(self.vehiculo, 100, date(2023, 1, 10))
+        url = f"/api/v1/ordenes_trabajo/costos/?empresa_id={self.empresa.id}&desde=2023-01-01"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['resumen']['total'], 100)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get("/api/v1/ordenes_trabajo/")['X-Cache'], 'MISS')
+
+        # Una lectura nueva solo invalida los costos, no el listado de órdenes:
+        self.registrar_kilometraje(self.vehiculo, 1000, date(2023, 1, 1))
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get("/api/v1/ordenes_trabajo/")['X-Cache'], 'HIT')
+
+        self.assertEqual(self.client.get("/api/v1/ordenes_trabajo/costos/").status_code, 400)
+        response = self.client.get(
+            f"/api/v1/ordenes_trabajo/costos/?empresa_id={self.empresa.id}&desde=enero"
+        )
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+    def test_cambio_de_empresa_del_vehiculo(self):
+        """Las órdenes que siguen a su vehículo a otra empresa invalidan la caché."""
+        self.crear_orden(self.vehiculo, 100, date(2023, 1, 10))
+        url = f"/api/v1/ordenes_trabajo/costos/?empresa_id={self.empresa.id}&desde=2023-01-01"
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.vehiculo.empresa = crear_empresa("Otra")
+        self.vehiculo.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['resumen']['ordenes'], 0)
@@ -1,20 +1,35 @@
+from datetime import date
+
 import coreapi
 import coreschema
-from django.utils.translation import gettext_lazy as _
-from rest_framework import viewsets, status
+from rest_framework import viewsets
 from rest_framework.schemas import AutoSchema
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from administracion_vehicular.alcance import AlcanceEmpresaMixin
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro
+from administracion_vehicular.cache import RespuestaCacheMixin
+from administracion_vehicular.exportacion import ExportacionMixin
+from tareas.registro import encolar
+from tareas.views import respuesta_tarea
+
+from .analitica import calcular_costos
 from .serializers import OrdenTrabajoSerializer
 from .models import OrdenTrabajo
+from .tareas import calcular_costos_flota
 
 class SearchSchema(AutoSchema):
 
     def get_description(self, path: str, method):
         if path.endswith('search_by'):
             return 'Filtra las órdenes de trabajo en función de responsable y vehículo.'
+        if path.endswith('/costos/'):
+            return (
+                'Calcula los costos de mantenimiento de la flota de una empresa'
+                ' por vehículo, mes y tipo de mantenimiento, y su costo por kilómetro.'
+            )
         return super().get_description(path, method)
 
     def get_manual_fields(self, path: str, method):
@@ -43,39 +58,131 @@ class SearchSchema(AutoSchema):
                     description='El id del vehículo a filtrar.'
                 )
             ]
+        elif path.endswith('/costos/'):
+            extra_fields = [
+                coreapi.Field(
+                    name='empresa_id',
+                    required=True,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Empresa ID',
+                        description='El id de la empresa de los vehículos.'
+                    ),
+                    description='El id de la empresa a analizar.'
+                ),
+                coreapi.Field(
+                    name='vehiculo_id',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Vehiculo ID',
+                        description='El id del vehículo de las órdenes de trabajo.'
+                    ),
+                    description='El id del vehículo a analizar.'
+                ),
+                coreapi.Field(
+                    name='desde',
+                    required=False,
+                    location='query',
+                    schema=coreschema.String(
+                        title='Desde',
+                        description='Fecha de emisión mínima (AAAA-MM-DD).'
+                    ),
+                    description='Inicio del periodo a analizar.'
+                ),
+                coreapi.Field(
+                    name='hasta',
+                    required=False,
+                    location='query',
+                    schema=coreschema.String(
+                        title='Hasta',
+                        description='Fecha de emisión máxima (AAAA-MM-DD).'
+                    ),
+                    description='Fin del periodo a analizar.'
+                ),
+                coreapi.Field(
+                    name='asincrono',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Asíncrono',
+                        description=(
+                            'Encola la operación como tarea en segundo plano'
+                            ' (respuesta 202 con la URL de la tarea)'
+                        )
+                    ),
+                    description='Calcular los costos en segundo plano.'
+                ),
+            ]
 
         return super().get_manual_fields(path, method) + extra_fields
 
-class OrdenTrabajoView(viewsets.ModelViewSet):
+class OrdenTrabajoView(
+    AlcanceEmpresaMixin, RespuestaCacheMixin, ExportacionMixin, BusquedaMixin,
+    viewsets.ModelViewSet
+):
+    """
+    Vista para gestionar las órdenes de trabajo.
+
+    Las respuestas de `list` y `retrieve` se guardan en caché hasta que cambia
+    alguna orden de trabajo; las de `costos`, hasta que cambia alguna orden
+    de trabajo o lectura del odómetro.
+    """
+    grupos_cache = ('ordenes_trabajo',)
+    grupos_cache_acciones = {'costos': ('ordenes_trabajo', 'kilometrajes')}
     queryset = OrdenTrabajo.objects.all()
     serializer_class = OrdenTrabajoSerializer
+    presupuesto_consultas = {
+        'list': 2, 'retrieve': 2, 'search_by': 2, 'costos': 5, 'exportar': 2
+    }
+    parametros_busqueda = (Parametro('responsable_id'), Parametro('vehiculo_id'))
+    parametros_costos = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('vehiculo_id'),
+        Parametro('desde', tipo=date),
+        Parametro('hasta', tipo=date),
+    )
+    nombre_exportacion = 'ordenes_trabajo'
+    campos_exportacion = (
+        'id', 'fecha_emision', 'vehiculo_id', 'vehiculo__placa', 'responsable_id',
+        'tipo_mantenimiento', 'tipo_trabajo', 'cumplimiento', 'costo_mantenimiento',
+    )
+    parametros_exportacion = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('vehiculo_id'),
+        Parametro('desde', tipo=date, campo='fecha_emision__gte'),
+        Parametro('hasta', tipo=date, campo='fecha_emision__lte'),
+    )
 
     @action(detail=False, methods=['get'], schema=SearchSchema())
     def search_by(self, request: Request):
         """Función de búsqueda para las órdenes de trabajo"""
-        responsable_id = request.query_params.get('responsable_id')
-        vehiculo_id = request.query_params.get('vehiculo_id')
+        return self.buscar(request)
 
-        queryset = OrdenTrabajo.objects.all()
-        if responsable_id and vehiculo_id:
-            queryset = queryset.filter(responsable_id=responsable_id, vehiculo_id=vehiculo_id)
-        elif responsable_id:
-            queryset = queryset.filter(responsable_id=responsable_id)
-        elif vehiculo_id:
-            queryset = queryset.filter(vehiculo_id=vehiculo_id)
-        else:
-            return Response(
-                {"error": _("Parámetros de búsqueda incorrectos.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    @action(detail=False, methods=['get'], schema=SearchSchema())
+    def costos(self, request: Request):
+        """Calcula los costos de mantenimiento de la flota de una empresa.
 
-        if not queryset.exists():
-            return Response(
-                {"error": _(
-                    "No se encontraron órdenes de trabajo para los criterios especificados."
-                )},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        Devuelve los totales, promedios y número de órdenes de la empresa,
+        de cada vehículo, de cada mes y de cada tipo de mantenimiento, junto
+        con los kilómetros recorridos y el costo por kilómetro, dentro del
+        rango de fechas `desde`-`hasta` (opcional). Con `?asincrono=true` el
+        cálculo se encola como tarea en segundo plano.
 
-        serializer = OrdenTrabajoSerializer(queryset, many=True)
-        return Response(serializer.data)
+        Args:
+            request (Request): La petición HTTP con los parámetros del cálculo.
+
+        Returns:
+            Response: Los costos de la flota, la tarea encolada con estado
+            202, o un mensaje de error si los parámetros son incorrectos.
+        """
+        filtros = self.obtener_filtros(request, self.parametros_costos)
+        self.verificar_empresa(filtros['empresa_id'])
+        if request.query_params.get('asincrono', '').lower() in ('1', 'true'):
+            empresa_id = filtros.pop('empresa_id')
+            tarea = encolar(
+                calcular_costos_flota, empresa_id=empresa_id, usuario=request.user,
+                empresa=empresa_id, **filtros
+            )
+            return respuesta_tarea(request, tarea)
+        return self.respuesta_cacheada(request, lambda: Response(calcular_costos(**filtros)))
@@ -7,7 +7,7 @@ from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 
 from usuarios.models import PerfilUsuario
-from usuarios.serializers import PerfilSerializer
+from usuarios.serializers import PerfilListSerializer, PerfilSerializer
 
 from .models import Representante
 
@@ -24,18 +24,20 @@ class RepresentanteSerializer(PerfilSerializer):
             - fields: Campos del modelo a serializar.
             - read_only_fields: Campos de solo lectura.
             - default_error_messages: Mensajes de error personalizados.
+            - list_serializer_class: Serializer usado con `many=True`.
         """
         model = Representante
         fields = (
             'id', 'empresa', 'nombres', 'apellidos', 'cedula', 'ruc', 'email', 'direccion',
-            'telefono', 'fecha_nacimiento', 'nivel_educacion',
-            'estado_civil', 'password', 'password_validator', 'fotografia'
+            'telefono', 'telefono_e164', 'fecha_nacimiento', 'nivel_educacion',
+            'estado_civil', 'password', 'password_validator', 'fotografia', 'miniaturas'
         )
         read_only_fields = ('id',)
         default_error_messages = {
             'invalid': _('Datos inválidos.'),
             'required': _('Este campo es obligatorio.'),
         }
+        list_serializer_class = PerfilListSerializer
 
     def create(self, validated_data: dict):
         """Crea una nueva instancia del modelo Representante a partir de los datos validados.
@@ -1,3 +1,80 @@
+"""
+tests.py
+
+Este módulo define los tests para representantes.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from usuarios.enums import EstadoCivil, NivelEducacion, Roles
+from usuarios.tests import crear_empresa
+from usuarios.validators import generar_cedula_ecuatoriana
+from vehiculos.enums import TipoLicencia
+from vehiculos.licencias import escanear_licencias
+from vehiculos.models import Licencia
+
+from .models import Representante
+from .serializers import RepresentanteSerializer
+
+class RepresentanteSerializerTestCase(TestCase):
+    """Pruebas del número de consultas al serializar representantes y de la
+    empresa copiada de su perfil."""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+
+    def crear_representante(self, indice: int) -> Representante:
+        """Crea un usuario con su perfil de representante."""
+        email = f"representante{indice}@andinos.ec"
+        user = User.objects.create(
+            username=email,
+            email=email,
+            first_name=f"Nombre{indice}",
+            last_name=f"Apellido{indice}"
+        )
+        return Representante.objects.create(
+            user=user,
+            empresa=self.empresa,
+            role=Roles.ADMINISTRADOR.value,
+            cedula=generar_cedula_ecuatoriana(),
+            ruc="1790012345001",
+            email=email,
+            telefono="0987129357",
+            fecha_nacimiento=date(1985, 5, 5),
+            nivel_educacion=NivelEducacion.SUPERIOR.value,
+            estado_civil=EstadoCivil.CASADO.value
+        )
+
+    def test_consultas_constantes_al_serializar_listas(self):
+        """El número de consultas no crece con el número de representantes."""
+        conteos = []
+        for total in (2, 15):
+            for indice in range(Representante.objects.count(), total):
+                self.crear_representante(indice)
+            with CaptureQueriesContext(connection) as consultas:
+                data = RepresentanteSerializer(Representante.objects.all(), many=True).data
+            self.assertEqual(len(data), total)
+            self.assertEqual(data[0]['nombres'], "Nombre0")
+            conteos.append(len(consultas))
+        self.assertEqual(conteos[0], conteos[1])
 
-# Create your tests here.
+    def test_licencia_sigue_al_representante(self):
+        """La licencia de un representante cambia de empresa con su perfil."""
+        representante = self.crear_representante(1)
+        licencia = Licencia.objects.create(
+            conductor=representante, tipo=TipoLicencia.B.value,
+            fecha_de_emision=date(2019, 1, 1), fecha_de_caducidad=date(2024, 5, 1), puntos=30
+        )
+        otra_empresa = crear_empresa("Otra")
+        representante.empresa = otra_empresa
+        representante.save()
+        licencia.refresh_from_db()
+        self.assertEqual(licencia.empresa, otra_empresa)
+        reporte = escanear_licencias(otra_empresa.id, date(2024, 6, 1))
+        self.assertEqual(reporte['resumen']['caducadas'], 1)
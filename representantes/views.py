@@ -2,16 +2,18 @@
 
 Autor: Christopher Villamarín (@xeland314)
 """
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 
+from administracion_vehicular.alcance import AlcanceEmpresaMixin
+from administracion_vehicular.autenticacion import TokenCacheAuthentication
+
 from .models import Representante
 from .serializers import RepresentanteSerializer
 
-class RepresentanteView(ModelViewSet):
+class RepresentanteView(AlcanceEmpresaMixin, ModelViewSet):
     """Vista para listar y crear representantes."""
-    queryset = Representante.objects.all()
+    queryset = Representante.objects.select_related('user')
     serializer_class = RepresentanteSerializer
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenCacheAuthentication,)
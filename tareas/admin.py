@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Tarea
+
+@admin.register(Tarea)
+class TareaPanel(admin.ModelAdmin):
+    icon_name = "schedule"
+    list_display = ('id', 'nombre', 'estado', 'empresa', 'intentos', 'creada', 'terminada')
+    list_filter = ('estado', 'nombre')
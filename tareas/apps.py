@@ -0,0 +1,15 @@
+from importlib import import_module
+
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tareas'
+
+    def ready(self):
+        # Registra las tareas definidas en el módulo `tareas.py` de cada aplicación:
+        autodiscover_modules('tareas')
+        # y las del proyecto (miniaturas, exportaciones), que no es una aplicación instalada:
+        import_module('administracion_vehicular.tareas')
@@ -0,0 +1,119 @@
+"""backends.py
+
+Este módulo define los backends de la cola de tareas en segundo plano. El
+backend se elige con `TAREAS_BACKEND` (ruta de la clase):
+
+    - `BackendBaseDeDatos` (por defecto): las tareas se guardan en la tabla
+      `Tarea` y los trabajadores (`manage.py trabajador_tareas`) las reservan
+      por lotes. En PostgreSQL la reserva usa `SELECT ... FOR UPDATE SKIP
+      LOCKED`, por lo que varios trabajadores pueden atender la misma cola
+      sin reservar dos veces una tarea.
+    - `BackendInmediato`: guarda la tarea y la ejecuta en el mismo proceso
+      al confirmarse la transacción, sin trabajador. Sirve para el
+      desarrollo local y las pruebas; las tareas que fallan quedan
+      pendientes de un trabajador para sus reintentos.
+
+Un backend externo (p. ej. un broker de mensajes) solo debe implementar
+`encolar` y `reservar` con la misma interfaz.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import timedelta
+from functools import lru_cache
+import logging
+from typing import List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .enums import EstadoTarea
+from .models import Tarea
+
+logger = logging.getLogger('tareas')
+
+def duracion_reserva() -> timedelta:
+    """Devuelve cuánto dura la reserva de una tarea (`TAREAS_RESERVA`)."""
+    return timedelta(seconds=getattr(settings, 'TAREAS_RESERVA', 600))
+
+class BackendBaseDeDatos:
+    """
+    Cola de tareas guardada en la base de datos.
+    """
+
+    def encolar(self, tarea: Tarea) -> None:
+        """Guarda una tarea pendiente."""
+        tarea.save()
+
+    def reservar(self, trabajador: str, limite: int) -> List[int]:
+        """Reserva hasta `limite` tareas listas para ejecutarse.
+
+        Son las tareas pendientes cuya espera terminó y las tareas en curso
+        cuya reserva expiró (su trabajador se detuvo sin terminarlas) y que
+        aún tienen intentos. Las tareas abandonadas que agotaron sus
+        intentos quedan fallidas: pudieron terminar su trabajo antes de que
+        se detuviera el trabajador, y repetirlas lo duplicaría.
+
+        Returns:
+            list: Los ids de las tareas reservadas, por orden de llegada.
+        """
+        ahora = timezone.now()
+        expiradas = Q(estado=EstadoTarea.EN_CURSO.value, reservada_hasta__lt=ahora)
+        listas = Tarea.objects.filter(
+            Q(estado=EstadoTarea.PENDIENTE.value, ejecutar_despues__lte=ahora)
+            | expiradas & Q(intentos__lt=F('max_intentos'))
+        ).order_by('ejecutar_despues', 'id')
+        with transaction.atomic():
+            agotadas = Tarea.objects.filter(expiradas, intentos__gte=F('max_intentos')).update(
+                estado=EstadoTarea.FALLIDA.value,
+                error="La reserva expiró sin que la tarea terminara y no le quedan intentos.",
+                reservada_hasta=None,
+                terminada=ahora,
+            )
+            if agotadas:
+                logger.warning(
+                    "%s tareas abandonadas sin intentos restantes quedaron fallidas.", agotadas
+                )
+            if connection.features.has_select_for_update_skip_locked:
+                listas = listas.select_for_update(skip_locked=True)
+            ids = list(listas.values_list('id', flat=True)[:limite])
+            Tarea.objects.filter(id__in=ids).update(
+                estado=EstadoTarea.EN_CURSO.value,
+                trabajador=trabajador,
+                reservada_hasta=ahora + duracion_reserva(),
+                iniciada=ahora,
+            )
+        return ids
+
+class BackendInmediato(BackendBaseDeDatos):
+    """
+    Guarda las tareas y las ejecuta en el mismo proceso al confirmarse la
+    transacción en curso.
+    """
+
+    def encolar(self, tarea: Tarea) -> None:
+        super().encolar(tarea)
+        transaction.on_commit(lambda: self.ejecutar_ahora(tarea.pk))
+
+    def ejecutar_ahora(self, tarea_id: int) -> None:
+        # Importación diferida: ejecucion.py importa el registro de tareas.
+        from .ejecucion import ejecutar
+        ahora = timezone.now()
+        Tarea.objects.filter(pk=tarea_id, estado=EstadoTarea.PENDIENTE.value).update(
+            estado=EstadoTarea.EN_CURSO.value, trabajador='inmediato', iniciada=ahora,
+            reservada_hasta=ahora + duracion_reserva()
+        )
+        ejecutar(tarea_id)
+
+@lru_cache(maxsize=None)
+def cargar_backend(ruta: str):
+    """Crea una instancia del backend indicado por su ruta."""
+    return import_string(ruta)()
+
+def obtener_backend():
+    """Devuelve el backend configurado en `TAREAS_BACKEND`."""
+    return cargar_backend(
+        getattr(settings, 'TAREAS_BACKEND', 'tareas.backends.BackendBaseDeDatos')
+    )
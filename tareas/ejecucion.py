@@ -0,0 +1,149 @@
+"""ejecucion.py
+
+Este módulo ejecuta las tareas reservadas por un trabajador.
+
+Si la función de una tarea lanza una excepción, la tarea vuelve a quedar
+pendiente con una espera exponencial (`TAREAS_ESPERA_BASE` segundos
+duplicados en cada intento, hasta `TAREAS_ESPERA_MAXIMA`); al agotar sus
+`max_intentos` queda fallida con la traza del último error.
+
+Una tarea nunca se ejecuta más de `max_intentos` veces:
+    - Cada ejecución reclama su intento con una actualización condicional
+      de `intentos`; si dos trabajadores reservaron la misma tarea, solo uno
+      la ejecuta.
+    - Mientras la función se ejecuta, un hilo renueva `reservada_hasta`
+      cada tercio de `TAREAS_RESERVA`, por lo que las tareas largas no se
+      consideran abandonadas.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import timedelta
+import logging
+import os
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .backends import duracion_reserva
+from .enums import EstadoTarea
+from .models import Tarea
+from .registro import obtener_definicion
+
+logger = logging.getLogger('tareas')
+
+def calcular_espera(intentos: int) -> timedelta:
+    """Devuelve la espera antes del siguiente intento de una tarea fallida."""
+    base = getattr(settings, 'TAREAS_ESPERA_BASE', 30)
+    maxima = getattr(settings, 'TAREAS_ESPERA_MAXIMA', 3600)
+    return timedelta(seconds=min(base * 2 ** max(intentos - 1, 0), maxima))
+
+def renovar_reserva(tarea_id: int) -> bool:
+    """Extiende la reserva de una tarea en curso.
+
+    Returns:
+        bool: Si la tarea seguía en curso.
+    """
+    return bool(Tarea.objects.filter(pk=tarea_id, estado=EstadoTarea.EN_CURSO.value).update(
+        reservada_hasta=timezone.now() + duracion_reserva()
+    ))
+
+class RenovacionReserva:
+    """
+    Contexto que renueva la reserva de una tarea en un hilo mientras se
+    ejecuta su función.
+    """
+
+    def __init__(self, tarea_id: int):
+        self.tarea_id = tarea_id
+        self.detenida = threading.Event()
+        self.hilo = threading.Thread(target=self.renovar, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detenida.set()
+        self.hilo.join()
+
+    def renovar(self):
+        intervalo = duracion_reserva().total_seconds() / 3
+        try:
+            while not self.detenida.wait(intervalo):
+                renovar_reserva(self.tarea_id)
+        finally:
+            # El hilo abre su propia conexión a la base de datos.
+            connections.close_all()
+
+def ejecutar(tarea_id: int) -> str:
+    """Ejecuta una tarea reservada (en curso) y guarda su resultado.
+
+    Returns:
+        str: El estado final de la tarea.
+    """
+    tarea = Tarea.objects.get(pk=tarea_id)
+    if tarea.estado != EstadoTarea.EN_CURSO.value:
+        return tarea.estado
+    if tarea.intentos >= tarea.max_intentos:
+        Tarea.objects.filter(pk=tarea.pk, estado=EstadoTarea.EN_CURSO.value).update(
+            estado=EstadoTarea.FALLIDA.value,
+            error="La tarea agotó sus intentos sin terminar.",
+            reservada_hasta=None,
+            terminada=timezone.now(),
+        )
+        return Tarea.objects.values_list('estado', flat=True).get(pk=tarea.pk)
+    definicion = obtener_definicion(tarea.nombre)
+    cambios = {'intentos': F('intentos') + 1}
+    if definicion is not None and not definicion.conservar_argumentos:
+        cambios['argumentos'] = {}
+    reclamada = Tarea.objects.filter(
+        pk=tarea.pk, estado=EstadoTarea.EN_CURSO.value, intentos=tarea.intentos
+    ).update(**cambios)
+    if not reclamada:
+        # Otro trabajador ya ejecuta este intento.
+        return Tarea.objects.values_list('estado', flat=True).get(pk=tarea.pk)
+    tarea.intentos += 1
+    try:
+        if definicion is None:
+            raise LookupError(f"La tarea {tarea.nombre} no está registrada.")
+        with RenovacionReserva(tarea.pk):
+            tarea.resultado = definicion.funcion(**tarea.argumentos)
+    except Exception:
+        tarea.error = traceback.format_exc()
+        if definicion is not None and tarea.intentos < tarea.max_intentos:
+            tarea.estado = EstadoTarea.PENDIENTE.value
+            tarea.ejecutar_despues = timezone.now() + calcular_espera(tarea.intentos)
+        else:
+            tarea.estado = EstadoTarea.FALLIDA.value
+            tarea.terminada = timezone.now()
+        logger.warning(
+            "La tarea %s #%s falló (intento %s de %s).",
+            tarea.nombre, tarea.pk, tarea.intentos, tarea.max_intentos
+        )
+    else:
+        tarea.estado = EstadoTarea.COMPLETADA.value
+        tarea.error = ''
+        tarea.terminada = timezone.now()
+    tarea.reservada_hasta = None
+    tarea.save(update_fields=[
+        'estado', 'resultado', 'error', 'ejecutar_despues', 'reservada_hasta', 'terminada'
+    ])
+    return tarea.estado
+
+def inicializar_proceso() -> None:
+    """Inicializa Django en cada proceso del grupo de un trabajador."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'administracion_vehicular.settings')
+    import django
+    django.setup()
+
+def ejecutar_en_proceso(tarea_id: int) -> str:
+    """Ejecuta una tarea en un proceso del grupo de un trabajador."""
+    close_old_connections()
+    try:
+        return ejecutar(tarea_id)
+    finally:
+        close_old_connections()
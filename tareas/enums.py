@@ -0,0 +1,16 @@
+from enum import Enum
+from typing import List, Tuple
+
+class EstadoTarea(Enum):
+    """
+    Enumeración de los estados de una tarea en segundo plano.
+    """
+    PENDIENTE = "Pendiente"
+    EN_CURSO = "En curso"
+    COMPLETADA = "Completada"
+    FALLIDA = "Fallida"
+    CANCELADA = "Cancelada"
+
+    @classmethod
+    def choices(cls) -> List[Tuple[str, str]]:
+        return [(key.value, key.name) for key in cls]
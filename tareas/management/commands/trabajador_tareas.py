@@ -0,0 +1,115 @@
+"""trabajador_tareas.py
+
+Comando que ejecuta las tareas en segundo plano de la cola de la base de
+datos en un grupo de procesos, fuera de los trabajadores de gunicorn.
+
+El trabajador reserva tareas mientras tenga procesos libres y consulta la
+cola cada `--intervalo` segundos cuando no hay tareas listas. Al recibir
+SIGINT o SIGTERM deja de reservar tareas y espera a que terminen las que
+están en curso. Se pueden ejecutar varios trabajadores sobre la misma cola.
+
+Uso:
+    python manage.py trabajador_tareas [--procesos N] [--intervalo SEGUNDOS]
+        [--nombre NOMBRE] [--una-vez]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import signal
+import socket
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tareas.backends import obtener_backend
+from tareas.ejecucion import ejecutar, ejecutar_en_proceso, inicializar_proceso
+
+logger = logging.getLogger('tareas')
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas en segundo plano en un grupo de procesos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=getattr(settings, 'TAREAS_PROCESOS', 0) or os.cpu_count() or 1,
+            help="Procesos que ejecutan tareas (1 = en el proceso del trabajador)."
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=getattr(settings, 'TAREAS_INTERVALO', 2.0),
+            help="Segundos de espera cuando no hay tareas listas."
+        )
+        parser.add_argument(
+            '--nombre',
+            default=f'{socket.gethostname()}:{os.getpid()}',
+            help="Identificador del trabajador guardado en sus tareas."
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help="Ejecuta las tareas listas y termina."
+        )
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGTERM, self.al_detener)
+        signal.signal(signal.SIGINT, self.al_detener)
+        backend = obtener_backend()
+        if options['procesos'] <= 1:
+            total = self.atender_en_proceso(backend, options)
+        else:
+            total = self.atender_en_grupo(backend, options)
+        self.stdout.write(self.style.SUCCESS(f"Tareas ejecutadas: {total}."))
+
+    def al_detener(self, *args):
+        self.detener = True
+
+    def atender_en_proceso(self, backend, options) -> int:
+        total = 0
+        while not self.detener:
+            ids = backend.reservar(options['nombre'], 1)
+            for tarea_id in ids:
+                ejecutar(tarea_id)
+                total += 1
+            if not ids:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        return total
+
+    def atender_en_grupo(self, backend, options) -> int:
+        total = 0
+        en_curso = set()
+        # Los procesos se crean con 'spawn' para no heredar las conexiones
+        # a la base de datos del trabajador.
+        with ProcessPoolExecutor(
+            max_workers=options['procesos'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inicializar_proceso
+        ) as grupo:
+            while not self.detener:
+                libres = options['procesos'] - len(en_curso)
+                ids = backend.reservar(options['nombre'], libres) if libres else []
+                en_curso.update(grupo.submit(ejecutar_en_proceso, tarea_id) for tarea_id in ids)
+                if not en_curso and options['una_vez']:
+                    break
+                if en_curso:
+                    terminadas, en_curso = wait(
+                        en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED
+                    )
+                    total += len(terminadas)
+                    for futuro in terminadas:
+                        if futuro.exception() is not None:
+                            logger.error("Error del trabajador: %r", futuro.exception())
+                elif not ids:
+                    time.sleep(options['intervalo'])
+            wait(en_curso)
+            total += len(en_curso)
+        return total
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:10
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('empresas', '0003_telefono_e164'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Nombre de la tarea registrada.', max_length=100, verbose_name='Nombre')),
+                ('argumentos', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Argumentos de la tarea.', verbose_name='Argumentos')),
+                ('estado', models.CharField(choices=[('Pendiente', 'PENDIENTE'), ('En curso', 'EN_CURSO'), ('Completada', 'COMPLETADA'), ('Fallida', 'FALLIDA'), ('Cancelada', 'CANCELADA')], default='Pendiente', help_text='Estado de la tarea.', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, help_text='Número de ejecuciones realizadas.', verbose_name='Intentos')),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3, help_text='Número máximo de ejecuciones antes de marcar la tarea como fallida.', verbose_name='Máximo de intentos')),
+                ('ejecutar_despues', models.DateTimeField(default=django.utils.timezone.now, help_text='Instante a partir del cual se puede ejecutar la tarea.', verbose_name='Ejecutar después de')),
+                ('reservada_hasta', models.DateTimeField(blank=True, help_text='Instante hasta el cual la tarea pertenece a su trabajador.', null=True, verbose_name='Reservada hasta')),
+                ('trabajador', models.CharField(blank=True, help_text='Identificador del trabajador que ejecuta la tarea.', max_length=100, verbose_name='Trabajador')),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Resultado de la tarea.', null=True, verbose_name='Resultado')),
+                ('error', models.TextField(blank=True, help_text='Traza del último error de la tarea.', verbose_name='Error')),
+                ('creada', models.DateTimeField(auto_now_add=True, verbose_name='Creada')),
+                ('iniciada', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada')),
+                ('terminada', models.DateTimeField(blank=True, null=True, verbose_name='Terminada')),
+                ('empresa', models.ForeignKey(blank=True, help_text='Empresa que solicitó la tarea (vacía para las tareas globales).', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tareas', to='empresas.empresa')),
+                ('usuario', models.ForeignKey(blank=True, help_text='Usuario que solicitó la tarea.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'indexes': [models.Index(fields=['estado', 'ejecutar_despues', 'id'], name='tarea_estado_idx'), models.Index(fields=['empresa', '-creada'], name='tarea_empresa_idx')],
+            },
+        ),
+    ]
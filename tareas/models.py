@@ -0,0 +1,123 @@
+"""models.py
+
+Este módulo define el modelo de las tareas en segundo plano.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from empresas.models import Empresa
+
+from .enums import EstadoTarea
+
+class Tarea(models.Model):
+    """
+    Representa una operación costosa que se ejecuta fuera de la petición
+    (ver `registro.py` y el comando `trabajador_tareas`).
+
+    Atributos:
+        - nombre: Nombre con el que se registró la función de la tarea.
+        - argumentos: Argumentos con nombre de la función (JSON).
+        - estado: Estado de la tarea (ver `EstadoTarea`).
+        - intentos: Número de ejecuciones realizadas.
+        - ejecutar_despues: Instante a partir del cual se puede ejecutar
+          (se pospone entre reintentos).
+        - reservada_hasta: Instante hasta el cual la tarea pertenece al
+          trabajador que la ejecuta; después se considera abandonada.
+        - resultado: Valor devuelto por la función (JSON).
+        - error: Traza del último error.
+    """
+    nombre = models.CharField(
+        _('Nombre'),
+        max_length=100,
+        help_text=_("Nombre de la tarea registrada.")
+    )
+    argumentos = models.JSONField(
+        _('Argumentos'),
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text=_("Argumentos de la tarea.")
+    )
+    estado = models.CharField(
+        _('Estado'),
+        max_length=20,
+        choices=EstadoTarea.choices(),
+        default=EstadoTarea.PENDIENTE.value,
+        help_text=_("Estado de la tarea.")
+    )
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="tareas",
+        help_text=_("Empresa que solicitó la tarea (vacía para las tareas globales).")
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text=_("Usuario que solicitó la tarea.")
+    )
+    intentos = models.PositiveSmallIntegerField(
+        _('Intentos'),
+        default=0,
+        help_text=_("Número de ejecuciones realizadas.")
+    )
+    max_intentos = models.PositiveSmallIntegerField(
+        _('Máximo de intentos'),
+        default=3,
+        help_text=_("Número máximo de ejecuciones antes de marcar la tarea como fallida.")
+    )
+    ejecutar_despues = models.DateTimeField(
+        _('Ejecutar después de'),
+        default=timezone.now,
+        help_text=_("Instante a partir del cual se puede ejecutar la tarea.")
+    )
+    reservada_hasta = models.DateTimeField(
+        _('Reservada hasta'),
+        null=True,
+        blank=True,
+        help_text=_("Instante hasta el cual la tarea pertenece a su trabajador.")
+    )
+    trabajador = models.CharField(
+        _('Trabajador'),
+        max_length=100,
+        blank=True,
+        help_text=_("Identificador del trabajador que ejecuta la tarea.")
+    )
+    resultado = models.JSONField(
+        _('Resultado'),
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text=_("Resultado de la tarea.")
+    )
+    error = models.TextField(
+        _('Error'),
+        blank=True,
+        help_text=_("Traza del último error de la tarea.")
+    )
+    creada = models.DateTimeField(_('Creada'), auto_now_add=True)
+    iniciada = models.DateTimeField(_('Iniciada'), null=True, blank=True)
+    terminada = models.DateTimeField(_('Terminada'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Tarea")
+        verbose_name_plural = _("Tareas")
+        indexes = [
+            # Tareas listas para ejecutarse, por orden de llegada (ver backends.py):
+            models.Index(fields=['estado', 'ejecutar_despues', 'id'], name='tarea_estado_idx'),
+            # Tareas de una empresa, de la más reciente a la más antigua:
+            models.Index(fields=['empresa', '-creada'], name='tarea_empresa_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.nombre} #{self.pk} ({self.estado})"
@@ -0,0 +1,110 @@
+"""registro.py
+
+Este módulo registra las funciones que se pueden ejecutar como tareas en
+segundo plano y las encola.
+
+Cada aplicación define sus tareas en su módulo `tareas.py` (se importan al
+iniciar Django, ver `apps.py`) con el decorador `tarea`:
+
+    @tarea('vehiculos.escanear_licencias')
+    def escanear_licencias(empresas=None, fecha=None):
+        ...
+
+y las encola con `encolar`, que guarda la tarea con el backend configurado
+(`TAREAS_BACKEND`, ver `backends.py`). Los argumentos y el resultado de la
+función se guardan en JSON, por lo que solo pueden contener valores
+serializables (ids en lugar de instancias de modelos).
+
+Las tareas cuyos argumentos contienen secretos (p. ej. las contraseñas de
+la incorporación en bloque) se registran con `conservar_argumentos=False`:
+sus argumentos se borran de la tabla al empezar la ejecución o al
+cancelarlas, y por eso se ejecutan una sola vez.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from typing import Callable, Dict, Optional, Union
+
+from .backends import obtener_backend
+from .models import Tarea
+
+class DefinicionTarea:
+    """
+    Función registrada como tarea.
+
+    Atributos:
+        - nombre: Nombre único de la tarea.
+        - funcion: Función que ejecuta la tarea con argumentos con nombre.
+        - max_intentos: Número máximo de ejecuciones si la función falla.
+        - conservar_argumentos: Si es False, los argumentos se borran al
+          empezar la ejecución (y la tarea no se reintenta).
+    """
+
+    def __init__(
+        self, nombre: str, funcion: Callable, max_intentos: int = 3,
+        conservar_argumentos: bool = True
+    ):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.conservar_argumentos = conservar_argumentos
+        self.max_intentos = max_intentos if conservar_argumentos else 1
+
+REGISTRO: Dict[str, DefinicionTarea] = {}
+
+def tarea(nombre: Optional[str] = None, max_intentos: int = 3, conservar_argumentos: bool = True):
+    """Decorador que registra una función como tarea en segundo plano.
+
+    Args:
+        nombre (str): Nombre de la tarea, por defecto `<módulo>.<función>`.
+        max_intentos (int): Número máximo de ejecuciones si la función falla.
+        conservar_argumentos (bool): Si es False, los argumentos no se
+            conservan en la tabla después de empezar la ejecución.
+    """
+
+    def decorador(funcion: Callable) -> Callable:
+        definicion = DefinicionTarea(
+            nombre or f'{funcion.__module__}.{funcion.__name__}', funcion, max_intentos,
+            conservar_argumentos
+        )
+        REGISTRO[definicion.nombre] = definicion
+        funcion.nombre_tarea = definicion.nombre
+        return funcion
+
+    return decorador
+
+def obtener_definicion(nombre: str) -> Optional[DefinicionTarea]:
+    """Devuelve la definición de una tarea registrada, o None si no existe."""
+    return REGISTRO.get(nombre)
+
+def encolar(
+    funcion: Union[str, Callable],
+    empresa_id: Optional[int] = None,
+    usuario=None,
+    **argumentos
+) -> Tarea:
+    """Encola una tarea registrada.
+
+    Args:
+        funcion (str | Callable): La función registrada o su nombre.
+        empresa_id (int): Empresa que solicita la tarea; limita quién puede
+            consultarla (vacía para las tareas globales). No se pasa a la
+            función: si la necesita, se incluye entre sus argumentos.
+        usuario (User): Usuario que solicita la tarea.
+        **argumentos: Argumentos con nombre de la función (JSON).
+
+    Returns:
+        Tarea: La tarea guardada.
+
+    Raises:
+        KeyError: Si la tarea no está registrada.
+    """
+    nombre = funcion if isinstance(funcion, str) else funcion.nombre_tarea
+    definicion = REGISTRO[nombre]
+    instancia = Tarea(
+        nombre=nombre,
+        argumentos=argumentos,
+        empresa_id=empresa_id,
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        max_intentos=definicion.max_intentos,
+    )
+    obtener_backend().encolar(instancia)
+    return instancia
@@ -0,0 +1,20 @@
+"""
+Este módulo contiene el serializador de las tareas en segundo plano.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from rest_framework import serializers
+
+from .models import Tarea
+
+class TareaSerializer(serializers.ModelSerializer):
+    """
+    Serializador de solo lectura del estado de una tarea.
+    """
+    class Meta:
+        model = Tarea
+        fields = (
+            'id', 'nombre', 'estado', 'empresa', 'usuario', 'intentos', 'max_intentos',
+            'ejecutar_despues', 'creada', 'iniciada', 'terminada', 'resultado', 'error',
+        )
+        read_only_fields = fields
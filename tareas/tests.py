@@ -0,0 +1,278 @@
+"""
+tests.py
+
+Este módulo define los tests de las tareas en segundo plano.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date, timedelta
+import gzip
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ordenes_de_trabajo.enums import EstadoCumplimiento, TipoMantenimiento
+from ordenes_de_trabajo.models import OrdenTrabajo
+from usuarios.enums import EstadoCivil, NivelEducacion, Roles
+from usuarios.models import PerfilUsuario
+from usuarios.tests import crear_empresa, crear_perfil
+from usuarios.validators import generar_cedula_ecuatoriana
+from vehiculos.enums import UnidadOdometro
+from vehiculos.models import Kilometraje
+from vehiculos.tests import ALMACENAMIENTO_LOCAL, crear_vehiculo
+
+from .backends import BackendBaseDeDatos, cargar_backend
+from .ejecucion import calcular_espera, ejecutar, renovar_reserva
+from .enums import EstadoTarea
+from .models import Tarea
+from .registro import encolar, tarea
+
+FALLOS = []
+
+@tarea('tareas.pruebas.sumar')
+def sumar(a: int, b: int) -> int:
+    return a + b
+
+@tarea('tareas.pruebas.fallar', max_intentos=2)
+def fallar() -> None:
+    FALLOS.append(1)
+    raise ValueError("Fallo de prueba")
+
+class TareasTestCase(TestCase):
+    """Pruebas de la cola de tareas con el backend de base de datos."""
+
+    def setUp(self):
+        self.backend = BackendBaseDeDatos()
+
+    def test_reservar_y_ejecutar(self):
+        primera = encolar(sumar, a=2, b=3)
+        encolar('tareas.pruebas.sumar', a=1, b=1)
+        self.assertEqual(primera.estado, EstadoTarea.PENDIENTE.value)
+
+        ids = self.backend.reservar('prueba', 1)
+        self.assertEqual(ids, [primera.pk])
+        # Una tarea reservada no se vuelve a reservar:
+        self.assertNotIn(primera.pk, self.backend.reservar('otro', 10))
+
+        self.assertEqual(ejecutar(primera.pk), EstadoTarea.COMPLETADA.value)
+        primera.refresh_from_db()
+        self.assertEqual((primera.resultado, primera.intentos, primera.trabajador), (5, 1, 'prueba'))
+
+    def test_reintentos_con_espera(self):
+        FALLOS.clear()
+        fallida = encolar(fallar)
+        self.backend.reservar('prueba', 1)
+        with self.assertLogs('tareas', level='WARNING'):
+            self.assertEqual(ejecutar(fallida.pk), EstadoTarea.PENDIENTE.value)
+        fallida.refresh_from_db()
+        self.assertGreater(fallida.ejecutar_despues, timezone.now())
+        self.assertIn("Fallo de prueba", fallida.error)
+        # No se reserva hasta que termina la espera:
+        self.assertEqual(self.backend.reservar('prueba', 1), [])
+
+        Tarea.objects.filter(pk=fallida.pk).update(ejecutar_despues=timezone.now())
+        self.backend.reservar('prueba', 1)
+        with self.assertLogs('tareas', level='WARNING'):
+            self.assertEqual(ejecutar(fallida.pk), EstadoTarea.FALLIDA.value)
+        self.assertEqual(len(FALLOS), 2)
+        self.assertEqual(calcular_espera(1), timedelta(seconds=30))
+        self.assertEqual(calcular_espera(20), timedelta(seconds=3600))
+
+    def test_reserva_expirada(self):
+        abandonada = encolar(sumar, a=1, b=2)
+        self.backend.reservar('caido', 1)
+        Tarea.objects.filter(pk=abandonada.pk).update(
+            reservada_hasta=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.backend.reservar('prueba', 1), [abandonada.pk])
+
+    def test_reserva_expirada_sin_intentos(self):
+        # La tarea se ejecutó una vez y su trabajador se detuvo antes de guardar el resultado.
+        abandonada = encolar(fallar)
+        self.backend.reservar('caido', 1)
+        Tarea.objects.filter(pk=abandonada.pk).update(
+            intentos=2, reservada_hasta=timezone.now() - timedelta(seconds=1)
+        )
+        with self.assertLogs('tareas', level='WARNING'):
+            self.assertEqual(self.backend.reservar('prueba', 1), [])
+        abandonada.refresh_from_db()
+        self.assertEqual(abandonada.estado, EstadoTarea.FALLIDA.value)
+
+        # Tampoco se ejecuta si se reservó antes de agotar sus intentos:
+        FALLOS.clear()
+        repetida = encolar(fallar)
+        self.backend.reservar('prueba', 1)
+        Tarea.objects.filter(pk=repetida.pk).update(intentos=2)
+        self.assertEqual(ejecutar(repetida.pk), EstadoTarea.FALLIDA.value)
+        self.assertEqual(FALLOS, [])
+
+    def test_renovar_reserva(self):
+        instancia = encolar(sumar, a=1, b=1)
+        self.assertFalse(renovar_reserva(instancia.pk))
+        self.backend.reservar('prueba', 1)
+        Tarea.objects.filter(pk=instancia.pk).update(reservada_hasta=timezone.now())
+        self.assertTrue(renovar_reserva(instancia.pk))
+        instancia.refresh_from_db()
+        self.assertGreater(instancia.reservada_hasta, timezone.now() + timedelta(seconds=500))
+
+    def test_trabajador(self):
+        for indice in range(3):
+            encolar(sumar, a=indice, b=1)
+        salida = StringIO()
+        call_command('trabajador_tareas', '--procesos', '1', '--una-vez', stdout=salida)
+        self.assertIn("Tareas ejecutadas: 3", salida.getvalue())
+        self.assertEqual(
+            sorted(Tarea.objects.values_list('resultado', flat=True)), [1, 2, 3]
+        )
+
+    @override_settings(TAREAS_BACKEND='tareas.backends.BackendInmediato')
+    def test_backend_inmediato(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            instancia = encolar(sumar, a=4, b=4)
+        instancia.refresh_from_db()
+        self.assertEqual((instancia.estado, instancia.resultado), (EstadoTarea.COMPLETADA.value, 8))
+        self.assertIsNotNone(cargar_backend('tareas.backends.BackendInmediato'))
+
+class TareasAPITestCase(TestCase):
+    """Pruebas de las rutas de las tareas y de las operaciones encoladas."""
+
+    def setUp(self):
+        cache.clear()
+        self.empresa = crear_empresa()
+        self.perfil = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, self.perfil)
+        self.client = APIClient()
+        self.client.force_authenticate(self.perfil.user)
+
+    def test_ingesta_en_segundo_plano(self):
+        lecturas = [{
+            "vehiculo": self.vehiculo.id, "kilometraje": 1000,
+            "unidad": UnidadOdometro.KILOMETROS.value, "fecha": "2023-01-01"
+        }]
+        response = self.client.post(
+            "/api/v1/kilometrajes/bulk/?asincrono=true", lecturas, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response['Location'].endswith(f"/api/v1/tareas/{response.data['id']}/"))
+        self.assertFalse(Kilometraje.objects.exists())
+
+        call_command('trabajador_tareas', '--procesos', '1', '--una-vez', stdout=StringIO())
+        response = self.client.get(f"/api/v1/tareas/{response.data['id']}/")
+        self.assertEqual(response.data['estado'], EstadoTarea.COMPLETADA.value)
+        self.assertEqual(response.data['resultado']['creadas'], 1)
+        self.assertEqual(Kilometraje.objects.get().empresa_id, self.empresa.id)
+
+    def test_alcance_cancelar_y_reintentar(self):
+        otra = encolar(sumar, empresa_id=crear_empresa("Otra").id, a=1, b=1)
+        self.assertEqual(self.client.get(f"/api/v1/tareas/{otra.pk}/").status_code, 404)
+
+        propia = encolar(sumar, empresa_id=self.empresa.id, a=1, b=1)
+        response = self.client.get("/api/v1/tareas/search_by/", {'estado': "Pendiente"})
+        self.assertEqual([fila['id'] for fila in response.data['results']], [propia.pk])
+
+        url = f"/api/v1/tareas/{propia.pk}/"
+        response = self.client.post(f"{url}cancelar/")
+        self.assertEqual(response.data['estado'], EstadoTarea.CANCELADA.value)
+        self.assertEqual(self.client.post(f"{url}cancelar/").status_code, 400)
+        response = self.client.post(f"{url}reintentar/")
+        self.assertEqual(response.data['estado'], EstadoTarea.PENDIENTE.value)
+
+    def test_vencimientos_en_segundo_plano(self):
+        response = self.client.get(
+            "/api/v1/manuales_mantenimiento/vencimientos/",
+            {'empresa_id': self.empresa.id, 'asincrono': "true"}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['nombre'], "manual_de_mantenimiento.calcular_vencimientos")
+        self.assertEqual(Tarea.objects.get().empresa_id, self.empresa.id)
+        call_command('trabajador_tareas', '--procesos', '1', '--una-vez', stdout=StringIO())
+        self.assertEqual(Tarea.objects.get().estado, EstadoTarea.COMPLETADA.value)
+
+    def test_incorporacion_en_segundo_plano(self):
+        """Las contraseñas no se conservan en la tabla de tareas."""
+        fila = {
+            "empresa": self.empresa.id, "nombres": "Ana María", "apellidos": "Torres",
+            "role": Roles.CONDUCTOR.value, "cedula": generar_cedula_ecuatoriana(),
+            "email": "nuevo@andinos.ec", "telefono": "0991234567",
+            "fecha_nacimiento": "1990-05-01", "nivel_educacion": NivelEducacion.SUPERIOR.value,
+            "estado_civil": EstadoCivil.SOLTERO.value, "password": "clave-segura-1",
+        }
+        response = self.client.post(
+            "/api/v1/perfiles/bulk/?asincrono=true", [fila], format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        instancia = Tarea.objects.get(pk=response.data['id'])
+        self.assertEqual((instancia.empresa_id, instancia.max_intentos), (self.empresa.id, 1))
+
+        call_command('trabajador_tareas', '--procesos', '1', '--una-vez', stdout=StringIO())
+        instancia.refresh_from_db()
+        self.assertEqual(instancia.estado, EstadoTarea.COMPLETADA.value)
+        self.assertEqual(instancia.argumentos, {})
+        self.assertEqual(instancia.resultado['creados'], 1)
+        self.assertTrue(PerfilUsuario.objects.get(email="nuevo@andinos.ec").user.check_password(
+            "clave-segura-1"
+        ))
+
+        cancelada = self.client.post(
+            "/api/v1/perfiles/bulk/?asincrono=true", [fila], format="json"
+        ).data['id']
+        url = f"/api/v1/tareas/{cancelada}/"
+        self.assertEqual(self.client.post(f"{url}cancelar/").status_code, 200)
+        self.assertEqual(Tarea.objects.get(pk=cancelada).argumentos, {})
+        self.assertEqual(self.client.post(f"{url}reintentar/").status_code, 400)
+
+    @override_settings(TAREAS_BACKEND='tareas.backends.BackendInmediato', **ALMACENAMIENTO_LOCAL)
+    def test_exportacion_en_segundo_plano(self):
+        """La exportación se escribe en el almacenamiento y se descarga desde la tarea."""
+        for dia in (1, 2):
+            Kilometraje.objects.create(
+                vehiculo=self.vehiculo, kilometraje=1000 * dia,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, dia)
+            )
+        ajeno = crear_vehiculo(crear_empresa("Otra"), self.perfil, "XYZ-9999")
+        Kilometraje.objects.create(
+            vehiculo=ajeno, kilometraje=10, unidad=UnidadOdometro.KILOMETROS.value,
+            fecha=date(2023, 1, 2)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(
+                "/api/v1/kilometrajes/exportar/",
+                {'empresa_id': self.empresa.id, 'desde': "2023-01-02", 'asincrono': "true"}
+            )
+        self.assertEqual(response.status_code, 202)
+        url = f"/api/v1/tareas/{response.data['id']}/"
+        resultado = self.client.get(url).data['resultado']
+        self.assertEqual((resultado['filas'], resultado['formato']), (1, 'csv'))
+        with default_storage.open(resultado['archivo']) as archivo:
+            lineas = gzip.decompress(archivo.read()).decode().splitlines()
+        self.assertEqual(lineas[1].split(',')[3], "2023-01-02")
+
+        response = self.client.get(f"{url}descargar/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(resultado['archivo'], response['Location'])
+        pendiente = encolar(sumar, empresa_id=self.empresa.id, a=1, b=1)
+        response = self.client.get(f"/api/v1/tareas/{pendiente.pk}/descargar/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_costos_en_segundo_plano(self):
+        OrdenTrabajo.objects.create(
+            responsable=self.perfil, vehiculo=self.vehiculo,
+            tipo_mantenimiento=TipoMantenimiento.CORRECTIVO.value,
+            tipo_trabajo="Cambio de aceite", cumplimiento=EstadoCumplimiento.CUMPLIDO.value,
+            costo_mantenimiento=100
+        )
+        response = self.client.get(
+            "/api/v1/ordenes_trabajo/costos/",
+            {'empresa_id': self.empresa.id, 'desde': "2000-01-01", 'asincrono': "true"}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['nombre'], "ordenes_de_trabajo.calcular_costos")
+        call_command('trabajador_tareas', '--procesos', '1', '--una-vez', stdout=StringIO())
+        instancia = Tarea.objects.get(pk=response.data['id'])
+        self.assertEqual(instancia.estado, EstadoTarea.COMPLETADA.value)
+        self.assertEqual(instancia.resultado['resumen']['ordenes'], 1)
@@ -0,0 +1,16 @@
+"""
+Módulo de URLs para las tareas en segundo plano.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.urls import path, include
+from rest_framework import routers
+
+from .views import TareaView
+
+router = routers.DefaultRouter()
+router.register(r'tareas', TareaView, basename='tareas')
+
+urlpatterns = [
+    path('api/v1/', include(router.urls)),
+]
@@ -0,0 +1,161 @@
+"""views.py
+
+Este módulo define la vista para consultar, cancelar y reintentar las tareas
+en segundo plano.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import coreapi
+import coreschema
+from django.core.files.storage import default_storage
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.schemas import AutoSchema
+
+from administracion_vehicular.alcance import AlcanceEmpresaMixin
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro
+
+from .enums import EstadoTarea
+from .models import Tarea
+from .registro import obtener_definicion
+from .serializers import TareaSerializer
+
+class TareaFilterSchema(AutoSchema):
+    def get_manual_fields(self, path: str, method):
+        if path.endswith('/search_by/'):
+            return [
+                coreapi.Field(
+                    name='estado',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Enum(
+                        [estado.value for estado in EstadoTarea],
+                        title='Estado',
+                        description='El estado de las tareas a buscar.'
+                    )
+                ),
+                coreapi.Field(
+                    name='nombre',
+                    required=False,
+                    location='query',
+                    schema=coreschema.String(
+                        title='Nombre',
+                        description='El nombre de las tareas a buscar.'
+                    )
+                )
+            ]
+        return super().get_manual_fields(path, method)
+
+def respuesta_tarea(request: Request, tarea: Tarea) -> Response:
+    """Responde 202 Accepted con la tarea encolada y la URL de su estado."""
+    response = Response(TareaSerializer(tarea).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = request.build_absolute_uri(f'/api/v1/tareas/{tarea.pk}/')
+    return response
+
+class TareaView(AlcanceEmpresaMixin, BusquedaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Vista para consultar el estado y el resultado de las tareas en segundo
+    plano de la empresa del usuario.
+    """
+    queryset = Tarea.objects.order_by('-creada', '-id')
+    serializer_class = TareaSerializer
+    presupuesto_consultas = {
+        'list': 2, 'retrieve': 2, 'search_by': 2, 'cancelar': 3, 'reintentar': 3,
+        'descargar': 2,
+    }
+    parametros_busqueda = (
+        Parametro('estado', tipo=str, opciones=[estado.value for estado in EstadoTarea]),
+        Parametro('nombre', tipo=str),
+    )
+
+    @action(detail=False, methods=['get'], schema=TareaFilterSchema())
+    def search_by(self, request: Request):
+        """Busca tareas por estado o nombre.
+
+        Args:
+            request (Request): La petición HTTP con los parámetros `estado`
+                o `nombre`.
+
+        Returns:
+            Response: Una página con las tareas que coinciden, o un mensaje
+            de error si los parámetros de búsqueda son incorrectos.
+        """
+        return self.buscar(request)
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request: Request, pk=None):
+        """Cancela una tarea pendiente.
+
+        Returns:
+            Response: La tarea cancelada, o 400 si ya no está pendiente.
+        """
+        tarea = self.get_object()
+        cambios = {'estado': EstadoTarea.CANCELADA.value, 'terminada': timezone.now()}
+        if not self.conserva_argumentos(tarea):
+            cambios['argumentos'] = {}
+        return self.cambiar_estado(tarea, (EstadoTarea.PENDIENTE,), **cambios)
+
+    @action(detail=True, methods=['post'])
+    def reintentar(self, request: Request, pk=None):
+        """Vuelve a encolar una tarea fallida o cancelada, con sus intentos en cero.
+
+        Returns:
+            Response: La tarea pendiente, o 400 si no está fallida ni
+            cancelada o si no conserva sus argumentos.
+        """
+        tarea = self.get_object()
+        if not self.conserva_argumentos(tarea):
+            return Response(
+                {"error": _("La tarea no conserva sus argumentos; debe solicitarse de nuevo.")},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.cambiar_estado(
+            tarea, (EstadoTarea.FALLIDA, EstadoTarea.CANCELADA),
+            estado=EstadoTarea.PENDIENTE.value, intentos=0, ejecutar_despues=timezone.now(),
+            terminada=None
+        )
+
+    @action(detail=True, methods=['get'])
+    def descargar(self, request: Request, pk=None):
+        """Redirige al archivo generado por una tarea completada (p. ej. una
+        exportación), con una URL firmada del almacenamiento.
+
+        Returns:
+            Response: 302 hacia el archivo, o 404 si la tarea no generó un
+            archivo o aún no termina.
+        """
+        tarea = self.get_object()
+        resultado = tarea.resultado if isinstance(tarea.resultado, dict) else {}
+        if tarea.estado != EstadoTarea.COMPLETADA.value or not resultado.get('archivo'):
+            return Response(
+                {"error": _("La tarea no tiene un archivo para descargar.")},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return HttpResponseRedirect(default_storage.url(resultado['archivo']))
+
+    def conserva_argumentos(self, tarea: Tarea) -> bool:
+        definicion = obtener_definicion(tarea.nombre)
+        return definicion is None or definicion.conservar_argumentos
+
+    def cambiar_estado(self, tarea: Tarea, desde, **cambios) -> Response:
+        """Actualiza una tarea si está en alguno de los estados `desde`.
+
+        La actualización es condicional, para no pisar el estado que un
+        trabajador haya guardado entre la lectura y la escritura.
+        """
+        actualizadas = Tarea.objects.filter(
+            pk=tarea.pk, estado__in=[estado.value for estado in desde]
+        ).update(**cambios)
+        if not actualizadas:
+            return Response(
+                {"error": _("La tarea está en estado %(estado)s.") % {'estado': tarea.estado}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        for campo, valor in cambios.items():
+            setattr(tarea, campo, valor)
+        return Response(self.get_serializer(tarea).data)
@@ -0,0 +1,200 @@
+"""incorporacion.py
+
+Este módulo registra en bloque a los trabajadores de una empresa
+(usuario de Django y perfil de usuario).
+
+Crear los trabajadores uno por uno con `PerfilSerializer` calcula el hash
+PBKDF2 de cada contraseña en serie y realiza dos INSERT por persona. En la
+incorporación en bloque:
+    - Se valida primero el formato de todas las filas (`FilaIncorporacionSerializer`),
+      y con una consulta `IN` cada una, la existencia de las empresas y que
+      los emails no estén registrados.
+    - Los hash de las contraseñas se calculan en paralelo en un grupo de
+      `INCORPORACION_PROCESOS` procesos.
+    - Con la opción de invitaciones no se reciben contraseñas: los usuarios
+      se crean sin contraseña utilizable y se devuelve un token de un solo
+      uso por usuario, con el que cada trabajador elige su contraseña
+      (ver `aceptar_invitacion`). No se calcula ningún hash.
+    - Los usuarios y los perfiles se insertan con `bulk_create` por lotes
+      dentro de una transacción.
+
+Las filas inválidas no impiden registrar las demás; se devuelven en el
+reporte junto con su posición en la petición y los errores de cada campo.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.translation import gettext as _
+
+from empresas.models import Empresa
+
+from .models import PerfilUsuario
+from .serializers import FilaIncorporacionSerializer
+from .telefonos import normalizar_telefonos
+
+def hashear_contrasenas(contrasenas: List[str]) -> List[str]:
+    """Calcula el hash de un conjunto de contraseñas.
+
+    Los hash se calculan en un grupo de `INCORPORACION_PROCESOS` procesos
+    (uno por CPU por defecto); con un solo proceso o una sola contraseña,
+    en el proceso actual.
+
+    Returns:
+        list: El hash de cada contraseña, en el mismo orden.
+    """
+    procesos = min(
+        getattr(settings, 'INCORPORACION_PROCESOS', None) or os.cpu_count() or 1,
+        len(contrasenas)
+    )
+    if procesos <= 1:
+        return [make_password(contrasena) for contrasena in contrasenas]
+    with ProcessPoolExecutor(max_workers=procesos) as grupo:
+        return list(grupo.map(
+            make_password, contrasenas,
+            chunksize=max(len(contrasenas) // (procesos * 4), 1)
+        ))
+
+def incorporar_trabajadores(
+    filas: Iterable[dict],
+    invitar: bool = False,
+    batch_size: Optional[int] = None,
+    empresas: Optional[QuerySet] = None
+) -> dict:
+    """Valida y registra en bloque a los trabajadores de una o varias empresas.
+
+    Args:
+        filas (Iterable[dict]): Los datos de cada trabajador (los campos de
+            `FilaIncorporacionSerializer`).
+        invitar (bool): Si es True, los usuarios se crean sin contraseña y se
+            devuelve un token de invitación por usuario.
+        batch_size (int): Número de filas insertadas por consulta
+            (`INCORPORACION_BATCH_SIZE` por defecto).
+        empresas (QuerySet): Empresas en las que se puede registrar a los
+            trabajadores (todas por defecto).
+
+    Returns:
+        dict: Reporte con el número de filas recibidas y de trabajadores
+        creados, los trabajadores creados (`fila`, `id` del perfil, `email` y, con
+        invitaciones, `usuario` y `token`) y los errores de cada fila
+        rechazada (`fila` es su posición en la petición, empezando en 0).
+    """
+    batch_size = batch_size or getattr(settings, 'INCORPORACION_BATCH_SIZE', 500)
+    errores: Dict[int, dict] = {}
+    validas: Dict[int, dict] = {}
+    recibidas = 0
+    for indice, fila in enumerate(filas):
+        recibidas += 1
+        serializer = FilaIncorporacionSerializer(data=fila, context={'invitar': invitar})
+        if serializer.is_valid():
+            validas[indice] = serializer.validated_data
+        else:
+            errores[indice] = serializer.errors
+
+    # Existencia de las empresas y emails ya registrados, una consulta cada uno:
+    empresas = Empresa.objects.all() if empresas is None else empresas
+    existentes = set(empresas.filter(
+        id__in={datos['empresa'] for datos in validas.values()}
+    ).values_list('id', flat=True))
+    registrados = set(User.objects.filter(
+        username__in={datos['email'] for datos in validas.values()}
+    ).values_list('username', flat=True))
+    vistos = set()
+    for indice, datos in list(validas.items()):
+        errores_fila = {}
+        if datos['empresa'] not in existentes:
+            errores_fila['empresa'] = [_("La empresa no existe.")]
+        if datos['email'] in registrados or datos['email'] in vistos:
+            errores_fila['email'] = [_("Ya existe un usuario con este email.")]
+        vistos.add(datos['email'])
+        if errores_fila:
+            errores[indice] = errores_fila
+            del validas[indice]
+
+    indices = sorted(validas)
+    if invitar:
+        contrasenas = [make_password(None) for _indice in indices]
+    else:
+        contrasenas = hashear_contrasenas([validas[indice]['password'] for indice in indices])
+    telefonos = normalizar_telefonos(validas[indice]['telefono'] for indice in indices)
+
+    usuarios = [
+        User(
+            username=validas[indice]['email'],
+            email=validas[indice]['email'],
+            first_name=validas[indice]['nombres'],
+            last_name=validas[indice]['apellidos'],
+            password=contrasena
+        )
+        for indice, contrasena in zip(indices, contrasenas)
+    ]
+    with transaction.atomic():
+        usuarios = User.objects.bulk_create(usuarios, batch_size=batch_size)
+        if any(usuario.pk is None for usuario in usuarios):
+            # La base de datos no devuelve los ids de las filas insertadas.
+            ids = dict(User.objects.filter(
+                username__in=[usuario.username for usuario in usuarios]
+            ).values_list('username', 'id'))
+            for usuario in usuarios:
+                usuario.pk = ids[usuario.username]
+        perfiles = PerfilUsuario.objects.bulk_create([
+            PerfilUsuario(
+                user=usuario,
+                empresa_id=validas[indice]['empresa'],
+                role=validas[indice]['role'],
+                cedula=validas[indice]['cedula'],
+                email=validas[indice]['email'],
+                telefono=validas[indice]['telefono'],
+                telefono_e164=telefono or '',
+                direccion=validas[indice].get('direccion', ''),
+                fecha_nacimiento=validas[indice]['fecha_nacimiento'],
+                nivel_educacion=validas[indice]['nivel_educacion'],
+                estado_civil=validas[indice]['estado_civil'],
+            )
+            for indice, usuario, telefono in zip(indices, usuarios, telefonos)
+        ], batch_size=batch_size)
+
+    creados = []
+    for indice, usuario, perfil in zip(indices, usuarios, perfiles):
+        creado = {'fila': indice, 'id': perfil.pk, 'email': usuario.email}
+        if invitar:
+            creado['usuario'] = usuario.pk
+            creado['token'] = default_token_generator.make_token(usuario)
+        creados.append(creado)
+    return {
+        'recibidas': recibidas,
+        'creados': len(creados),
+        'trabajadores': creados,
+        'errores': [
+            {'fila': indice, 'errores': errores[indice]} for indice in sorted(errores)
+        ],
+    }
+
+def aceptar_invitacion(usuario: int, token: str, password: str) -> Optional[User]:
+    """Asigna la contraseña de un usuario invitado.
+
+    El token deja de ser válido al cambiar la contraseña del usuario
+    (y expira después de `PASSWORD_RESET_TIMEOUT` segundos).
+
+    Args:
+        usuario (int): Id del usuario invitado.
+        token (str): Token de la invitación.
+        password (str): La contraseña elegida por el usuario.
+
+    Returns:
+        User: El usuario, o None si el token no es válido.
+    """
+    invitado = User.objects.filter(pk=usuario).first()
+    if invitado is None or not default_token_generator.check_token(invitado, token):
+        return None
+    invitado.set_password(password)
+    invitado.save(update_fields=['password'])
+    return invitado
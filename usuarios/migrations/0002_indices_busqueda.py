@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['empresa', 'role'], name='perfil_empresa_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['email'], name='perfil_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['cedula'], name='perfil_cedula_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Rutas de las miniaturas de las fotografías (ver imagenes.py).', verbose_name='Miniaturas'),
+        ),
+    ]
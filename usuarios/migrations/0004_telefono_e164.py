@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+from usuarios.telefonos import normalizar_telefonos
+
+
+def normalizar_telefonos_existentes(apps, schema_editor):
+    """Guarda el teléfono normalizado de cada perfil existente."""
+    PerfilUsuario = apps.get_model('usuarios', 'PerfilUsuario')
+    filas = list(PerfilUsuario.objects.only('id', 'telefono'))
+    for fila, normalizado in zip(filas, normalizar_telefonos(fila.telefono for fila in filas)):
+        fila.telefono_e164 = normalizado or ''
+    PerfilUsuario.objects.bulk_update(filas, ['telefono_e164'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='telefono_e164',
+            field=models.CharField(blank=True, editable=False, help_text='Teléfono de la persona normalizado en formato E.164.', max_length=16, verbose_name='Teléfono (E.164)'),
+        ),
+        migrations.RunPython(normalizar_telefonos_existentes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['telefono_e164'], name='perfil_telefono_idx'),
+        ),
+    ]
@@ -9,13 +9,14 @@ from .enums import (
     NivelEducacion,
     Roles
 )
+from .telefonos import TelefonoNormalizadoMixin
 from .validators import (
     validar_cedula,
     validar_fecha_de_nacimiento,
     validar_numero_de_telefono
 )
 
-class PerfilUsuario(models.Model):
+class PerfilUsuario(TelefonoNormalizadoMixin, models.Model):
     """
     La clase PerfilUsuario representa el perfil de un usuario en el sistema.
     """
@@ -53,6 +54,13 @@ class PerfilUsuario(models.Model):
         validators=[validar_numero_de_telefono],
         help_text=_("Teléfono de la persona.")
     )
+    telefono_e164 = models.CharField(
+        _('Teléfono (E.164)'),
+        max_length=16,
+        blank=True,
+        editable=False,
+        help_text=_("Teléfono de la persona normalizado en formato E.164.")
+    )
     direccion = models.TextField(
         _('Dirección'),
         blank=True,
@@ -82,10 +90,26 @@ class PerfilUsuario(models.Model):
         blank=True,
         help_text=_("Fotografía opcional de la persona.")
     )
+    miniaturas = models.JSONField(
+        _('Miniaturas'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("Rutas de las miniaturas de las fotografías (ver imagenes.py).")
+    )
 
     class Meta:
         verbose_name = _("Perfil de usuario")
         verbose_name_plural = _("Perfiles de usuario")
+        indexes = [
+            # Búsqueda de trabajadores por empresa y rol (`search_by`):
+            models.Index(fields=['empresa', 'role'], name='perfil_empresa_role_idx'),
+            # Búsqueda de usuarios por email o cédula:
+            models.Index(fields=['email'], name='perfil_email_idx'),
+            models.Index(fields=['cedula'], name='perfil_cedula_idx'),
+            # Búsqueda de usuarios por teléfono normalizado:
+            models.Index(fields=['telefono_e164'], name='perfil_telefono_idx'),
+        ]
 
     def __str__(self):
         return f"{self.email}"
@@ -8,9 +8,14 @@ Autor: Christopher Villamarín (@xeland314)
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from administracion_vehicular.almacenamiento import ListaConURLs
+from administracion_vehicular.busqueda import ID_MAXIMO
+from administracion_vehicular.imagenes import MiniaturasField
+from administracion_vehicular.validacion import ValidacionEnLoteMixin
 from empresas.models import Empresa
 
 from .models import PerfilUsuario
@@ -23,9 +28,37 @@ from .exceptions import (
 from .validators import (
     es_un_nombre_valido,
     es_una_cedula_valida,
-    es_un_numero_de_telefono_valido
+    es_un_numero_de_telefono_valido,
+    validar_cedula,
+    validar_numero_de_telefono
 )
 
+class PerfilListSerializer(ValidacionEnLoteMixin, ListaConURLs):
+    """
+    ListSerializer para serializar listas de perfiles de usuario.
+
+    Al deserializar una lista, valida en lote las cédulas y los teléfonos
+    de todas las filas.
+
+    Obtiene los usuarios (nombres y apellidos) de todos los perfiles
+    en una sola consulta a través de la relación `PerfilUsuario.user`,
+    en lugar de realizar una consulta por cada perfil, y resuelve
+    de una vez las URLs de sus fotografías.
+    """
+    campos_validados_en_lote = {
+        'cedula': (es_una_cedula_valida, validar_cedula),
+        'telefono': (es_un_numero_de_telefono_valido, validar_numero_de_telefono),
+    }
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        if isinstance(iterable, models.QuerySet):
+            iterable = iterable.select_related('user')
+        else:
+            iterable = list(iterable)
+            models.prefetch_related_objects(iterable, 'user')
+        return super().to_representation(iterable)
+
 class PerfilSerializer(serializers.ModelSerializer):
     """
     Serializer para serializar y deserializar instancias del modelo PerfilUsuario.
@@ -56,6 +89,7 @@ class PerfilSerializer(serializers.ModelSerializer):
         style={'input_type': 'password'},
         help_text=_("Campo para confirmar la contraseña del usuario.")
     )
+    miniaturas = MiniaturasField()
 
     class Meta:
         """Clase interna para especificar el modelo y los campos a serializar.
@@ -65,18 +99,20 @@ class PerfilSerializer(serializers.ModelSerializer):
             - fields: Campos del modelo a serializar.
             - read_only_fields: Campos de solo lectura.
             - default_error_messages: Mensajes de error personalizados.
+            - list_serializer_class: Serializer usado con `many=True`.
         """
         model = PerfilUsuario
         fields = (
             'id', 'nombres', 'apellidos', 'empresa', 'role', 'cedula', 'email',
-            'direccion', 'telefono', 'fecha_nacimiento', 'nivel_educacion',
-            'estado_civil', 'password', 'password_validator', 'fotografia'
+            'direccion', 'telefono', 'telefono_e164', 'fecha_nacimiento', 'nivel_educacion',
+            'estado_civil', 'password', 'password_validator', 'fotografia', 'miniaturas'
         )
         read_only_fields = ('id',)
         default_error_messages = {
             'invalid': _('Datos inválidos.'),
             'required': _('Este campo es obligatorio.'),
         }
+        list_serializer_class = PerfilListSerializer
 
     def create(self, validated_data: dict):
         """Crea una nuevo PerfilUsuario a partir de los datos validados.
@@ -102,9 +138,15 @@ class PerfilSerializer(serializers.ModelSerializer):
         return usuario
 
     def to_representation(self, instance: PerfilUsuario):
+        """Agrega los nombres y apellidos del usuario asociado al perfil.
+
+        Los datos se leen a través de la relación `PerfilUsuario.user`,
+        por lo que no se realiza ninguna consulta adicional si el usuario
+        ya fue cargado con `select_related` o `prefetch_related_objects`.
+        """
         representation = super().to_representation(instance)
         try:
-            user: User = User.objects.get(username=representation.get('email'))
+            user: User = instance.user
             representation['nombres'] = user.first_name
             representation['apellidos'] = user.last_name
         except ObjectDoesNotExist:
@@ -186,3 +228,75 @@ class PerfilSerializer(serializers.ModelSerializer):
             raise ErrorDeConfirmacionDeContrasena()
 
         return attrs
+
+class FilaIncorporacionSerializer(serializers.ModelSerializer):
+    """
+    Serializer para validar cada fila de la incorporación en bloque de
+    trabajadores (ver `incorporacion.py`).
+
+    La empresa se recibe como id y su existencia se comprueba en bloque;
+    la contraseña no se admite si se envían invitaciones (`invitar` en el
+    contexto) y es obligatoria en caso contrario.
+    """
+    empresa = serializers.IntegerField(
+        min_value=1,
+        max_value=ID_MAXIMO,
+        help_text=_("Empresa en la que labora el trabajador.")
+    )
+    nombres = serializers.CharField(max_length=150, help_text=_("Nombres del usuario."))
+    apellidos = serializers.CharField(max_length=150, help_text=_("Apellidos del usuario."))
+    password = serializers.CharField(
+        required=False,
+        write_only=True,
+        help_text=_("Contraseña del usuario.")
+    )
+
+    class Meta:
+        model = PerfilUsuario
+        fields = (
+            'empresa', 'nombres', 'apellidos', 'role', 'cedula', 'email', 'direccion',
+            'telefono', 'fecha_nacimiento', 'nivel_educacion', 'estado_civil', 'password'
+        )
+
+    def validate_nombres(self, nombres: str) -> str:
+        if not es_un_nombre_valido(nombres):
+            raise NombreInvalido('Es un nombre inválido.', params={'value': nombres})
+        return nombres
+
+    def validate_apellidos(self, apellidos: str) -> str:
+        if not es_un_nombre_valido(apellidos):
+            raise NombreInvalido('Es un apellido inválido.', params={'value': apellidos})
+        return apellidos
+
+    def validate(self, attrs: dict) -> dict:
+        invitar = self.context.get('invitar', False)
+        if invitar and attrs.get('password'):
+            raise serializers.ValidationError(
+                {'password': _("No se admiten contraseñas al enviar invitaciones.")}
+            )
+        if not invitar and not attrs.get('password'):
+            raise serializers.ValidationError({'password': _("Este campo es obligatorio.")})
+        return attrs
+
+class InvitacionSerializer(serializers.Serializer):
+    """
+    Serializer para aceptar la invitación de un trabajador incorporado
+    en bloque y asignar su contraseña.
+    """
+    usuario = serializers.IntegerField(help_text=_("Id del usuario invitado."))
+    token = serializers.CharField(help_text=_("Token de la invitación."))
+    password = serializers.CharField(
+        write_only=True,
+        style={'input_type': 'password'},
+        help_text=_("Contraseña del usuario.")
+    )
+    password_validator = serializers.CharField(
+        write_only=True,
+        style={'input_type': 'password'},
+        help_text=_("Campo para confirmar la contraseña del usuario.")
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        if attrs['password'] != attrs.pop('password_validator'):
+            raise ErrorDeConfirmacionDeContrasena()
+        return attrs
@@ -0,0 +1,17 @@
+"""signals.py
+
+Conecta la generación de las miniaturas de la fotografía de los perfiles de
+usuario y la invalidación de la empresa y del token de cada usuario guardados
+en caché (ver `alcance.py` y `autenticacion.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from administracion_vehicular.alcance import conectar_perfiles
+from administracion_vehicular.autenticacion import conectar_tokens
+from administracion_vehicular.imagenes import conectar_miniaturas
+
+from .models import PerfilUsuario
+
+conectar_miniaturas([PerfilUsuario], ['fotografia'])
+conectar_perfiles([PerfilUsuario])
+conectar_tokens([PerfilUsuario])
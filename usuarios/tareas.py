@@ -0,0 +1,30 @@
+"""tareas.py
+
+Este módulo registra la incorporación en bloque de trabajadores como tarea
+en segundo plano (ver `tareas/registro.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from typing import Optional
+
+from tareas.registro import tarea
+
+from empresas.models import Empresa
+
+from .incorporacion import incorporar_trabajadores
+
+# Las filas incluyen contraseñas: no se conservan en la tabla de tareas
+# después de empezar la ejecución, por lo que la tarea no se reintenta.
+@tarea('usuarios.incorporar_trabajadores', conservar_argumentos=False)
+def incorporar_trabajadores_en_bloque(
+    filas: list,
+    invitar: bool = False,
+    empresa: Optional[int] = None,
+    todas_las_empresas: bool = False
+) -> dict:
+    """Registra en bloque a los trabajadores de una empresa (o de todas, para
+    los usuarios del personal)."""
+    empresas = Empresa.objects.all()
+    if not todas_las_empresas:
+        empresas = empresas.filter(id=empresa)
+    return incorporar_trabajadores(filas, invitar=invitar, empresas=empresas)
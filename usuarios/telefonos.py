@@ -0,0 +1,81 @@
+"""telefonos.py
+
+Este módulo normaliza y valida los números de teléfono de los perfiles de
+usuario y de las empresas.
+
+Analizar un número con `phonenumbers` es costoso y, al guardar un perfil
+desde la API, el mismo número se valida en el serializer y otra vez en el
+validador del campo del modelo. Por eso:
+    - `normalizar_telefono` guarda en una caché LRU acotada
+      (`TELEFONOS_CACHE_TAMANIO` entradas) la forma E.164 de cada número
+      (p. ej. `+593987129357`), o None si el número no es válido. Esa forma
+      se guarda en el campo indexado `telefono_e164` de los modelos.
+    - `normalizar_telefonos` normaliza en lote los números de una importación,
+      analizando una sola vez cada número distinto.
+    - La biblioteca `phonenumbers` (y sus metadatos de todas las regiones)
+      se importa con el primer número analizado y no al iniciar el proceso.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+
+REGION_POR_DEFECTO = 'EC'
+
+@lru_cache(maxsize=getattr(settings, 'TELEFONOS_CACHE_TAMANIO', 8192))
+def normalizar_telefono(telefono: str, region: str = REGION_POR_DEFECTO) -> Optional[str]:
+    """
+    Devuelve la forma E.164 de un número de teléfono o celular.
+
+    Args:
+        - telefono (str): El número a normalizar, en formato nacional o internacional.
+        - region (str): Región de los números en formato nacional.
+    Returns:
+        - str: El número en formato E.164, o None si no es un número válido.
+    """
+    if not isinstance(telefono, str):
+        return None
+    # Importación diferida: la primera llamada carga la biblioteca.
+    import phonenumbers
+    try:
+        numero = phonenumbers.parse(telefono, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(numero):
+        return None
+    return phonenumbers.format_number(numero, phonenumbers.PhoneNumberFormat.E164)
+
+def normalizar_telefonos(
+    telefonos: Iterable[str], region: str = REGION_POR_DEFECTO
+) -> List[Optional[str]]:
+    """
+    Normaliza en lote los números de teléfono de una importación.
+
+    Args:
+        - telefonos (Iterable[str]): Los números a normalizar.
+        - region (str): Región de los números en formato nacional.
+    Returns:
+        - list: La forma E.164 de cada número (None para los inválidos),
+          en el mismo orden.
+    """
+    telefonos = list(telefonos)
+    normalizados = {
+        telefono: normalizar_telefono(telefono, region)
+        for telefono in set(telefonos)
+    }
+    return [normalizados[telefono] for telefono in telefonos]
+
+class TelefonoNormalizadoMixin:
+    """
+    Mixin para modelos con los campos `telefono` y `telefono_e164`:
+    guarda la forma E.164 del teléfono junto con el modelo.
+    """
+
+    def save(self, *args, **kwargs):
+        self.telefono_e164 = normalizar_telefono(self.telefono) or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'telefono' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telefono_e164'}
+        super().save(*args, **kwargs)
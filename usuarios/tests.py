@@ -9,12 +9,35 @@ Dependencias: django.test.TestCase, django.contrib.auth.models.User,
     .utils.es_un_numero_de_telefono_valido
 """
 from datetime import date, timedelta
+import json
 import random
 import unittest
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient
 
+from administracion_vehicular.autenticacion import clave_token, leer_datos, token_de_los_datos
+from administracion_vehicular.cache import CONTADORES, obtener_estadisticas
+from administracion_vehicular.middleware import PresupuestoConsultasExcedido
+
+from empresas.models import Empresa, Suscripcion
+from vehiculos.views import KilometrajeView
+
+from .enums import EstadoCivil, NivelEducacion, Roles
 from .exceptions import CedulaInvalida
+from .models import PerfilUsuario
+from .incorporacion import hashear_contrasenas
+from .serializers import PerfilSerializer
+from .telefonos import normalizar_telefono, normalizar_telefonos
+from .views import PerfilView
 from .validators import (
     es_una_cedula_valida,
     es_un_numero_de_telefono_valido,
@@ -176,6 +199,366 @@ class UtilsTestCase(TestCase):
             else:
                 self.assertFalse(es_mayor_de_edad(fecha_nacimiento))
 
+def crear_empresa(nombre: str = "Transportes Andinos") -> Empresa:
+    """Crea una empresa con su suscripción para las pruebas."""
+    suscripcion = Suscripcion.objects.create(
+        tipo="Básica",
+        fecha_emision=date(2023, 1, 1),
+        fecha_caducidad=date(2033, 1, 1),
+        precio=100
+    )
+    return Empresa.objects.create(
+        nombre_comercial=nombre,
+        suscripcion=suscripcion,
+        ruc="1790012345001",
+        direccion="Av. Amazonas",
+        correo="contacto@andinos.ec",
+        telefono="0987129357"
+    )
+
+def crear_perfil(empresa: Empresa, indice: int, role: Roles = Roles.CONDUCTOR) -> PerfilUsuario:
+    """Crea un usuario con su perfil dentro de la empresa indicada."""
+    email = f"usuario{indice}@{empresa.id}.ec"
+    user = User.objects.create(
+        username=email,
+        email=email,
+        first_name=f"Nombre{indice}",
+        last_name=f"Apellido{indice}"
+    )
+    return PerfilUsuario.objects.create(
+        user=user,
+        empresa=empresa,
+        role=role.value,
+        cedula=generar_cedula_ecuatoriana(),
+        email=email,
+        telefono="0987129357",
+        fecha_nacimiento=date(1990, 1, 1),
+        nivel_educacion=NivelEducacion.SUPERIOR.value,
+        estado_civil=EstadoCivil.SOLTERO.value
+    )
+
+class TelefonosTestCase(TestCase):
+    """Pruebas de la normalización de números de teléfono."""
+
+    def test_normalizar_telefono(self):
+        """Devuelve la forma E.164 de los números válidos y None de los inválidos."""
+        self.assertEqual(normalizar_telefono("0987129357"), "+593987129357")
+        self.assertEqual(normalizar_telefono("593987129357"), "+593987129357")
+        self.assertIsNone(normalizar_telefono("098712935"))
+        self.assertIsNone(normalizar_telefono(None))
+
+    def test_cache(self):
+        """Cada número se analiza una sola vez mientras permanece en la caché."""
+        normalizar_telefono.cache_clear()
+        for _ in range(3):
+            es_un_numero_de_telefono_valido("0991234567")
+        informacion = normalizar_telefono.cache_info()
+        self.assertEqual((informacion.misses, informacion.hits), (1, 2))
+
+    def test_normalizar_telefonos(self):
+        """El lote conserva el orden y analiza cada número distinto una vez."""
+        normalizar_telefono.cache_clear()
+        self.assertEqual(
+            normalizar_telefonos(["0987129357", "abc", "0987129357"]),
+            ["+593987129357", None, "+593987129357"]
+        )
+        self.assertEqual(normalizar_telefono.cache_info().misses, 2)
+
+    def test_telefono_e164_al_guardar(self):
+        """Los perfiles y empresas guardan su teléfono normalizado."""
+        empresa = crear_empresa()
+        perfil = crear_perfil(empresa, 1)
+        self.assertEqual(empresa.telefono_e164, "+593987129357")
+        perfil.telefono = "0991234567"
+        perfil.save(update_fields=['telefono'])
+        perfil.refresh_from_db()
+        self.assertEqual(perfil.telefono_e164, "+593991234567")
+
+class PerfilSerializerTestCase(TestCase):
+    """Pruebas del número de consultas al serializar perfiles de usuario."""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+
+    def contar_consultas(self, total: int) -> int:
+        """Crea perfiles hasta `total` y cuenta las consultas al serializarlos."""
+        for indice in range(PerfilUsuario.objects.count(), total):
+            crear_perfil(self.empresa, indice)
+        with CaptureQueriesContext(connection) as consultas:
+            data = PerfilSerializer(
+                PerfilUsuario.objects.filter(empresa=self.empresa), many=True
+            ).data
+        self.assertEqual(len(data), total)
+        return len(consultas)
+
+    def test_nombres_y_apellidos(self):
+        """Los nombres y apellidos se obtienen del usuario asociado al perfil."""
+        perfil = crear_perfil(self.empresa, 1)
+        data = PerfilSerializer(perfil).data
+        self.assertEqual(data['nombres'], "Nombre1")
+        self.assertEqual(data['apellidos'], "Apellido1")
+
+    def test_consultas_constantes_al_serializar_listas(self):
+        """El número de consultas no crece con el número de perfiles."""
+        self.assertEqual(self.contar_consultas(2), 1)
+        self.assertEqual(self.contar_consultas(20), 1)
+
+    def test_consultas_constantes_en_search_by(self):
+        """El endpoint `search_by` no realiza una consulta por cada perfil."""
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        url = f"/api/v1/perfiles/search_by/?empresa_id={self.empresa.id}"
+
+        crear_perfil(self.empresa, 1)
+        with CaptureQueriesContext(connection) as pocas:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for indice in range(2, 30):
+            crear_perfil(self.empresa, indice)
+        with CaptureQueriesContext(connection) as muchas:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(pocas), len(muchas))
+
+class IncorporacionTestCase(TestCase):
+    """Pruebas de la incorporación en bloque de trabajadores."""
+
+    URL = "/api/v1/perfiles/bulk/"
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        crear_perfil(self.empresa, 1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def fila(self, email: str, **datos) -> dict:
+        fila = {
+            "empresa": self.empresa.id,
+            "nombres": "Ana María",
+            "apellidos": "Torres",
+            "role": Roles.CONDUCTOR.value,
+            "cedula": generar_cedula_ecuatoriana(),
+            "email": email,
+            "telefono": "0991234567",
+            "fecha_nacimiento": "1990-05-01",
+            "nivel_educacion": NivelEducacion.SUPERIOR.value,
+            "estado_civil": EstadoCivil.SOLTERO.value,
+        }
+        fila.update(datos)
+        return fila
+
+    @override_settings(INCORPORACION_PROCESOS=1)
+    def test_incorporacion_json_con_reporte_de_errores(self):
+        filas = [
+            self.fila("nuevo1@andinos.ec", password="clave-segura-1"),
+            self.fila(f"usuario1@{self.empresa.id}.ec", password="clave"),
+            self.fila("nuevo2@andinos.ec", password="clave", cedula="1234567890"),
+            self.fila("nuevo1@andinos.ec", password="clave"),
+            self.fila("nuevo3@andinos.ec", password="clave", empresa=999999),
+            self.fila("nuevo4@andinos.ec"),
+            self.fila("nuevo5@andinos.ec", password="clave", empresa=10 ** 30),
+        ]
+        # Empresas, emails registrados, los INSERT y los savepoints,
+        # sin importar el número de filas.
+        with self.assertNumQueries(6):
+            response = self.client.post(self.URL, filas, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['recibidas'], response.data['creados']), (7, 1))
+        errores = {error['fila']: set(error['errores']) for error in response.data['errores']}
+        self.assertEqual(errores, {
+            1: {'email'}, 2: {'cedula'}, 3: {'email'}, 4: {'empresa'}, 5: {'password'},
+            6: {'empresa'}
+        })
+        perfil = PerfilUsuario.objects.select_related('user').get(
+            id=response.data['trabajadores'][0]['id']
+        )
+        self.assertEqual(perfil.user.first_name, "Ana María")
+        self.assertEqual(perfil.telefono_e164, "+593991234567")
+        self.assertTrue(perfil.user.check_password("clave-segura-1"))
+
+    def test_incorporacion_csv_con_invitaciones(self):
+        fila = self.fila("invitado@andinos.ec")
+        csv = ",".join(fila) + "\r\n" + ",".join(str(valor) for valor in fila.values()) + "\r\n"
+        response = self.client.post(
+            f"{self.URL}?invitar=true", csv.encode("utf-8-sig"), content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, 201)
+        invitado = response.data['trabajadores'][0]
+        self.assertFalse(User.objects.get(id=invitado['usuario']).has_usable_password())
+
+        aceptar = "/api/v1/perfiles/aceptar_invitacion/"
+        datos = {
+            "usuario": invitado['usuario'], "token": invitado['token'],
+            "password": "nueva-clave", "password_validator": "nueva-clave",
+        }
+        anonimo = APIClient()
+        self.assertEqual(anonimo.post(aceptar, datos, format="json").status_code, 200)
+        self.assertTrue(User.objects.get(id=invitado['usuario']).check_password("nueva-clave"))
+        # El token es de un solo uso:
+        self.assertEqual(anonimo.post(aceptar, datos, format="json").status_code, 400)
+
+    def test_contrasenas_con_invitaciones(self):
+        """Con invitaciones no se admiten contraseñas."""
+        response = self.client.post(
+            f"{self.URL}?invitar=true", [self.fila("x@andinos.ec", password="clave")],
+            format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data['errores'][0]['errores'])
+
+    @override_settings(INCORPORACION_PROCESOS=2)
+    def test_hash_en_paralelo(self):
+        hashes = hashear_contrasenas(["uno", "dos", "tres"])
+        self.assertEqual(len(set(hashes)), 3)
+        for contrasena, hash_ in zip(["uno", "dos", "tres"], hashes):
+            self.assertTrue(check_password(contrasena, hash_))
+
+@override_settings(AUTENTICACION_CACHE=True)
+class AutenticacionCacheTestCase(TestCase):
+    """Pruebas de la caché de los tokens de autenticación."""
+
+    URL = "/api/v1/perfiles/"
+
+    def setUp(self):
+        cache.clear()
+        # Descarta los contadores que otras pruebas acumularon en el proceso:
+        CONTADORES.vaciar()
+        self.empresa = crear_empresa()
+        self.perfil = crear_perfil(self.empresa, 1)
+        self.token = Token.objects.create(user=self.perfil.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_en_cache(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.URL).status_code, 200)
+        # El token, el usuario y la empresa del perfil salen de la caché:
+        with self.assertNumQueries(1):
+            response = self.client.get(self.URL)
+        self.assertEqual([fila['id'] for fila in response.data['results']], [self.perfil.id])
+        self.assertEqual(
+            obtener_estadisticas()['autenticacion'],
+            {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5}
+        )
+        self.assertNotIn(self.token.key, str(cache._cache.keys()))
+
+    def test_la_cache_no_guarda_el_usuario(self):
+        """Se guardan los datos del token, no el usuario con el hash de su contraseña."""
+        self.perfil.user.set_password("clave-secreta")
+        self.perfil.user.save()
+        self.client.get(self.URL)
+        datos = cache.get(clave_token(self.token.key))
+        self.assertEqual(
+            datos, (self.perfil.user.id, self.perfil.user.username, True, False, False,
+                    self.perfil.id, self.empresa.id)
+        )
+        # El usuario y el perfil se reconstruyen sin consultas; el resto de sus
+        # campos se cargan solo si se usan.
+        with self.assertNumQueries(0):
+            token = token_de_los_datos(self.token.key, leer_datos(datos))
+            self.assertEqual(token.user.perfilusuario.empresa_id, self.empresa.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(token.user.email, self.perfil.user.email)
+
+    @override_settings(CACHE_ESTADISTICAS_LOTE=3, CACHE_ESTADISTICAS_INTERVALO=3600)
+    def test_contadores_por_lote(self):
+        """Los aciertos y fallos se suman a la caché por lotes."""
+        clave = 'respuestas:aciertos:autenticacion'
+        for _ in range(3):
+            self.client.get(self.URL)
+        self.assertEqual(cache.get(clave), 2)
+        self.client.get(self.URL)
+        self.assertEqual(cache.get(clave), 2)
+        self.assertEqual(obtener_estadisticas()['autenticacion']['aciertos'], 3)
+
+    def test_invalidacion_al_guardar_usuario_y_perfil(self):
+        self.client.get(self.URL)
+        otra = crear_empresa("Otra")
+        self.perfil.empresa = otra
+        self.perfil.save()
+        response = self.client.get(self.URL)
+        self.assertEqual([fila['empresa'] for fila in response.data['results']], [otra.id])
+
+        self.perfil.user.is_active = False
+        self.perfil.user.save()
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
+
+    def test_cerrar_sesion(self):
+        self.client.get(self.URL)
+        self.assertEqual(self.client.post("/api/v1/sesion/cerrar/").status_code, 204)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
+
+    def test_rotar_token(self):
+        self.client.get(self.URL)
+        response = self.client.post("/api/v1/sesion/rotar_token/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+@override_settings(PERFILADOR_CONSULTAS=True, PERFILADOR_CONSULTAS_ESTRICTO=True)
+class PerfiladorConsultasTestCase(TestCase):
+    """Pruebas del perfilador de consultas y de los presupuestos de las vistas."""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        for indice in range(5):
+            crear_perfil(self.empresa, indice)
+        user = User.objects.create(username="admin", is_staff=True)
+        self.token = Token.objects.create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cabecera_server_timing_y_log(self):
+        with self.assertLogs('administracion_vehicular.consultas', level='INFO') as logs:
+            response = self.client.get("/api/v1/perfiles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;desc="2 consultas"', response['Server-Timing'])
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['ruta'], "/api/v1/perfiles/")
+        self.assertEqual(registro['consultas'], 2)
+        self.assertEqual(registro['duplicadas'], {})
+
+    def test_presupuesto_excedido(self):
+        """Una regresión N+1 (el usuario de cada perfil) supera el presupuesto."""
+        with mock.patch.object(PerfilView, 'queryset', PerfilUsuario.objects.all()), \
+                mock.patch.object(PerfilSerializer.Meta, 'list_serializer_class', ListSerializer):
+            with self.assertLogs('administracion_vehicular.consultas', level='INFO') as logs:
+                with self.assertRaises(PresupuestoConsultasExcedido):
+                    self.client.get("/api/v1/perfiles/")
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(list(registro['duplicadas'].values()), [5])
+
+    def test_exportacion_en_flujo(self):
+        """Las consultas de una exportación se cuentan al terminar de enviarla."""
+        url = f"/api/v1/kilometrajes/exportar/?empresa_id={self.empresa.id}"
+        with self.assertLogs('administracion_vehicular.consultas', level='INFO') as logs:
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('Server-Timing'))
+            b''.join(response.streaming_content)
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['ruta'], "/api/v1/kilometrajes/exportar/")
+        self.assertEqual(registro['consultas'], 2)
+        with mock.patch.object(KilometrajeView, 'presupuesto_consultas', {'exportar': 0}), \
+                self.assertLogs('administracion_vehicular.consultas', level='INFO'):
+            response = self.client.get(url)
+            with self.assertRaises(PresupuestoConsultasExcedido):
+                b''.join(response.streaming_content)
+
+    async def test_vista_asincrona(self):
+        """Las peticiones asíncronas se perfilan sin adaptarlas a un hilo."""
+        with self.assertLogs('administracion_vehicular.consultas', level='INFO') as logs:
+            response = await self.async_client.get(
+                "/api/v1/async/vehiculos/0/estado/",
+                AUTHORIZATION=f"Token {self.token.key}"
+            )
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('db;desc="2 consultas"', response['Server-Timing'])
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['consultas'], 2)
+
 class TestSuite(TestCase):
     """
     Todos los tests agrupados en uno.
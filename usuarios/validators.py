@@ -2,15 +2,23 @@ from datetime import date
 import random
 import re
 
-import phonenumbers
-
 from .exceptions import (
     CedulaInvalida,
     FechaDeNacimientoInvalida,
     NombreInvalido,
     TelefonoInvalido
 )
+from .telefonos import normalizar_telefono
+
+# Patrones compilados una sola vez al importar el módulo:
+# Cédula: código de provincia (00-24 o 30), tercer dígito (0-6) y siete dígitos más.
+PATRON_CEDULA = re.compile(r'(?:[01][0-9]|2[0-4]|30)[0-6][0-9]{7}')
+PATRON_NOMBRE = re.compile(r'^[A-Za-zÁ-ú ]+$')
 
+# Valor que aporta cada dígito con coeficiente 2 en el algoritmo Módulo 10
+# (el doble del dígito, menos 9 si es mayor que 9); y el de los demás dígitos.
+VALOR_COEFICIENTE_2 = {str(digito): digito * 2 - 9 * (digito >= 5) for digito in range(10)}
+VALOR_COEFICIENTE_1 = {str(digito): digito for digito in range(10)}
 
 def calcular_digito_de_verificacion(cedula: str) -> int:
     """
@@ -22,11 +30,8 @@ def calcular_digito_de_verificacion(cedula: str) -> int:
         - int: El dígito de verificación calculado.
     Based on: https://publiblog-ec.blogspot.com/2019/01/verificador-cedula-ciudadania.html
     """
-    coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-    total = sum(map(
-        lambda x: x[0] if x[0] < 10 else x[0] - 9,
-        [(int(cedula[i]) * coeficientes[i],) for i in range(9)]
-    ))
+    total = sum(map(VALOR_COEFICIENTE_2.__getitem__, cedula[0:9:2])) \
+        + sum(map(VALOR_COEFICIENTE_1.__getitem__, cedula[1:9:2]))
     return (10 - total % 10) % 10
 
 def generar_cedula_ecuatoriana() -> str:
@@ -85,21 +90,11 @@ def es_una_cedula_valida(cedula: str) -> bool:
     Returns:
         - bool: `True` si la cédula es válida, `False` en caso contrario.
     """
-    # Check if the id_number has 10 digits and only contains numeric characters
-    if not cedula.isdigit() or len(cedula) != 10:
-        return False
-    # Check if the first two digits are between 0 and 24 or equal to 30
-    codigo_provincial = int(cedula[:2])
-    if not (0 <= codigo_provincial <= 24 or codigo_provincial == 30):
+    # Verificar el formato: 10 dígitos, código provincial y tercer dígito
+    if PATRON_CEDULA.fullmatch(cedula) is None:
         return False
-    # Check if the third digit is less than or equal to 6
-    tercer_digito = int(cedula[2])
-    if tercer_digito > 6:
-        return False
-    # Calculate the verification digit using the Module 10 algorithm
-    digito_de_verificacion_calculado = calcular_digito_de_verificacion(cedula)
-     # Check if the calculated verification digit matches the given verification digit
-    return digito_de_verificacion_calculado == int(cedula[9])
+    # Comparar con el dígito de verificación (algoritmo Módulo 10)
+    return calcular_digito_de_verificacion(cedula) == VALOR_COEFICIENTE_1[cedula[9]]
 
 def es_bisiesto(year: int) -> bool:
     """Verifica si un año es bisiesto.
@@ -152,11 +147,7 @@ def es_un_numero_de_telefono_valido(telefono: str) -> bool:
     Returns:
         - bool: True si el número es válido, False en caso contrario.
     """
-    try:
-        parsed_number = phonenumbers.parse(telefono, "EC")
-        return phonenumbers.is_valid_number(parsed_number)
-    except phonenumbers.phonenumberutil.NumberParseException:
-        return False
+    return normalizar_telefono(telefono) is not None
 
 def es_un_nombre_valido(nombres:str) -> bool:
     """
@@ -168,8 +159,7 @@ def es_un_nombre_valido(nombres:str) -> bool:
     """
     if nombres.strip() == "":
         return False
-    patron = re.compile(r'^[A-Za-zÁ-ú ]+$')
-    if patron.match(nombres):
+    if PATRON_NOMBRE.match(nombres):
         palabras = nombres.count(' ') + 1
         if palabras >= 1:
             return True
@@ -6,18 +6,31 @@ Autor: Christopher Villamarín (@xeland314)
 """
 import coreapi
 import coreschema
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from rest_framework.authentication import TokenAuthentication
+from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.schemas import AutoSchema
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import status
 
+from administracion_vehicular.alcance import AlcanceEmpresaMixin, es_global, obtener_empresa_id
+from administracion_vehicular.autenticacion import TokenCacheAuthentication
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro
+from administracion_vehicular.parsers import CSVParser, NDJSONParser
+
+from empresas.models import Empresa
+from tareas.registro import encolar
+from tareas.views import respuesta_tarea
+
+from .enums import Roles
+from .incorporacion import aceptar_invitacion, incorporar_trabajadores
 from .models import PerfilUsuario
-from .serializers import PerfilSerializer
+from .serializers import InvitacionSerializer, PerfilSerializer
+from .tareas import incorporar_trabajadores_en_bloque
 
 class UserFilterSchema(AutoSchema):
 
@@ -27,6 +40,8 @@ class UserFilterSchema(AutoSchema):
         """
         if path.endswith('/search_by/'):
             return 'Filtra los perfiles de usuario por empresa y rol.'
+        if path.endswith('/bulk/'):
+            return 'Registra en bloque a los trabajadores (JSON, NDJSON o CSV).'
         return super().get_description(path, method)
 
     def get_manual_fields(self, path: str, method):
@@ -58,16 +73,51 @@ class UserFilterSchema(AutoSchema):
                     description='El rol de los usuarios a filtrar.'
                 )
             ]
+        if path.endswith('/bulk/'):
+            extra_fields = [
+                coreapi.Field(
+                    name='invitar',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Invitar',
+                        description='Crear los usuarios sin contraseña y devolver'
+                                    ' un token de invitación por usuario.'
+                    ),
+                    description='Enviar invitaciones en lugar de contraseñas.'
+                ),
+                coreapi.Field(
+                    name='asincrono',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Asíncrono',
+                        description=(
+                            'Encola la operación como tarea en segundo plano'
+                            ' (respuesta 202 con la URL de la tarea)'
+                        )
+                    )
+                )
+            ]
         return super().get_manual_fields(path, method) + extra_fields
 
-class PerfilView(ModelViewSet):
+class PerfilView(AlcanceEmpresaMixin, BusquedaMixin, ModelViewSet):
     """
     Perfiles de usuario
     """
-    queryset = PerfilUsuario.objects.all()
+    queryset = PerfilUsuario.objects.select_related('user')
     serializer_class = PerfilSerializer
+    presupuesto_consultas = {
+        'list': 2, 'retrieve': 2, 'search_by': 3, 'search': 3, 'bulk': 8,
+        'aceptar_invitacion': 2
+    }
+    parametros_busqueda = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('role', tipo=str, opciones=[rol.value for rol in Roles]),
+    )
+    parametros_search = (Parametro('email', tipo=str), Parametro('cedula', tipo=str))
     permission_classes =  [IsAuthenticated,]
-    authentication_class = (TokenAuthentication,)
+    authentication_class = (TokenCacheAuthentication,)
 
     @action(detail=False, methods=['get'], schema=UserFilterSchema())
     def search_by(self, request: Request):
@@ -84,27 +134,7 @@ class PerfilView(ModelViewSet):
         Raises:
             ValidationError: Si los parámetros de búsqueda no son válidos.
         """
-        empresa_id = request.query_params.get('empresa_id')
-        role = request.query_params.get('role')
-
-        if empresa_id and role:
-            queryset = PerfilUsuario.objects.filter(empresa_id=empresa_id, role=role)
-        elif empresa_id:
-            queryset = PerfilUsuario.objects.filter(empresa_id=empresa_id)
-        else:
-            return Response(
-                {"error": _("Parámetros de búsqueda incorrectos.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if not queryset.exists():
-            return Response(
-                {"error": _("No se ha encontrado ningún usuario con este rol en esta empresa")},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        serializer = PerfilSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.buscar(request)
 
     @action(detail=False, methods=['get'])
     def search(self, request: Request):
@@ -129,24 +159,92 @@ class PerfilView(ModelViewSet):
             - Un objeto Response con la información del usuario en formato JSON,
             o un mensaje de error si ocurre algún problema.
         """
-        email = request.query_params.get('email')
-        cedula = request.query_params.get('cedula')
-
-        if email:
-            queryset = PerfilUsuario.objects.filter(email=email)
-        elif cedula:
-            queryset = PerfilUsuario.objects.filter(cedula=cedula)
-        else:
+        return self.buscar_uno(
+            request, self.parametros_search, solo_el_primero=True
+        )
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[JSONParser, NDJSONParser, CSVParser],
+        schema=UserFilterSchema()
+    )
+    def bulk(self, request: Request):
+        """Registra en bloque a los trabajadores de una o varias empresas.
+
+        El cuerpo de la petición puede ser un arreglo JSON, un flujo NDJSON
+        (`application/x-ndjson`) o un archivo CSV (`text/csv`) con un
+        trabajador por fila. Con `?invitar=true` no se reciben contraseñas y
+        el reporte incluye el token de invitación de cada usuario creado.
+        Con `?asincrono=true` la incorporación se encola como tarea en segundo
+        plano y el reporte queda en el resultado de la tarea.
+
+        Args:
+            request (Request): La petición HTTP con los trabajadores.
+
+        Returns:
+            Response: El reporte de la incorporación con estado 201 si se creó
+            al menos un trabajador, 400 si el cuerpo es inválido o se
+            rechazaron todas las filas, o la tarea encolada con estado 202.
+        """
+        filas = request.data
+        if not isinstance(filas, list):
             return Response(
-                {"error": _("Parámetros de búsqueda incorrectos.")},
+                {"error": _("Se esperaba una lista de trabajadores.")},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        if not queryset.exists():
+        maximo = getattr(settings, 'INCORPORACION_MAX_FILAS', 5000)
+        if len(filas) > maximo:
             return Response(
-                {"error": _("No se ha encontrado ningún usuario con estos datos")},
-                status=status.HTTP_404_NOT_FOUND
+                {"error": _("Se admiten como máximo %(maximo)s trabajadores por petición.")
+                    % {'maximo': maximo}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invitar = request.query_params.get('invitar', 'false').lower() == 'true'
+        if request.query_params.get('asincrono', '').lower() in ('1', 'true'):
+            empresa_id = obtener_empresa_id(request)
+            tarea = encolar(
+                incorporar_trabajadores_en_bloque,
+                empresa_id=empresa_id,
+                usuario=request.user,
+                filas=filas,
+                invitar=invitar,
+                empresa=empresa_id,
+                todas_las_empresas=es_global(request),
             )
+            return respuesta_tarea(request, tarea)
+        reporte = incorporar_trabajadores(
+            filas, invitar=invitar,
+            empresas=self.limitar_a_empresa(Empresa.objects.all(), 'id')
+        )
+        codigo = status.HTTP_201_CREATED if reporte['creados'] or not filas \
+            else status.HTTP_400_BAD_REQUEST
+        return Response(reporte, status=codigo)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[AllowAny],
+        authentication_classes=[],
+        serializer_class=InvitacionSerializer
+    )
+    def aceptar_invitacion(self, request: Request):
+        """Asigna la contraseña de un trabajador invitado en la incorporación en bloque.
 
-        serializer = PerfilSerializer(queryset.first())
-        return Response(serializer.data)
+        Args:
+            request (Request): La petición HTTP con el id del usuario, el token
+                de la invitación y la contraseña con su confirmación.
+
+        Returns:
+            Response: 200 si se asignó la contraseña, o 400 si los datos son
+            inválidos o el token no es válido, ya se usó o expiró.
+        """
+        serializer = InvitacionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        usuario = aceptar_invitacion(**serializer.validated_data)
+        if usuario is None:
+            return Response(
+                {"error": _("La invitación no es válida o ha expirado.")},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"usuario": usuario.pk, "email": usuario.email})
@@ -0,0 +1,200 @@
+"""ingesta.py
+
+Este módulo registra en bloque las lecturas de odómetro enviadas por los
+equipos de telemetría (GPS) de los vehículos.
+
+En lugar de validar y guardar cada lectura por separado, las lecturas de
+una petición se procesan en conjunto:
+    - Se valida el formato de cada fila (vehículo, kilometraje, unidad y fecha).
+    - Dentro de una transacción se bloquean los vehículos de las filas
+      válidas (`KilometrajeActual.objects.bloquear`), de modo que las
+      ingestas simultáneas de un mismo vehículo se validan una tras otra.
+    - Se comprueba la existencia de todos los vehículos con una sola consulta
+      `IN`, que también trae la empresa y el kilometraje actual de cada uno.
+    - Se comprueba con `ValidadorKilometraje` que el kilometraje no retroceda
+      ni dé saltos inverosímiles respecto de las lecturas vecinas del vehículo,
+      guardadas o del mismo lote.
+    - Las filas válidas se insertan con `bulk_create` por lotes, en la misma
+      transacción, y se actualiza el kilometraje actual de los vehículos.
+
+Las filas inválidas no impiden guardar las demás; se devuelven en el reporte
+junto con su posición en la petición y los errores de cada campo. Las
+anomalías aceptadas se devuelven como advertencias.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.translation import gettext as _
+
+from administracion_vehicular.busqueda import ID_MAXIMO
+from administracion_vehicular.cache import invalidar
+
+from .models import Kilometraje, KilometrajeActual, Vehiculo
+from .odometro import FACTORES_KILOMETROS, ValidadorKilometraje
+
+# Mayor valor que admite `Kilometraje.kilometraje` (10 dígitos, 2 decimales):
+KILOMETRAJE_MAXIMO = Decimal('99999999.99')
+
+def parsear_fila(fila) -> Tuple[Optional[dict], Dict[str, str]]:
+    """Valida el formato de una lectura.
+
+    Args:
+        fila (dict): Lectura con las claves `vehiculo`, `kilometraje`,
+            `unidad` y `fecha` (ISO 8601).
+
+    Returns:
+        tuple: Los datos convertidos (o None si hay errores) y los errores
+        de cada campo.
+    """
+    if not isinstance(fila, dict):
+        return None, {'non_field_errors': _("Cada lectura debe ser un objeto.")}
+    errores = {}
+    datos = {}
+
+    vehiculo = fila.get('vehiculo')
+    if isinstance(vehiculo, bool) or not isinstance(vehiculo, (int, str)) \
+            or not re.fullmatch(r'[0-9]+', str(vehiculo)) or int(vehiculo) > ID_MAXIMO:
+        errores['vehiculo'] = _("Debe ser el id de un vehículo.")
+    else:
+        datos['vehiculo_id'] = int(vehiculo)
+
+    try:
+        kilometraje = Decimal(str(fila.get('kilometraje')))
+    except InvalidOperation:
+        kilometraje = None
+    if kilometraje is None or not kilometraje.is_finite() \
+            or not Decimal(0) <= kilometraje <= KILOMETRAJE_MAXIMO:
+        errores['kilometraje'] = _("Debe ser un número entre 0 y %(maximo)s.") % {
+            'maximo': KILOMETRAJE_MAXIMO
+        }
+    else:
+        datos['kilometraje'] = kilometraje.quantize(Decimal('0.01'))
+
+    unidad = fila.get('unidad')
+    if unidad not in FACTORES_KILOMETROS:
+        errores['unidad'] = _("Debe ser una de: %(unidades)s.") % {
+            'unidades': ', '.join(FACTORES_KILOMETROS)
+        }
+    else:
+        datos['unidad'] = unidad
+
+    try:
+        fecha = date.fromisoformat(fila.get('fecha'))
+    except (TypeError, ValueError):
+        errores['fecha'] = _("Debe ser una fecha con el formato AAAA-MM-DD.")
+    else:
+        if fecha > date.today():
+            errores['fecha'] = _("La fecha no puede ser posterior a la fecha actual.")
+        datos['fecha'] = fecha
+
+    return (None if errores else datos), errores
+
+def ingerir_kilometrajes(
+    filas: Iterable[dict],
+    batch_size: Optional[int] = None,
+    vehiculos: Optional[QuerySet] = None
+) -> dict:
+    """Valida y guarda en bloque un conjunto de lecturas de odómetro.
+
+    Args:
+        filas (Iterable[dict]): Las lecturas recibidas.
+        batch_size (int): Número de filas insertadas por consulta
+            (`INGESTA_KILOMETRAJE_BATCH_SIZE` por defecto).
+        vehiculos (QuerySet): Vehículos que pueden recibir lecturas (todos por
+            defecto); las lecturas de los demás se rechazan.
+
+    Returns:
+        dict: Reporte con el número de lecturas recibidas y creadas y la
+        lista de errores de cada fila rechazada (`fila` es su posición
+        en la petición, empezando en 0).
+    """
+    batch_size = batch_size or getattr(settings, 'INGESTA_KILOMETRAJE_BATCH_SIZE', 1000)
+    errores: Dict[int, Dict[str, str]] = {}
+    validas: List[Tuple[int, dict]] = []
+    recibidas = 0
+    for indice, fila in enumerate(filas):
+        recibidas += 1
+        datos, errores_fila = parsear_fila(fila)
+        if errores_fila:
+            errores[indice] = errores_fila
+        else:
+            validas.append((indice, datos))
+
+    with transaction.atomic():
+        # Los vehículos se bloquean antes de leer sus lecturas vecinas y hasta
+        # insertar las nuevas, para que dos ingestas simultáneas de un mismo
+        # vehículo no validen sus lecturas contra la misma bitácora:
+        vehiculos = Vehiculo.objects.all() if vehiculos is None else vehiculos
+        vehiculo_ids = {datos['vehiculo_id'] for _indice, datos in validas}
+        KilometrajeActual.objects.bloquear(vehiculo_ids, vehiculos)
+
+        # Existencia de los vehículos, su empresa y su kilometraje actual en una consulta:
+        actuales = {}
+        empresas = {}
+        for vehiculo_id, empresa_id, *actual in vehiculos.filter(
+            id__in=vehiculo_ids
+        ).values_list(
+            'id',
+            'empresa_id',
+            'kilometraje_actual__kilometraje',
+            'kilometraje_actual__unidad',
+            'kilometraje_actual__fecha',
+            'kilometraje_actual__lectura_id'
+        ):
+            actuales[vehiculo_id] = tuple(actual)
+            empresas[vehiculo_id] = empresa_id
+        existentes = []
+        for indice, datos in validas:
+            if datos['vehiculo_id'] in actuales:
+                existentes.append((indice, datos))
+            else:
+                errores[indice] = {'vehiculo': _("El vehículo no existe.")}
+
+        # Monotonía y saltos inverosímiles respecto de las lecturas vecinas:
+        errores_kilometraje, advertencias_kilometraje = ValidadorKilometraje().validar(
+            [datos for _indice, datos in existentes], actuales
+        )
+        aceptadas = []
+        advertencias = {}
+        for posicion, (indice, datos) in enumerate(existentes):
+            if posicion in errores_kilometraje:
+                errores[indice] = {'kilometraje': errores_kilometraje[posicion]}
+                continue
+            if posicion in advertencias_kilometraje:
+                advertencias[indice] = {'kilometraje': advertencias_kilometraje[posicion]}
+            aceptadas.append((
+                indice, Kilometraje(empresa_id=empresas[datos['vehiculo_id']], **datos)
+            ))
+
+        # Se insertan en el orden de la petición:
+        lecturas = [lectura for _indice, lectura in sorted(aceptadas, key=lambda item: item[0])]
+        creadas = Kilometraje.objects.bulk_create(lecturas, batch_size=batch_size)
+        if all(lectura.pk is not None for lectura in creadas):
+            KilometrajeActual.objects.registrar(creadas)
+        else:
+            # La base de datos no devuelve los ids de las filas insertadas.
+            KilometrajeActual.objects.reconstruir(
+                {lectura.vehiculo_id for lectura in creadas}
+            )
+        if creadas:
+            # `bulk_create` no emite `post_save` (ver signals.py):
+            transaction.on_commit(lambda: invalidar('kilometrajes'))
+
+    return {
+        'recibidas': recibidas,
+        'creadas': len(creadas),
+        'errores': [
+            {'fila': indice, 'errores': errores[indice]} for indice in sorted(errores)
+        ],
+        'advertencias': [
+            {'fila': indice, 'advertencias': advertencias[indice]}
+            for indice in sorted(advertencias)
+        ],
+    }
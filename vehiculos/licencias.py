@@ -0,0 +1,151 @@
+"""licencias.py
+
+Este módulo revisa en lote la caducidad de las licencias de conducir de los
+conductores de una empresa.
+
+`Licencia.esta_vigente` revisa una licencia a la vez; para saber qué
+licencias caducan pronto habría que recorrer todos los perfiles. El
+escaneo de una empresa realiza dos consultas, sin importar el número de
+conductores:
+    - Las licencias que caducan hasta dentro de `VENTANAS_ALERTA[-1]` días
+      (incluidas las ya caducadas), con una consulta por rango sobre el
+      índice `(empresa, fecha_de_caducidad)`. Se agrupan en `caducadas` y en la
+      primera ventana (7, 30 o 90 días) que contiene su caducidad.
+    - Las órdenes de movimiento abiertas (sin cierre) cuyo conductor tiene
+      la licencia caducada.
+
+El resumen se obtiene con el comando `escanear_licencias` (pensado para
+ejecutarse a diario, p. ej. con cron) o con la acción `caducidad` de las
+licencias. Las empresas con licencias caducadas, por caducar en la primera
+ventana u órdenes abiertas con licencia caducada se registran como avisos
+en el logger `vehiculos.licencias`.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date, timedelta
+import logging
+from typing import Iterable, List, Optional
+
+from django.db.models import F
+
+from empresas.models import Empresa
+from ordenes_de_mantenimiento.models import AperturaOrdenMovimiento
+
+from .models import Licencia
+
+logger = logging.getLogger('vehiculos.licencias')
+
+# Ventanas de alerta, en días hasta la caducidad:
+VENTANAS_ALERTA = (7, 30, 90)
+CADUCADAS = 'caducadas'
+
+def nombre_ventana(dias: int) -> str:
+    """Devuelve el nombre del grupo de una ventana de alerta."""
+    return f'{dias}_dias'
+
+def clasificar(fecha_de_caducidad: date, hoy: date) -> Optional[str]:
+    """Devuelve el grupo de una licencia según su fecha de caducidad.
+
+    Returns:
+        str: `caducadas`, el nombre de la primera ventana que contiene la
+        caducidad, o None si caduca después de la última ventana.
+    """
+    dias = (fecha_de_caducidad - hoy).days
+    if dias < 0:
+        return CADUCADAS
+    for ventana in VENTANAS_ALERTA:
+        if dias <= ventana:
+            return nombre_ventana(ventana)
+    return None
+
+def escanear_licencias(empresa_id: int, hoy: Optional[date] = None) -> dict:
+    """Revisa la caducidad de las licencias de los conductores de una empresa.
+
+    Args:
+        empresa_id (int): El id de la empresa.
+        hoy (date): Fecha de referencia, por defecto la fecha actual.
+
+    Returns:
+        dict: El número de licencias de cada grupo (`resumen`), las
+        licencias de cada grupo ordenadas por caducidad y las órdenes de
+        movimiento abiertas con la licencia del conductor caducada.
+    """
+    hoy = hoy or date.today()
+    grupos = {CADUCADAS: []}
+    grupos.update({nombre_ventana(ventana): [] for ventana in VENTANAS_ALERTA})
+    licencias = Licencia.objects.filter(
+        empresa_id=empresa_id,
+        fecha_de_caducidad__lte=hoy + timedelta(days=VENTANAS_ALERTA[-1])
+    ).values(
+        'id', 'tipo', 'fecha_de_caducidad', 'puntos', 'conductor_id',
+        'conductor__cedula', 'conductor__email',
+        'conductor__user__first_name', 'conductor__user__last_name',
+    ).order_by('fecha_de_caducidad', 'id')
+    for licencia in licencias:
+        grupos[clasificar(licencia['fecha_de_caducidad'], hoy)].append({
+            'id': licencia['id'],
+            'tipo': licencia['tipo'],
+            'fecha_de_caducidad': licencia['fecha_de_caducidad'],
+            'dias_restantes': (licencia['fecha_de_caducidad'] - hoy).days,
+            'puntos': licencia['puntos'],
+            'conductor': {
+                'id': licencia['conductor_id'],
+                'nombres': licencia['conductor__user__first_name'],
+                'apellidos': licencia['conductor__user__last_name'],
+                'cedula': licencia['conductor__cedula'],
+                'email': licencia['conductor__email'],
+            },
+        })
+
+    ordenes = list(AperturaOrdenMovimiento.objects.filter(
+        empresa_id=empresa_id,
+        cierreordenmovimiento__isnull=True,
+        conductor__licencias_conductores__fecha_de_caducidad__lt=hoy
+    ).values(
+        'id', 'fecha_salida_vehiculo', 'vehiculo_id', 'vehiculo__placa', 'conductor_id',
+        fecha_de_caducidad=F('conductor__licencias_conductores__fecha_de_caducidad'),
+    ).order_by('fecha_salida_vehiculo', 'id'))
+
+    return {
+        'empresa_id': empresa_id,
+        'fecha': hoy,
+        'resumen': {grupo: len(filas) for grupo, filas in grupos.items()},
+        'licencias': grupos,
+        'ordenes_abiertas_con_licencia_caducada': ordenes,
+    }
+
+def requiere_atencion(reporte: dict) -> bool:
+    """Indica si el reporte de una empresa contiene alertas urgentes."""
+    return bool(
+        reporte['resumen'][CADUCADAS]
+        or reporte['resumen'][nombre_ventana(VENTANAS_ALERTA[0])]
+        or reporte['ordenes_abiertas_con_licencia_caducada']
+    )
+
+def escanear_empresas(
+    empresas: Optional[Iterable[int]] = None, hoy: Optional[date] = None
+) -> List[dict]:
+    """Revisa las licencias de varias empresas y registra sus alertas.
+
+    Args:
+        empresas (Iterable[int]): Ids de las empresas (por defecto todas).
+        hoy (date): Fecha de referencia, por defecto la fecha actual.
+
+    Returns:
+        list: El reporte de cada empresa (ver `escanear_licencias`).
+    """
+    if empresas is None:
+        empresas = Empresa.objects.order_by('id').values_list('id', flat=True)
+    reportes = []
+    for empresa_id in empresas:
+        reporte = escanear_licencias(empresa_id, hoy)
+        if requiere_atencion(reporte):
+            logger.warning(
+                "Empresa %s: %s licencias caducadas, %s por caducar en %s días"
+                " y %s órdenes abiertas con licencia caducada.",
+                empresa_id, reporte['resumen'][CADUCADAS],
+                reporte['resumen'][nombre_ventana(VENTANAS_ALERTA[0])], VENTANAS_ALERTA[0],
+                len(reporte['ordenes_abiertas_con_licencia_caducada'])
+            )
+        reportes.append(reporte)
+    return reportes
@@ -0,0 +1,118 @@
+"""llantas.py
+
+Este módulo calcula la antigüedad de las llantas de los vehículos de una
+empresa a partir de su fecha de fabricación.
+
+La fecha de fabricación se obtiene del código DOT al guardar cada llanta
+(`Llanta.fecha_fabricacion`, ver `obtener_fecha_fabricacion`) y no en cada
+consulta. El reporte de una empresa realiza dos consultas, sin importar el
+número de llantas:
+    - Los totales de la empresa: llantas, llantas sin fecha de fabricación
+      (código DOT sin semana o año válidos) y llantas antiguas.
+    - Las llantas fabricadas antes del límite de antigüedad
+      (`LLANTAS_ANTIGUEDAD_MAXIMA` años por defecto), con una consulta por
+      rango sobre el índice de `fecha_fabricacion`, agrupadas por posición.
+
+Las llantas guardadas antes de existir la columna se completan con el
+comando `completar_fecha_fabricacion_llantas` (ver `completar_fechas_fabricacion`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.models import Count, Q, QuerySet
+
+from .enums import PosicionLlanta
+from .models import Llanta
+from .validators import obtener_fecha_fabricacion
+
+def completar_fechas_fabricacion(
+    llantas: QuerySet, batch_size: int = 1000, hoy: Optional[date] = None
+) -> int:
+    """Calcula y guarda la fecha de fabricación de un conjunto de llantas.
+
+    Cada código de fecha distinto (semana y año) se decodifica una sola vez
+    y las llantas se actualizan con `bulk_update` por lotes.
+
+    Args:
+        llantas (QuerySet): Las llantas a completar.
+        batch_size (int): Número de filas leídas y actualizadas por consulta.
+        hoy (date): Fecha de referencia para el siglo de los años de dos
+            dígitos, por defecto la fecha actual.
+
+    Returns:
+        int: El número de llantas actualizadas.
+    """
+    fechas: Dict[str, Optional[date]] = {}
+    pendientes = []
+    total = 0
+    for llanta in llantas.only('id', 'codigo_de_fabricacion').iterator(chunk_size=batch_size):
+        codigo = llanta.codigo_de_fabricacion[-4:]
+        if codigo not in fechas:
+            fechas[codigo] = obtener_fecha_fabricacion(codigo, hoy)
+        llanta.fecha_fabricacion = fechas[codigo]
+        pendientes.append(llanta)
+        if len(pendientes) >= batch_size:
+            total += Llanta.objects.bulk_update(pendientes, ['fecha_fabricacion'])
+            pendientes = []
+    if pendientes:
+        total += Llanta.objects.bulk_update(pendientes, ['fecha_fabricacion'])
+    return total
+
+def fecha_limite(anios: int, hoy: date) -> date:
+    """Devuelve la fecha de hace `anios` años (el 28 de febrero si hoy es 29)."""
+    try:
+        return hoy.replace(year=hoy.year - anios)
+    except ValueError:
+        return hoy.replace(year=hoy.year - anios, day=28)
+
+def reporte_antiguedad(
+    empresa_id: int, anios: Optional[int] = None, hoy: Optional[date] = None
+) -> dict:
+    """Lista las llantas de una empresa que superan la antigüedad máxima.
+
+    Args:
+        empresa_id (int): El id de la empresa.
+        anios (int): Antigüedad máxima en años (`LLANTAS_ANTIGUEDAD_MAXIMA`
+            por defecto).
+        hoy (date): Fecha de referencia, por defecto la fecha actual.
+
+    Returns:
+        dict: Los totales de la empresa y las llantas antiguas agrupadas por
+        posición, de la más antigua a la más reciente.
+    """
+    hoy = hoy or date.today()
+    anios = settings.LLANTAS_ANTIGUEDAD_MAXIMA if anios is None else anios
+    limite = fecha_limite(anios, hoy)
+    llantas = Llanta.objects.filter(vehiculo__empresa_id=empresa_id)
+    totales = llantas.aggregate(
+        total=Count('id'),
+        sin_fecha=Count('id', filter=Q(fecha_fabricacion__isnull=True)),
+        antiguas=Count('id', filter=Q(fecha_fabricacion__lte=limite)),
+    )
+
+    posiciones = {posicion.value: [] for posicion in PosicionLlanta}
+    antiguas = llantas.filter(fecha_fabricacion__lte=limite).values(
+        'id', 'vehiculo_id', 'vehiculo__placa', 'codigo_de_fabricacion',
+        'posicion_respecto_al_vehiculo', 'fecha_fabricacion',
+    ).order_by('fecha_fabricacion', 'id')
+    for llanta in antiguas:
+        posiciones.setdefault(llanta['posicion_respecto_al_vehiculo'], []).append({
+            'id': llanta['id'],
+            'vehiculo_id': llanta['vehiculo_id'],
+            'placa': llanta['vehiculo__placa'],
+            'codigo_de_fabricacion': llanta['codigo_de_fabricacion'],
+            'fecha_fabricacion': llanta['fecha_fabricacion'],
+            'antiguedad_anios': round((hoy - llanta['fecha_fabricacion']).days / 365.25, 1),
+        })
+
+    return {
+        'empresa_id': empresa_id,
+        'fecha': hoy,
+        'antiguedad_maxima': anios,
+        'fabricadas_hasta': limite,
+        'resumen': totales,
+        'posiciones': {posicion: filas for posicion, filas in posiciones.items() if filas},
+    }
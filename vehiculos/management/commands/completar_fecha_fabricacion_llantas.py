@@ -0,0 +1,39 @@
+"""completar_fecha_fabricacion_llantas.py
+
+Comando para calcular la fecha de fabricación de las llantas a partir de su
+código DOT (p. ej. las guardadas antes de existir la columna).
+
+Uso:
+    python manage.py completar_fecha_fabricacion_llantas [--todas] [--batch-size N]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.core.management.base import BaseCommand
+
+from vehiculos.llantas import completar_fechas_fabricacion
+from vehiculos.models import Llanta
+
+class Command(BaseCommand):
+    help = "Calcula la fecha de fabricación de las llantas a partir de su código DOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help="Recalcula todas las llantas (por defecto solo las que no tienen fecha)."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Número de filas leídas y actualizadas por consulta."
+        )
+
+    def handle(self, *args, **options):
+        llantas = Llanta.objects.all()
+        if not options['todas']:
+            llantas = llantas.filter(fecha_fabricacion__isnull=True)
+        total = completar_fechas_fabricacion(llantas, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Fecha de fabricación calculada para {total} llantas."
+        ))
@@ -0,0 +1,57 @@
+"""escanear_licencias.py
+
+Comando para revisar la caducidad de las licencias de los conductores de
+todas las empresas (o de las indicadas) y escribir el resumen de alertas.
+Está pensado para ejecutarse a diario, p. ej. con cron.
+
+Uso:
+    python manage.py escanear_licencias [--empresa ID ...] [--fecha AAAA-MM-DD]
+        [--salida ARCHIVO]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from vehiculos.licencias import CADUCADAS, escanear_empresas
+
+class Command(BaseCommand):
+    help = "Revisa la caducidad de las licencias de conducir y escribe el resumen de alertas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa',
+            type=int,
+            nargs='+',
+            dest='empresas',
+            help="Ids de las empresas a revisar (por defecto todas)."
+        )
+        parser.add_argument(
+            '--fecha',
+            type=date.fromisoformat,
+            help="Fecha de referencia (por defecto la fecha actual)."
+        )
+        parser.add_argument(
+            '--salida',
+            help="Archivo en el que se escribe el resumen completo en JSON."
+        )
+
+    def handle(self, *args, **options):
+        reportes = escanear_empresas(options['empresas'], options['fecha'])
+        for reporte in reportes:
+            resumen = ', '.join(
+                f"{grupo}: {total}" for grupo, total in reporte['resumen'].items()
+            )
+            ordenes = len(reporte['ordenes_abiertas_con_licencia_caducada'])
+            estilo = self.style.WARNING if reporte['resumen'][CADUCADAS] or ordenes \
+                else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"Empresa {reporte['empresa_id']}: {resumen};"
+                f" órdenes abiertas con licencia caducada: {ordenes}."
+            ))
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(reportes, archivo, cls=DjangoJSONEncoder, indent=2, ensure_ascii=False)
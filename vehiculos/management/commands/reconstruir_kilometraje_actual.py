@@ -0,0 +1,39 @@
+"""reconstruir_kilometraje_actual.py
+
+Comando para reconstruir desde cero el kilometraje actual de los vehículos
+a partir de la bitácora de kilometrajes.
+
+Uso:
+    python manage.py reconstruir_kilometraje_actual [--vehiculo ID ...] [--batch-size N]
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.core.management.base import BaseCommand
+
+from vehiculos.models import KilometrajeActual
+
+class Command(BaseCommand):
+    help = "Reconstruye el kilometraje actual de los vehículos desde la bitácora de kilometrajes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vehiculo',
+            type=int,
+            nargs='+',
+            dest='vehiculos',
+            help="Ids de los vehículos a reconstruir (por defecto todos)."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Número de filas insertadas por consulta."
+        )
+
+    def handle(self, *args, **options):
+        total = KilometrajeActual.objects.reconstruir(
+            options['vehiculos'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Kilometraje actual reconstruido para {total} vehículos."
+        ))
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def asignar_empresa_del_propietario(apps, schema_editor):
+    """Asigna a cada vehículo existente la empresa de su propietario."""
+    Vehiculo = apps.get_model('vehiculos', 'Vehiculo')
+    PerfilUsuario = apps.get_model('usuarios', 'PerfilUsuario')
+    Vehiculo.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            PerfilUsuario.objects.filter(
+                id=models.OuterRef('propietario_id')
+            ).values('empresa_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0001_initial'),
+        ('usuarios', '0001_initial'),
+        ('vehiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='empresa',
+            field=models.ForeignKey(help_text='Empresa en la que se ha registrado el vehículo.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vehiculos_empresa', to='empresas.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_del_propietario, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='empresa',
+            field=models.ForeignKey(help_text='Empresa en la que se ha registrado el vehículo.', on_delete=django.db.models.deletion.CASCADE, related_name='vehiculos_empresa', to='empresas.empresa'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:18
+
+from django.db import migrations, models
+from django.db.models.functions import RowNumber
+import django.db.models.deletion
+
+
+def copiar_ultimas_lecturas(apps, schema_editor):
+    """Copia la lectura más reciente de cada vehículo."""
+    Kilometraje = apps.get_model('vehiculos', 'Kilometraje')
+    KilometrajeActual = apps.get_model('vehiculos', 'KilometrajeActual')
+    lecturas = Kilometraje.objects.annotate(
+        fila=models.Window(
+            expression=RowNumber(),
+            partition_by=[models.F('vehiculo_id')],
+            order_by=[models.F('fecha').desc(), models.F('id').desc()]
+        )
+    ).filter(fila=1)
+    KilometrajeActual.objects.bulk_create(
+        (
+            KilometrajeActual(
+                vehiculo_id=lectura.vehiculo_id,
+                lectura_id=lectura.id,
+                kilometraje=lectura.kilometraje,
+                unidad=lectura.unidad,
+                fecha=lectura.fecha
+            )
+            for lectura in lecturas.iterator(chunk_size=1000)
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehiculos', '0002_vehiculo_empresa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KilometrajeActual',
+            fields=[
+                ('vehiculo', models.OneToOneField(help_text='El vehículo al que pertenece la lectura.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='kilometraje_actual', serialize=False, to='vehiculos.vehiculo')),
+                ('kilometraje', models.DecimalField(db_index=True, decimal_places=2, help_text='El kilometraje actual del vehículo.', max_digits=10, verbose_name='Kilometraje')),
+                ('unidad', models.CharField(choices=[('km', 'KILOMETROS'), ('mi', 'MILLAS'), ('días', 'DIAS')], help_text='La unidad de medida del kilometraje.', max_length=10, verbose_name='Unidad')),
+                ('fecha', models.DateField(help_text='La fecha en la que se registró el kilometraje actual.', verbose_name='Fecha')),
+                ('lectura', models.ForeignKey(help_text='La lectura de la bitácora de kilometraje más reciente.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='vehiculos.kilometraje')),
+            ],
+            options={
+                'verbose_name': 'Kilometraje actual',
+                'verbose_name_plural': 'Kilometrajes actuales',
+            },
+        ),
+        migrations.RunPython(copiar_ultimas_lecturas, migrations.RunPython.noop),
+    ]
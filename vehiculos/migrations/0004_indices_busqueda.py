@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehiculos', '0003_kilometrajeactual'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kilometraje',
+            index=models.Index(fields=['vehiculo', 'fecha', 'id'], name='kilometraje_vehiculo_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def asignar_empresa_del_vehiculo(apps, schema_editor):
+    """Copia en cada lectura de odómetro la empresa de su vehículo."""
+    Kilometraje = apps.get_model('vehiculos', 'Kilometraje')
+    Vehiculo = apps.get_model('vehiculos', 'Vehiculo')
+    Kilometraje.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            Vehiculo.objects.filter(id=models.OuterRef('vehiculo_id')).values('empresa_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_telefono_e164'),
+        ('vehiculos', '0005_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kilometraje',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='La empresa del vehículo, para filtrar la bitácora por empresa sin joins.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='kilometrajes', to='empresas.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_del_vehiculo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='kilometraje',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='La empresa del vehículo, para filtrar la bitácora por empresa sin joins.', on_delete=django.db.models.deletion.CASCADE, related_name='kilometrajes', to='empresas.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='kilometraje',
+            index=models.Index(fields=['empresa', 'fecha'], name='kilometraje_empresa_fecha_idx'),
+        ),
+    ]
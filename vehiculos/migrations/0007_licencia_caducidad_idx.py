@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehiculos', '0006_kilometraje_empresa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='licencia',
+            index=models.Index(fields=['fecha_de_caducidad', 'conductor'], name='licencia_caducidad_idx'),
+        ),
+    ]
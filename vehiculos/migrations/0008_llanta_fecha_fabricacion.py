@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+from vehiculos.validators import obtener_fecha_fabricacion
+
+
+def completar_fechas(apps, schema_editor):
+    """Calcula la fecha de fabricación de las llantas existentes."""
+    Llanta = apps.get_model('vehiculos', 'Llanta')
+    fechas = {}
+    llantas = []
+    for llanta in Llanta.objects.only('id', 'codigo_de_fabricacion').iterator(chunk_size=1000):
+        codigo = llanta.codigo_de_fabricacion[-4:]
+        if codigo not in fechas:
+            fechas[codigo] = obtener_fecha_fabricacion(codigo)
+        llanta.fecha_fabricacion = fechas[codigo]
+        llantas.append(llanta)
+    Llanta.objects.bulk_update(llantas, ['fecha_fabricacion'], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehiculos', '0007_licencia_caducidad_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llanta',
+            name='fecha_fabricacion',
+            field=models.DateField(editable=False, help_text='Fecha de fabricación obtenida del código DOT.', null=True, verbose_name='Fecha de fabricación'),
+        ),
+        migrations.AddIndex(
+            model_name='llanta',
+            index=models.Index(fields=['fecha_fabricacion', 'vehiculo'], name='llanta_fabricacion_idx'),
+        ),
+        migrations.RunPython(completar_fechas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def asignar_empresa_del_conductor(apps, schema_editor):
+    """Copia en cada licencia la empresa de su conductor."""
+    Licencia = apps.get_model('vehiculos', 'Licencia')
+    PerfilUsuario = apps.get_model('usuarios', 'PerfilUsuario')
+    Licencia.objects.filter(empresa__isnull=True).update(
+        empresa_id=models.Subquery(
+            PerfilUsuario.objects.filter(id=models.OuterRef('conductor_id')).values('empresa_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0003_telefono_e164'),
+        ('usuarios', '0004_telefono_e164'),
+        ('vehiculos', '0008_llanta_fecha_fabricacion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='licencia',
+            name='licencia_caducidad_idx',
+        ),
+        migrations.AddField(
+            model_name='licencia',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='La empresa del conductor, para revisar las licencias por empresa sin joins.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='licencias', to='empresas.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_del_conductor, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='licencia',
+            name='empresa',
+            field=models.ForeignKey(editable=False, help_text='La empresa del conductor, para revisar las licencias por empresa sin joins.', on_delete=django.db.models.deletion.CASCADE, related_name='licencias', to='empresas.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='licencia',
+            index=models.Index(fields=['empresa', 'fecha_de_caducidad'], name='licencia_empresa_caducidad_idx'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from datetime import date
-from django.db import models
+from typing import Iterable, List, Optional
+
+from django.db import models, transaction
+from django.db.models.functions import RowNumber
 from django.utils.translation import gettext_lazy as _
+from administracion_vehicular.alcance import EmpresaDerivadaMixin
 from empresas.models import Empresa
 
 from usuarios.models import PerfilUsuario
@@ -14,6 +18,7 @@ from .enums import (
     UnidadOdometro
 )
 from .validators import (
+    obtener_fecha_fabricacion,
     validar_anio_fabricacion,
     validar_codigo_bateria,
     validar_codigo_dot,
@@ -21,12 +26,13 @@ from .validators import (
     validar_vigencia_licencia
 )
 
-class Kilometraje(models.Model):
+class Kilometraje(EmpresaDerivadaMixin, models.Model):
     """
     Representa el odómetro de un vehículo.
 
     Atributos:
         - vehiculo (Vehiculo): El vehículo al que pertenece el odómetro.
+        - empresa (Empresa): La empresa del vehículo (copiada al guardar).
         - kilometraje (float): El kilometraje recorrido por el vehículo.
         - unidad (str): La unidad de medida del kilometraje.
         - fecha_inicial (DateField): La fecha inicial de uso del vehículo.
@@ -37,6 +43,13 @@ class Kilometraje(models.Model):
         on_delete=models.CASCADE,
         help_text=_("El vehículo al que pertenece el odómetro.")
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        related_name='kilometrajes',
+        on_delete=models.CASCADE,
+        editable=False,
+        help_text=_("La empresa del vehículo, para filtrar la bitácora por empresa sin joins.")
+    )
     kilometraje = models.DecimalField(
         _('Kilometraje'),
         max_digits=10,
@@ -60,10 +73,141 @@ class Kilometraje(models.Model):
     class Meta:
         verbose_name = _("Kilometraje")
         verbose_name_plural = _("Kilometrajes")
+        indexes = [
+            # Lectura ordenada de la bitácora de un vehículo (kilometraje actual,
+            # validación de lecturas vecinas):
+            models.Index(fields=['vehiculo', 'fecha', 'id'], name='kilometraje_vehiculo_fecha_idx'),
+            # Bitácora de una empresa por rango de fechas (exportación, costos):
+            models.Index(fields=['empresa', 'fecha'], name='kilometraje_empresa_fecha_idx'),
+        ]
 
     def __str__(self):
         return f'{self.vehiculo}: {self.kilometraje} {self.unidad} - {self.fecha}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Vehículo guardado, para recalcular su kilometraje actual si la
+        # lectura se mueve a otro vehículo:
+        instancia._vehiculo_guardado = instancia.__dict__.get('vehiculo_id')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        """Guarda la lectura y actualiza el kilometraje actual del vehículo
+        (y el del vehículo anterior, si la lectura cambió de vehículo) dentro
+        de la misma transacción.
+
+        Las eliminaciones, incluidas las de querysets y en cascada, se
+        atienden con la señal `post_delete` (ver `signals.py`).
+        """
+        anterior = getattr(self, '_vehiculo_guardado', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            KilometrajeActual.objects.registrar([self])
+            if anterior is not None and anterior != self.vehiculo_id:
+                KilometrajeActual.objects.reconstruir([anterior])
+        self._vehiculo_guardado = self.vehiculo_id
+
+class KilometrajeActualManager(models.Manager):
+    """
+    Manager para mantener actualizado el kilometraje actual de los vehículos.
+    """
+
+    def bloquear(self, vehiculo_ids: Iterable[int], vehiculos: Optional[models.QuerySet] = None) -> List[int]:
+        """Bloquea las filas de los vehículos hasta el final de la transacción.
+
+        Serializa las escrituras concurrentes sobre la bitácora de un mismo
+        vehículo: quien valida lecturas contra sus vecinas debe bloquear el
+        vehículo antes de leerlas y mantener el bloqueo hasta insertarlas.
+        Se bloquean en orden de id para evitar interbloqueos.
+
+        Args:
+            vehiculo_ids (Iterable[int]): Vehículos a bloquear.
+            vehiculos (QuerySet): Vehículos que se pueden bloquear (todos por defecto).
+
+        Returns:
+            list: Los ids de los vehículos bloqueados (los que existen).
+        """
+        vehiculos = Vehiculo.objects.all() if vehiculos is None else vehiculos
+        return list(vehiculos.select_for_update().filter(
+            id__in=list(vehiculo_ids)
+        ).order_by('id').values_list('id', flat=True))
+
+    def registrar(self, lecturas: Iterable[Kilometraje]) -> None:
+        """Actualiza el kilometraje actual a partir de lecturas recién guardadas.
+
+        Para cada vehículo se conserva la lectura más reciente según su fecha
+        (y su id en caso de empate). Las filas de los vehículos afectados se
+        bloquean (ver `bloquear`) para serializar las escrituras concurrentes
+        sobre un mismo vehículo.
+
+        Args:
+            lecturas (Iterable[Kilometraje]): Lecturas ya guardadas en la base de datos.
+        """
+        recientes = {}
+        for lectura in lecturas:
+            actual = recientes.get(lectura.vehiculo_id)
+            if actual is None or (lectura.fecha, lectura.pk) > (actual.fecha, actual.pk):
+                recientes[lectura.vehiculo_id] = lectura
+        if not recientes:
+            return
+
+        with transaction.atomic():
+            self.bloquear(recientes.keys())
+            actuales = self.in_bulk(recientes.keys())
+            por_reconstruir = []
+            nuevos = []
+            modificados = []
+            for vehiculo_id, lectura in recientes.items():
+                actual: Optional[KilometrajeActual] = actuales.get(vehiculo_id)
+                if actual is None:
+                    nuevos.append(KilometrajeActual.desde_lectura(lectura))
+                elif actual.lectura_id == lectura.pk and lectura.fecha < actual.fecha:
+                    # Se modificó la fecha de la lectura actual: puede haber otra más reciente.
+                    por_reconstruir.append(vehiculo_id)
+                elif (lectura.fecha, lectura.pk) >= (actual.fecha, actual.lectura_id or 0):
+                    actual.actualizar(lectura)
+                    modificados.append(actual)
+            self.bulk_create(nuevos)
+            self.bulk_update(modificados, ['lectura', 'kilometraje', 'unidad', 'fecha'])
+            if por_reconstruir:
+                self.reconstruir(por_reconstruir)
+
+    def reconstruir(self, vehiculo_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+        """Reconstruye el kilometraje actual a partir de la bitácora de kilometrajes.
+
+        Args:
+            vehiculo_ids (Iterable[int]): Vehículos a reconstruir, todos por defecto.
+            batch_size (int): Número de filas insertadas por consulta.
+
+        Returns:
+            int: Número de vehículos con kilometraje actual.
+        """
+        lecturas = Kilometraje.objects.annotate(
+            fila=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F('vehiculo_id')],
+                order_by=[models.F('fecha').desc(), models.F('id').desc()]
+            )
+        ).filter(fila=1)
+        actuales = self.all()
+        if vehiculo_ids is not None:
+            vehiculo_ids = list(vehiculo_ids)
+            lecturas = lecturas.filter(vehiculo_id__in=vehiculo_ids)
+            actuales = actuales.filter(vehiculo_id__in=vehiculo_ids)
+
+        total = 0
+        with transaction.atomic():
+            actuales.delete()
+            lote = []
+            for lectura in lecturas.iterator(chunk_size=batch_size):
+                lote.append(KilometrajeActual.desde_lectura(lectura))
+                if len(lote) >= batch_size:
+                    total += len(self.bulk_create(lote))
+                    lote = []
+            total += len(self.bulk_create(lote))
+        return total
+
 class Vehiculo(models.Model):
     """
     Representa un vehículo.
@@ -128,6 +272,13 @@ class Vehiculo(models.Model):
         blank=True,
         help_text=_("La fotografía del vehículo.")
     )
+    miniaturas = models.JSONField(
+        _('Miniaturas'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("Rutas de las miniaturas de las fotografías (ver imagenes.py).")
+    )
     marca = models.CharField(
         _('Marca'),
         max_length=50,
@@ -177,6 +328,77 @@ class Vehiculo(models.Model):
     def __str__(self) -> str:
         return f"Vehículo #{self.id}: {self.placa} - {self.modelo} - {self.anio_de_fabricacion}"
 
+class KilometrajeActual(models.Model):
+    """
+    Representa la lectura más reciente del odómetro de un vehículo.
+
+    Es una copia desnormalizada de la última lectura de `Kilometraje`
+    que se actualiza en la misma transacción en la que se registra cada
+    lectura, de modo que no es necesario recorrer la bitácora de kilometrajes
+    para conocer el kilometraje actual de un vehículo.
+
+    Atributos:
+        - vehiculo (Vehiculo): El vehículo al que pertenece la lectura.
+        - lectura (Kilometraje): La lectura de la bitácora que se copió.
+        - kilometraje (float): El kilometraje recorrido por el vehículo.
+        - unidad (str): La unidad de medida del kilometraje.
+        - fecha (DateField): La fecha en la que se registró la lectura.
+    """
+    vehiculo = models.OneToOneField(
+        Vehiculo,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='kilometraje_actual',
+        help_text=_("El vehículo al que pertenece la lectura.")
+    )
+    lectura = models.ForeignKey(
+        Kilometraje,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        help_text=_("La lectura de la bitácora de kilometraje más reciente.")
+    )
+    kilometraje = models.DecimalField(
+        _('Kilometraje'),
+        max_digits=10,
+        decimal_places=2,
+        db_index=True,
+        help_text=_("El kilometraje actual del vehículo.")
+    )
+    unidad = models.CharField(
+        _('Unidad'),
+        max_length=10,
+        choices=UnidadOdometro.choices(),
+        help_text=_("La unidad de medida del kilometraje.")
+    )
+    fecha = models.DateField(
+        _('Fecha'),
+        help_text=_("La fecha en la que se registró el kilometraje actual.")
+    )
+
+    objects = KilometrajeActualManager()
+
+    class Meta:
+        verbose_name = _("Kilometraje actual")
+        verbose_name_plural = _("Kilometrajes actuales")
+
+    def __str__(self):
+        return f'{self.vehiculo_id}: {self.kilometraje} {self.unidad} - {self.fecha}'
+
+    @classmethod
+    def desde_lectura(cls, lectura: Kilometraje) -> 'KilometrajeActual':
+        """Crea un kilometraje actual (sin guardar) a partir de una lectura."""
+        actual = cls(vehiculo_id=lectura.vehiculo_id)
+        actual.actualizar(lectura)
+        return actual
+
+    def actualizar(self, lectura: Kilometraje) -> None:
+        """Copia los datos de una lectura (sin guardar)."""
+        self.lectura_id = lectura.pk
+        self.kilometraje = lectura.kilometraje
+        self.unidad = lectura.unidad
+        self.fecha = lectura.fecha
+
 class Llanta(models.Model):
     """
     Representa una llanta de un vehículo.
@@ -185,6 +407,8 @@ class Llanta(models.Model):
         - vehiculo (Vehiculo): El vehículo al que pertenece la llanta.
         - codigo_de_fabricacion (str): El código de fabricación de la llanta.
         - posicion_respecto_al_vehiculo (str): La posición de la llanta respecto al vehículo.
+        - fecha_fabricacion (date): Fecha de fabricación obtenida del código DOT
+          al guardar la llanta (ver `obtener_fecha_fabricacion`).
     """
     vehiculo = models.ForeignKey(
         Vehiculo,
@@ -204,6 +428,26 @@ class Llanta(models.Model):
         choices=PosicionLlanta.choices(),
         help_text=_("La posición de la llanta respecto al vehículo.")
     )
+    fecha_fabricacion = models.DateField(
+        _('Fecha de fabricación'),
+        null=True,
+        editable=False,
+        help_text=_("Fecha de fabricación obtenida del código DOT.")
+    )
+
+    class Meta:
+        indexes = [
+            # Llantas fabricadas antes de una fecha (reporte de antigüedad, ver llantas.py):
+            models.Index(fields=['fecha_fabricacion', 'vehiculo'], name='llanta_fabricacion_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'codigo_de_fabricacion' in update_fields:
+            self.fecha_fabricacion = obtener_fecha_fabricacion(self.codigo_de_fabricacion)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'fecha_fabricacion'}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         """Devuelve una representación legible por humanos del objeto Llanta."""
@@ -235,23 +479,33 @@ class Bateria(models.Model):
         """Devuelve una representación legible por humanos del objeto Bateria."""
         return f"Batería de {self.vehiculo}"
 
-class Licencia(models.Model):
+class Licencia(EmpresaDerivadaMixin, models.Model):
     """
     Representa una licencia de conducir.
 
     Atributos:
+        empresa (Empresa): La empresa del conductor (copiada al guardar).
         tipo (str): El tipo de la licencia (A, B, C, etc.).
         fecha_de_caducidad (date): La fecha de caducidad de la licencia.
 
     Métodos:
         esta_vigente(): Retorna la validez de la licencia en el tiempo.
     """
+    relacion_empresa = 'conductor'
+
     conductor = models.OneToOneField(
         PerfilUsuario,
         on_delete=models.CASCADE,
         related_name="licencias_conductores",
         help_text=_("Conductor al que pertenece esta licencia.")
     )
+    empresa = models.ForeignKey(
+        Empresa,
+        related_name='licencias',
+        on_delete=models.CASCADE,
+        editable=False,
+        help_text=_("La empresa del conductor, para revisar las licencias por empresa sin joins.")
+    )
     tipo = models.CharField(
         max_length=2,
         choices=TipoLicencia.choices(),
@@ -271,6 +525,12 @@ class Licencia(models.Model):
         help_text=_("Puntos vigentes de la licencia.")
     )
 
+    class Meta:
+        indexes = [
+            # Licencias de una empresa que caducan en un rango de fechas (ver licencias.py):
+            models.Index(fields=['empresa', 'fecha_de_caducidad'], name='licencia_empresa_caducidad_idx'),
+        ]
+
     def __str__(self):
         return f'{self.tipo} - {self.fecha_de_caducidad}'
 
@@ -0,0 +1,236 @@
+"""odometro.py
+
+Este módulo valida la coherencia de las lecturas de odómetro de los vehículos.
+
+Una lectura es rechazada cuando el kilometraje retrocede respecto de la lectura
+anterior del vehículo (o supera a la lectura posterior, si se registra una
+lectura con fecha pasada), y se considera una anomalía cuando el salto entre
+dos lecturas consecutivas supera `KILOMETRAJE_DELTA_MAXIMO_DIARIO` kilómetros
+por cada día transcurrido. Las anomalías se rechazan si
+`KILOMETRAJE_RECHAZAR_ANOMALIAS` es True, o se devuelven como advertencias.
+
+Las lecturas en millas se convierten a kilómetros antes de compararlas.
+Las lecturas en otras unidades (días) no se validan.
+
+Para un lote de lecturas, las lecturas vecinas de cada vehículo se cargan
+en conjunto: si todas las lecturas del lote son posteriores al kilometraje
+actual del vehículo basta con este; en otro caso se cargan las lecturas del
+rango de fechas del lote, la anterior y la posterior, con una consulta por
+cada `VEHICULOS_POR_CONSULTA` vehículos.
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from bisect import bisect_left, insort
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, Q, Subquery, Value, When
+from django.utils.translation import gettext as _
+
+from .enums import UnidadOdometro
+from .models import Kilometraje, KilometrajeActual
+
+# Factores de conversión a kilómetros de las unidades de distancia:
+FACTORES_KILOMETROS = {
+    UnidadOdometro.KILOMETROS.value: Decimal('1'),
+    UnidadOdometro.MILLAS.value: Decimal('1.609344'),
+}
+
+# Vehículos cuyas lecturas vecinas se cargan en una misma consulta:
+VEHICULOS_POR_CONSULTA = 100
+
+def a_kilometros(valor: Decimal, unidad: str) -> Decimal:
+    """Convierte un kilometraje a kilómetros."""
+    return Decimal(valor) * FACTORES_KILOMETROS[unidad]
+
+def kilometros_sql(campo: str = 'kilometraje', unidad: str = 'unidad') -> Case:
+    """Expresión SQL equivalente a `a_kilometros` para anotar consultas.
+
+    Las lecturas en unidades que no son de distancia se convierten en NULL.
+    """
+    return Case(
+        *[
+            When(**{unidad: clave}, then=F(campo) * Value(factor))
+            for clave, factor in FACTORES_KILOMETROS.items()
+        ],
+        default=None,
+        output_field=DecimalField(max_digits=20, decimal_places=6)
+    )
+
+class ValidadorKilometraje:
+    """
+    Valida la monotonía y los saltos de un conjunto de lecturas de odómetro.
+
+    Las lecturas se representan como diccionarios con las claves
+    `vehiculo_id`, `kilometraje`, `unidad` y `fecha`.
+    """
+
+    def __init__(
+        self,
+        delta_maximo_diario: Optional[Decimal] = None,
+        rechazar_anomalias: Optional[bool] = None
+    ):
+        if delta_maximo_diario is None:
+            delta_maximo_diario = getattr(settings, 'KILOMETRAJE_DELTA_MAXIMO_DIARIO', 2000)
+        if rechazar_anomalias is None:
+            rechazar_anomalias = getattr(settings, 'KILOMETRAJE_RECHAZAR_ANOMALIAS', True)
+        self.delta_maximo_diario = Decimal(delta_maximo_diario)
+        self.rechazar_anomalias = rechazar_anomalias
+
+    def cargar_historial(
+        self,
+        rangos: Dict[int, Tuple[date, date]],
+        actuales: Optional[Dict[int, Tuple[Decimal, str, date, Optional[int]]]] = None,
+        excluir: Iterable[int] = ()
+    ) -> Dict[int, List[tuple]]:
+        """Carga las lecturas guardadas con las que se comparan las nuevas.
+
+        Args:
+            rangos (dict): Fecha mínima y máxima de las nuevas lecturas de cada vehículo.
+            actuales (dict): Kilometraje, unidad, fecha e id de la lectura actual de
+                cada vehículo, si ya se consultaron (se consultan en otro caso).
+            excluir (Iterable[int]): Ids de lecturas que no se deben considerar
+                (por ejemplo, la lectura que se está modificando).
+
+        Returns:
+            dict: Lista ordenada de lecturas `((fecha, 0, id), km)` de cada vehículo.
+        """
+        excluir = set(excluir)
+        if actuales is None:
+            actuales = {
+                vehiculo_id: (kilometraje, unidad, fecha, lectura_id)
+                for vehiculo_id, kilometraje, unidad, fecha, lectura_id
+                in KilometrajeActual.objects.filter(vehiculo_id__in=rangos).values_list(
+                    'vehiculo_id', 'kilometraje', 'unidad', 'fecha', 'lectura_id'
+                )
+            }
+        historial = {vehiculo_id: [] for vehiculo_id in rangos}
+        por_consultar = []
+        for vehiculo_id, (minima, _maxima) in rangos.items():
+            actual = actuales.get(vehiculo_id)
+            if actual is None or actual[0] is None:
+                # El vehículo no tiene lecturas.
+                continue
+            kilometraje, unidad, fecha, lectura_id = actual
+            if minima >= fecha and lectura_id not in excluir:
+                if unidad in FACTORES_KILOMETROS:
+                    historial[vehiculo_id].append(
+                        ((fecha, 0, lectura_id or 0), a_kilometros(kilometraje, unidad))
+                    )
+            else:
+                por_consultar.append(vehiculo_id)
+
+        for inicio in range(0, len(por_consultar), VEHICULOS_POR_CONSULTA):
+            condiciones = Q()
+            for vehiculo_id in por_consultar[inicio:inicio + VEHICULOS_POR_CONSULTA]:
+                minima, maxima = rangos[vehiculo_id]
+                lecturas = Kilometraje.objects.filter(
+                    vehiculo_id=vehiculo_id,
+                    unidad__in=FACTORES_KILOMETROS
+                ).exclude(id__in=excluir)
+                anterior = lecturas.filter(fecha__lt=minima).order_by('-fecha', '-id')
+                posterior = lecturas.filter(fecha__gt=maxima).order_by('fecha', 'id')
+                condiciones |= Q(vehiculo_id=vehiculo_id, fecha__range=(minima, maxima)) \
+                    | Q(id=Subquery(anterior.values('id')[:1])) \
+                    | Q(id=Subquery(posterior.values('id')[:1]))
+            guardadas = Kilometraje.objects.filter(condiciones).filter(
+                unidad__in=FACTORES_KILOMETROS
+            ).exclude(id__in=excluir).values_list('id', 'vehiculo_id', 'kilometraje', 'unidad', 'fecha')
+            for lectura_id, vehiculo_id, kilometraje, unidad, fecha in guardadas:
+                historial[vehiculo_id].append(
+                    ((fecha, 0, lectura_id), a_kilometros(kilometraje, unidad))
+                )
+        for lecturas in historial.values():
+            lecturas.sort()
+        return historial
+
+    def comparar(self, kilometraje: Decimal, fecha: date, vecina: tuple, posterior: bool) -> Tuple[str, str]:
+        """Compara una lectura con una lectura vecina del mismo vehículo.
+
+        Returns:
+            tuple: El tipo del problema ('error' o 'advertencia') y su mensaje,
+            o (None, None) si las lecturas son coherentes.
+        """
+        (fecha_vecina, _orden, _id), kilometraje_vecino = vecina
+        if posterior:
+            delta = kilometraje_vecino - kilometraje
+            dias = (fecha_vecina - fecha).days
+        else:
+            delta = kilometraje - kilometraje_vecino
+            dias = (fecha - fecha_vecina).days
+        if delta < 0:
+            mensaje = _(
+                "El kilometraje es mayor que el de una lectura posterior del vehículo "
+                "(%(kilometraje)s km el %(fecha)s)."
+            ) if posterior else _(
+                "El kilometraje es menor que el de una lectura anterior del vehículo "
+                "(%(kilometraje)s km el %(fecha)s)."
+            )
+            return 'error', mensaje % {
+                'kilometraje': round(kilometraje_vecino, 2), 'fecha': fecha_vecina
+            }
+        if delta > self.delta_maximo_diario * max(dias, 1):
+            mensaje = _(
+                "Salto de kilometraje inverosímil: %(delta)s km en %(dias)s días."
+            ) % {'delta': round(delta, 2), 'dias': dias}
+            return ('error' if self.rechazar_anomalias else 'advertencia'), mensaje
+        return None, None
+
+    def validar(
+        self,
+        lecturas: List[dict],
+        actuales: Optional[Dict[int, tuple]] = None,
+        excluir: Iterable[int] = ()
+    ) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """Valida un conjunto de lecturas nuevas.
+
+        Las lecturas se recorren en orden cronológico y cada lectura aceptada
+        pasa a formar parte del historial con el que se comparan las siguientes.
+
+        Args:
+            lecturas (list): Las lecturas nuevas.
+            actuales (dict): Kilometraje actual de los vehículos, si ya se consultó.
+            excluir (Iterable[int]): Ids de lecturas guardadas que no se consideran.
+
+        Returns:
+            tuple: Los errores y las advertencias, indexados por la posición de
+            la lectura en `lecturas`.
+        """
+        distancias = [
+            (indice, lectura) for indice, lectura in enumerate(lecturas)
+            if lectura['unidad'] in FACTORES_KILOMETROS
+        ]
+        rangos: Dict[int, Tuple[date, date]] = {}
+        for _indice, lectura in distancias:
+            minima, maxima = rangos.get(lectura['vehiculo_id'], (lectura['fecha'], lectura['fecha']))
+            rangos[lectura['vehiculo_id']] = (
+                min(minima, lectura['fecha']), max(maxima, lectura['fecha'])
+            )
+        historial = self.cargar_historial(rangos, actuales, excluir) if rangos else {}
+
+        errores, advertencias = {}, {}
+        for indice, lectura in sorted(distancias, key=lambda item: (item[1]['fecha'], item[0])):
+            lecturas_vehiculo = historial[lectura['vehiculo_id']]
+            clave = (lectura['fecha'], 1, indice)
+            kilometraje = a_kilometros(lectura['kilometraje'], lectura['unidad'])
+            posicion = bisect_left(lecturas_vehiculo, (clave,))
+            vecinas = []
+            if posicion > 0:
+                vecinas.append((lecturas_vehiculo[posicion - 1], False))
+            if posicion < len(lecturas_vehiculo):
+                vecinas.append((lecturas_vehiculo[posicion], True))
+            problemas = [
+                self.comparar(kilometraje, lectura['fecha'], vecina, posterior)
+                for vecina, posterior in vecinas
+            ]
+            mensajes_error = [mensaje for tipo, mensaje in problemas if tipo == 'error']
+            if mensajes_error:
+                errores[indice] = mensajes_error[0]
+                continue
+            mensajes_advertencia = [mensaje for tipo, mensaje in problemas if tipo]
+            if mensajes_advertencia:
+                advertencias[indice] = mensajes_advertencia[0]
+            insort(lecturas_vehiculo, (clave, kilometraje))
+        return errores, advertencias
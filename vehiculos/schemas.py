@@ -33,6 +33,33 @@ class KilometrajeFilterSchema(AutoSchema):
                     )
                 )
             ]
+        if path.endswith('/bulk/'):
+            return [
+                coreapi.Field(
+                    name='lecturas',
+                    required=True,
+                    location='body',
+                    schema=coreschema.Array(
+                        title='Lecturas',
+                        description=(
+                            'Arreglo JSON o flujo NDJSON de lecturas con los campos '
+                            'vehiculo, kilometraje, unidad (km o mi) y fecha.'
+                        )
+                    )
+                ),
+                coreapi.Field(
+                    name='asincrono',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Boolean(
+                        title='Asíncrono',
+                        description=(
+                            'Encola la operación como tarea en segundo plano'
+                            ' (respuesta 202 con la URL de la tarea)'
+                        )
+                    )
+                )
+            ]
         return super().get_manual_fields(path, method)
 
 class LicenciaFilterSchema(AutoSchema):
@@ -49,6 +76,42 @@ class LicenciaFilterSchema(AutoSchema):
                     )
                 )
             ]
+        if path.endswith('/caducidad/'):
+            return [
+                coreapi.Field(
+                    name='empresa_id',
+                    required=True,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Empresa ID',
+                        description='El id de la empresa cuyas licencias se revisan.'
+                    )
+                ),
+                coreapi.Field(
+                    name='fecha',
+                    required=False,
+                    location='query',
+                    schema=coreschema.String(
+                        title='Fecha',
+                        description='Fecha de referencia AAAA-MM-DD (por defecto, hoy).'
+                    )
+                )
+            ]
+        if path.endswith('/vigencia/'):
+            return [
+                coreapi.Field(
+                    name='conductor_id',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Conductor ID',
+                        description=(
+                            'El id del conductor. Por defecto, el perfil'
+                            ' del usuario que realiza la petición.'
+                        )
+                    )
+                )
+            ]
         return super().get_manual_fields(path, method)
 
 class LlantaFilterSchema(AutoSchema):
@@ -65,8 +128,50 @@ class LlantaFilterSchema(AutoSchema):
                     )
                 )
             ]
+        if path.endswith('/antiguedad/'):
+            return [
+                coreapi.Field(
+                    name='empresa_id',
+                    required=True,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Empresa ID',
+                        description='El id de la empresa cuyas llantas se revisan.'
+                    )
+                ),
+                coreapi.Field(
+                    name='anios',
+                    required=False,
+                    location='query',
+                    schema=coreschema.Integer(
+                        title='Años',
+                        description='Antigüedad máxima en años (por defecto, la configurada).'
+                    )
+                )
+            ]
         return super().get_manual_fields(path, method)
 
+FILTROS_KILOMETRAJE_ACTUAL = [
+    coreapi.Field(
+        name='kilometraje_min',
+        required=False,
+        location='query',
+        schema=coreschema.Number(
+            title='Kilometraje mínimo',
+            description='Filtra los vehículos cuyo kilometraje actual es mayor o igual.'
+        )
+    ),
+    coreapi.Field(
+        name='kilometraje_max',
+        required=False,
+        location='query',
+        schema=coreschema.Number(
+            title='Kilometraje máximo',
+            description='Filtra los vehículos cuyo kilometraje actual es menor o igual.'
+        )
+    )
+]
+
 class VehiculoFilterSchema(AutoSchema):
     def get_manual_fields(self, path: str, method):
         if path.endswith('/search_by/'):
@@ -80,5 +185,7 @@ class VehiculoFilterSchema(AutoSchema):
                         description='El id del propietario para buscar los vehículos.'
                     )
                 )
-            ]
+            ] + FILTROS_KILOMETRAJE_ACTUAL
+        if method == 'GET' and path.endswith('/vehiculos/'):
+            return super().get_manual_fields(path, method) + FILTROS_KILOMETRAJE_ACTUAL
         return super().get_manual_fields(path, method)
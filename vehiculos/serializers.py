@@ -3,9 +3,15 @@ Este módulo contiene los serializadores de los modelos de control_vehicular.
 
 Autor: Christopher Villamarín (@xeland314)
 """
+from datetime import date
 
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+
+from administracion_vehicular.almacenamiento import ListaConURLs
+from administracion_vehicular.imagenes import MiniaturasField
+from administracion_vehicular.validacion import ValidacionEnLoteMixin
 from empresas.models import Empresa
 
 from usuarios.models import PerfilUsuario
@@ -15,22 +21,95 @@ from .models import (
     Licencia,
     Vehiculo,
     Llanta,
-    Kilometraje
+    Kilometraje,
+    KilometrajeActual
+)
+from .odometro import ValidadorKilometraje
+from .validators import (
+    es_un_codigo_bateria_valido,
+    es_un_codigo_dot_valido,
+    es_una_placa_de_vehiculo_valida,
+    validar_codigo_bateria,
+    validar_codigo_dot,
+    validar_placa_vehicular
 )
 
 class KilometrajeSerializer(serializers.ModelSerializer):
     """
     Serializador para el modelo Kilometraje.
+
+    Rechaza las lecturas que retroceden respecto de las lecturas vecinas
+    del vehículo o que dan saltos inverosímiles (ver `ValidadorKilometraje`).
+    La validación se repite al guardar, con el vehículo bloqueado, para que
+    dos lecturas simultáneas no se validen contra la misma bitácora.
     """
     class Meta:
         model = Kilometraje
         fields = '__all__'
         read_only_fields = ('id',)
 
+    def validar_kilometraje(self, attrs: dict) -> None:
+        """Valida la lectura contra las lecturas vecinas del vehículo."""
+        datos = {
+            campo: attrs.get(campo, getattr(self.instance, campo, None))
+            for campo in ('vehiculo', 'kilometraje', 'unidad', 'fecha')
+        }
+        lectura = {
+            'vehiculo_id': datos['vehiculo'].pk,
+            'kilometraje': datos['kilometraje'],
+            'unidad': datos['unidad'],
+            'fecha': datos['fecha'],
+        }
+        excluir = [self.instance.pk] if self.instance is not None else []
+        errores, _advertencias = ValidadorKilometraje().validar([lectura], excluir=excluir)
+        if errores:
+            raise serializers.ValidationError({'kilometraje': errores[0]})
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        self.validar_kilometraje(attrs)
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            KilometrajeActual.objects.bloquear([validated_data['vehiculo'].pk])
+            self.validar_kilometraje(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            vehiculo = validated_data.get('vehiculo', instance.vehiculo)
+            KilometrajeActual.objects.bloquear({vehiculo.pk, instance.vehiculo_id})
+            self.validar_kilometraje(validated_data)
+            return super().update(instance, validated_data)
+
+class KilometrajeActualSerializer(serializers.ModelSerializer):
+    """
+    Serializador para el modelo KilometrajeActual.
+    """
+    class Meta:
+        model = KilometrajeActual
+        fields = ('kilometraje', 'unidad', 'fecha')
+        read_only_fields = fields
+
+class VehiculoListSerializer(ValidacionEnLoteMixin, ListaConURLs):
+    """
+    ListSerializer para listas de vehículos: valida en lote las placas
+    y resuelve de una vez las URLs de las fotografías.
+    """
+    campos_validados_en_lote = {
+        'placa': (es_una_placa_de_vehiculo_valida, validar_placa_vehicular)
+    }
+
 class VehiculoSerializer(serializers.ModelSerializer):
     """
     Serializador para el modelo Vehiculo.
     """
+    kilometraje_actual = KilometrajeActualSerializer(
+        read_only=True,
+        allow_null=True,
+        help_text=_("Última lectura del odómetro del vehículo.")
+    )
     propietario = serializers.PrimaryKeyRelatedField(
         queryset=PerfilUsuario.objects.all(),
         help_text=_("Usuario al que pertenece el vehículo.")
@@ -39,11 +118,35 @@ class VehiculoSerializer(serializers.ModelSerializer):
         queryset=Empresa.objects.all(),
         help_text=_("Empresa en la que se ha registrado el vehículo.")
     )
+    miniaturas = MiniaturasField()
 
     class Meta:
         model = Vehiculo
         fields = '__all__'
         read_only_fields = ('id',)
+        list_serializer_class = VehiculoListSerializer
+
+class EstadoVehiculoSerializer(serializers.ModelSerializer):
+    """
+    Serializador del estado actual de un vehículo: su condición, su última
+    lectura del odómetro y su orden de movimiento abierta (sin cierre).
+    """
+    kilometraje_actual = KilometrajeActualSerializer(read_only=True, allow_null=True)
+    orden_movimiento_abierta = serializers.IntegerField(
+        read_only=True, allow_null=True,
+        help_text=_("Id de la apertura de la orden de movimiento sin cierre, si la hay.")
+    )
+
+    class Meta:
+        model = Vehiculo
+        fields = ('id', 'placa', 'condicion', 'kilometraje_actual', 'orden_movimiento_abierta')
+        read_only_fields = fields
+
+class LlantaListSerializer(ValidacionEnLoteMixin, serializers.ListSerializer):
+    """ListSerializer para listas de llantas: valida en lote los códigos DOT."""
+    campos_validados_en_lote = {
+        'codigo_de_fabricacion': (es_un_codigo_dot_valido, validar_codigo_dot)
+    }
 
 class LlantaSerializer(serializers.ModelSerializer):
     """
@@ -53,6 +156,13 @@ class LlantaSerializer(serializers.ModelSerializer):
         model = Llanta
         fields = '__all__'
         read_only_fields = ('id',)
+        list_serializer_class = LlantaListSerializer
+
+class BateriaListSerializer(ValidacionEnLoteMixin, serializers.ListSerializer):
+    """ListSerializer para listas de baterías: valida en lote sus códigos."""
+    campos_validados_en_lote = {
+        'codigo_de_fabricacion': (es_un_codigo_bateria_valido, validar_codigo_bateria)
+    }
 
 class BateriaSerializer(serializers.ModelSerializer):
     """
@@ -62,6 +172,7 @@ class BateriaSerializer(serializers.ModelSerializer):
         model = Bateria
         fields = '__all__'
         read_only_fields = ('id',)
+        list_serializer_class = BateriaListSerializer
 
 class LicenciaSerializer(serializers.ModelSerializer):
     """
@@ -81,3 +192,23 @@ class LicenciaSerializer(serializers.ModelSerializer):
         model = Licencia
         fields = '__all__'
         read_only_fields = ('id',)
+
+class VigenciaLicenciaSerializer(serializers.ModelSerializer):
+    """
+    Serializador de la vigencia de la licencia de un conductor.
+    """
+    vigente = serializers.SerializerMethodField(help_text=_("Si la licencia está vigente hoy."))
+    dias_restantes = serializers.SerializerMethodField(
+        help_text=_("Días hasta la caducidad (negativo si ya caducó).")
+    )
+
+    class Meta:
+        model = Licencia
+        fields = ('conductor', 'tipo', 'fecha_de_caducidad', 'puntos', 'vigente', 'dias_restantes')
+        read_only_fields = fields
+
+    def get_vigente(self, licencia: Licencia) -> bool:
+        return licencia.esta_vigente()
+
+    def get_dias_restantes(self, licencia: Licencia) -> int:
+        return (licencia.fecha_de_caducidad - date.today()).days
@@ -0,0 +1,45 @@
+"""signals.py
+
+Conecta:
+    - La actualización del kilometraje actual al eliminar lecturas, también
+      con `QuerySet.delete` y en cascada, que no llaman a `Kilometraje.delete`.
+    - La invalidación de las respuestas en caché que dependen de la bitácora
+      de kilometrajes (costos por kilómetro de las órdenes de trabajo).
+    - La generación de las miniaturas de las fotografías de los vehículos.
+    - La actualización de la empresa de las lecturas y de las licencias al
+      cambiar la empresa de su vehículo o de su conductor (ver `alcance.py`).
+
+Las lecturas insertadas con `bulk_create` no emiten señales; la ingesta
+en bloque invalida el grupo por su cuenta (ver `ingesta.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from django.db.models.signals import post_delete
+
+from administracion_vehicular.alcance import conectar_propagacion
+from administracion_vehicular.cache import conectar_invalidacion
+from administracion_vehicular.imagenes import conectar_miniaturas
+
+from usuarios.models import PerfilUsuario
+
+from .models import Kilometraje, KilometrajeActual, Licencia, Vehiculo
+
+def al_eliminar_lectura(sender, instance: Kilometraje, **kwargs):
+    """Recalcula el kilometraje actual del vehículo si se eliminó su lectura actual.
+
+    La referencia a la lectura eliminada se anula (`SET_NULL`) antes de la
+    señal, por lo que solo se reconstruyen los vehículos que la perdieron.
+    """
+    if KilometrajeActual.objects.filter(
+        vehiculo_id=instance.vehiculo_id, lectura__isnull=True
+    ).exists():
+        KilometrajeActual.objects.reconstruir([instance.vehiculo_id])
+
+post_delete.connect(
+    al_eliminar_lectura, sender=Kilometraje, dispatch_uid='vehiculos:kilometraje_actual'
+)
+
+conectar_invalidacion('kilometrajes', [Kilometraje])
+conectar_propagacion(Kilometraje, 'vehiculo', Vehiculo)
+conectar_propagacion(Licencia, 'conductor', PerfilUsuario)
+conectar_miniaturas([Vehiculo], ['foto_vehiculo', 'foto_matricula'])
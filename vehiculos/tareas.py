@@ -0,0 +1,41 @@
+"""tareas.py
+
+Este módulo registra las operaciones costosas de los vehículos como tareas
+en segundo plano (ver `tareas/registro.py`).
+
+Autor: Christopher Villamarín (@xeland314)
+"""
+from datetime import date
+from typing import List, Optional
+
+from tareas.registro import tarea
+
+from .ingesta import ingerir_kilometrajes
+from .licencias import escanear_empresas
+from .llantas import completar_fechas_fabricacion
+from .models import Llanta, Vehiculo
+
+@tarea('vehiculos.escanear_licencias')
+def escanear_licencias(empresas: Optional[List[int]] = None, fecha: Optional[str] = None) -> list:
+    """Revisa la caducidad de las licencias (ver `licencias.escanear_empresas`)."""
+    return escanear_empresas(empresas, date.fromisoformat(fecha) if fecha else None)
+
+@tarea('vehiculos.completar_fechas_llantas')
+def completar_fechas_llantas(todas: bool = False) -> int:
+    """Calcula la fecha de fabricación de las llantas que no la tienen (o de todas)."""
+    llantas = Llanta.objects.all()
+    if not todas:
+        llantas = llantas.filter(fecha_fabricacion__isnull=True)
+    return completar_fechas_fabricacion(llantas)
+
+# Sin reintentos: una ingesta repetida duplicaría las lecturas ya guardadas.
+@tarea('vehiculos.ingerir_kilometrajes', max_intentos=1)
+def ingerir_kilometrajes_en_bloque(
+    filas: list, empresa: Optional[int] = None, todas_las_empresas: bool = False
+) -> dict:
+    """Registra en bloque lecturas de odómetro de los vehículos de una empresa
+    (o de todas, para los usuarios del personal)."""
+    vehiculos = Vehiculo.objects.all()
+    if not todas_las_empresas:
+        vehiculos = vehiculos.filter(empresa_id=empresa)
+    return ingerir_kilometrajes(filas, vehiculos=vehiculos)
@@ -6,11 +6,45 @@ Este módulo define los tests para control_vehicular.
 Autor: Christopher Villamarín (@xeland314)
 """
 
+from datetime import date
+from decimal import Decimal
+import csv
+import gzip
+from io import BytesIO, StringIO
+import json
 import random
+import tempfile
+import time
 import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
 
+from administracion_vehicular.almacenamiento import AlmacenamientoLocal
+from administracion_vehicular.pagination import PaginacionCursor
+from administracion_vehicular.validacion import validar_varios
+from ordenes_de_mantenimiento.enums import EstadoCumplimiento
+from ordenes_de_mantenimiento.models import AperturaOrdenMovimiento, CierreOrdenMovimiento
+from usuarios.tests import crear_empresa, crear_perfil
+
+from .enums import (
+    Combustible,
+    CondicionVehicular,
+    PosicionLlanta,
+    TipoLicencia,
+    UnidadCarburante,
+    UnidadOdometro
+)
 from .exceptions import (
     CodigoDotInvalido,
     PlacaVehicularInvalida,
@@ -29,6 +63,37 @@ from .validators import (
     validar_anio_fabricacion,
     validar_codigo_bateria,
 )
+from .ingesta import ingerir_kilometrajes
+from .licencias import escanear_licencias
+from .llantas import reporte_antiguedad
+from .models import Kilometraje, KilometrajeActual, Licencia, Llanta, Vehiculo
+from .odometro import ValidadorKilometraje
+from .serializers import (
+    KilometrajeSerializer,
+    LlantaListSerializer,
+    LlantaSerializer,
+    VehiculoSerializer
+)
+
+def crear_vehiculo(empresa, propietario, placa: str = "ABC-1234") -> Vehiculo:
+    """Crea un vehículo de la empresa indicada para las pruebas."""
+    return Vehiculo.objects.create(
+        empresa=empresa,
+        propietario=propietario,
+        anio_de_fabricacion=2018,
+        cilindraje=1.6,
+        color="Blanco",
+        clase="Camioneta",
+        combustible=Combustible.DIESEL.value,
+        condicion=CondicionVehicular.OPERABLE.value,
+        marca="Toyota",
+        modelo="Hilux",
+        numero_de_chasis=f"CH-{placa}",
+        placa=placa,
+        tonelaje=1.5,
+        valor_unidad_carburante=1.75,
+        unidad_carburante=UnidadCarburante.GALONES.value
+    )
 
 class UtilsTestCase(TestCase):
     """Clase de pruebas para las funciones de utilidad."""
@@ -149,6 +214,925 @@ class UtilsTestCase(TestCase):
             CodigoBateriaInvalido, validar_codigo_bateria, "1283944"
         )
 
+    def test_placas_de_motos(self) -> None:
+        """El patrón combinado acepta las placas de motos con letra final."""
+        self.assertTrue(es_una_placa_de_vehiculo_valida('AB-123C'))
+        self.assertFalse(es_una_placa_de_vehiculo_valida('AB-1234'))
+        self.assertFalse(es_una_placa_de_vehiculo_valida('ABC-123C'))
+
+class ValidacionEnLoteTestCase(TestCase):
+    """Pruebas de la validación en lote de las cargas masivas."""
+
+    def test_validar_varios(self) -> None:
+        """Devuelve la máscara y los errores de los valores inválidos por posición."""
+        resultado = validar_varios(
+            ['ABC-1234', 'ABCD-1234', 'AB-123'],
+            es_una_placa_de_vehiculo_valida,
+            validar_placa_vehicular
+        )
+        self.assertEqual(resultado.mascara, [True, False, True])
+        self.assertEqual(list(resultado.errores), [1])
+        self.assertIn('ABCD-1234', resultado.errores[1][0])
+
+    def test_lista_de_llantas(self) -> None:
+        """Los errores del lote se combinan con los de cada fila."""
+        serializer = LlantaSerializer(data=[
+            {'codigo_de_fabricacion': 'DOT-80CB-PWP5-0823'},
+            {'codigo_de_fabricacion': 'DOT-80CB-PWP50823'},
+        ], many=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertNotIn('codigo_de_fabricacion', serializer.errors[0])
+        self.assertIn('vehiculo', serializer.errors[0])
+        self.assertIn('vehiculo', serializer.errors[1])
+        self.assertEqual(len(serializer.errors[1]['codigo_de_fabricacion']), 1)
+        self.assertIn('DOT-80CB-PWP50823', serializer.errors[1]['codigo_de_fabricacion'][0])
+
+    def test_valores_revisados_en_lote(self) -> None:
+        """El serializer de cada fila no vuelve a validar los valores revisados en lote."""
+        campos = {'codigo_de_fabricacion': (lambda codigo: True, validar_codigo_dot)}
+        serializer = LlantaSerializer(
+            data=[{'codigo_de_fabricacion': 'DOT-80CB-PWP50823'}], many=True
+        )
+        with mock.patch.object(LlantaListSerializer, 'campos_validados_en_lote', campos):
+            self.assertFalse(serializer.is_valid())
+        self.assertNotIn('codigo_de_fabricacion', serializer.errors[0])
+        campo = serializer.child.fields['codigo_de_fabricacion']
+        self.assertIn(validar_codigo_dot, campo.validators)
+
+    def test_lista_de_vehiculos_valida(self) -> None:
+        """Las filas con placas válidas se validan con el serializer de cada fila."""
+        serializer = VehiculoSerializer(data=[{'placa': 'ABC-1234'}], many=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertNotIn('placa', serializer.errors[0])
+        self.assertIn('marca', serializer.errors[0])
+
+class PaginacionTestCase(TestCase):
+    """Pruebas de la paginación por cursor de las rutas de la API."""
+
+    def setUp(self):
+        empresa = crear_empresa()
+        self.vehiculo = crear_vehiculo(empresa, crear_perfil(empresa, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def registrar_kilometraje(self, valor: int) -> Kilometraje:
+        """Registra una lectura del odómetro del vehículo."""
+        return Kilometraje.objects.create(
+            vehiculo=self.vehiculo,
+            kilometraje=valor,
+            unidad=UnidadOdometro.KILOMETROS.value,
+            fecha=date(2023, 1, 1)
+        )
+
+    def recorrer(self, url: str, al_recibir_pagina=None) -> list:
+        """Recorre todas las páginas de una ruta y devuelve los ids recibidos."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+            if al_recibir_pagina:
+                al_recibir_pagina()
+        return ids
+
+    def test_search_by_paginado(self):
+        """`search_by` devuelve páginas del tamaño pedido sin repetir registros."""
+        esperados = [self.registrar_kilometraje(valor).id for valor in range(7)]
+        url = f"/api/v1/kilometrajes/search_by/?vehiculo_id={self.vehiculo.id}&page_size=3"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(sorted(self.recorrer(url)), esperados)
+
+    def test_paginas_estables_con_inserciones_concurrentes(self):
+        """Los registros insertados mientras se recorre la lista no desplazan las páginas."""
+        esperados = [self.registrar_kilometraje(valor).id for valor in range(6)]
+        ids = self.recorrer(
+            "/api/v1/kilometrajes/?page_size=2",
+            al_recibir_pagina=lambda: self.registrar_kilometraje(100)
+        )
+        self.assertEqual(ids, sorted(esperados, reverse=True))
+
+    def test_tamanio_maximo_de_pagina(self):
+        """El tamaño de página pedido por el cliente se limita a `max_page_size`."""
+        for valor in range(3):
+            self.registrar_kilometraje(valor)
+        with mock.patch.object(PaginacionCursor, 'max_page_size', 2):
+            response = self.client.get("/api/v1/kilometrajes/?page_size=50")
+        self.assertEqual(len(response.data['results']), 2)
+
+class BusquedaTestCase(TestCase):
+    """Pruebas de las acciones `search_by` con parámetros tipados."""
+
+    def setUp(self):
+        empresa = crear_empresa()
+        self.conductor = crear_perfil(empresa, 1)
+        self.vehiculo = crear_vehiculo(empresa, self.conductor)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def test_parametros_invalidos(self):
+        """Los parámetros ausentes o de otro tipo se rechazan con 400."""
+        for consulta in (
+            "", "?vehiculo_id=abc", "?vehiculo_id=-1", f"?vehiculo_id={2 ** 64}",
+            "?vehiculo_id=%C2%B2", "?vehiculo_id=%D9%A3",
+        ):
+            response = self.client.get(f"/api/v1/kilometrajes/search_by/{consulta}")
+            self.assertEqual(response.status_code, 400, consulta)
+            self.assertIn('error', response.data)
+
+    def test_sin_resultados_devuelve_una_pagina_vacia(self):
+        """Una búsqueda sin coincidencias devuelve una página vacía en una sola consulta."""
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/kilometrajes/search_by/?vehiculo_id=999")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_by_licencias(self):
+        """Las licencias se buscan por conductor y se devuelven paginadas."""
+        licencia = Licencia.objects.create(
+            conductor=self.conductor,
+            tipo=TipoLicencia.B.value,
+            fecha_de_emision=date(2020, 1, 1),
+            fecha_de_caducidad=date(2025, 1, 1),
+            puntos=30
+        )
+        response = self.client.get(
+            f"/api/v1/licencias/search_by/?conductor_id={self.conductor.id}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [licencia.id])
+
+class ExportacionTestCase(TestCase):
+    """Pruebas de la exportación en flujo de la bitácora de kilometrajes."""
+
+    URL = "/api/v1/kilometrajes/exportar/"
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        propietario = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, propietario)
+        otra = crear_empresa("Otra empresa")
+        self.ajeno = crear_vehiculo(otra, crear_perfil(otra, 2), "XYZ-9999")
+        for dia in range(1, 6):
+            Kilometraje.objects.create(
+                vehiculo=self.vehiculo, kilometraje=1000 * dia,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, dia)
+            )
+        Kilometraje.objects.create(
+            vehiculo=self.ajeno, kilometraje=10,
+            unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, 1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def descargar(self, consulta: str, **kwargs):
+        response = self.client.get(f"{self.URL}?empresa_id={self.empresa.id}{consulta}", **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_con_rango_de_fechas(self):
+        """Se exportan en CSV las lecturas de la empresa dentro del rango."""
+        response, contenido = self.descargar(
+            "&desde=2023-01-02&hasta=2023-01-04", HTTP_ACCEPT="text/csv"
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        filas = list(csv.reader(StringIO(contenido.decode())))
+        self.assertEqual(
+            filas[0], ['id', 'vehiculo_id', 'vehiculo__placa', 'fecha', 'kilometraje', 'unidad']
+        )
+        self.assertEqual([fila[3] for fila in filas[1:]], ['2023-01-02', '2023-01-03', '2023-01-04'])
+
+    def test_ndjson_comprimido(self):
+        """El NDJSON se comprime con gzip si el cliente lo acepta."""
+        response, contenido = self.descargar(
+            "&formato=ndjson", HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lineas = gzip.decompress(contenido).decode().splitlines()
+        self.assertEqual(len(lineas), 5)
+        self.assertEqual(json.loads(lineas[0])['vehiculo__placa'], self.vehiculo.placa)
+
+    def test_parametros_invalidos(self):
+        """Se requiere la empresa y un formato conocido."""
+        self.assertEqual(self.client.get(self.URL).status_code, 400)
+        response = self.client.get(f"{self.URL}?empresa_id={self.empresa.id}&formato=xml")
+        self.assertEqual(response.status_code, 400)
+
+def crear_foto(ancho: int = 1200, alto: int = 900, nombre: str = "foto.jpg") -> SimpleUploadedFile:
+    """Crea una fotografía JPEG con metadatos EXIF (orientación girada 90°)."""
+    imagen = Image.new('RGB', (ancho, alto), 'blue')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientación: girar 90° en sentido horario.
+    exif[0x010F] = "Fabricante del teléfono"
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/jpeg')
+
+# Almacenamiento en un directorio temporal en lugar de Google Cloud Storage:
+ALMACENAMIENTO_LOCAL = {
+    'STORAGES': {
+        'default': {'BACKEND': 'administracion_vehicular.almacenamiento.AlmacenamientoLocal'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    'MEDIA_ROOT': tempfile.mkdtemp(),
+    'MEDIA_URL': '/media/',
+}
+
+@override_settings(TAREAS_BACKEND='tareas.backends.BackendInmediato', **ALMACENAMIENTO_LOCAL)
+class MiniaturasTestCase(TestCase):
+    """Pruebas de la generación en segundo plano de las miniaturas."""
+
+    def setUp(self):
+        empresa = crear_empresa()
+        self.vehiculo = crear_vehiculo(empresa, crear_perfil(empresa, 1))
+
+    def subir_foto(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo.foto_vehiculo = crear_foto(**kwargs)
+            self.vehiculo.save()
+        self.vehiculo.refresh_from_db()
+        return self.vehiculo.miniaturas['foto_vehiculo']
+
+    def test_miniaturas_webp_sin_exif(self):
+        """Se generan miniaturas WebP orientadas, reducidas y sin metadatos."""
+        variantes = self.subir_foto()
+        self.assertEqual(variantes['original'], self.vehiculo.foto_vehiculo.name)
+        with default_storage.open(variantes['pequena']) as archivo, Image.open(archivo) as miniatura:
+            self.assertEqual(miniatura.format, 'WEBP')
+            # La orientación EXIF se aplica antes de descartar los metadatos:
+            self.assertEqual(miniatura.size, (120, 160))
+            self.assertEqual(len(miniatura.getexif()), 0)
+        with default_storage.open(variantes['mediana']) as archivo, Image.open(archivo) as miniatura:
+            self.assertEqual(max(miniatura.size), 640)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        data = client.get(f"/api/v1/vehiculos/{self.vehiculo.id}/").data
+        self.assertRegex(
+            data['miniaturas']['foto_vehiculo']['pequena'],
+            r'_pequena\.[0-9a-f]{12}\.webp\?expira=\d+&firma='
+        )
+        self.assertNotIn('foto_matricula', data['miniaturas'])
+
+    def test_reemplazar_la_fotografia(self):
+        """Al reemplazar la fotografía se eliminan las miniaturas anteriores."""
+        anteriores = self.subir_foto()
+        nuevas = self.subir_foto(nombre="otra.jpg")
+        self.assertNotEqual(anteriores['pequena'], nuevas['pequena'])
+        self.assertFalse(default_storage.exists(anteriores['pequena']))
+        self.assertTrue(default_storage.exists(nuevas['pequena']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo.foto_vehiculo = None
+            self.vehiculo.save()
+        self.vehiculo.refresh_from_db()
+        self.assertEqual(self.vehiculo.miniaturas, {})
+        self.assertFalse(default_storage.exists(nuevas['pequena']))
+
+@override_settings(TAREAS_BACKEND='tareas.backends.BackendInmediato', **ALMACENAMIENTO_LOCAL)
+class URLsFirmadasTestCase(TestCase):
+    """Pruebas de la caché de URLs firmadas de las fotografías."""
+
+    def setUp(self):
+        cache.clear()
+        empresa = crear_empresa()
+        propietario = crear_perfil(empresa, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for indice in range(3):
+                vehiculo = crear_vehiculo(empresa, propietario, f"ABC-{1000 + indice}")
+                vehiculo.foto_vehiculo = crear_foto(ancho=400, alto=300)
+                vehiculo.save()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def test_urls_firmadas_una_vez(self):
+        """Las URLs se firman en la primera petición y luego se leen de la caché."""
+        with mock.patch.object(
+            AlmacenamientoLocal, 'firmar', autospec=True, side_effect=AlmacenamientoLocal.firmar
+        ) as firmar:
+            primera = self.client.get("/api/v1/vehiculos/").data['results']
+            # Una fotografía y dos miniaturas por vehículo:
+            self.assertEqual(firmar.call_count, 9)
+            segunda = self.client.get("/api/v1/vehiculos/").data['results']
+            self.assertEqual(firmar.call_count, 9)
+        self.assertEqual(primera, segunda)
+
+        url = urlparse(primera[0]['foto_vehiculo'])
+        consulta = parse_qs(url.query)
+        response = self.client.get(primera[0]['foto_vehiculo'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\xff\xd8'))
+        firma_invalida = {'expira': consulta['expira'][0], 'firma': 'x'}
+        self.assertEqual(self.client.get(url.path, firma_invalida).status_code, 403)
+        expirada = int(consulta['expira'][0]) - 10 ** 6
+        self.assertTrue(url.path.startswith('/media/'))
+        self.assertEqual(self.client.get(url.path, {
+            'expira': expirada,
+            'firma': default_storage.firmar(url.path[len('/media/'):], expirada),
+        }).status_code, 403)
+
+    @override_settings(CACHE_RESPUESTAS_TIMEOUT=300, MEDIA_URL_MARGEN=120)
+    def test_urls_no_expiran_en_respuestas_cacheadas(self):
+        """Una URL deja de entregarse antes de que pueda expirar dentro de una
+        respuesta cacheada o mientras el cliente la usa."""
+        nombre = Vehiculo.objects.first().foto_vehiculo.name
+        url, vigencia = default_storage.generar_url(nombre)
+        restante = int(parse_qs(urlparse(url).query)['expira'][0]) - time.time()
+        self.assertGreaterEqual(restante - vigencia, 300 + 120 - 1)
+
+    @override_settings(MEDIA_CDN_URL='https://cdn.example.com/')
+    def test_miniaturas_desde_la_cdn(self):
+        """Las miniaturas, direccionadas por contenido, se sirven desde la CDN sin firma."""
+        vehiculo = self.client.get("/api/v1/vehiculos/").data['results'][0]
+        miniatura = vehiculo['miniaturas']['foto_vehiculo']['mediana']
+        self.assertRegex(miniatura, r'^https://cdn\.example\.com/miniaturas/.+\.webp$')
+        self.assertIn('firma=', vehiculo['foto_vehiculo'])
+
+class KilometrajeActualTestCase(TestCase):
+    """Pruebas del kilometraje actual desnormalizado de los vehículos."""
+
+    def setUp(self):
+        empresa = crear_empresa()
+        propietario = crear_perfil(empresa, 1)
+        self.vehiculo = crear_vehiculo(empresa, propietario)
+        self.otro_vehiculo = crear_vehiculo(empresa, propietario, "XYZ-987")
+
+    def registrar(self, valor: int, fecha: date, vehiculo=None) -> Kilometraje:
+        return Kilometraje.objects.create(
+            vehiculo=vehiculo or self.vehiculo,
+            kilometraje=valor,
+            unidad=UnidadOdometro.KILOMETROS.value,
+            fecha=fecha
+        )
+
+    def actual(self, vehiculo=None) -> KilometrajeActual:
+        return KilometrajeActual.objects.get(vehiculo=vehiculo or self.vehiculo)
+
+    def test_se_conserva_la_lectura_mas_reciente(self):
+        """Una lectura con fecha anterior no reemplaza al kilometraje actual."""
+        self.registrar(1000, date(2023, 1, 1))
+        reciente = self.registrar(3000, date(2023, 3, 1))
+        self.registrar(2000, date(2023, 2, 1))
+        self.assertEqual(self.actual().lectura_id, reciente.id)
+        self.assertEqual(self.actual().kilometraje, 3000)
+
+    def test_eliminar_y_modificar_la_lectura_actual(self):
+        """Al eliminar o mover la lectura actual se recalcula el kilometraje actual."""
+        anterior = self.registrar(1000, date(2023, 1, 1))
+        reciente = self.registrar(3000, date(2023, 3, 1))
+        reciente.fecha = date(2022, 12, 1)
+        reciente.save()
+        self.assertEqual(self.actual().lectura_id, anterior.id)
+        anterior.delete()
+        self.assertEqual(self.actual().lectura_id, reciente.id)
+        reciente.delete()
+        self.assertFalse(KilometrajeActual.objects.filter(vehiculo=self.vehiculo).exists())
+
+    def test_eliminar_con_queryset_y_en_cascada(self):
+        """Las eliminaciones que no llaman a `delete()` también recalculan el
+        kilometraje actual."""
+        anterior = self.registrar(1000, date(2023, 1, 1))
+        reciente = self.registrar(3000, date(2023, 3, 1))
+        Kilometraje.objects.filter(id=reciente.id).delete()
+        self.assertEqual(self.actual().lectura_id, anterior.id)
+        self.assertEqual(self.actual().kilometraje, 1000)
+        # Al eliminar el vehículo se eliminan en cascada sus lecturas:
+        self.vehiculo.delete()
+        self.assertFalse(Kilometraje.objects.filter(id=anterior.id).exists())
+        self.assertFalse(KilometrajeActual.objects.filter(vehiculo_id=anterior.vehiculo_id).exists())
+
+    def test_mover_la_lectura_a_otro_vehiculo(self):
+        """El vehículo anterior deja de apuntar a una lectura que se movió."""
+        anterior = self.registrar(1000, date(2023, 1, 1))
+        reciente = Kilometraje.objects.get(id=self.registrar(3000, date(2023, 3, 1)).id)
+        reciente.vehiculo = self.otro_vehiculo
+        reciente.save()
+        self.assertEqual(self.actual().lectura_id, anterior.id)
+        self.assertEqual(self.actual(self.otro_vehiculo).lectura_id, reciente.id)
+
+    def test_reconstruir(self):
+        """El comando reconstruye el kilometraje actual de todos los vehículos."""
+        self.registrar(1000, date(2023, 1, 1))
+        self.registrar(5000, date(2023, 5, 1))
+        self.registrar(700, date(2023, 2, 1), self.otro_vehiculo)
+        KilometrajeActual.objects.all().delete()
+        call_command('reconstruir_kilometraje_actual', stdout=StringIO())
+        self.assertEqual(self.actual().kilometraje, 5000)
+        self.assertEqual(self.actual(self.otro_vehiculo).kilometraje, 700)
+
+    def test_serializador_y_filtros(self):
+        """El kilometraje actual se expone en los vehículos y permite filtrarlos."""
+        self.registrar(5000, date(2023, 5, 1))
+        self.registrar(700, date(2023, 2, 1), self.otro_vehiculo)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+        response = client.get("/api/v1/vehiculos/?kilometraje_min=1000")
+        self.assertEqual([v['id'] for v in response.data['results']], [self.vehiculo.id])
+        self.assertEqual(response.data['results'][0]['kilometraje_actual']['kilometraje'], '5000.00')
+
+        response = client.get("/api/v1/vehiculos/?kilometraje_max=1000")
+        self.assertEqual([v['id'] for v in response.data['results']], [self.otro_vehiculo.id])
+        self.assertEqual(client.get("/api/v1/vehiculos/?kilometraje_max=abc").status_code, 400)
+
+class IngestaKilometrajeTestCase(TestCase):
+    """Pruebas de la ingesta en bloque de lecturas de odómetro."""
+
+    URL = "/api/v1/kilometrajes/bulk/"
+
+    def setUp(self):
+        empresa = crear_empresa()
+        propietario = crear_perfil(empresa, 1)
+        self.vehiculo = crear_vehiculo(empresa, propietario)
+        self.otro_vehiculo = crear_vehiculo(empresa, propietario, "XYZ-987")
+        Kilometraje.objects.create(
+            vehiculo=self.vehiculo, kilometraje=1000,
+            unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, 1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def lectura(self, vehiculo, kilometraje, fecha="2023-02-01", unidad="km"):
+        return {"vehiculo": vehiculo, "kilometraje": kilometraje, "unidad": unidad, "fecha": fecha}
+
+    def test_ingesta_json_con_reporte_de_errores(self):
+        lecturas = [
+            self.lectura(self.vehiculo.id, 1500),
+            self.lectura(self.otro_vehiculo.id, 300, unidad="mi"),
+            self.lectura(999999, 100),
+            self.lectura(self.vehiculo.id, 900, fecha="2023-03-01"),
+            self.lectura(self.vehiculo.id, "abc", unidad="días"),
+            self.lectura(self.vehiculo.id, 2000, fecha="2023-03-01"),
+        ]
+        # El bloqueo de los vehículos, una consulta de validación, un INSERT y
+        # las del kilometraje actual (más los savepoints), sin importar el
+        # número de lecturas.
+        with self.assertNumQueries(11):
+            response = self.client.post(self.URL, lecturas, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recibidas'], 6)
+        self.assertEqual(response.data['creadas'], 3)
+        errores = {error['fila']: error['errores'] for error in response.data['errores']}
+        self.assertEqual(set(errores), {2, 3, 4})
+        self.assertIn('vehiculo', errores[2])
+        self.assertIn('kilometraje', errores[3])
+        self.assertEqual(set(errores[4]), {'kilometraje', 'unidad'})
+
+        actual = KilometrajeActual.objects.get(vehiculo=self.vehiculo)
+        self.assertEqual(actual.kilometraje, 2000)
+        self.assertEqual(actual.fecha, date(2023, 3, 1))
+        self.assertEqual(
+            KilometrajeActual.objects.get(vehiculo=self.otro_vehiculo).unidad, "mi"
+        )
+
+    def test_ingesta_ndjson(self):
+        cuerpo = "\n".join(json.dumps(self.lectura(self.otro_vehiculo.id, 100 * dia, f"2023-01-{dia:02d}"))
+                           for dia in range(1, 21)) + "\n\n"
+        response = self.client.post(self.URL, cuerpo, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['creadas'], 20)
+        self.assertEqual(KilometrajeActual.objects.get(vehiculo=self.otro_vehiculo).kilometraje, 2000)
+
+        response = self.client.post(self.URL, "{malo", content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 400)
+
+    def test_cuerpo_invalido(self):
+        self.assertEqual(self.client.post(self.URL, {"a": 1}, format="json").status_code, 400)
+        response = self.client.post(self.URL, [self.lectura(999999, 1)], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['creadas'], 0)
+        # Dígitos que `int` no acepta e ids fuera de rango son errores de la fila:
+        response = self.client.post(
+            self.URL, [self.lectura("²", 1), self.lectura(10 ** 30, 1)], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([set(error['errores']) for error in response.data['errores']],
+                         [{'vehiculo'}, {'vehiculo'}])
+        with self.settings(INGESTA_KILOMETRAJE_MAX_FILAS=1):
+            response = self.client.post(
+                self.URL, [self.lectura(self.vehiculo.id, 1)] * 2, format="json"
+            )
+        self.assertEqual(response.status_code, 400)
+
+class AlcanceEmpresaTestCase(TestCase):
+    """Pruebas del aislamiento de los registros de cada empresa."""
+
+    def setUp(self):
+        cache.clear()
+        self.empresa = crear_empresa()
+        self.otra_empresa = crear_empresa("Otra")
+        self.perfil = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, self.perfil)
+        self.otro_vehiculo = crear_vehiculo(
+            self.otra_empresa, crear_perfil(self.otra_empresa, 2), "XYZ-987"
+        )
+        for vehiculo in (self.vehiculo, self.otro_vehiculo):
+            Kilometraje.objects.create(
+                vehiculo=vehiculo, kilometraje=1000,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, 1)
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.perfil.user)
+
+    def test_listados_limitados_a_la_empresa(self):
+        response = self.client.get("/api/v1/vehiculos/")
+        self.assertEqual([fila['placa'] for fila in response.data['results']], ["ABC-1234"])
+        response = self.client.get("/api/v1/kilometrajes/")
+        self.assertEqual(
+            {fila['empresa'] for fila in response.data['results']}, {self.empresa.id}
+        )
+        url = f"/api/v1/vehiculos/{self.otro_vehiculo.id}/"
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(
+            "/api/v1/ordenes_trabajo/costos/", {'empresa_id': self.otra_empresa.id}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_escrituras_fuera_de_la_empresa(self):
+        lectura = {
+            "vehiculo": self.otro_vehiculo.id, "kilometraje": 1500,
+            "unidad": UnidadOdometro.KILOMETROS.value, "fecha": "2023-02-01"
+        }
+        response = self.client.post("/api/v1/kilometrajes/", lectura, format="json")
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post("/api/v1/kilometrajes/bulk/", [lectura], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Kilometraje.objects.filter(vehiculo=self.otro_vehiculo).count(), 1)
+
+        lectura['vehiculo'] = self.vehiculo.id
+        response = self.client.post("/api/v1/kilometrajes/", lectura, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Kilometraje.objects.get(id=response.data['id']).empresa_id, self.empresa.id)
+
+    def test_usuarios_sin_perfil_no_ven_registros(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="sin_perfil"))
+        self.assertEqual(client.get("/api/v1/vehiculos/").data['results'], [])
+        self.assertEqual(client.get("/api/v1/empresas/").data['results'], [])
+
+    def test_empresa_del_usuario_en_cache(self):
+        self.client.get("/api/v1/vehiculos/")
+        # La empresa del usuario ya no se consulta:
+        with self.assertNumQueries(1):
+            self.client.get("/api/v1/vehiculos/")
+        # Al cambiar la empresa del perfil se vuelve a consultar:
+        self.perfil.empresa = self.otra_empresa
+        self.perfil.save()
+        response = self.client.get("/api/v1/vehiculos/")
+        self.assertEqual([fila['placa'] for fila in response.data['results']], ["XYZ-987"])
+
+    def test_empresa_copiada_del_vehiculo(self):
+        self.vehiculo.empresa = self.otra_empresa
+        self.vehiculo.save()
+        self.assertEqual(
+            set(Kilometraje.objects.filter(vehiculo=self.vehiculo).values_list('empresa', flat=True)),
+            {self.otra_empresa.id}
+        )
+
+class ConsultasAsincronasTestCase(TestCase):
+    """Pruebas de las versiones síncrona y asíncrona de las consultas frecuentes."""
+
+    def setUp(self):
+        cache.clear()
+        self.empresa = crear_empresa()
+        self.conductor = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, self.conductor)
+        self.otro_vehiculo = crear_vehiculo(
+            crear_empresa("Otra"), self.conductor, "XYZ-987"
+        )
+        self.lecturas = [
+            Kilometraje.objects.create(
+                vehiculo=self.vehiculo, kilometraje=1000 + indice * 100,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, 1 + indice)
+            )
+            for indice in range(3)
+        ]
+        self.cerrada = self.crear_apertura(self.lecturas[0], date(2023, 1, 1))
+        CierreOrdenMovimiento.objects.create(
+            apertura=self.cerrada, fecha_retorno_vehiculo=date(2023, 1, 2),
+            kilometraje_retorno=self.lecturas[1], cumplimiento=EstadoCumplimiento.CUMPLIDO.value
+        )
+        self.abierta = self.crear_apertura(self.lecturas[2], date(2023, 1, 3))
+        Licencia.objects.create(
+            conductor=self.conductor, tipo=TipoLicencia.B.value,
+            fecha_de_emision=date(2020, 1, 1), fecha_de_caducidad=date(2099, 1, 1), puntos=30
+        )
+        token = Token.objects.create(user=self.conductor.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def crear_apertura(self, lectura, fecha) -> AperturaOrdenMovimiento:
+        return AperturaOrdenMovimiento.objects.create(
+            responsable=self.conductor, conductor=self.conductor, vehiculo=self.vehiculo,
+            kilometraje_salida=lectura, fecha_salida_vehiculo=fecha,
+            itinerario="Quito - Ambato", detalle_comision="Entrega"
+        )
+
+    def comparar(self, ruta: str, **parametros):
+        """Verifica que ambas versiones de la consulta respondan lo mismo."""
+        sincrona = self.client.get(f"/api/v1/{ruta}", parametros)
+        asincrona = self.client.get(f"/api/v1/async/{ruta}", parametros)
+        self.assertEqual(sincrona.status_code, 200)
+        self.assertEqual(asincrona.status_code, 200)
+        self.assertEqual(json.loads(sincrona.content), asincrona.json())
+        return asincrona.json()
+
+    def test_orden_abierta(self):
+        datos = self.comparar("apertura_ordenes_movimiento/abierta/")
+        self.assertEqual(datos['id'], self.abierta.id)
+        self.assertEqual(
+            self.comparar("apertura_ordenes_movimiento/abierta/", conductor_id=self.conductor.id),
+            datos
+        )
+        CierreOrdenMovimiento.objects.create(
+            apertura=self.abierta, fecha_retorno_vehiculo=date(2023, 1, 4),
+            kilometraje_retorno=Kilometraje.objects.create(
+                vehiculo=self.vehiculo, kilometraje=1500,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 1, 4)
+            ),
+            cumplimiento=EstadoCumplimiento.CUMPLIDO.value
+        )
+        for ruta in ("/api/v1/", "/api/v1/async/"):
+            response = self.client.get(f"{ruta}apertura_ordenes_movimiento/abierta/")
+            self.assertEqual(response.status_code, 404)
+
+    def test_estado_vehiculo(self):
+        datos = self.comparar(f"vehiculos/{self.vehiculo.id}/estado/")
+        self.assertEqual(datos['orden_movimiento_abierta'], self.abierta.id)
+        self.assertEqual(datos['kilometraje_actual']['fecha'], "2023-01-03")
+        # Los vehículos de otras empresas no existen para el usuario:
+        response = self.client.get(f"/api/v1/async/vehiculos/{self.otro_vehiculo.id}/estado/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_vigencia_licencia(self):
+        datos = self.comparar("licencias/vigencia/")
+        self.assertTrue(datos['vigente'])
+        self.assertGreater(datos['dias_restantes'], 0)
+        response = self.client.get("/api/v1/async/licencias/vigencia/", {'conductor_id': "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_autenticacion_requerida(self):
+        client = APIClient()
+        response = client.get("/api/v1/async/licencias/vigencia/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], "Token")
+        client.credentials(HTTP_AUTHORIZATION="Token invalido")
+        self.assertEqual(client.get("/api/v1/async/licencias/vigencia/").status_code, 401)
+        self.assertEqual(self.client.post("/api/v1/async/licencias/vigencia/").status_code, 405)
+
+class LicenciaCaducidadTestCase(TestCase):
+    """Pruebas del escaneo de caducidad de las licencias."""
+
+    HOY = date(2024, 6, 1)
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.otra_empresa = crear_empresa("Otra")
+        caducidades = [date(2024, 5, 20), date(2024, 6, 5), date(2024, 6, 20),
+                       date(2024, 8, 1), date(2025, 6, 1)]
+        self.conductores = []
+        for indice, caducidad in enumerate(caducidades, start=1):
+            conductor = crear_perfil(self.empresa, indice)
+            Licencia.objects.create(
+                conductor=conductor, tipo=TipoLicencia.B.value,
+                fecha_de_emision=date(2019, 1, 1), fecha_de_caducidad=caducidad, puntos=30
+            )
+            self.conductores.append(conductor)
+        Licencia.objects.create(
+            conductor=crear_perfil(self.otra_empresa, 9), tipo=TipoLicencia.B.value,
+            fecha_de_emision=date(2019, 1, 1), fecha_de_caducidad=date(2024, 5, 1), puntos=30
+        )
+        vehiculo = crear_vehiculo(self.empresa, self.conductores[0])
+        lectura = Kilometraje.objects.create(
+            vehiculo=vehiculo, kilometraje=1000,
+            unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2024, 5, 30)
+        )
+        self.orden = AperturaOrdenMovimiento.objects.create(
+            responsable=self.conductores[1], conductor=self.conductores[0], vehiculo=vehiculo,
+            kilometraje_salida=lectura, fecha_salida_vehiculo=date(2024, 5, 30),
+            itinerario="Quito - Ambato", detalle_comision="Entrega"
+        )
+
+    def test_grupos_y_ordenes_abiertas(self):
+        with self.assertNumQueries(2):
+            reporte = escanear_licencias(self.empresa.id, self.HOY)
+        self.assertEqual(
+            reporte['resumen'], {'caducadas': 1, '7_dias': 1, '30_dias': 1, '90_dias': 1}
+        )
+        self.assertEqual(reporte['licencias']['caducadas'][0]['dias_restantes'], -12)
+        self.assertEqual(
+            reporte['licencias']['7_dias'][0]['conductor']['id'], self.conductores[1].id
+        )
+        self.assertEqual(
+            [orden['id'] for orden in reporte['ordenes_abiertas_con_licencia_caducada']],
+            [self.orden.id]
+        )
+
+    def test_comando_y_accion(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as archivo:
+            salida = StringIO()
+            with self.assertLogs('vehiculos.licencias', level='WARNING'):
+                call_command(
+                    'escanear_licencias', '--empresa', str(self.empresa.id),
+                    '--fecha', "2024-06-01", '--salida', archivo.name, stdout=salida
+                )
+            self.assertIn("caducadas: 1", salida.getvalue())
+            with open(archivo.name, encoding='utf-8') as contenido:
+                reportes = json.load(contenido)
+        self.assertEqual(reportes[0]['licencias']['caducadas'][0]['fecha_de_caducidad'], "2024-05-20")
+
+        client = APIClient()
+        client.force_authenticate(self.conductores[0].user)
+        response = client.get(
+            "/api/v1/licencias/caducidad/", {'empresa_id': self.empresa.id, 'fecha': "2024-06-01"}
+        )
+        self.assertEqual(response.data['resumen']['caducadas'], 1)
+        response = client.get("/api/v1/licencias/caducidad/", {'empresa_id': self.otra_empresa.id})
+        self.assertEqual(response.status_code, 403)
+        response = client.get("/api/v1/licencias/caducidad/", {'fecha': "2024-06-01"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empresa_copiada_del_conductor(self):
+        """La licencia sigue a su conductor cuando este cambia de empresa."""
+        self.assertEqual(Licencia.objects.get(conductor=self.conductores[0]).empresa, self.empresa)
+        self.conductores[0].empresa = self.otra_empresa
+        self.conductores[0].save()
+        self.assertEqual(
+            Licencia.objects.get(conductor=self.conductores[0]).empresa, self.otra_empresa
+        )
+        reporte = escanear_licencias(self.otra_empresa.id, self.HOY)
+        self.assertEqual(reporte['resumen']['caducadas'], 2)
+
+class AntiguedadLlantasTestCase(TestCase):
+    """Pruebas de la fecha de fabricación y la antigüedad de las llantas."""
+
+    HOY = date(2024, 6, 1)
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        propietario = crear_perfil(self.empresa, 1)
+        self.vehiculo = crear_vehiculo(self.empresa, propietario)
+        otro = crear_vehiculo(crear_empresa("Otra"), propietario, "XYZ-987")
+        codigos = [
+            ('DOT-80CB-PWP5-1299', PosicionLlanta.DERECHO_DELANTERO),
+            ('DOT-80CB-PWP5-0815', PosicionLlanta.DERECHO_DELANTERO),
+            ('DOT-80CB-PWP5-2017', PosicionLlanta.REPUESTO),
+            ('DOT-80CB-PWP5-0823', PosicionLlanta.IZQUIERDO_DELANTERO),
+            ('DOT-80CB-PWP5-0000', PosicionLlanta.IZQUIERDO_POSTERIOR),
+        ]
+        for codigo, posicion in codigos:
+            Llanta.objects.create(
+                vehiculo=self.vehiculo, codigo_de_fabricacion=codigo,
+                posicion_respecto_al_vehiculo=posicion.value
+            )
+        Llanta.objects.create(
+            vehiculo=otro, codigo_de_fabricacion='DOT-80CB-PWP5-0101',
+            posicion_respecto_al_vehiculo=PosicionLlanta.REPUESTO.value
+        )
+
+    def test_siglo_de_los_anios_de_dos_digitos(self):
+        self.assertEqual(obtener_fecha_fabricacion('DOT-80CB-PWP5-1299', self.HOY), date(1999, 3, 22))
+        self.assertEqual(obtener_fecha_fabricacion('DOT-80CB-PWP5-0805', self.HOY), date(2005, 2, 21))
+        # Semanas inexistentes o posteriores a la fecha de referencia:
+        self.assertIsNone(obtener_fecha_fabricacion('DOT-80CB-PWP5-5424', self.HOY))
+        self.assertIsNone(obtener_fecha_fabricacion('DOT-80CB-PWP5-4024', self.HOY))
+        self.assertIsNone(obtener_fecha_fabricacion('DOT-80CB-PWP5-0000', self.HOY))
+
+    def test_fecha_guardada_y_completada(self):
+        llanta = Llanta.objects.get(codigo_de_fabricacion='DOT-80CB-PWP5-0815')
+        self.assertEqual(llanta.fecha_fabricacion, date(2015, 2, 16))
+        llanta.codigo_de_fabricacion = 'DOT-80CB-PWP5-0816'
+        llanta.save(update_fields=['codigo_de_fabricacion'])
+        llanta.refresh_from_db()
+        self.assertEqual(llanta.fecha_fabricacion, date(2016, 2, 22))
+
+        Llanta.objects.update(fecha_fabricacion=None)
+        salida = StringIO()
+        call_command('completar_fecha_fabricacion_llantas', stdout=salida)
+        self.assertIn("6 llantas", salida.getvalue())
+        llanta.refresh_from_db()
+        self.assertEqual(llanta.fecha_fabricacion, date(2016, 2, 22))
+
+    def test_reporte_por_posicion(self):
+        with self.assertNumQueries(2):
+            reporte = reporte_antiguedad(self.empresa.id, anios=8, hoy=self.HOY)
+        self.assertEqual(reporte['resumen'], {'total': 5, 'sin_fecha': 1, 'antiguas': 2})
+        self.assertEqual(
+            [llanta['codigo_de_fabricacion']
+             for llanta in reporte['posiciones'][PosicionLlanta.DERECHO_DELANTERO.value]],
+            ['DOT-80CB-PWP5-1299', 'DOT-80CB-PWP5-0815']
+        )
+        self.assertEqual(list(reporte['posiciones']), [PosicionLlanta.DERECHO_DELANTERO.value])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(perfilusuario__empresa=self.empresa))
+        response = client.get(
+            "/api/v1/llantas/antiguedad/", {'empresa_id': self.empresa.id, 'anios': 5}
+        )
+        self.assertEqual(response.data['resumen']['antiguas'], 3)
+        response = client.get("/api/v1/llantas/antiguedad/", {'empresa_id': self.empresa.id + 1})
+        self.assertEqual(response.status_code, 403)
+
+class ValidacionKilometrajeTestCase(TestCase):
+    """Pruebas de la validación de monotonía y saltos del odómetro."""
+
+    def setUp(self):
+        empresa = crear_empresa()
+        propietario = crear_perfil(empresa, 1)
+        self.vehiculo = crear_vehiculo(empresa, propietario)
+        for valor, fecha in ((1000, date(2023, 1, 1)), (2000, date(2023, 2, 1))):
+            Kilometraje.objects.create(
+                vehiculo=self.vehiculo, kilometraje=valor,
+                unidad=UnidadOdometro.KILOMETROS.value, fecha=fecha
+            )
+
+    def serializar(self, kilometraje, fecha, unidad="km", instance=None):
+        return KilometrajeSerializer(instance, data={
+            "vehiculo": self.vehiculo.id, "kilometraje": kilometraje,
+            "unidad": unidad, "fecha": fecha
+        })
+
+    def test_serializador_rechaza_lecturas_incoherentes(self):
+        self.assertTrue(self.serializar(2100, "2023-02-10").is_valid())
+        serializer = self.serializar(1900, "2023-02-10")
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('kilometraje', serializer.errors)
+        # Lectura con fecha pasada: debe quedar entre sus lecturas vecinas.
+        self.assertTrue(self.serializar(1500, "2023-01-15").is_valid())
+        self.assertFalse(self.serializar(2500, "2023-01-15").is_valid())
+        # Salto de 50000 km en un día:
+        self.assertFalse(self.serializar(52000, "2023-02-02").is_valid())
+
+    def test_conversion_de_millas(self):
+        """1300 mi son unos 2092 km y 1200 mi unos 1931 km."""
+        self.assertTrue(self.serializar(1300, "2023-02-10", unidad="mi").is_valid())
+        self.assertFalse(self.serializar(1200, "2023-02-10", unidad="mi").is_valid())
+
+    def test_modificar_una_lectura_no_se_compara_consigo_misma(self):
+        lectura = Kilometraje.objects.get(kilometraje=2000)
+        self.assertTrue(self.serializar(1800, "2023-02-01", instance=lectura).is_valid())
+        self.assertFalse(self.serializar(900, "2023-02-01", instance=lectura).is_valid())
+
+    def test_lote_con_consultas_constantes(self):
+        """Las lecturas vecinas de un lote se cargan en una sola consulta."""
+        lecturas = [
+            {'vehiculo_id': self.vehiculo.id, 'kilometraje': Decimal(valor),
+             'unidad': 'km', 'fecha': fecha}
+            for valor, fecha in (
+                (1100, date(2023, 1, 5)),
+                (1050, date(2023, 1, 10)),
+                (1200, date(2023, 1, 12)),
+                (2500, date(2023, 2, 2)),
+                (90000, date(2023, 2, 3)),
+            )
+        ]
+        with self.assertNumQueries(2):
+            errores, advertencias = ValidadorKilometraje().validar(lecturas)
+        self.assertEqual(set(errores), {1, 4})
+        self.assertEqual(advertencias, {})
+
+        errores, advertencias = ValidadorKilometraje(rechazar_anomalias=False).validar(lecturas)
+        self.assertEqual(set(errores), {1})
+        self.assertEqual(set(advertencias), {4})
+
+    def lectura_concurrente(self):
+        """Simula otra petición que guarda una lectura de 2500 km justo antes
+        de que se obtenga el bloqueo del vehículo."""
+        bloquear = KilometrajeActual.objects.bloquear
+        guardada = []
+
+        def bloquear_tras_lectura(*args, **kwargs):
+            if not guardada:
+                guardada.append(True)
+                Kilometraje.objects.create(
+                    vehiculo=self.vehiculo, kilometraje=2500,
+                    unidad=UnidadOdometro.KILOMETROS.value, fecha=date(2023, 2, 5)
+                )
+            return bloquear(*args, **kwargs)
+
+        return mock.patch.object(
+            KilometrajeActual.objects, 'bloquear', side_effect=bloquear_tras_lectura
+        )
+
+    def test_ingesta_valida_con_el_vehiculo_bloqueado(self):
+        with self.lectura_concurrente():
+            reporte = ingerir_kilometrajes([{
+                'vehiculo': self.vehiculo.id, 'kilometraje': 2100,
+                'unidad': "km", 'fecha': "2023-02-10"
+            }])
+        self.assertEqual(reporte['creadas'], 0)
+        self.assertIn('kilometraje', reporte['errores'][0]['errores'])
+
+    def test_serializador_valida_con_el_vehiculo_bloqueado(self):
+        serializer = self.serializar(2100, "2023-02-10")
+        self.assertTrue(serializer.is_valid())
+        with self.lectura_concurrente(), self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertFalse(Kilometraje.objects.filter(kilometraje=2100).exists())
+
 class TestSuite(TestCase):
     """
     Todos los tests agrupados en uno.
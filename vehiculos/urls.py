@@ -13,6 +13,8 @@ from .views import (
     LlantaView,
     VehiculoView,
     KilometrajeView,
+    estado_vehiculo_asincrono,
+    vigencia_licencia_asincrona,
 )
 
 router = routers.DefaultRouter()
@@ -24,4 +26,15 @@ router.register(r'vehiculos', VehiculoView, basename='vehiculos')
 
 urlpatterns = [
     path('api/v1/', include(router.urls)),
+    # Versiones asíncronas de las consultas más frecuentes (servidas con ASGI):
+    path(
+        'api/v1/async/vehiculos/<int:pk>/estado/',
+        estado_vehiculo_asincrono,
+        name='vehiculos-estado-asincrono'
+    ),
+    path(
+        'api/v1/async/licencias/vigencia/',
+        vigencia_licencia_asincrona,
+        name='licencias-vigencia-asincrona'
+    ),
 ]
@@ -1,5 +1,6 @@
 from datetime import date, datetime
 import re
+from typing import Optional
 
 from .exceptions import (
     CodigoBateriaInvalido,
@@ -9,14 +10,18 @@ from .exceptions import (
     PlacaVehicularInvalida, 
 )
 
+# Patrones compilados una sola vez al importar el módulo:
+# Placas de vehículos (`ABC-1234`) y de motos (`AB-123` o `AB-123A`).
+PATRON_PLACA = re.compile(r'^(?:[A-Z]{3}-\d{3,4}|[A-Z]{2}-\d{3}[A-Z]?)$')
+PATRON_CODIGO_DOT = re.compile(r'^DOT-[A-Z0-9]{4}-[A-Z0-9]{4}-\d{4}$')
+PATRON_CODIGO_BATERIA = re.compile(r'^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]{8,}$')
+
 def es_una_placa_de_vehiculo_valida(placa: str) -> bool:
     """
     Esta función solo verifica si el formato de la placa es válido.
     No verifica si la placa está registrada en el SRI o ANT.
     """
-    patron_vehiculo = r'^[A-Z]{3}\-\d{3,4}$'
-    patron_moto = r'^[A-Z]{2}\-\d{3}[A-Z]?$'
-    return bool(re.match(patron_vehiculo, placa)) or bool(re.match(patron_moto, placa))
+    return PATRON_PLACA.match(placa) is not None
 
 def es_un_codigo_dot_valido(codigo: str) -> bool:
     """
@@ -34,8 +39,7 @@ def es_un_codigo_dot_valido(codigo: str) -> bool:
     Returns:
         bool: True si el código DOT tiene el formato correcto, False en caso contrario.
     """
-    patron = r'^DOT-[A-Z0-9]{4}-[A-Z0-9]{4}-\d{4}$'
-    return bool(re.match(patron, codigo))
+    return PATRON_CODIGO_DOT.match(codigo) is not None
 
 def es_un_anio_de_fabricacion_valido(anio: int):
     """
@@ -58,10 +62,9 @@ def es_un_codigo_bateria_valido(codigo_bateria: str):
     Returns:
         - bool: True si el código de batería es válido, False en caso contrario.
     """
-    patron = r'^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]{8,}$'
-    return bool(re.match(patron, codigo_bateria))
+    return PATRON_CODIGO_BATERIA.match(codigo_bateria) is not None
 
-def obtener_fecha_fabricacion(codigo_dot: str) -> datetime:
+def obtener_fecha_fabricacion(codigo_dot: str, hoy: Optional[date] = None) -> Optional[date]:
     """
     Obtiene la fecha de fabricación de una llanta a partir de su código DOT.
 
@@ -73,22 +76,33 @@ def obtener_fecha_fabricacion(codigo_dot: str) -> datetime:
     los primeros dos dígitos indican la semana del año
     en que fue fabricada y los últimos dos dígitos indican el año.
 
+    El año de dos dígitos se interpreta en el siglo actual, salvo que sea
+    posterior al año de `hoy`: en ese caso corresponde al siglo anterior
+    (p. ej. `99` es 1999 y no 2099).
+
     Args:
         codigo_dot (str): El código DOT de la llanta.
+        hoy (date): Fecha de referencia, por defecto la fecha actual.
 
     Returns:
-        datetime: La fecha de fabricación de la llanta.
+        date: El lunes de la semana ISO de fabricación de la llanta, o None
+        si los últimos cuatro caracteres no son una semana y un año válidos.
     """
-    # Extraer la fecha de fabricación del código DOT
     fecha_fabricacion_str = codigo_dot[-4:]
+    if len(fecha_fabricacion_str) != 4 or not fecha_fabricacion_str.isdigit():
+        return None
     semana_fabricacion = int(fecha_fabricacion_str[:2])
     anio_fabricacion = int(fecha_fabricacion_str[2:])
 
-    # Calcular la fecha de fabricación
-    fecha_fabricacion = datetime.strptime(
-        f'20{anio_fabricacion}-W{semana_fabricacion}-1', '%Y-W%W-%w'
-    )
-    return fecha_fabricacion
+    hoy = hoy or date.today()
+    anio_fabricacion += hoy.year - hoy.year % 100
+    if anio_fabricacion > hoy.year:
+        anio_fabricacion -= 100
+    try:
+        fecha_fabricacion = date.fromisocalendar(anio_fabricacion, semana_fabricacion, 1)
+    except ValueError:
+        return None
+    return fecha_fabricacion if fecha_fabricacion <= hoy else None
 
 def validar_placa_vehicular(placa: str):
     """Valida si una placa vehicular es válida.
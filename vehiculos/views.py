@@ -1,9 +1,36 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Max, Q, QuerySet
+from django.http import Http404, HttpRequest
 from django.utils.translation import gettext_lazy as _
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from administracion_vehicular.alcance import (
+    AlcanceEmpresaMixin,
+    es_global,
+    filtrar_por_empresa,
+    obtener_empresa_id,
+)
+from administracion_vehicular.asincrono import vista_asincrona
+from administracion_vehicular.busqueda import BusquedaMixin, Parametro, obtener_perfil_id
+from administracion_vehicular.exportacion import ExportacionMixin
+from administracion_vehicular.parsers import NDJSONParser
+from tareas.registro import encolar
+from tareas.views import respuesta_tarea
+
+from .ingesta import ingerir_kilometrajes
+from .licencias import escanear_licencias
+from .llantas import reporte_antiguedad
+from .tareas import ingerir_kilometrajes_en_bloque
+
 from .schemas import (
     BateriaFilterSchema,
     KilometrajeFilterSchema,
@@ -13,22 +40,36 @@ from .schemas import (
 )
 from .serializers import (
     BateriaSerializer,
+    EstadoVehiculoSerializer,
     LicenciaSerializer,
     LlantaSerializer,
     KilometrajeSerializer,
     VehiculoSerializer,
+    VigenciaLicenciaSerializer,
 )
 from .models import (
     Bateria, Licencia, Llanta,
     Vehiculo, Kilometraje,
 )
 
-class BateriaView(viewsets.ModelViewSet):
+def estado_de_vehiculos(queryset: QuerySet) -> QuerySet:
+    """Añade a los vehículos su kilometraje actual y el id de su orden de
+    movimiento abierta (`orden_movimiento_abierta`), en una sola consulta."""
+    return queryset.select_related('kilometraje_actual').annotate(
+        orden_movimiento_abierta=Max(
+            'aperturas_vehiculo__id',
+            filter=Q(aperturas_vehiculo__cierreordenmovimiento__isnull=True)
+        )
+    )
+
+class BateriaView(AlcanceEmpresaMixin, BusquedaMixin, viewsets.ModelViewSet):
     """
     Clase que define la vista para listar y crear baterías.
     """
     queryset = Bateria.objects.all()
+    campo_empresa = 'vehiculo__empresa'
     serializer_class = BateriaSerializer
+    parametros_busqueda = (Parametro('vehiculo_id', requerido=True),)
 
     @action(detail=False, methods=['get'], schema=BateriaFilterSchema())
     def search_by(self, request: Request):
@@ -41,33 +82,25 @@ class BateriaView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con el parámetro de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados de las baterías
-            que pertenecen al vehículo especificado, o un mensaje de error si no se
-            encontraron baterías o si el parámetro de búsqueda es incorrecto.
+            Response: Una página con los datos serializados de las baterías
+            que pertenecen al vehículo especificado, o un mensaje de error
+            si el parámetro de búsqueda es incorrecto.
         """
-        vehiculo_id = request.query_params.get('vehiculo_id')
+        return self.buscar(request)
 
-        if not vehiculo_id:
-            return Response(
-                {"error": _("Parámetro de búsqueda incorrecto: vehiculo_id es obligatorio.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            baterias = Bateria.objects.filter(vehiculo_id=vehiculo_id)
-            serializer = BateriaSerializer(baterias, many=True)
-            return Response(serializer.data)
-        except Bateria.DoesNotExist:
-            return Response(
-                {"error": _("No se encontraron baterías para el vehículo especificado.")},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-class LlantaView(viewsets.ModelViewSet):
+class LlantaView(AlcanceEmpresaMixin, BusquedaMixin, viewsets.ModelViewSet):
     """
     Clase que define la vista para listar y crear llantas.
     """
     queryset = Llanta.objects.all()
+    campo_empresa = 'vehiculo__empresa'
     serializer_class = LlantaSerializer
+    presupuesto_consultas = {'antiguedad': 3}
+    parametros_busqueda = (Parametro('vehiculo_id', requerido=True),)
+    parametros_antiguedad = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('anios'),
+    )
 
     @action(detail=False, methods=['get'], schema=LlantaFilterSchema())
     def search_by(self, request: Request):
@@ -80,33 +113,46 @@ class LlantaView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con el parámetro de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados de las llantas
-            que pertenecen al vehículo especificado, o un mensaje de error si no se
-            encontraron llantas o si el parámetro de búsqueda es incorrecto.
+            Response: Una página con los datos serializados de las llantas
+            que pertenecen al vehículo especificado, o un mensaje de error
+            si el parámetro de búsqueda es incorrecto.
         """
-        vehiculo_id = request.query_params.get('vehiculo_id')
+        return self.buscar(request)
 
-        if not vehiculo_id:
-            return Response(
-                {"error": _("Parámetro de búsqueda incorrecto: vehiculo_id es obligatorio.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            llantas = Llanta.objects.filter(vehiculo_id=vehiculo_id)
-            serializer = LlantaSerializer(llantas, many=True)
-            return Response(serializer.data)
-        except Llanta.DoesNotExist:
-            return Response(
-                {"error": _("No se encontraron llantas para el vehículo especificado.")},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    @action(detail=False, methods=['get'], schema=LlantaFilterSchema())
+    def antiguedad(self, request: Request):
+        """Lista las llantas de una empresa que superan la antigüedad máxima.
 
-class LicenciaView(viewsets.ModelViewSet):
+        La antigüedad se calcula desde la fecha de fabricación del código DOT
+        guardada con cada llanta (ver `llantas.py`).
+
+        Args:
+            request (Request): La petición HTTP con los parámetros `empresa_id`
+                y `anios` (opcional, por defecto `LLANTAS_ANTIGUEDAD_MAXIMA`).
+
+        Returns:
+            Response: Los totales de la empresa y las llantas antiguas
+            agrupadas por posición, o un mensaje de error si los parámetros
+            son incorrectos.
+        """
+        parametros = {'anios': None}
+        parametros.update(self.obtener_filtros(request, self.parametros_antiguedad))
+        self.verificar_empresa(parametros['empresa_id'])
+        return Response(reporte_antiguedad(parametros['empresa_id'], parametros['anios']))
+
+class LicenciaView(AlcanceEmpresaMixin, BusquedaMixin, viewsets.ModelViewSet):
     """
     Clase que define la vista para listar y crear licencias.
     """
     queryset = Licencia.objects.all()
+    campo_empresa = 'empresa'
     serializer_class = LicenciaSerializer
+    presupuesto_consultas = {'vigencia': 2, 'caducidad': 3}
+    parametros_busqueda = (Parametro('conductor_id', requerido=True),)
+    parametros_caducidad = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('fecha', tipo=date),
+    )
 
     @action(detail=False, methods=['get'], schema=LicenciaFilterSchema())
     def search_by(self, request: Request):
@@ -119,33 +165,72 @@ class LicenciaView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con el parámetro de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados de las licencias
-            que pertenecen al conductor especificado, o un mensaje de error si no se
-            encontraron licencias o si el parámetro de búsqueda es incorrecto.
+            Response: Una página con los datos serializados de las licencias
+            que pertenecen al conductor especificado, o un mensaje de error
+            si el parámetro de búsqueda es incorrecto.
         """
-        conductor_id = request.query_params.get('conductor_id')
+        return self.buscar(request)
 
-        if not conductor_id:
-            return Response(
-                {"error": _("Parámetro de búsqueda incorrecto: conductor_id es obligatorio.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            licencias = Licencia.objects.filter(conductor_id=conductor_id)
-            serializer = LicenciaSerializer(licencias, many=False)
-            return Response(serializer.data)
-        except Licencia.DoesNotExist:
-            return Response(
-                {"error": _("No se encontraron licencias para el conductor especificado.")},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    @action(detail=False, methods=['get'], schema=LicenciaFilterSchema())
+    def vigencia(self, request: Request):
+        """Devuelve la vigencia de la licencia de un conductor.
 
-class KilometrajeView(viewsets.ModelViewSet):
+        Su versión asíncrona es `vigencia_licencia_asincrona`.
+
+        Args:
+            request (Request): La petición HTTP con el parámetro opcional
+                `conductor_id` (por defecto, el perfil del usuario).
+
+        Returns:
+            Response: La licencia del conductor con su vigencia y los días
+            que faltan para su caducidad, o 404 si no tiene licencia.
+        """
+        licencia = get_object_or_404(self.get_queryset(), conductor_id=obtener_perfil_id(request))
+        return Response(VigenciaLicenciaSerializer(licencia).data)
+
+    @action(detail=False, methods=['get'], schema=LicenciaFilterSchema())
+    def caducidad(self, request: Request):
+        """Revisa la caducidad de las licencias de los conductores de una empresa.
+
+        Agrupa las licencias caducadas y las que caducan en los próximos 7,
+        30 o 90 días, y lista las órdenes de movimiento abiertas cuyo
+        conductor tiene la licencia caducada (ver `licencias.py`).
+
+        Args:
+            request (Request): La petición HTTP con los parámetros `empresa_id`
+                y `fecha` (opcional, por defecto la fecha actual).
+
+        Returns:
+            Response: El resumen de la empresa, o un mensaje de error si los
+            parámetros son incorrectos.
+        """
+        parametros = {
+            parametro.nombre: None for parametro in self.parametros_caducidad
+        }
+        parametros.update(self.obtener_filtros(request, self.parametros_caducidad))
+        self.verificar_empresa(parametros['empresa_id'])
+        return Response(escanear_licencias(parametros['empresa_id'], parametros['fecha']))
+
+class KilometrajeView(
+    AlcanceEmpresaMixin, ExportacionMixin, BusquedaMixin, viewsets.ModelViewSet
+):
     """
     Vista para gestionar los kilometrajes de los vehículos.
     """
     queryset = Kilometraje.objects.all()
     serializer_class = KilometrajeSerializer
+    parametros_busqueda = (Parametro('vehiculo_id', requerido=True),)
+    presupuesto_consultas = {
+        'list': 2, 'retrieve': 2, 'search_by': 2, 'bulk': 12, 'exportar': 2
+    }
+    nombre_exportacion = 'kilometrajes'
+    campos_exportacion = ('id', 'vehiculo_id', 'vehiculo__placa', 'fecha', 'kilometraje', 'unidad')
+    parametros_exportacion = (
+        Parametro('empresa_id', requerido=True),
+        Parametro('vehiculo_id'),
+        Parametro('desde', tipo=date, campo='fecha__gte'),
+        Parametro('hasta', tipo=date, campo='fecha__lte'),
+    )
 
     @action(detail=False, methods=['get'], schema=KilometrajeFilterSchema())
     def search_by(self, request: Request):
@@ -158,33 +243,98 @@ class KilometrajeView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con el parámetro de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados de los kilometrajes
-            que pertenecen al vehículo especificado, o un mensaje de error si no se
-            encontraron kilometrajes o si el parámetro de búsqueda es incorrecto.
+            Response: Una página con los datos serializados de los kilometrajes
+            que pertenecen al vehículo especificado, o un mensaje de error
+            si el parámetro de búsqueda es incorrecto.
         """
-        vehiculo_id = request.query_params.get('vehiculo_id')
+        return self.buscar(request)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[JSONParser, NDJSONParser],
+        schema=KilometrajeFilterSchema()
+    )
+    def bulk(self, request: Request):
+        """Registra en bloque las lecturas de odómetro de los equipos de telemetría.
+
+        El cuerpo de la petición puede ser un arreglo JSON o un flujo NDJSON
+        (`application/x-ndjson`) con un objeto por lectura. Las lecturas válidas
+        se guardan y las inválidas se devuelven en el reporte de errores.
 
-        if not vehiculo_id:
+        Con `?asincrono=true` la ingesta se encola como tarea en segundo plano
+        (ver `tareas`) y el reporte queda en el resultado de la tarea.
+
+        Args:
+            request (Request): La petición HTTP con las lecturas.
+
+        Returns:
+            Response: El reporte de la ingesta con estado 201 si se guardó al menos
+            una lectura, o 400 si el cuerpo es inválido o se rechazaron todas;
+            o la tarea encolada con estado 202.
+        """
+        filas = request.data
+        if not isinstance(filas, list):
             return Response(
-                {"error": _("Parámetro de búsqueda incorrecto: vehiculo_id es obligatorio.")},
+                {"error": _("Se esperaba una lista de lecturas.")},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        try:
-            kilometrajes = Kilometraje.objects.filter(vehiculo_id=vehiculo_id)
-            serializer = KilometrajeSerializer(kilometrajes, many=True)
-            return Response(serializer.data)
-        except Kilometraje.DoesNotExist:
+        maximo = getattr(settings, 'INGESTA_KILOMETRAJE_MAX_FILAS', 10000)
+        if len(filas) > maximo:
             return Response(
-                {"error": _("No se encontraron kilometrajes para el vehículo especificado."),},
-                status=status.HTTP_404_NOT_FOUND
+                {"error": _("Se admiten como máximo %(maximo)s lecturas por petición.")
+                    % {'maximo': maximo}},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        if request.query_params.get('asincrono', '').lower() in ('1', 'true'):
+            empresa_id = obtener_empresa_id(request)
+            tarea = encolar(
+                ingerir_kilometrajes_en_bloque,
+                empresa_id=empresa_id,
+                usuario=request.user,
+                filas=filas,
+                empresa=empresa_id,
+                todas_las_empresas=es_global(request),
+            )
+            return respuesta_tarea(request, tarea)
+        reporte = ingerir_kilometrajes(
+            filas, vehiculos=self.limitar_a_empresa(Vehiculo.objects.all())
+        )
+        codigo = status.HTTP_201_CREATED if reporte['creadas'] or not filas \
+            else status.HTTP_400_BAD_REQUEST
+        return Response(reporte, status=codigo)
 
-class VehiculoView(viewsets.ModelViewSet):
+class VehiculoView(AlcanceEmpresaMixin, BusquedaMixin, viewsets.ModelViewSet):
     """
     Vista para gestionar vehículos.
+
+    Los vehículos se pueden filtrar por su kilometraje actual con los
+    parámetros `kilometraje_min` y `kilometraje_max`.
     """
-    queryset = Vehiculo.objects.all()
+    queryset = Vehiculo.objects.select_related('kilometraje_actual')
     serializer_class = VehiculoSerializer
+    presupuesto_consultas = {'list': 2, 'retrieve': 2, 'search_by': 2, 'estado': 2}
+    schema = VehiculoFilterSchema()
+    parametros_busqueda = (Parametro('propietario_id', requerido=True),)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filtros = {
+            'kilometraje_min': 'kilometraje_actual__kilometraje__gte',
+            'kilometraje_max': 'kilometraje_actual__kilometraje__lte',
+        }
+        for parametro, filtro in filtros.items():
+            valor = self.request.query_params.get(parametro)
+            if valor is None:
+                continue
+            try:
+                numero = Decimal(valor)
+            except InvalidOperation:
+                numero = None
+            if numero is None or not numero.is_finite():
+                raise ValidationError({parametro: _("Debe ser un número.")})
+            queryset = queryset.filter(**{filtro: numero})
+        return queryset
 
     @action(detail=False, methods=['get'], schema=VehiculoFilterSchema())
     def search_by(self, request: Request):
@@ -197,23 +347,42 @@ class VehiculoView(viewsets.ModelViewSet):
             request (Request): La petición HTTP con el parámetro de búsqueda.
 
         Returns:
-            Response: Una respuesta HTTP con los datos serializados de los vehículos
-            que pertenecen al propietario especificado, o un mensaje de error si no se
-            encontraron vehículos o si el parámetro de búsqueda es incorrecto.
+            Response: Una página con los datos serializados de los vehículos
+            que pertenecen al propietario especificado, o un mensaje de error
+            si el parámetro de búsqueda es incorrecto.
         """
-        propietario_id = request.query_params.get('propietario_id')
+        return self.buscar(request)
 
-        if not propietario_id:
-            return Response(
-                {"error": _("Parámetro de búsqueda incorrecto: propietario_id es obligatorio.")},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            vehiculos = Vehiculo.objects.filter(propietario_id=propietario_id)
-            serializer = VehiculoSerializer(vehiculos, many=True)
-            return Response(serializer.data)
-        except Vehiculo.DoesNotExist:
-            return Response(
-                {"error": _("No se encontraron vehículos para el propietario especificado.")},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    @action(detail=True, methods=['get'])
+    def estado(self, request: Request, pk=None):
+        """Devuelve el estado actual de un vehículo.
+
+        Incluye su condición, su kilometraje actual y el id de su orden de
+        movimiento abierta. Su versión asíncrona es `estado_vehiculo_asincrono`.
+
+        Returns:
+            Response: El estado del vehículo, o 404 si no existe.
+        """
+        queryset = estado_de_vehiculos(self.limitar_a_empresa(Vehiculo.objects.all()))
+        vehiculo = get_object_or_404(queryset, pk=pk)
+        return Response(EstadoVehiculoSerializer(vehiculo).data)
+
+@vista_asincrona
+async def estado_vehiculo_asincrono(request: HttpRequest, pk: int) -> dict:
+    """Versión asíncrona de `VehiculoView.estado`."""
+    queryset = estado_de_vehiculos(filtrar_por_empresa(request, Vehiculo.objects.all(), 'empresa'))
+    try:
+        vehiculo = await queryset.aget(pk=pk)
+    except Vehiculo.DoesNotExist:
+        raise Http404(_("El vehículo no existe."))
+    return EstadoVehiculoSerializer(vehiculo).data
+
+@vista_asincrona
+async def vigencia_licencia_asincrona(request: HttpRequest) -> dict:
+    """Versión asíncrona de `LicenciaView.vigencia`."""
+    queryset = filtrar_por_empresa(request, Licencia.objects.all(), 'empresa')
+    try:
+        licencia = await queryset.aget(conductor_id=obtener_perfil_id(request))
+    except Licencia.DoesNotExist:
+        raise Http404(_("El conductor no tiene licencia."))
+    return VigenciaLicenciaSerializer(licencia).data